@@ -0,0 +1,1114 @@
+import contextlib
+import itertools
+import json
+import select
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError, wait as futures_wait
+from enum import IntEnum
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from SharedRing import RingSocket
+
+# تعريفات الأوامر (نفس قيم ControlCommand في نواة C++)
+class ControlCommand(IntEnum):
+    CMD_INIT = 1
+    CMD_SHUTDOWN = 2
+    CMD_UPDATE_CONFIG = 3
+    CMD_SEND_CHAT = 4
+    CMD_GET_STATUS = 5
+    CMD_CREATE_PLAYER = 6
+    CMD_REMOVE_PLAYER = 7
+    CMD_UPDATE_PLAYER = 8
+    CMD_READ_MEMORY = 9
+    CMD_WRITE_MEMORY = 10
+    CMD_BATCH = 11
+    CMD_SUBSCRIBE = 12
+    CMD_UNSUBSCRIBE = 13
+    CMD_STATE_PUSH = 14  # من النواة فقط: إطار بث، رقم الطلب = رقم الاشتراك
+
+# بت في رقم الأمر: أمر مؤطر برقم طلب (الخادم يقبل الصيغتين على نفس المنفذ)
+PIPELINE_FLAG = 0x80000000
+MAX_PACKET_SIZE = 4096
+
+STATUS_OK = 0x00000001
+STATUS_FAILED = 0x00000000
+STATUS_ERROR = 0xFFFFFFFF
+
+# الطلب: [الأمر | PIPELINE_FLAG][رقم الطلب][حجم البيانات] + البيانات
+REQUEST_HEADER = struct.Struct('<III')
+# الرد: [الأمر][الحالة][حجم البيانات][رقم الطلب] + البيانات (أول 12 بايت كالصيغة القديمة)
+RESPONSE_HEADER = struct.Struct('<IIII')
+LEGACY_RESPONSE_HEADER = struct.Struct('<III')
+
+# CMD_BATCH: [العدد] ثم لكل أمر [الأمر:2][الحجم:2] + البيانات
+BATCH_COUNT = struct.Struct('<I')
+BATCH_ITEM = struct.Struct('<HH')
+# الرد: [عدد المنفذ] ثم لكل أمر [الحالة:4][الحجم:2] + البيانات
+BATCH_RESULT = struct.Struct('<IH')
+MAX_BATCH_PAYLOAD = MAX_PACKET_SIZE - 4   # مخزن الاستقبال في الخادم ناقص رقم الأمر
+MAX_BATCH_REPLY = MAX_PACKET_SIZE - 12    # ControlResponse.data
+
+# الاشتراك: [نوع البث][الأعلام][المعدل Hz][حد تغير الموقع][مهلة الإبقاء ms] -> [رقم الاشتراك]
+STREAM_LOCAL_PLAYER = 1
+SUBSCRIBE_ON_CHANGE = 0x1  # إرسال فقط عند التغير (مع إطار إبقاء كل مهلة)
+SUBSCRIBE_REQUEST = struct.Struct('<IIffI')
+SUBSCRIPTION_ID = struct.Struct('<I')
+ROTATION_EPSILON = 0.5  # درجات، مثل StateSampler
+STALE_MARGIN = 0.25  # ثوانٍ فوق مهلة الإبقاء قبل اعتبار آخر إطار قديماً
+# إطار اللاعب المحلي: [التسلسل][وقت النواة ms][الموقع 3f][الدوران 3f][المركبة][الحركة]
+LOCAL_PLAYER_FRAME = struct.Struct('<II6fIi')
+
+class LocalPlayerState(NamedTuple):
+    sequence: int
+    core_time_ms: int
+    position: Tuple[float, float, float]
+    rotation: Tuple[float, float, float]
+    vehicle: int
+    animation: int
+    received: float  # time.monotonic() عند الاستقبال
+
+    @classmethod
+    def unpack(cls, data: bytes, received: float) -> 'LocalPlayerState':
+        sequence, core_time, x, y, z, rx, ry, rz, vehicle, animation = LOCAL_PLAYER_FRAME.unpack_from(data)
+        return cls(sequence, core_time, (x, y, z), (rx, ry, rz), vehicle, animation, received)
+
+class StateStream:
+    """بث حالة من النواة: آخر إطار (latest)، الإطار التالي (get)، تكرار عادي أو async، أو callbacks
+
+    الإطارات تُقرأ في أي خيط يضخ القناة (انتظار رد، get، latest)، ويُحفظ الأحدث فقط.
+    """
+
+    def __init__(self, channel: 'PipelinedChannel', subscription_id: int,
+                 decode: Callable[[bytes, float], object] = LocalPlayerState.unpack,
+                 keepalive: float = 1.0):
+        self.channel = channel
+        self.id = subscription_id
+        self.decode = decode
+        self.keepalive = keepalive
+        self.state = None
+        self.callbacks: List[Callable] = []
+        self.closed = False
+        self._new = False
+        self._arrived = threading.Event()
+
+        # إحصائيات
+        self.frames = 0
+        self.conflated = 0  # إطارات استبدلها أحدث منها قبل قراءتها
+
+    def _deliver(self, data: bytes):
+        state = self.decode(data, time.monotonic())
+        if self._new:
+            self.conflated += 1
+        self.state = state
+        self.frames += 1
+        self._new = True
+        self._arrived.set()
+        for callback in self.callbacks:
+            try:
+                callback(state)
+            except Exception as e:
+                print(f"Stream callback error: {e}")
+
+    def add_callback(self, callback: Callable):
+        """callback(state) لكل إطار، في الخيط الذي يضخ القناة"""
+        self.callbacks.append(callback)
+
+    @property
+    def latest(self):
+        """آخر حالة بدون انتظار (الإطارات الواصلة تُقرأ أولاً)"""
+        self.channel.poll()
+        self._new = False
+        return self.state
+
+    def fresh(self, max_age: Optional[float] = None):
+        """آخر حالة إن وصلت خلال max_age (افتراضياً مهلة الإبقاء + STALE_MARGIN)، وإلا None
+
+        النواة لا ترسل شيئاً حين يتعذر قراءة اللاعب والاتصال قائم، فالإطار القديم لا يُعتمد.
+        """
+        state = self.latest
+        if state is None or self.closed:
+            return None
+        if max_age is None:
+            max_age = self.keepalive + STALE_MARGIN
+        return state if time.monotonic() - state.received <= max_age else None
+
+    def get(self, timeout: Optional[float] = None):
+        """انتظار إطار جديد: None عند انتهاء المهلة أو الإغلاق"""
+        if not self._new:
+            self._arrived.clear()
+            self.channel.wait_until(lambda: self._new or self.closed, self._arrived.wait, timeout)
+        if not self._new:
+            return None
+        self._new = False
+        return self.state
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        state = self.get()
+        if state is None:
+            raise StopIteration
+        return state
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        import asyncio
+        state = await asyncio.get_running_loop().run_in_executor(None, self.get)
+        if state is None:
+            raise StopAsyncIteration
+        return state
+
+    def _close(self):
+        self.closed = True
+        self._arrived.set()
+
+    def close(self):
+        """إلغاء الاشتراك"""
+        if not self.closed:
+            self.channel.unsubscribe(self)
+
+class BatchResult:
+    """نتيجة أمر داخل دفعة - تكتمل بعد إرسال الدفعة"""
+    __slots__ = ('status', 'data')
+
+    def __init__(self):
+        self.status = None
+        self.data = b''
+
+    @property
+    def ok(self) -> bool:
+        return self.status == STATUS_OK
+
+    def __repr__(self):
+        return f"BatchResult(status={self.status}, data={self.data!r})"
+
+class CommandBatch:
+    """تجميع أوامر القراءة والكتابة وتحديث اللاعبين في أطر CMD_BATCH
+
+    الدفعة تُقسم إلى عدة أطر عندما تتجاوز حدود الطلب أو الرد (MAX_PACKET_SIZE).
+    """
+
+    def __init__(self):
+        self.items: List[tuple] = []  # (الأمر، البيانات، حجم الرد المتوقع، النتيجة)
+
+    def add(self, command: int, payload: bytes = b'', reply_size: int = 0) -> BatchResult:
+        if command == ControlCommand.CMD_BATCH:
+            raise ValueError("CMD_BATCH cannot be nested")
+        if BATCH_COUNT.size + BATCH_ITEM.size + len(payload) > MAX_BATCH_PAYLOAD:
+            raise ValueError(f"Batch item too large: {len(payload)} bytes")
+        result = BatchResult()
+        self.items.append((int(command), payload, reply_size, result))
+        return result
+
+    def read_memory(self, address: int, size: int) -> BatchResult:
+        return self.add(ControlCommand.CMD_READ_MEMORY, struct.pack('<II', address, size), size)
+
+    def write_memory(self, address: int, data: bytes) -> BatchResult:
+        return self.add(ControlCommand.CMD_WRITE_MEMORY, struct.pack('<II', address, len(data)) + data)
+
+    def update_player(self, player_id: int, position: Tuple[float, float, float],
+                      rotation: Tuple[float, float, float]) -> BatchResult:
+        return self.add(ControlCommand.CMD_UPDATE_PLAYER, struct.pack('<Iffffff', player_id, *position, *rotation))
+
+    def frames(self) -> List[Tuple[bytes, List[BatchResult]]]:
+        """بيانات أطر CMD_BATCH (بدون رقم الأمر) مع نتائج كل إطار"""
+        frames = []
+        chunks, results = [], []
+        request_size = reply_size = BATCH_COUNT.size
+        for command, payload, expected, result in self.items:
+            item_size = BATCH_ITEM.size + len(payload)
+            item_reply = BATCH_RESULT.size + expected
+            if results and (request_size + item_size > MAX_BATCH_PAYLOAD or reply_size + item_reply > MAX_BATCH_REPLY):
+                frames.append((BATCH_COUNT.pack(len(results)) + b''.join(chunks), results))
+                chunks, results = [], []
+                request_size = reply_size = BATCH_COUNT.size
+            chunks.append(BATCH_ITEM.pack(command, len(payload)))
+            chunks.append(payload)
+            results.append(result)
+            request_size += item_size
+            reply_size += item_reply
+        if results:
+            frames.append((BATCH_COUNT.pack(len(results)) + b''.join(chunks), results))
+        return frames
+
+    @staticmethod
+    def decode(data: bytes, results: List[BatchResult]) -> int:
+        """توزيع رد إطار على النتائج: عدد الأوامر الناجحة (غير المنفذة تبقى فاشلة)"""
+        for result in results:
+            result.status, result.data = STATUS_FAILED, b''
+        if len(data) < BATCH_COUNT.size:
+            return 0
+        completed = min(BATCH_COUNT.unpack_from(data)[0], len(results))
+        offset = BATCH_COUNT.size
+        succeeded = 0
+        for result in results[:completed]:
+            if offset + BATCH_RESULT.size > len(data):
+                break
+            status, size = BATCH_RESULT.unpack_from(data, offset)
+            offset += BATCH_RESULT.size
+            result.status, result.data = status, data[offset:offset + size]
+            offset += size
+            succeeded += status == STATUS_OK
+        return succeeded
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+class PendingReply(Future):
+    """Future لرد أمر: result() تقرأ الردود من المقبس في خيط المستدعي حتى يصل ردها"""
+
+    def __init__(self, channel: 'PipelinedChannel'):
+        super().__init__()
+        self.channel = channel
+        self.request_id: Optional[int] = None
+
+    def result(self, timeout: Optional[float] = None):
+        if not self.done():
+            self.channel.wait(self, timeout)
+            if not self.done():
+                # انتهت المهلة: الرد المتأخر يُهمل عند وصوله
+                self.channel.discard(self)
+        # بعد wait إما اكتملت أو انتهت المهلة (TimeoutError)
+        return super().result(0)
+
+class PipelinedChannel:
+    """قناة تحكم بعدة أوامر في الطريق: كل أمر برقم طلب، والردود تحل Future بأي ترتيب
+
+    بدون خيط قراءة: الخيط الذي ينتظر رداً يقرأ كل الردود المتاحة ويحلها
+    (خيط واحد يقرأ في كل لحظة، والبقية تنتظر). الإرسال من أي خيط (مع قفل).
+    """
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.send_lock = threading.Lock()
+        self.recv_lock = threading.Lock()
+        self.pending: Dict[int, Future] = {}
+        self.pending_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._buffer = b''
+        # المقبس بدون مهلة (الإرسال لا ينقطع)؛ مهلة الانتظار عبر select
+        # أو wait_readable لوسائل النقل الأخرى (RingSocket)
+        sock.settimeout(None)
+        self._wait_readable = getattr(sock, 'wait_readable', None)
+        self.streams: Dict[int, StateStream] = {}
+        self._early_pushes: Dict[int, bytes] = {}  # إطارات وصلت قبل تسجيل اشتراكها
+        self._unsubscribed: Set[int] = set()  # إطاراتها المتأخرة (في الطريق) تُهمل
+        self.closed = False
+        self.error: Optional[Exception] = None
+
+        # إحصائيات
+        self.sent = 0
+        self.received = 0
+        self.pushes = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.max_in_flight = 0
+
+    def submit(self, command: int, data: bytes = b'') -> Future:
+        """إرسال أمر بدون انتظار: Future تُحل بـ (الحالة، البيانات)"""
+        return self.submit_many([(command, data)])[0]
+
+    def submit_many(self, commands) -> List[Future]:
+        """إرسال عدة أوامر (الأمر، البيانات) في استدعاء إرسال واحد"""
+        futures = [PendingReply(self) for _ in commands]
+        if self.closed:
+            for future in futures:
+                future.set_exception(ConnectionError(f"Control channel closed: {self.error}"))
+            return futures
+
+        frames = []
+        with self.pending_lock:
+            for future, (command, data) in zip(futures, commands):
+                request_id = next(self._ids) & 0xFFFFFFFF
+                future.request_id = request_id
+                self.pending[request_id] = future
+                frames.append(REQUEST_HEADER.pack(int(command) | PIPELINE_FLAG, request_id, len(data)))
+                frames.append(data)
+            self.max_in_flight = max(self.max_in_flight, len(self.pending))
+        packet = b''.join(frames)
+        try:
+            with self.send_lock:
+                self.sock.sendall(packet)
+            self.sent += len(futures)
+            self.bytes_sent += len(packet)
+        except OSError as e:
+            self._fail(e)
+        return futures
+
+    def call(self, command: int, data: bytes = b'', timeout: Optional[float] = 5.0) -> Tuple[int, bytes]:
+        """أمر متزامن (عمق 1)"""
+        return self.submit(command, data).result(timeout)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self.pending)
+
+    def discard(self, future: PendingReply):
+        """التخلي عن أمر لم يصل رده (انتهت مهلته): يخرج من pending بدون إغلاق القناة"""
+        with self.pending_lock:
+            if self.pending.get(future.request_id) is future:
+                del self.pending[future.request_id]
+
+    def wait(self, future: Future, timeout: Optional[float] = None):
+        """قراءة الردود حتى تُحل future أو تنتهي المهلة"""
+        self.wait_until(future.done, lambda wait_time: futures_wait([future], timeout=wait_time), timeout)
+
+    def wait_until(self, done: Callable[[], bool], block: Callable[[float], object],
+                   timeout: Optional[float] = None):
+        """قراءة الردود حتى done() أو تنتهي المهلة؛ block(ثوان) عندما يقرأ خيط آخر"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not done() and not self.closed:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return
+            if self.recv_lock.acquire(blocking=False):
+                try:
+                    if not done():
+                        self._pump(remaining)
+                finally:
+                    self.recv_lock.release()
+            else:
+                # خيط آخر يقرأ، وسيحل ردنا عند وصوله
+                block(0.05 if remaining is None else min(remaining, 0.05))
+
+    def poll(self):
+        """قراءة ما وصل بدون انتظار (إطارات البث والردود)"""
+        if self.recv_lock.acquire(blocking=False):
+            try:
+                self._pump(0)
+            finally:
+                self.recv_lock.release()
+
+    def subscribe(self, stream_type: int, rate: float, flags: int = 0, epsilon: float = 0.0,
+                  keepalive: float = 1.0, decode=LocalPlayerState.unpack,
+                  timeout: float = 5.0) -> Optional[StateStream]:
+        """طلب بث من النواة؛ None إن لم تدعمه (نواة قديمة)"""
+        payload = SUBSCRIBE_REQUEST.pack(stream_type, flags, rate, epsilon, int(keepalive * 1000))
+        status, data = self.call(ControlCommand.CMD_SUBSCRIBE, payload, timeout)
+        if status != STATUS_OK or len(data) < SUBSCRIPTION_ID.size:
+            return None
+        stream = StateStream(self, SUBSCRIPTION_ID.unpack_from(data)[0], decode, keepalive)
+        with self.recv_lock:
+            self.streams[stream.id] = stream
+            early = self._early_pushes.pop(stream.id, None)
+            if early is not None:
+                stream._deliver(early)
+        return stream
+
+    def unsubscribe(self, stream: StateStream, timeout: float = 5.0) -> bool:
+        with self.recv_lock:
+            self._unsubscribed.add(stream.id)
+            self.streams.pop(stream.id, None)
+            self._early_pushes.pop(stream.id, None)
+        stream._close()
+        if self.closed:
+            return False
+        status, _ = self.call(ControlCommand.CMD_UNSUBSCRIBE, SUBSCRIPTION_ID.pack(stream.id), timeout)
+        return status == STATUS_OK
+
+    def _pump(self, timeout: Optional[float]):
+        """قراءة واحدة من المقبس وحل كل الردود الكاملة فيها"""
+        try:
+            if timeout is not None:
+                if self._wait_readable is not None:
+                    if not self._wait_readable(timeout):
+                        return
+                elif not select.select([self.sock], [], [], timeout)[0]:
+                    return
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                raise ConnectionError("Control server closed the connection")
+        except (OSError, ValueError) as e:
+            self._fail(e)
+            return
+        self.bytes_received += len(chunk)
+
+        buffer = self._buffer + chunk if self._buffer else chunk
+        # قراءة واحدة قد تحمل ردوداً كثيرة
+        offset = 0
+        while len(buffer) - offset >= RESPONSE_HEADER.size:
+            command, status, size, request_id = RESPONSE_HEADER.unpack_from(buffer, offset)
+            end = offset + RESPONSE_HEADER.size + size
+            if end > len(buffer):
+                break
+            data = buffer[offset + RESPONSE_HEADER.size:end]
+            offset = end
+            if command & ~PIPELINE_FLAG == ControlCommand.CMD_STATE_PUSH:
+                # إطار بث: رقم الطلب هو رقم الاشتراك
+                self.pushes += 1
+                stream = self.streams.get(request_id)
+                if stream is not None:
+                    stream._deliver(data)
+                elif request_id not in self._unsubscribed:
+                    self._early_pushes[request_id] = data
+                continue
+            with self.pending_lock:
+                future = self.pending.pop(request_id, None)
+            self.received += 1
+            if future is not None and not future.done():
+                future.set_result((status, data))
+        self._buffer = buffer[offset:]
+
+    def _fail(self, error: Exception):
+        """فشل الاتصال: كل الأوامر المعلقة تفشل"""
+        self.closed = True
+        self.error = error
+        with self.pending_lock:
+            pending, self.pending = self.pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError(f"Control channel failed: {error}"))
+        for stream in list(self.streams.values()):
+            stream._close()
+
+    def close(self):
+        self._fail(ConnectionError("Control channel closed"))
+
+class StandInControlServer:
+    """خادم تحكم محلي بنفس أوامر نواة C++ فوق واجهة ذاكرة (ملف تفريغ أو عملية) للاختبار
+
+    يقبل الصيغة القديمة (أمر لكل recv) والصيغة المؤطرة برقم طلب.
+    reorder=True يرسل ردود كل دفعة مقروءة بترتيب معكوس (لاختبار الحل خارج الترتيب).
+    latency تأخير قبل كل رد (محاكاة زمن الرحلة إلى خيط اللعبة).
+    CMD_SUBSCRIBE يبدأ خيط بث لكل اشتراك يقرأ اللاعب المحلي من base_address + 0xB7CD98.
+    """
+
+    def __init__(self, backend, host: str = '127.0.0.1', port: int = 0, reorder: bool = False,
+                 latency: float = 0.0, entity_base: int = 0, entity_size: int = 0x198,
+                 base_address: int = 0x00400000):
+        self.backend = backend
+        self.base_address = base_address
+        self.reorder = reorder
+        self.latency = latency
+        self.drop_after: Optional[int] = None  # قطع الاتصال بعد هذا العدد من قراءات المقبس (نواة ماتت)
+        self.entity_base = entity_base
+        self.entity_size = entity_size
+        self.players: Dict[int, int] = {}  # رقم اللاعب -> عنوان الكائن
+        self.lock = threading.Lock()
+        self.commands = 0
+        self.pushes = 0
+        self.subscription_ids = itertools.count(1)
+        self.ring: Optional[RingSocket] = None
+
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((host, port))
+        self.server.listen(5)
+        self.port = self.server.getsockname()[1]
+        self.running = True
+        self.thread = threading.Thread(target=self._accept_loop, daemon=True, name="StandInControlServer")
+        self.thread.start()
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                client, _ = self.server.accept()
+            except OSError:
+                break
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._handle_client, args=(client,), daemon=True).start()
+
+    def serve_ring(self, name: str):
+        """خدمة عميل إضافي عبر حلقتي الذاكرة المشتركة (نفس الأوامر المؤطرة)"""
+        self.ring = RingSocket.create(name)
+        self.ring_thread = threading.Thread(target=self._ring_loop, daemon=True, name="StandInRingServer")
+        self.ring_thread.start()
+
+    def _ring_loop(self):
+        ring = self.ring
+        while self.running:
+            if ring.client_attached():
+                self._serve_stream(ring)
+            elif not ring.client_closing():
+                time.sleep(0.001)
+                continue
+            # العميل أغلق: الحلقتان للعميل التالي
+            ring.reset()
+
+    def _handle_client(self, client: socket.socket):
+        try:
+            self._serve_stream(client)
+        finally:
+            client.close()
+
+    def _serve_stream(self, client):
+        pending = b''
+        send_lock = threading.Lock()  # الردود وإطارات البث من عدة خيوط (الحلقة منتج واحد)
+        subscriptions: Dict[int, dict] = {}
+        try:
+            while self.running:
+                chunk = client.recv(65536)
+                if not chunk:
+                    break
+                if self.drop_after is not None:
+                    self.drop_after -= 1
+                    if self.drop_after < 0:
+                        break
+                if not pending and (len(chunk) < 4 or not struct.unpack_from('<I', chunk)[0] & PIPELINE_FLAG):
+                    # الصيغة القديمة: أمر واحد لكل recv
+                    command, status, data = self.process(chunk)
+                    if self.latency:
+                        time.sleep(self.latency)
+                    with send_lock:
+                        client.sendall(LEGACY_RESPONSE_HEADER.pack(command, status, len(data)) + data)
+                    continue
+
+                pending += chunk
+                replies = []
+                offset = 0
+                while len(pending) - offset >= REQUEST_HEADER.size:
+                    command, request_id, size = REQUEST_HEADER.unpack_from(pending, offset)
+                    end = offset + REQUEST_HEADER.size + size
+                    if end > len(pending):
+                        break
+                    payload = pending[offset + REQUEST_HEADER.size:end]
+                    offset = end
+                    if command & ~PIPELINE_FLAG == ControlCommand.CMD_SUBSCRIBE:
+                        status, data = self._subscribe(client, send_lock, subscriptions, payload)
+                    elif command & ~PIPELINE_FLAG == ControlCommand.CMD_UNSUBSCRIBE and size >= 4:
+                        subscription = subscriptions.pop(SUBSCRIPTION_ID.unpack_from(payload)[0], None)
+                        if subscription is not None:
+                            subscription['active'] = False
+                        status, data = (STATUS_OK if subscription else STATUS_FAILED), b''
+                    else:
+                        _, status, data = self.process(struct.pack('<I', command & ~PIPELINE_FLAG) + payload)
+                    replies.append(RESPONSE_HEADER.pack(command, status, len(data), request_id) + data)
+                pending = pending[offset:]
+                if self.reorder:
+                    replies.reverse()
+                if replies:
+                    if self.latency:
+                        time.sleep(self.latency)
+                    with send_lock:
+                        client.sendall(b''.join(replies))
+        except OSError:
+            pass
+        finally:
+            for subscription in subscriptions.values():
+                subscription['active'] = False
+            for subscription in subscriptions.values():
+                subscription['thread'].join(timeout=1.0)
+
+    def _subscribe(self, client, send_lock: threading.Lock, subscriptions: Dict[int, dict],
+                   payload: bytes) -> Tuple[int, bytes]:
+        if len(payload) < SUBSCRIBE_REQUEST.size:
+            return STATUS_FAILED, b''
+        stream_type, flags, rate, epsilon, keepalive_ms = SUBSCRIBE_REQUEST.unpack_from(payload)
+        if stream_type != STREAM_LOCAL_PLAYER or not 0 < rate <= 1000:
+            return STATUS_FAILED, b''
+        subscription_id = next(self.subscription_ids)
+        subscription = {'active': True}
+        subscription['thread'] = threading.Thread(
+            target=self._push_loop, daemon=True, name=f"StandInPush-{subscription_id}",
+            args=(client, send_lock, subscription, subscription_id, flags, rate, epsilon, keepalive_ms / 1000.0))
+        subscriptions[subscription_id] = subscription
+        subscription['thread'].start()
+        return STATUS_OK, SUBSCRIPTION_ID.pack(subscription_id)
+
+    def _local_player_state(self) -> Optional[tuple]:
+        """(الموقع، الدوران، المركبة، الحركة) بقراءتين: المؤشر ثم كائن اللاعب"""
+        pointer = struct.unpack('<I', self.backend.read(self.base_address + 0xB7CD98, 4))[0]
+        if not pointer:
+            return None
+        ped = self.backend.read(pointer, 0x5A4)
+        return (struct.unpack_from('<fff', ped, 0x14), struct.unpack_from('<fff', ped, 0x20),
+                struct.unpack_from('<I', ped, 0x58C)[0], struct.unpack_from('<i', ped, 0x5A0)[0])
+
+    def _push_loop(self, client, send_lock: threading.Lock, subscription: dict, subscription_id: int,
+                   flags: int, rate: float, epsilon: float, keepalive: float):
+        interval = 1.0 / rate
+        sequence = 0
+        last_state = None
+        last_sent = 0.0
+        next_tick = time.monotonic()
+        while self.running and subscription['active']:
+            now = time.monotonic()
+            try:
+                state = self._local_player_state()
+            except Exception:
+                state = None
+            if state is not None:
+                changed = (last_state is None
+                           or max(abs(a - b) for a, b in zip(state[0], last_state[0])) > epsilon
+                           or max(abs(a - b) for a, b in zip(state[1], last_state[1])) > ROTATION_EPSILON
+                           or state[2:] != last_state[2:])
+                if not flags & SUBSCRIBE_ON_CHANGE or changed or now - last_sent >= keepalive:
+                    body = LOCAL_PLAYER_FRAME.pack(sequence, int(now * 1000) & 0xFFFFFFFF,
+                                                   *state[0], *state[1], state[2], state[3])
+                    try:
+                        with send_lock:
+                            client.sendall(RESPONSE_HEADER.pack(ControlCommand.CMD_STATE_PUSH, STATUS_OK,
+                                                                len(body), subscription_id) + body)
+                    except OSError:
+                        break
+                    sequence += 1
+                    self.pushes += 1
+                    last_state = state
+                    last_sent = now
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.monotonic()
+
+    def process(self, frame: bytes) -> Tuple[int, int, bytes]:
+        """تنفيذ أمر بالصيغة القديمة: (الأمر، الحالة، البيانات)"""
+        self.commands += 1
+        if len(frame) < 4:
+            return 0, STATUS_ERROR, b''
+        command = struct.unpack_from('<I', frame)[0]
+        try:
+            return (command,) + self._execute(command, frame)
+        except Exception:
+            return command, STATUS_FAILED, b''
+
+    def _execute(self, command: int, frame: bytes) -> Tuple[int, bytes]:
+        if command == ControlCommand.CMD_INIT:
+            return STATUS_OK, b"Memory manager initialized\0"
+        if command in (ControlCommand.CMD_SHUTDOWN, ControlCommand.CMD_UPDATE_CONFIG, ControlCommand.CMD_SEND_CHAT):
+            return STATUS_OK, b''
+        if command == ControlCommand.CMD_GET_STATUS:
+            status = json.dumps({'attached': True, 'player_count': len(self.players), 'stand_in': True})
+            return STATUS_OK, status.encode('utf-8') + b'\0'
+        if command == ControlCommand.CMD_READ_MEMORY and len(frame) >= 12:
+            address, size = struct.unpack_from('<II', frame, 4)
+            if not 0 < size <= MAX_PACKET_SIZE - 12:
+                return STATUS_FAILED, b''
+            return STATUS_OK, self.backend.read(address, size)
+        if command == ControlCommand.CMD_WRITE_MEMORY and len(frame) >= 12:
+            address, size = struct.unpack_from('<II', frame, 4)
+            if not 0 < size <= len(frame) - 12:
+                return STATUS_FAILED, b''
+            self.backend.write(address, frame[12:12 + size])
+            return STATUS_OK, b''
+        if command == ControlCommand.CMD_CREATE_PLAYER and len(frame) >= 20:
+            player_id, x, y, z = struct.unpack_from('<Ifff', frame, 4)
+            with self.lock:
+                entity_addr = self.players.get(player_id)
+                if entity_addr is None:
+                    entity_addr = self.entity_base + len(self.players) * self.entity_size
+                    self.players[player_id] = entity_addr
+            self.backend.write(entity_addr + 0x14, struct.pack('<fff', x, y, z))
+            return STATUS_OK, struct.pack('<I', entity_addr)
+        if command == ControlCommand.CMD_REMOVE_PLAYER and len(frame) >= 8:
+            player_id = struct.unpack_from('<I', frame, 4)[0]
+            with self.lock:
+                removed = self.players.pop(player_id, None)
+            return (STATUS_OK if removed else STATUS_FAILED), b''
+        if command == ControlCommand.CMD_UPDATE_PLAYER and len(frame) >= 32:
+            player_id, x, y, z, rx, ry, rz = struct.unpack_from('<Iffffff', frame, 4)
+            entity_addr = self.players.get(player_id)
+            if entity_addr is None:
+                return STATUS_FAILED, b''
+            self.backend.write(entity_addr + 0x14, struct.pack('<fff', x, y, z))
+            self.backend.write(entity_addr + 0x20, struct.pack('<fff', rx, ry, rz))
+            return STATUS_OK, b''
+        if command == ControlCommand.CMD_BATCH and len(frame) >= 8:
+            count = BATCH_COUNT.unpack_from(frame, 4)[0]
+            offset = 8
+            replies = []
+            reply_size = BATCH_COUNT.size
+            for _ in range(count):
+                if offset + BATCH_ITEM.size > len(frame):
+                    break
+                item_command, size = BATCH_ITEM.unpack_from(frame, offset)
+                offset += BATCH_ITEM.size
+                if offset + size > len(frame) or item_command == ControlCommand.CMD_BATCH:
+                    break
+                _, status, data = self.process(struct.pack('<I', item_command) + frame[offset:offset + size])
+                offset += size
+                if reply_size + BATCH_RESULT.size + len(data) > MAX_BATCH_REPLY:
+                    if reply_size + BATCH_RESULT.size > MAX_BATCH_REPLY:
+                        break
+                    # الرد لا يتسع: الأمر نُفذ لكن بدون بيانات
+                    status, data = STATUS_FAILED, b''
+                replies.append(BATCH_RESULT.pack(status, len(data)) + data)
+                reply_size += BATCH_RESULT.size + len(data)
+            status = STATUS_OK if len(replies) == count else STATUS_FAILED
+            return status, BATCH_COUNT.pack(len(replies)) + b''.join(replies)
+        return STATUS_ERROR, b''
+
+    def close(self):
+        self.running = False
+        self.server.close()
+        if self.ring is not None:
+            self.ring.shutdown()
+            self.ring_thread.join(timeout=1.0)
+            self.ring.close()
+
+def benchmark_pipeline(port: int, address: int, depths=(1, 8, 64), commands: int = 4000) -> dict:
+    """أوامر/ثانية لقراءة 12 بايت مع depth أوامر في الطريق"""
+    results = {}
+
+    # المرجع: الصيغة القديمة (إرسال ثم انتظار الرد على نفس المقبس)
+    sock = socket.create_connection(('127.0.0.1', port))
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    request = struct.pack('<III', ControlCommand.CMD_READ_MEMORY, address, 12)
+    start_time = time.perf_counter()
+    for _ in range(commands // 4):
+        sock.sendall(request)
+        header = sock.recv(LEGACY_RESPONSE_HEADER.size + 12, socket.MSG_WAITALL)
+        assert len(header) == LEGACY_RESPONSE_HEADER.size + 12
+    results['legacy'] = (commands // 4) / (time.perf_counter() - start_time)
+    sock.close()
+
+    payload = struct.pack('<II', address, 12)
+    for depth in depths:
+        sock = socket.create_connection(('127.0.0.1', port))
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        channel = PipelinedChannel(sock)
+        in_flight = []
+        start_time = time.perf_counter()
+        for _ in range(commands):
+            if len(in_flight) >= depth:
+                status, data = in_flight.pop(0).result(5.0)
+                assert status == STATUS_OK and len(data) == 12
+            in_flight.append(channel.submit(ControlCommand.CMD_READ_MEMORY, payload))
+        for future in in_flight:
+            future.result(5.0)
+        results[depth] = commands / (time.perf_counter() - start_time)
+        channel.close()
+        sock.close()
+    return results
+
+def benchmark_batch(controller, entity_base: int, players: int = 16, ticks: int = 200,
+                    entity_size: int = 0x198) -> dict:
+    """نبضة تحديث (3 كتابات لكل لاعب + قراءة): أمر لكل كتابة مقابل دفعة CMD_BATCH"""
+    results = {}
+    for mode in ('per_command', 'batched'):
+        frames_before = controller.batch_frames
+        start_time = time.perf_counter()
+        for tick in range(ticks):
+            with controller.batch() if mode == 'batched' else contextlib.nullcontext() as batch:
+                for player in range(players):
+                    entity_addr = entity_base + player * entity_size
+                    controller.write_memory_vector3(entity_addr + 0x14, float(tick), float(player), 10.0)
+                    controller.write_memory_vector3(entity_addr + 0x20, 0.0, 0.0, float(tick % 360))
+                    controller.write_memory_int(entity_addr + 0x5A0, tick & 7)
+                if batch is None:
+                    animation = controller.read_memory_int(entity_base + 0x5A0)
+                else:
+                    animation = batch.read_memory(entity_base + 0x5A0, 4)
+            if batch is not None:
+                animation = struct.unpack('<i', animation.data)[0]
+            assert animation == tick & 7
+        elapsed = time.perf_counter() - start_time
+        results[mode] = {
+            'ticks_per_sec': ticks / elapsed,
+            'commands_per_sec': ticks * (3 * players + 1) / elapsed,
+            'frames_per_tick': (controller.batch_frames - frames_before) / ticks if mode == 'batched'
+                               else 3 * players + 1,
+        }
+    return results
+
+def benchmark_stream(controller, backend, player_address: int, ticks: int = 40, sync_rate: float = 20.0,
+                     stream_rates=(20.0, 40.0), game_rate: float = 60.0) -> dict:
+    """استطلاع get_local_player_position مقابل بث مشترك في حلقة مزامنة بمعدل sync_rate
+
+    "لعبة" تكتب وقتها (ms) في x عند game_rate، فعمر الموقع المقروء = الوقت الحالي - x.
+    """
+    start = time.monotonic()
+    game_running = True
+
+    def game():
+        while game_running:
+            backend.write(player_address + 0x14, struct.pack('<f', (time.monotonic() - start) * 1000.0))
+            time.sleep(1.0 / game_rate)
+
+    game_thread = threading.Thread(target=game, daemon=True)
+    game_thread.start()
+    results = {}
+    channel = controller.channel
+    for mode in ('poll',) + tuple(f'stream {rate:g} Hz' for rate in stream_rates):
+        stream = None
+        if mode != 'poll':
+            stream = controller.subscribe_local_player(rate=float(mode.split()[1]))
+            stream.get(1.0)
+        messages = channel.sent + channel.received + channel.pushes
+        traffic = channel.bytes_sent + channel.bytes_received
+        call_time = 0.0
+        ages = []
+        for _ in range(ticks):
+            time.sleep(1.0 / sync_rate)
+            call_start = time.perf_counter()
+            position = stream.latest.position if stream else controller.get_local_player_position()
+            call_time += time.perf_counter() - call_start
+            ages.append((time.monotonic() - start) * 1000.0 - position[0])
+        results[mode] = {
+            'call_us': call_time * 1e6 / ticks,
+            'messages_per_tick': (channel.sent + channel.received + channel.pushes - messages) / ticks,
+            'bytes_per_tick': (channel.bytes_sent + channel.bytes_received - traffic) / ticks,
+            'age_ms': sum(ages) / len(ages),
+            'max_age_ms': max(ages),
+        }
+        if stream:
+            controller.unsubscribe(stream)
+    game_running = False
+    game_thread.join()
+    return results
+
+def benchmark_dump(controller_module, port: int, start: int, size: int, expected: bytes) -> dict:
+    """MB/s وأقصى ذاكرة مخصصة لتفريغ size بايت: read_region ثم كتابة مقابل التفريغ المتدفق"""
+    import gzip
+    import os
+    import tempfile
+    import tracemalloc
+    results = {}
+    path = os.path.join(tempfile.gettempdir(), f"vice_line_dump_{os.getpid()}.bin")
+    modes = (('read_region + write', True, None), ('legacy mmap (recv_into)', False, False),
+             ('pipelined mmap', True, False), ('pipelined gzip', True, True))
+    for label, pipelined, compress in modes:
+        controller = controller_module.CPPController(port=port, pipelined=pipelined)
+        controller.connect()
+        info = {}
+        for measure in ('time', 'memory'):
+            if measure == 'memory':
+                tracemalloc.start()
+            start_time = time.perf_counter()
+            if compress is None:
+                with open(path, 'wb') as f:
+                    for _, data in controller.read_region(start, size):
+                        f.write(data)
+            else:
+                assert controller.dump_memory_region(start, size, path, compress=compress)
+            if measure == 'time':
+                info['mb_per_sec'] = size / (time.perf_counter() - start_time) / 1e6
+            else:
+                info['peak_kib'] = tracemalloc.get_traced_memory()[1] / 1024
+                tracemalloc.stop()
+        info['file_kib'] = os.path.getsize(path) / 1024
+        opener = gzip.open if compress else open
+        with opener(path, 'rb') as f:
+            assert f.read() == expected
+        results[label] = info
+        controller.disconnect()
+    os.unlink(path)
+    return results
+
+# اختبار النظام
+if __name__ == "__main__":
+    import asyncio
+    import os
+    import tempfile
+    from MemoryBackends import (DumpFileBackend, build_synthetic_image, SYNTHETIC_BASE, SYNTHETIC_PLAYER_PED,
+                                SYNTHETIC_VEHICLE)
+
+    path = build_synthetic_image()
+    backend = DumpFileBackend(path, SYNTHETIC_BASE)
+    server = StandInControlServer(backend, reorder=True, entity_base=SYNTHETIC_BASE + 0x00B74490)
+
+    sock = socket.create_connection(('127.0.0.1', server.port))
+    channel = PipelinedChannel(sock)
+    # دفعة واحدة: الخادم يقرأها في recv واحد ويعكس ترتيب الردود
+    futures = channel.submit_many([
+        (ControlCommand.CMD_READ_MEMORY, struct.pack('<II', SYNTHETIC_PLAYER_PED + 0x14, 12)),
+        (ControlCommand.CMD_GET_STATUS, b''),
+        (ControlCommand.CMD_CREATE_PLAYER, struct.pack('<Ifff', 7, 1.0, 2.0, 3.0)),
+        (ControlCommand.CMD_READ_MEMORY, struct.pack('<II', 0, 4)),
+    ])
+    futures[3].result(5.0)  # آخر أمر يُحل أولاً
+    status, data = futures[0].result(5.0)
+    assert status == STATUS_OK and struct.unpack('<fff', data) == (512.5, -1024.25, 12.0)
+    assert json.loads(futures[1].result(5.0)[1].rstrip(b'\0'))['stand_in']
+    assert futures[2].result(5.0)[0] == STATUS_OK
+    assert futures[3].result(5.0)[0] == STATUS_FAILED  # عنوان خارج الصورة
+    channel.close()
+    sock.close()
+    print("✓ Pipelined channel OK (out-of-order replies)")
+
+    # انتهاء مهلة أمر: يخرج من pending، الرد المتأخر يُهمل، والقناة تبقى مفتوحة
+    server.latency = 0.2
+    sock = socket.create_connection(('127.0.0.1', server.port))
+    channel = PipelinedChannel(sock)
+    try:
+        channel.submit(ControlCommand.CMD_GET_STATUS).result(0.02)
+        assert False, "expected a timeout"
+    except FuturesTimeoutError:
+        pass
+    assert channel.in_flight == 0 and not channel.closed
+    server.latency = 0.0
+    assert channel.call(ControlCommand.CMD_GET_STATUS)[0] == STATUS_OK
+    assert channel.in_flight == 0 and channel.received == 2
+    channel.close()
+    sock.close()
+    print("✓ Timed-out request dropped, channel still usable")
+
+    # إطارات بث كانت في الطريق عند إلغاء الاشتراك تُهمل ولا تبقى في _early_pushes
+    left, right = socket.socketpair()
+    channel = PipelinedChannel(left)
+    stream = StateStream(channel, 9, LocalPlayerState.unpack, 1.0)
+    channel.streams[stream.id] = stream
+
+    def reply_with_late_pushes():
+        command, request_id, size = REQUEST_HEADER.unpack(right.recv(REQUEST_HEADER.size))
+        right.recv(size)
+        push = RESPONSE_HEADER.pack(ControlCommand.CMD_STATE_PUSH | PIPELINE_FLAG, STATUS_OK, 0, stream.id)
+        right.sendall(push + RESPONSE_HEADER.pack(command, STATUS_OK, 0, request_id) + push)
+    threading.Thread(target=reply_with_late_pushes, daemon=True).start()
+    assert channel.unsubscribe(stream)
+    deadline = time.monotonic() + 1.0
+    while channel.pushes < 2 and time.monotonic() < deadline:
+        channel.poll()
+    assert channel.pushes == 2 and not channel._early_pushes
+    channel.close()
+    left.close()
+    right.close()
+    print("✓ Late pushes after unsubscribe discarded")
+
+    # CMD_BATCH: حالة لكل أمر، والدفعة الكبيرة تُقسم إلى عدة أطر
+    batch = CommandBatch()
+    written = batch.write_memory(SYNTHETIC_PLAYER_PED + 0x30, struct.pack('<i', 77))
+    read_back = batch.read_memory(SYNTHETIC_PLAYER_PED + 0x30, 4)
+    missing = batch.read_memory(0, 4)
+    for _ in range(400):
+        batch.read_memory(SYNTHETIC_PLAYER_PED, 12)
+    frames = batch.frames()
+    assert len(frames) > 1 and all(len(payload) <= MAX_BATCH_PAYLOAD for payload, _ in frames)
+    for payload, results in frames:
+        _, status, data = server.process(struct.pack('<I', ControlCommand.CMD_BATCH) + payload)
+        assert len(data) <= MAX_BATCH_REPLY
+        CommandBatch.decode(data, results)
+    assert written.ok and read_back.data == struct.pack('<i', 77) and not missing.ok
+    print(f"✓ CMD_BATCH OK ({len(batch)} commands in {len(frames)} frames)")
+
+    server.reorder = False
+    controller_module = __import__('deepseek_python_20251209_8e4673')
+
+    # مهلة رد في المتحكم: فشل الأمر وحده بدون قطع الاتصال
+    server.latency = 0.2
+    controller = controller_module.CPPController(port=server.port)
+    controller.connect()
+    assert controller._result(controller.submit(ControlCommand.CMD_GET_STATUS), timeout=0.02) == (False, b'')
+    assert controller.connected and controller.channel.in_flight == 0
+    server.latency = 0.0
+    assert controller._send_command(ControlCommand.CMD_GET_STATUS)[0]
+    controller.disconnect()
+
+    # البث: إطار أول فوراً، ثم عند التغير فقط (وإطار إبقاء)
+    controller = controller_module.CPPController(port=server.port)
+    controller.connect()
+    stream = controller.subscribe_local_player(rate=200.0, keepalive=0.05)
+    received = []
+    stream.add_callback(received.append)
+    state = stream.get(1.0)
+    assert state.position == (512.5, -1024.25, 12.0) and state.rotation == (0.0, 0.0, 90.0)
+    assert state.vehicle == SYNTHETIC_VEHICLE
+    time.sleep(0.2)
+    stream.latest  # callbacks تعمل في الخيط الذي يقرأ القناة
+    assert 2 <= len(received) <= 8, len(received)  # ثابت: إطارات إبقاء كل 50 ms فقط
+    backend.write(SYNTHETIC_PLAYER_PED + 0x14, struct.pack('<f', 600.0))
+    moved = next(state for state in stream if state.position[0] == 600.0)
+    assert moved.sequence > state.sequence
+    backend.write(SYNTHETIC_PLAYER_PED + 0x14, struct.pack('<f', 512.5))
+
+    async def first_frames(count):
+        frames = []
+        async for state in stream:
+            frames.append(state)
+            if len(frames) == count:
+                return frames
+    assert len(asyncio.run(first_frames(2))) == 2
+
+    # النواة تتوقف عن البث والاتصال قائم (مؤشر اللاعب فارغ): الإطار الأخير يصبح قديماً
+    assert stream.fresh() is not None
+    player_pointer = server.base_address + 0xB7CD98
+    saved_pointer = backend.read(player_pointer, 4)
+    backend.write(player_pointer, struct.pack('<I', 0))
+    time.sleep(stream.keepalive + STALE_MARGIN + 0.05)
+    assert stream.fresh() is None and not stream.closed and stream.latest is not None
+    backend.write(player_pointer, saved_pointer)
+    assert stream.get(1.0) is not None and stream.fresh() is not None
+    assert controller.unsubscribe(stream) and stream.closed and stream.get(0.1) is None
+    pushes = server.pushes
+    time.sleep(0.1)
+    assert server.pushes == pushes
+    controller.disconnect()
+    print(f"✓ Local player stream OK ({len(received)} frames, {stream.conflated} conflated)")
+    for latency in (0.0, 0.0002):
+        server.latency = latency
+        print(f"--- stand-in reply latency {latency * 1e3:.1f} ms ---")
+        results = benchmark_pipeline(server.port, SYNTHETIC_PLAYER_PED + 0x14)
+        print(f"Legacy request/response:  {results['legacy']:10,.0f} commands/s")
+        for depth in (1, 8, 64):
+            print(f"Pipelined, depth {depth:<3}      {results[depth]:10,.0f} commands/s")
+
+        # get_local_player_position: رحلتان بالطريقة القديمة، رحلة واحدة بالقراءة التخمينية
+        for pipelined in (False, True):
+            controller = controller_module.CPPController(port=server.port, pipelined=pipelined)
+            controller.connect()
+            assert controller.get_local_player_position() == (512.5, -1024.25, 12.0)
+            calls = 1000
+            start_time = time.perf_counter()
+            for _ in range(calls):
+                position = controller.get_local_player_position()
+            elapsed = time.perf_counter() - start_time
+            assert position == (512.5, -1024.25, 12.0)
+            label = 'pipelined' if pipelined else 'legacy'
+            print(f"get_local_player_position, {label + ' (speculative)' if pipelined else label:<24} {elapsed * 1e6 / calls:7.1f} us/call")
+
+            results = benchmark_batch(controller, SYNTHETIC_BASE + 0x00B74490,
+                                      ticks=200 if latency == 0 else 50)
+            for mode, info in results.items():
+                print(f"  16-player tick, {label:<9} {mode:<12} {info['ticks_per_sec']:8,.0f} ticks/s "
+                      f"{info['commands_per_sec']:10,.0f} commands/s, {info['frames_per_tick']:.0f} frames/tick")
+            controller.disconnect()
+
+    # حلقة مزامنة 20 Hz: استطلاع (رحلة لكل نبضة) مقابل إطارات مدفوعة
+    server.latency = 0.0002
+    controller = controller_module.CPPController(port=server.port)
+    controller.connect()
+    print("--- local player at 20 Hz sync, stand-in latency 0.2 ms, game at 60 Hz ---")
+    for mode, info in benchmark_stream(controller, backend, SYNTHETIC_PLAYER_PED).items():
+        print(f"{mode:<14} {info['call_us']:8.1f} us/tick {info['messages_per_tick']:5.2f} messages/tick "
+              f"{info['bytes_per_tick']:6.1f} bytes/tick, position age {info['age_ms']:5.1f} ms "
+              f"(max {info['max_age_ms']:.1f})")
+    controller.disconnect()
+
+    # التفريغ: الجزء المقروء جزئياً أصفار، وانقطاع الاتصال يوقف التفريغ ويغلق المقبس
+    class PartialReadBackend:
+        def __init__(self, backend, short_address: int):
+            self.backend = backend
+            self.short_address = short_address
+
+        def read(self, address: int, size: int) -> bytes:
+            data = self.backend.read(address, size)
+            return data[:size // 2] if address == self.short_address else data
+
+    chunk = controller_module.MAX_READ_SIZE
+    partial = StandInControlServer(PartialReadBackend(backend, SYNTHETIC_BASE + chunk))
+    expected = bytearray(backend.read(SYNTHETIC_BASE, 64 * chunk))
+    expected[chunk:2 * chunk] = bytes(chunk)
+    dump_path = os.path.join(tempfile.gettempdir(), f"vice_line_dump_{os.getpid()}.bin")
+    for pipelined in (False, True):
+        controller = controller_module.CPPController(port=partial.port, pipelined=pipelined)
+        controller.connect()
+        assert controller.dump_memory_region(SYNTHETIC_BASE, len(expected), dump_path, window=0)
+        with open(dump_path, 'rb') as f:
+            assert f.read() == expected
+        partial.drop_after = 2
+        assert not controller.dump_memory_region(SYNTHETIC_BASE, len(expected), dump_path)
+        assert not controller.connected and controller.socket is None
+        partial.drop_after = None
+    partial.close()
+    os.unlink(dump_path)
+    print("✓ Dump OK (partial chunks zero-filled, aborts on lost connection)")
+
+    region = 4 << 20
+    for latency in (0.0, 0.0002):
+        server.latency = latency
+        print(f"--- dump {region >> 20} MiB, stand-in reply latency {latency * 1e3:.1f} ms ---")
+        results = benchmark_dump(controller_module, server.port, SYNTHETIC_BASE, region,
+                                 backend.read(SYNTHETIC_BASE, region))
+        for mode, info in results.items():
+            print(f"{mode:<24} {info['mb_per_sec']:7.1f} MB/s, peak {info['peak_kib']:8,.0f} KiB allocated, "
+                  f"file {info['file_kib']:7,.0f} KiB")
+    server.close()
+    backend.close()
+    os.unlink(path)
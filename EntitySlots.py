@@ -0,0 +1,146 @@
+import ctypes
+import os
+import struct
+import sys
+import time
+from typing import List
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+_INT = struct.Struct('i')
+
+def scan_free_slots(data, entity_size: int, max_entities: int) -> List[int]:
+    """الفتحات الفارغة (نوع الكائن = 0) في مصفوفة الكائنات المقروءة دفعة واحدة"""
+    if entity_size % 4:
+        # الحجم غير محاذي: قراءة النوع لكل فتحة
+        return [slot for slot in range(max_entities)
+                if _INT.unpack_from(data, slot * entity_size)[0] == 0]
+
+    stride = entity_size // 4
+    if NUMPY_AVAILABLE:
+        types = np.frombuffer(data, dtype=np.int32, count=max_entities * stride)[::stride]
+        return np.flatnonzero(types == 0).tolist()
+
+    # بدون NumPy: عرض strided عبر memoryview.cast
+    types = memoryview(data)[:max_entities * entity_size].cast('i')[::stride].tolist()
+    return [slot for slot, entity_type in enumerate(types) if entity_type == 0]
+
+class FreeSlotMap:
+    """خريطة بت للفتحات الفارغة: البت مضبوط = الفتحة فارغة
+
+    أقل فتحة فارغة تُستخرج بعمليات على عدد صحيح (بنفس ترتيب البحث الخطي القديم).
+    """
+
+    def __init__(self, max_entities: int):
+        self.max_entities = max_entities
+        self.bits = 0
+        self.scans = 0
+
+    def load(self, free_slots: List[int]):
+        """إعادة بناء الخريطة من مسح كامل"""
+        bits = 0
+        for slot in free_slots:
+            bits |= 1 << slot
+        self.bits = bits
+        self.scans += 1
+
+    def first(self) -> int:
+        """أقل فتحة فارغة أو -1"""
+        bits = self.bits
+        if not bits:
+            return -1
+        return (bits & -bits).bit_length() - 1
+
+    def mark_used(self, slot: int):
+        self.bits &= ~(1 << slot)
+
+    def mark_free(self, slot: int):
+        if 0 <= slot < self.max_entities:
+            self.bits |= 1 << slot
+
+    def __len__(self) -> int:
+        return bin(self.bits).count('1')
+
+def benchmark_slot_search(backend, entity_list_addr: int, entity_size: int = 0x198,
+                          max_entities: int = 400, joins: int = 50) -> dict:
+    """كلفة إيجاد فتحة لكل لاعب ينضم: الحلقة القديمة، مسح كامل، والخريطة"""
+    results = {}
+
+    def linear():
+        for slot in range(max_entities):
+            if _INT.unpack(backend.read(entity_list_addr + slot * entity_size, 4))[0] == 0:
+                return slot
+        return -1
+
+    def bulk():
+        free = scan_free_slots(backend.read(entity_list_addr, max_entities * entity_size),
+                               entity_size, max_entities)
+        return free[0] if free else -1
+
+    slot_map = FreeSlotMap(max_entities)
+
+    def bitmap():
+        if not slot_map.bits:
+            slot_map.load(scan_free_slots(backend.read(entity_list_addr, max_entities * entity_size),
+                                          entity_size, max_entities))
+        slot = slot_map.first()
+        # تحقق بقراءة واحدة: اللعبة قد تكون شغلت الفتحة
+        while slot != -1 and _INT.unpack(backend.read(entity_list_addr + slot * entity_size, 4))[0] != 0:
+            slot_map.mark_used(slot)
+            slot = slot_map.first()
+        return slot
+
+    for name, find in (('linear', linear), ('bulk', bulk), ('bitmap', bitmap)):
+        taken = []
+        elapsed = 0.0
+        for _ in range(joins):
+            start_time = time.perf_counter()
+            slot = find()
+            elapsed += time.perf_counter() - start_time
+            # إنشاء اللاعب: كتابة النوع في الفتحة
+            backend.write(entity_list_addr + slot * entity_size, _INT.pack(1))
+            slot_map.mark_used(slot)
+            taken.append(slot)
+        for slot in taken:
+            backend.write(entity_list_addr + slot * entity_size, _INT.pack(0))
+            slot_map.mark_free(slot)
+        results[name] = {'join_us': elapsed * 1e6 / joins, 'slots': taken}
+
+    assert results['linear']['slots'] == results['bulk']['slots'] == results['bitmap']['slots']
+    return results
+
+# اختبار النظام
+if __name__ == "__main__":
+    from MemoryBackends import DumpFileBackend, LinuxProcessBackend, build_synthetic_image, SYNTHETIC_BASE
+
+    # كل الفتحات مشغولة إلا فتحات محددة
+    data = bytearray(400 * 0x198)
+    for slot in range(400):
+        if slot not in (3, 250, 399):
+            struct.pack_into('i', data, slot * 0x198, 1)
+    assert scan_free_slots(data, 0x198, 400) == [3, 250, 399]
+    slot_map = FreeSlotMap(400)
+    slot_map.load([3, 250, 399])
+    slot_map.mark_used(3)
+    assert slot_map.first() == 250 and len(slot_map) == 2
+
+    path = build_synthetic_image(used_slots=300)
+    backends = {'dump file (mmap)': (DumpFileBackend(path, SYNTHETIC_BASE), SYNTHETIC_BASE + 0x00B74490)}
+    if sys.platform.startswith('linux'):
+        # نسخة من مصفوفة الكائنات في ذاكرة هذه العملية (قراءة عبر process_vm_readv)
+        entities = ctypes.create_string_buffer(backends['dump file (mmap)'][0].read(SYNTHETIC_BASE + 0x00B74490,
+                                                                                   400 * 0x198))
+        backends['process_vm_readv'] = (LinuxProcessBackend(os.getpid()), ctypes.addressof(entities))
+
+    print(f"NumPy available: {NUMPY_AVAILABLE}; 300/400 slots used, 50 joins")
+    for name, (backend, entity_list_addr) in backends.items():
+        results = benchmark_slot_search(backend, entity_list_addr)
+        print(f"{name}: linear {results['linear']['join_us']:,.1f} us/join, "
+              f"bulk scan {results['bulk']['join_us']:,.1f} us/join, "
+              f"bitmap {results['bitmap']['join_us']:,.1f} us/join")
+        backend.close()
+    os.unlink(path)
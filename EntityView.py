@@ -0,0 +1,158 @@
+import ctypes
+import os
+import struct
+import sys
+import time
+from typing import Tuple
+
+# إزاحات الحقول في كائن اللعبة (نفس قيم GTAVCMemoryManager)
+TYPE_OFFSET = 0x000
+POSITION_OFFSET = 0x014
+ENABLED_OFFSET = 0x018
+ROTATION_OFFSET = 0x020
+PLAYER_ID_OFFSET = 0x05C
+AI_OFFSET = 0x530
+VEHICLE_OFFSET = 0x58C
+ANIMATION_OFFSET = 0x5A0
+
+# entity_size (0x198) هو المسافة بين الفتحات، لكن المركبة والحركة بعده
+# لذلك نقرأ حتى نهاية آخر حقل مستخدم في استدعاء واحد
+ENTITY_VIEW_SIZE = ANIMATION_OFFSET + 4
+
+_INT = struct.Struct('i')
+_VECTOR3 = struct.Struct('fff')
+
+class EntityView:
+    """سجل كائن مقروء دفعة واحدة، والحقول تُفك من المخزن بدون نسخ"""
+    __slots__ = ('address', 'buffer', 'view')
+
+    def __init__(self, address: int = 0, size: int = ENTITY_VIEW_SIZE):
+        self.address = address
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+
+    def load(self, backend, address: int) -> 'EntityView':
+        """قراءة السجل كاملاً في المخزن الموجود (استدعاء نظام واحد)"""
+        backend.read_into(address, self.buffer)
+        self.address = address
+        return self
+
+    def field(self, offset: int, size: int) -> memoryview:
+        """البايتات الخام لحقل (شريحة من المخزن بدون نسخ)"""
+        return self.view[offset:offset + size]
+
+    @property
+    def entity_type(self) -> int:
+        return _INT.unpack_from(self.buffer, TYPE_OFFSET)[0]
+
+    @property
+    def position(self) -> Tuple[float, float, float]:
+        return _VECTOR3.unpack_from(self.buffer, POSITION_OFFSET)
+
+    @property
+    def rotation(self) -> Tuple[float, float, float]:
+        return _VECTOR3.unpack_from(self.buffer, ROTATION_OFFSET)
+
+    @property
+    def enabled(self) -> int:
+        return _INT.unpack_from(self.buffer, ENABLED_OFFSET)[0]
+
+    @property
+    def player_id(self) -> int:
+        return _INT.unpack_from(self.buffer, PLAYER_ID_OFFSET)[0]
+
+    @property
+    def ai(self) -> int:
+        return _INT.unpack_from(self.buffer, AI_OFFSET)[0]
+
+    @property
+    def vehicle(self) -> int:
+        return _INT.unpack_from(self.buffer, VEHICLE_OFFSET)[0]
+
+    @property
+    def animation(self) -> int:
+        return _INT.unpack_from(self.buffer, ANIMATION_OFFSET)[0]
+
+class _CountingBackend:
+    """غلاف يعد استدعاءات القراءة"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.reads = 0
+
+    def read(self, address, size):
+        self.reads += 1
+        return self.backend.read(address, size)
+
+    def read_into(self, address, buffer):
+        self.reads += 1
+        return self.backend.read_into(address, buffer)
+
+def benchmark_entity_reads(backend, player_ptr_addr: int, rounds: int = 20000) -> dict:
+    """قراءة اللاعب المحلي: حقل بحقل (المسار القديم) مقابل سجل واحد"""
+    counting = _CountingBackend(backend)
+    results = {}
+
+    def read_int(address):
+        return _INT.unpack(counting.read(address, 4))[0]
+
+    # المسار القديم: get_player_position + get_player_rotation + get_player_vehicle
+    start_time = time.perf_counter()
+    for _ in range(rounds):
+        player_ptr = read_int(player_ptr_addr)
+        position = _VECTOR3.unpack(counting.read(player_ptr + POSITION_OFFSET, 12))
+        player_ptr = read_int(player_ptr_addr)
+        rotation = _VECTOR3.unpack(counting.read(player_ptr + ROTATION_OFFSET, 12))
+        player_ptr = read_int(player_ptr_addr)
+        vehicle = read_int(player_ptr + VEHICLE_OFFSET)
+    elapsed = time.perf_counter() - start_time
+    results['per_field'] = {'reads_per_sec': rounds / elapsed, 'syscalls_per_read': counting.reads / rounds}
+    expected = (position, rotation, vehicle)
+
+    counting.reads = 0
+    view = EntityView()
+    start_time = time.perf_counter()
+    for _ in range(rounds):
+        view.load(counting, read_int(player_ptr_addr))
+        position, rotation, vehicle = view.position, view.rotation, view.vehicle
+    elapsed = time.perf_counter() - start_time
+    results['coalesced'] = {'reads_per_sec': rounds / elapsed, 'syscalls_per_read': counting.reads / rounds}
+
+    assert (position, rotation, vehicle) == expected
+    return results
+
+# اختبار النظام
+if __name__ == "__main__":
+    from MemoryBackends import (DumpFileBackend, LinuxProcessBackend, build_synthetic_image,
+                                SYNTHETIC_BASE, SYNTHETIC_PLAYER_PED, SYNTHETIC_VEHICLE)
+
+    path = build_synthetic_image()
+    backends = {'dump file (mmap)': (DumpFileBackend(path, SYNTHETIC_BASE), SYNTHETIC_BASE + 0x00B7CD98)}
+
+    if sys.platform.startswith('linux'):
+        # كائن في ذاكرة هذه العملية تحت 4GB (MAP_32BIT): قراءة عبر process_vm_readv كما مع اللعبة
+        import mmap
+        try:
+            region = mmap.mmap(-1, 0x1000, flags=mmap.MAP_PRIVATE | mmap.MAP_ANONYMOUS | 0x40)
+            address = ctypes.addressof((ctypes.c_char * 0x1000).from_buffer(region))
+        except (OSError, ValueError):
+            address = 1 << 32
+        if address < 1 << 31:
+            entity = address + 0x10
+            struct.pack_into('i', region, 0, entity)
+            struct.pack_into('fff', region, 0x10 + POSITION_OFFSET, 512.5, -1024.25, 12.0)
+            struct.pack_into('i', region, 0x10 + VEHICLE_OFFSET, 0x1234)
+            backends['process_vm_readv'] = (LinuxProcessBackend(os.getpid()), address)
+
+    view = EntityView().load(backends['dump file (mmap)'][0], SYNTHETIC_PLAYER_PED)
+    assert view.position == (512.5, -1024.25, 12.0) and view.vehicle == SYNTHETIC_VEHICLE
+    assert bytes(view.field(POSITION_OFFSET, 4)) == struct.pack('f', 512.5)
+
+    for name, (backend, player_ptr_addr) in backends.items():
+        results = benchmark_entity_reads(backend, player_ptr_addr)
+        before, after = results['per_field'], results['coalesced']
+        print(f"{name}: {before['reads_per_sec']:,.0f} -> {after['reads_per_sec']:,.0f} player reads/s "
+              f"({after['reads_per_sec'] / before['reads_per_sec']:.1f}x), "
+              f"syscalls per read {before['syscalls_per_read']:.0f} -> {after['syscalls_per_read']:.0f}")
+        backend.close()
+    os.unlink(path)
@@ -0,0 +1,308 @@
+import ctypes
+import socket
+import struct
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from RecvRing import IOVEC, MMSGHDR, EAGAIN_ERRORS
+
+# sendmmsg متوفر فقط على Linux (عبر libc)
+SENDMMSG_AVAILABLE = False
+if sys.platform.startswith('linux'):
+    try:
+        _libc = ctypes.CDLL(None, use_errno=True)
+        _sendmmsg = _libc.sendmmsg
+        _sendmmsg.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int]
+        _sendmmsg.restype = ctypes.c_int
+        SENDMMSG_AVAILABLE = True
+    except (OSError, AttributeError):
+        SENDMMSG_AVAILABLE = False
+
+SOCKADDR_IN_SIZE = 16
+_IOVEC_STRUCT = struct.Struct('PN')
+_POINTER_STRUCT = struct.Struct('P')
+ERROR_LOG_INTERVAL = 100
+# أقل من هذا العدد sendto أسرع من نسخ الحزم إلى مخزن sendmmsg (مقاس عبر loopback:
+# 2 حزم 4.0 مقابل 6.0 us/حزمة، 8 حزم 3.7 مقابل 4.2، التعادل قرب 16)
+SENDMMSG_MIN_BATCH = 16
+
+class PeerStats:
+    """إحصائيات الإرسال لعنوان واحد"""
+    __slots__ = ('sent', 'bytes', 'errors', 'last_error')
+
+    def __init__(self):
+        self.sent = 0
+        self.bytes = 0
+        self.errors = 0
+        self.last_error = None
+
+class FanOutSender:
+    """مرحلة إرسال جماعية: حزم مرمزة مرة واحدة تُرسل لعدة عناوين بدفعة واحدة"""
+
+    def __init__(self, sock: socket.socket, use_sendmmsg: bool = True, capacity: int = 256):
+        self.sock = sock
+        self.pending: List[Tuple[bytes, tuple]] = []
+        self.lock = threading.Lock()
+        self.send_lock = threading.Lock()
+        self.peers: Dict[tuple, PeerStats] = {}
+
+        # إحصائيات
+        self.syscalls = 0
+        self.datagrams = 0
+        self.errors = 0
+
+        self.use_sendmmsg = use_sendmmsg and SENDMMSG_AVAILABLE and sock.family == socket.AF_INET
+        if self.use_sendmmsg:
+            self._allocate(capacity)
+            self._sockaddrs: Dict[tuple, tuple] = {}
+
+    def _allocate(self, capacity: int):
+        """تخصيص مصفوفات sendmmsg ومخزن البيانات"""
+        self.capacity = capacity
+        self._iovecs = (IOVEC * capacity)()
+        self._msgs = (MMSGHDR * capacity)()
+        for i in range(capacity):
+            header = self._msgs[i].msg_hdr
+            header.msg_iov = ctypes.pointer(self._iovecs[i])
+            header.msg_iovlen = 1
+            header.msg_namelen = SOCKADDR_IN_SIZE
+
+        # الكتابة في الهياكل عبر memoryview بدل خصائص ctypes
+        self._iovecs_view = memoryview(self._iovecs).cast('B')
+        self._msgs_view = memoryview(self._msgs).cast('B')
+        self._arena = bytearray(capacity * 256)
+        self._arena_c = (ctypes.c_char * len(self._arena)).from_buffer(self._arena)
+
+    def _sockaddr(self, addr: tuple) -> int:
+        """عنوان sockaddr_in في الذاكرة لعنوان معين (مع ذاكرة مؤقتة)"""
+        entry = self._sockaddrs.get(addr)
+        if entry is None:
+            packed = struct.pack('=H', socket.AF_INET) + struct.pack('>H', addr[1]) + \
+                socket.inet_aton(socket.gethostbyname(addr[0])) + bytes(8)
+            raw = ctypes.create_string_buffer(packed, SOCKADDR_IN_SIZE)
+            entry = self._sockaddrs[addr] = (raw, ctypes.addressof(raw))
+        return entry[1]
+
+    def queue(self, data: bytes, addr: tuple):
+        """إضافة حزمة لعنوان واحد"""
+        with self.lock:
+            self.pending.append((data, addr))
+
+    def queue_many(self, data: bytes, addrs: Iterable[tuple]):
+        """إضافة نفس البايتات (مرمزة مرة واحدة) لعدة عناوين"""
+        with self.lock:
+            self.pending.extend((data, addr) for addr in addrs)
+
+    def queue_batch(self, outgoing: Iterable[Tuple[bytes, tuple]]):
+        """إضافة أزواج (بيانات، عنوان) جاهزة"""
+        with self.lock:
+            self.pending.extend(outgoing)
+
+    def send_many(self, data: bytes, addrs: Iterable[tuple]) -> int:
+        """إرسال فوري لعدة عناوين"""
+        self.queue_many(data, addrs)
+        return self.flush()
+
+    def flush(self) -> int:
+        """إرسال كل الحزم المعلقة وإرجاع عدد المرسل"""
+        with self.lock:
+            if not self.pending:
+                return 0
+            pending, self.pending = self.pending, []
+
+        # هياكل sendmmsg مشتركة - إرسال دفعة واحدة في كل مرة
+        with self.send_lock:
+            if self.use_sendmmsg and len(pending) >= SENDMMSG_MIN_BATCH:
+                return self._flush_sendmmsg(pending)
+            return self._flush_sendto(pending)
+
+    def _flush_sendto(self, pending: List[Tuple[bytes, tuple]]) -> int:
+        """إرسال حزمة حزمة (كل المنصات)"""
+        sent = 0
+        sendto = self.sock.sendto
+        for data, addr in pending:
+            self.syscalls += 1
+            try:
+                sendto(data, addr)
+            except OSError as e:
+                self._record_error(addr, e)
+                continue
+            self._record_sent(addr, len(data))
+            sent += 1
+        self.datagrams += sent
+        return sent
+
+    def _flush_sendmmsg(self, pending: List[Tuple[bytes, tuple]]) -> int:
+        """إرسال دفعات باستدعاء نظام واحد لكل دفعة"""
+        if len(pending) > self.capacity:
+            self._allocate(max(len(pending), self.capacity * 2))
+
+        # نسخ كل الحزم إلى مخزن واحد متصل (نسخة واحدة بدل مؤشر ctypes لكل حزمة)
+        payload = b''.join([data for data, _ in pending])
+        if len(payload) > len(self._arena):
+            self._arena = bytearray(len(payload) * 2)
+            self._arena_c = (ctypes.c_char * len(self._arena)).from_buffer(self._arena)
+        self._arena[:len(payload)] = payload
+        base = ctypes.addressof(self._arena_c)
+
+        iovec = _IOVEC_STRUCT
+        iovec_size = ctypes.sizeof(IOVEC)
+        msg_size = ctypes.sizeof(MMSGHDR)
+        iovecs_view = self._iovecs_view
+        msgs_view = self._msgs_view
+        offset = 0
+        for i, (data, addr) in enumerate(pending):
+            size = len(data)
+            iovec.pack_into(iovecs_view, i * iovec_size, base + offset, size)
+            # msg_name هو أول حقل في mmsghdr
+            _POINTER_STRUCT.pack_into(msgs_view, i * msg_size, self._sockaddr(addr))
+            offset += size
+
+        fd = self.sock.fileno()
+        total = len(pending)
+        index = 0
+        sent = 0
+        while index < total:
+            self.syscalls += 1
+            count = _sendmmsg(fd, ctypes.addressof(self._msgs) + index * msg_size,
+                              total - index, 0)
+            if count < 0:
+                # الخطأ يخص أول رسالة في الدفعة: تسجيله ومتابعة الباقي
+                error = ctypes.get_errno()
+                self._record_error(pending[index][1], OSError(error, f"sendmmsg errno {error}"))
+                if error in EAGAIN_ERRORS:
+                    # المخزن ممتلئ - إسقاط الباقي بدل الحجب داخل حلقة الشبكة
+                    for _, addr in pending[index + 1:]:
+                        self._record_error(addr, OSError(error, "send buffer full"))
+                    break
+                index += 1
+                continue
+
+            for data, addr in pending[index:index + count]:
+                self._record_sent(addr, len(data))
+            index += count
+            sent += count
+
+        self.datagrams += sent
+        return sent
+
+    def _record_sent(self, addr: tuple, size: int):
+        stats = self.peers.get(addr)
+        if stats is None:
+            stats = self.peers[addr] = PeerStats()
+        stats.sent += 1
+        stats.bytes += size
+
+    def _record_error(self, addr: tuple, error: Exception):
+        """عد أخطاء كل عنوان مع طباعة أول خطأ وكل 100 بعده"""
+        stats = self.peers.get(addr)
+        if stats is None:
+            stats = self.peers[addr] = PeerStats()
+        stats.errors += 1
+        stats.last_error = str(error)
+        self.errors += 1
+        if stats.errors == 1 or stats.errors % ERROR_LOG_INTERVAL == 0:
+            print(f"Failed to send to {addr}: {error} ({stats.errors} errors)")
+
+    def forget(self, addr: tuple):
+        """حذف إحصائيات عنوان بعد الانفصال"""
+        self.peers.pop(addr, None)
+        if self.use_sendmmsg:
+            self._sockaddrs.pop(addr, None)
+
+    def error_counts(self) -> Dict[tuple, int]:
+        """عدد الأخطاء لكل عنوان"""
+        return {addr: stats.errors for addr, stats in self.peers.items() if stats.errors}
+
+def _legacy_relay(sock, streams, clients, packet, source):
+    """نسخة من المسار القديم: ترميز وإرسال منفصل لكل مستقبل"""
+    for addr in clients:
+        if addr == source:
+            continue
+        data = streams.encode(packet.player_id, addr, packet)
+        if data:
+            try:
+                sock.sendto(data, addr)
+            except Exception:
+                pass
+
+def benchmark_fanout(client_counts=(2, 4, 8, 16, 32, 64), ticks: int = 100, rate: int = 20) -> dict:
+    """قياس وقت المعالج لكل حزمة معاد بثها: المسار القديم مقابل FanOutSender"""
+    import math
+    from NetworkProtocol import PacketType, make_message
+    from SnapshotDelta import SnapshotStreams
+
+    results = {}
+    for count in client_counts:
+        clients = []
+        for _ in range(count):
+            client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            client.bind(('127.0.0.1', 0))
+            client.setblocking(False)
+            clients.append(client)
+        addrs = [c.getsockname() for c in clients]
+
+        row = {}
+        for mode in ('legacy', 'fanout'):
+            host = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            host.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4 * 1024 * 1024)
+            host.bind(('127.0.0.1', 0))
+            streams = SnapshotStreams()
+            sender = FanOutSender(host)
+            relayed = 0
+            cpu = 0.0
+
+            for tick in range(ticks):
+                start_cpu = time.process_time()
+                for player, source in enumerate(addrs):
+                    angle = (tick + player) / rate
+                    packet = make_message(PacketType.POSITION, player_id=player + 1,
+                                          timestamp=tick * 1000 // rate,
+                                          position=(100.0 * math.cos(angle), 100.0 * math.sin(angle), 10.0),
+                                          rotation=(0.0, 0.0, math.degrees(angle)),
+                                          velocity=(1.0, 1.0, 0.0),
+                                          animation=1, health=100, armor=0, weapon=0)
+                    if mode == 'legacy':
+                        _legacy_relay(host, streams, addrs, packet, source)
+                    else:
+                        receivers = [addr for addr in addrs if addr != source]
+                        sender.queue_batch(streams.encode_many(packet.player_id, receivers, packet))
+                if mode == 'fanout':
+                    sender.flush()
+                cpu += time.process_time() - start_cpu
+                relayed += count * (count - 1)
+
+                # كل المستقبلين يؤكدون آخر لقطة (حالة مستقرة)
+                for key, encoder in streams.encoders.items():
+                    encoder.acknowledge(encoder.sequence)
+                for client in clients:
+                    try:
+                        while True:
+                            client.recv(2048)
+                    except BlockingIOError:
+                        pass
+
+            row[mode] = {
+                'cpu_us_per_packet': cpu * 1e6 / relayed,
+                'syscalls': sender.syscalls if mode == 'fanout' else relayed,
+            }
+            host.close()
+
+        for client in clients:
+            client.close()
+        results[count] = row
+
+    return results
+
+# اختبار النظام
+if __name__ == "__main__":
+    print(f"sendmmsg available: {SENDMMSG_AVAILABLE}")
+    print(f"{'clients':>7}  {'legacy us/pkt':>13}  {'fanout us/pkt':>13}  {'speedup':>7}  {'syscalls legacy/fanout':>22}")
+    for count, row in benchmark_fanout().items():
+        legacy = row['legacy']
+        fanout = row['fanout']
+        print(f"{count:>7}  {legacy['cpu_us_per_packet']:>13.2f}  {fanout['cpu_us_per_packet']:>13.2f}  "
+              f"{legacy['cpu_us_per_packet'] / fanout['cpu_us_per_packet']:>6.1f}x  "
+              f"{legacy['syscalls']:>11}/{fanout['syscalls']}")
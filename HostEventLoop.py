@@ -0,0 +1,284 @@
+import asyncio
+import socket
+import statistics
+import threading
+import time
+from typing import Callable, List, Optional
+
+from RecvRing import ReceiveRing
+
+class EventLoopEngine:
+    """محرك شبكة قائم على asyncio: قراءة كل الحزم الجاهزة في كل دورة + مهام دورية"""
+
+    def __init__(self, sock: socket.socket, on_datagram: Callable[[bytes, tuple], None],
+                 max_datagram: int = 2048, max_batch: int = 256, use_ring: bool = False,
+                 on_drained: Optional[Callable[[], None]] = None):
+        self.sock = sock
+        self.on_datagram = on_datagram
+        self.on_drained = on_drained  # بعد معالجة كل دفعة (لإرسال الردود المجمعة)
+        self.max_datagram = max_datagram
+        self.max_batch = max_batch
+
+        # حلقة استقبال مخصصة مسبقاً (اختيارية: لم تتفوق على recvfrom في benchmark_engines)
+        # المعالج يستلم memoryview صالحة أثناء الاستدعاء فقط
+        self.ring = ReceiveRing(slots=min(max_batch, 64), slot_size=max_datagram) if use_ring else None
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread: Optional[threading.Thread] = None
+        self.running = False
+        self._periodic = []
+        self._tasks: List[asyncio.Task] = []
+        self._ready = threading.Event()
+
+        # إحصائيات
+        self.datagrams = 0
+        self.wakeups = 0
+
+    def add_periodic(self, interval: float, callback: Callable[[], None], name: str = ""):
+        """إضافة مهمة دورية تعمل على نفس الحلقة (قبل start)"""
+        self._periodic.append((interval, callback, name or callback.__name__))
+
+    def start(self):
+        """تشغيل الحلقة في خيط خاص"""
+        self.sock.setblocking(False)
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True, name="NetworkLoopThread")
+        self.thread.start()
+        self._ready.wait(timeout=2)
+
+    def stop(self, timeout: float = 2.0):
+        """إيقاف الحلقة فوراً (بدون انتظار مهلة استقبال)"""
+        self.running = False
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self._shutdown)
+        if self.thread and self.thread.is_alive() and self.thread is not threading.current_thread():
+            self.thread.join(timeout=timeout)
+
+    def call_soon(self, callback: Callable, *args):
+        """تنفيذ دالة على خيط الحلقة (آمن من خيوط أخرى)"""
+        if self.loop and self.running:
+            self.loop.call_soon_threadsafe(callback, *args)
+
+    def _run(self):
+        """جسم خيط الحلقة"""
+        # SelectorEventLoop صراحة: add_reader غير مدعوم في Proactor على Windows
+        self.loop = asyncio.SelectorEventLoop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.add_reader(self.sock.fileno(), self._on_readable)
+            for interval, callback, name in self._periodic:
+                self._tasks.append(self.loop.create_task(self._run_periodic(interval, callback, name)))
+            self.loop.call_soon(self._ready.set)
+            self.loop.run_forever()
+        finally:
+            try:
+                self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            finally:
+                self.loop.close()
+                self._ready.set()
+
+    def _shutdown(self):
+        """إلغاء المهام وإيقاف الحلقة"""
+        try:
+            self.loop.remove_reader(self.sock.fileno())
+        except (ValueError, OSError):
+            pass
+        for task in self._tasks:
+            task.cancel()
+        self.loop.stop()
+
+    def _on_readable(self):
+        """قراءة كل الحزم المتاحة دفعة واحدة"""
+        self.wakeups += 1
+        if self.ring:
+            self._drain_ring()
+        else:
+            self._drain_recvfrom()
+
+        if self.on_drained:
+            try:
+                self.on_drained()
+            except Exception as e:
+                print(f"Error flushing outgoing packets: {e}")
+
+    def _drain_recvfrom(self):
+        """قراءة الحزم واحدة واحدة (بدون الحلقة)"""
+        recvfrom = self.sock.recvfrom
+        handler = self.on_datagram
+
+        for _ in range(self.max_batch):
+            try:
+                data, addr = recvfrom(self.max_datagram)
+            except (BlockingIOError, InterruptedError):
+                break
+            except ConnectionResetError:
+                # Windows: ICMP port unreachable من إرسال سابق
+                continue
+            except OSError as e:
+                if self.running:
+                    print(f"Network error (event loop): {e}")
+                break
+
+            self.datagrams += 1
+            try:
+                handler(data, addr)
+            except Exception as e:
+                print(f"Error processing packet: {e}")
+
+    def _drain_ring(self):
+        """استقبال دفعات في الحلقة وتمرير شرائح بدون نسخ للمعالج"""
+        ring = self.ring
+        handler = self.on_datagram
+        received = 0
+
+        for _ in range(self.max_batch):
+            try:
+                count = ring.receive(self.sock)
+            except (BlockingIOError, InterruptedError):
+                break
+            except ConnectionResetError:
+                # Windows: ICMP port unreachable من إرسال سابق
+                continue
+            except OSError as e:
+                if self.running:
+                    print(f"Network error (event loop): {e}")
+                break
+
+            for i in range(count):
+                try:
+                    handler(ring.packet(i), ring.addrs[i])
+                except Exception as e:
+                    print(f"Error processing packet: {e}")
+
+            self.datagrams += count
+            received += count
+            if count < ring.slots or received >= self.max_batch:
+                break
+
+    async def _run_periodic(self, interval: float, callback: Callable[[], None], name: str):
+        """تشغيل دالة بمعدل ثابت بدون تراكم الانحراف"""
+        next_time = self.loop.time()
+        while self.running:
+            try:
+                callback()
+            except Exception as e:
+                print(f"{name} error: {e}")
+
+            next_time += interval
+            delay = next_time - self.loop.time()
+            if delay < 0:
+                # تأخرنا - لا نحاول تعويض النبضات الفائتة
+                next_time = self.loop.time()
+                delay = 0
+            await asyncio.sleep(delay)
+
+def _threaded_receive_loop(sock: socket.socket, handler, state: dict):
+    """نسخة من _network_loop القديمة (recvfrom مع مهلة 100ms) لاختبار الأداء"""
+    sock.settimeout(0.1)
+    while state['running']:
+        try:
+            data, addr = sock.recvfrom(1024)
+            handler(data, addr)
+        except socket.timeout:
+            continue
+        except OSError:
+            break
+
+def benchmark_engines(clients: int = 16, packets_per_client: int = 2000, pings: int = 500) -> dict:
+    """مقارنة المحرك القديم (خيط + مهلة) مع محرك الحلقة عبر loopback"""
+    results = {}
+
+    for engine_name in ('threaded', 'event_loop', 'event_loop (ring)'):
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        server.bind(('127.0.0.1', 0))
+        server_addr = server.getsockname()
+        received = [0]
+        echo_sock = server
+
+        def handler(data, addr):
+            received[0] += 1
+            # حزم ping تعاد للمرسل
+            if data[:1] == b'P':
+                echo_sock.sendto(data, addr)
+
+        state = {'running': True}
+        engine = None
+        thread = None
+        if engine_name == 'threaded':
+            thread = threading.Thread(target=_threaded_receive_loop, args=(server, handler, state),
+                                      daemon=True)
+            thread.start()
+        else:
+            engine = EventLoopEngine(server, handler, use_ring=engine_name.endswith('(ring)'))
+            engine.start()
+
+        client_socks = []
+        for _ in range(clients):
+            client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            client.bind(('127.0.0.1', 0))
+            client_socks.append(client)
+
+        # الإنتاجية: كل العملاء يرسلون بأقصى سرعة
+        payload = b'D' * 53
+        total = clients * packets_per_client
+        start_time = time.perf_counter()
+        for _ in range(packets_per_client):
+            for client in client_socks:
+                client.sendto(payload, server_addr)
+        deadline = time.perf_counter() + 5.0
+        while received[0] < total and time.perf_counter() < deadline:
+            time.sleep(0.001)
+        elapsed = time.perf_counter() - start_time
+        delivered = received[0]
+
+        # زمن الذهاب والعودة
+        pinger = client_socks[0]
+        pinger.settimeout(1.0)
+        samples = []
+        for i in range(pings):
+            sent_at = time.perf_counter()
+            pinger.sendto(b'P' + i.to_bytes(4, 'little'), server_addr)
+            try:
+                pinger.recvfrom(64)
+            except socket.timeout:
+                continue
+            samples.append((time.perf_counter() - sent_at) * 1e6)
+
+        # زمن الإيقاف
+        stop_start = time.perf_counter()
+        if engine:
+            engine.stop()
+        else:
+            state['running'] = False
+            thread.join(timeout=2)
+        shutdown_ms = (time.perf_counter() - stop_start) * 1000
+
+        results[engine_name] = {
+            'sent': total,
+            'delivered': delivered,
+            'packets_per_sec': delivered / elapsed,
+            'rtt_median_us': statistics.median(samples) if samples else None,
+            'rtt_p99_us': sorted(samples)[int(len(samples) * 0.99) - 1] if samples else None,
+            'shutdown_ms': shutdown_ms,
+        }
+        if engine:
+            results[engine_name]['datagrams_per_wakeup'] = engine.datagrams / max(1, engine.wakeups)
+
+        for client in client_socks:
+            client.close()
+        server.close()
+
+    return results
+
+# اختبار النظام
+if __name__ == "__main__":
+    results = benchmark_engines()
+    for name, info in results.items():
+        print(f"{name}:")
+        print(f"  Throughput: {info['packets_per_sec']:,.0f} packets/sec "
+              f"({info['delivered']}/{info['sent']} delivered)")
+        print(f"  RTT: median {info['rtt_median_us']:.0f} us, p99 {info['rtt_p99_us']:.0f} us")
+        print(f"  Shutdown: {info['shutdown_ms']:.1f} ms")
+        if 'datagrams_per_wakeup' in info:
+            print(f"  Datagrams per wakeup: {info['datagrams_per_wakeup']:.1f}")
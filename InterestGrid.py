@@ -0,0 +1,248 @@
+import math
+import random
+import time
+from typing import Dict, Iterable, Iterator, Optional, Set, Tuple
+
+# مستويات الاهتمام
+NEAR = 1  # كل نبضة
+FAR = 2   # بمعدل مخفض
+
+class SpatialGrid:
+    """شبكة منتظمة على المحورين X/Y لإيجاد اللاعبين القريبين"""
+
+    def __init__(self, cell_size: float = 200.0):
+        self.cell_size = cell_size
+        self.cells: Dict[Tuple[int, int], Set[int]] = {}
+        self.positions: Dict[int, Tuple[float, float, float]] = {}
+        self.cell_of: Dict[int, Tuple[int, int]] = {}
+
+        # إحصائيات
+        self.updates = 0
+        self.cell_changes = 0
+
+    def _cell(self, position) -> Tuple[int, int]:
+        return (int(math.floor(position[0] / self.cell_size)),
+                int(math.floor(position[1] / self.cell_size)))
+
+    def update(self, player_id: int, position) -> bool:
+        """تحديث موقع لاعب (ينقل بين الخلايا فقط عند تغير الخلية)"""
+        self.updates += 1
+        self.positions[player_id] = position
+        cell = self._cell(position)
+        old_cell = self.cell_of.get(player_id)
+        if old_cell == cell:
+            return False
+
+        if old_cell is not None:
+            members = self.cells[old_cell]
+            members.discard(player_id)
+            if not members:
+                del self.cells[old_cell]
+        self.cells.setdefault(cell, set()).add(player_id)
+        self.cell_of[player_id] = cell
+        self.cell_changes += 1
+        return True
+
+    def remove(self, player_id: int):
+        """حذف لاعب من الشبكة"""
+        self.positions.pop(player_id, None)
+        cell = self.cell_of.pop(player_id, None)
+        if cell is not None:
+            members = self.cells.get(cell)
+            if members is not None:
+                members.discard(player_id)
+                if not members:
+                    del self.cells[cell]
+
+    def nearby(self, position, radius: float) -> Iterator[int]:
+        """كل اللاعبين في الخلايا التي تغطي الدائرة (مرشحون، بدون فحص المسافة)"""
+        min_x, min_y = self._cell((position[0] - radius, position[1] - radius))
+        max_x, max_y = self._cell((position[0] + radius, position[1] + radius))
+        cells = self.cells
+        for cx in range(min_x, max_x + 1):
+            for cy in range(min_y, max_y + 1):
+                members = cells.get((cx, cy))
+                if members:
+                    yield from members
+
+class InterestManager:
+    """إدارة الاهتمام: القريب كل نبضة، البعيد بمعدل مخفض، وما بعده لا يُرسل"""
+
+    def __init__(self, near_radius: float = 150.0, far_radius: float = 400.0,
+                 hysteresis: float = 25.0, far_interval: int = 4, cell_size: Optional[float] = None):
+        self.near_radius = near_radius
+        self.far_radius = far_radius
+        self.hysteresis = hysteresis
+        self.far_interval = far_interval
+        self.grid = SpatialGrid(cell_size or far_radius / 2)
+
+        # المستوى الحالي لكل (مشاهد، لاعب)
+        self.tiers: Dict[int, Dict[int, int]] = {}
+        self.entered: Set[Tuple[int, int]] = set()
+        self.tick = 0
+
+    def update(self, player_id: int, position):
+        """تحديث تدريجي للفهرس عند وصول موقع جديد"""
+        self.grid.update(player_id, position)
+
+    def remove(self, player_id: int):
+        """حذف لاعب منفصل من الفهرس ومن جداول المشاهدين"""
+        self.grid.remove(player_id)
+        self.tiers.pop(player_id, None)
+        for tiers in self.tiers.values():
+            tiers.pop(player_id, None)
+
+    def refresh(self, viewers: Iterable[int]):
+        """حساب مستويات الاهتمام لهذه النبضة (مع هامش لمنع التذبذب عند الحدود)"""
+        self.tick += 1
+        self.entered = set()
+        positions = self.grid.positions
+        near_enter = self.near_radius ** 2
+        near_exit = (self.near_radius + self.hysteresis) ** 2
+        far_enter = self.far_radius ** 2
+        far_exit = (self.far_radius + self.hysteresis) ** 2
+        search_radius = self.far_radius + self.hysteresis
+
+        for viewer in viewers:
+            position = positions.get(viewer)
+            if position is None:
+                # موقع المشاهد غير معروف بعد - الكل مهم
+                self.tiers.pop(viewer, None)
+                continue
+
+            old = self.tiers.get(viewer, {})
+            new = {}
+            vx, vy = position[0], position[1]
+            for subject in self.grid.nearby(position, search_radius):
+                if subject == viewer:
+                    continue
+                other = positions[subject]
+                dx = other[0] - vx
+                dy = other[1] - vy
+                distance = dx * dx + dy * dy
+                previous = old.get(subject)
+
+                if distance <= near_enter or (previous == NEAR and distance <= near_exit):
+                    tier = NEAR
+                elif distance <= far_enter or (previous is not None and distance <= far_exit):
+                    tier = FAR
+                else:
+                    continue
+
+                new[subject] = tier
+                if previous is None or tier < previous:
+                    self.entered.add((viewer, subject))
+
+            self.tiers[viewer] = new
+
+    def should_send(self, viewer: int, subject: int, dirty: bool) -> bool:
+        """هل يُرسل اللاعب subject للمشاهد viewer في هذه النبضة"""
+        tiers = self.tiers.get(viewer)
+        if tiers is None:
+            # مشاهد بدون موقع معروف: السلوك القديم
+            return dirty
+
+        tier = tiers.get(subject)
+        if tier is None:
+            if subject not in self.grid.positions:
+                return dirty  # لاعب بدون موقع معروف
+            return False
+        if (viewer, subject) in self.entered:
+            return True
+        if tier == NEAR:
+            return dirty
+        # البعيد: كل far_interval نبضات، موزع حسب رقم اللاعب
+        return (self.tick + subject) % self.far_interval == 0
+
+def _synthetic_positions(count: int, layout: str, rng: random.Random) -> Dict[int, list]:
+    """مواقع اصطناعية: منتظمة على الخريطة أو متجمعة حول نقاط"""
+    positions = {}
+    centers = [(rng.uniform(-2000, 2000), rng.uniform(-2000, 2000)) for _ in range(6)]
+    for player in range(1, count + 1):
+        if layout == 'uniform':
+            x, y = rng.uniform(-2500, 2500), rng.uniform(-2500, 2500)
+        else:
+            cx, cy = centers[player % len(centers)]
+            x, y = rng.gauss(cx, 120.0), rng.gauss(cy, 120.0)
+        positions[player] = [x, y, 10.0]
+    return positions
+
+def benchmark_interest(player_counts=(100, 150), ticks: int = 40, rate: int = 20, seed: int = 3) -> dict:
+    """قياس البايتات الموفرة وكلفة تحديث الفهرس مع توزيع منتظم ومتجمع"""
+    from NetworkProtocol import PacketType, make_message
+    from SnapshotDelta import SnapshotStreams
+    from TickAggregator import TickAggregator
+
+    results = {}
+    for count in player_counts:
+        for layout in ('uniform', 'clustered'):
+            row = {}
+            for mode in ('all', 'interest'):
+                rng = random.Random(seed)
+                positions = _synthetic_positions(count, layout, rng)
+                headings = {player: rng.uniform(0, 2 * math.pi) for player in positions}
+                recipients = {('10.0.0.1', 10000 + player): player for player in positions}
+                source_of = {player: addr for addr, player in recipients.items()}
+
+                streams = SnapshotStreams()
+                aggregator = TickAggregator()
+                interest = InterestManager() if mode == 'interest' else None
+                sent_bytes = 0
+                update_time = 0.0
+                refresh_time = 0.0
+
+                for tick in range(ticks):
+                    for player, position in positions.items():
+                        # حركة بسرعة مركبة (~15 م/ث) مع انعطاف عشوائي
+                        headings[player] += rng.uniform(-0.2, 0.2)
+                        position[0] += 15.0 / rate * math.cos(headings[player])
+                        position[1] += 15.0 / rate * math.sin(headings[player])
+                        packet = make_message(PacketType.POSITION, player_id=player,
+                                              timestamp=tick * 1000 // rate,
+                                              position=tuple(position), rotation=(0.0, 0.0, 0.0),
+                                              velocity=(0.0, 0.0, 0.0), animation=0,
+                                              health=100, armor=0, weapon=0)
+                        if interest:
+                            start_time = time.perf_counter()
+                            interest.update(player, packet.position)
+                            update_time += time.perf_counter() - start_time
+                        aggregator.update(player, packet, source_of[player])
+
+                    start_time = time.perf_counter()
+                    if interest:
+                        interest.refresh(recipients.values())
+                    refresh_time += time.perf_counter() - start_time
+
+                    for datagram, _ in aggregator.build(recipients, streams, interest):
+                        sent_bytes += len(datagram) + 28  # رؤوس IP/UDP
+
+                    for encoder in streams.encoders.values():
+                        encoder.acknowledge(encoder.sequence)
+
+                row[mode] = {
+                    'bytes_per_sec': sent_bytes * rate / ticks,
+                    'update_us': update_time * 1e6 / (count * ticks),
+                    'refresh_ms': refresh_time * 1000 / ticks,
+                }
+            results[(count, layout)] = row
+    return results
+
+# اختبار النظام
+if __name__ == "__main__":
+    # الهامش: لاعب يتأرجح حول حد القرب لا يغير مستواه
+    manager = InterestManager(near_radius=100.0, far_radius=300.0, hysteresis=20.0)
+    manager.update(1, (0.0, 0.0, 0.0))
+    tiers = []
+    for x in (90.0, 110.0, 95.0, 115.0, 125.0, 310.0, 330.0, 290.0):
+        manager.update(2, (x, 0.0, 0.0))
+        manager.refresh([1])
+        tiers.append(manager.tiers[1].get(2))
+    assert tiers == [NEAR, NEAR, NEAR, NEAR, FAR, FAR, None, FAR], tiers
+
+    for (count, layout), row in benchmark_interest().items():
+        saved = 1 - row['interest']['bytes_per_sec'] / row['all']['bytes_per_sec']
+        print(f"{count} players, {layout}:")
+        print(f"  Relay bandwidth: {row['all']['bytes_per_sec'] / 1024:,.0f} KB/s -> "
+              f"{row['interest']['bytes_per_sec'] / 1024:,.0f} KB/s ({saved:.0%} saved)")
+        print(f"  Index update: {row['interest']['update_us']:.2f} us/update, "
+              f"refresh {row['interest']['refresh_ms']:.2f} ms/tick")
@@ -0,0 +1,282 @@
+import json
+import math
+import random
+import sys
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+# العرض متأخر بهذا القدر عن أحدث لقطة (يغطي التذبذب وفقدان حزمة)
+INTERPOLATION_DELAY = 0.1
+# أقصى مدة للتنبؤ بالحركة عند انقطاع اللقطات
+MAX_EXTRAPOLATION = 0.25
+RING_SIZE = 16
+
+def _wrap_angle(angle: float) -> float:
+    """تحويل الزاوية إلى المجال [-180, 180)"""
+    return (angle + 180.0) % 360.0 - 180.0
+
+class SnapshotRing:
+    """حلقة لقطات لاعب واحد بأعمدة array (زمن، موقع، سرعة، دوران)"""
+    __slots__ = ('size', 'times', 'pos', 'vel', 'rot', 'animation', 'head', 'count',
+                 'last_stamp', 'timeline', 'offset')
+
+    def __init__(self, size: int = RING_SIZE):
+        self.size = size
+        self.times = array('d', bytes(8 * size))
+        self.pos = array('d', bytes(8 * 3 * size))
+        self.vel = array('d', bytes(8 * 3 * size))
+        self.rot = array('d', bytes(8 * 3 * size))
+        self.animation = array('H', bytes(2 * size))
+        self.head = 0  # موضع اللقطة التالية
+        self.count = 0
+
+        # ساعة المرسل: الطوابع 32 بت (ms) تُحول لخط زمني متصل بالثواني
+        self.last_stamp: Optional[int] = None
+        self.timeline = 0.0
+        # الفرق بين الساعة المحلية وساعة المرسل (أقل تأخير شوهد)
+        self.offset: Optional[float] = None
+
+    def push(self, stamp: int, received_at: float, position, velocity, rotation, animation: int = 0) -> bool:
+        """إضافة لقطة (False إن كانت أقدم من آخر لقطة)"""
+        if self.last_stamp is None:
+            self.timeline = 0.0
+        else:
+            # فرق موقع بإشارة مع التفاف 32 بت
+            delta = (stamp - self.last_stamp) & 0xFFFFFFFF
+            if delta >= 0x80000000:
+                return False  # لقطة متأخرة وصلت بعد أحدث منها
+            if delta == 0 and self.count:
+                return False
+            self.timeline += delta / 1000.0
+        self.last_stamp = stamp
+
+        # تقدير فرق الساعتين: يتبع أقل تأخير، وينجرف ببطء لأعلى
+        sample = received_at - self.timeline
+        if self.offset is None or sample < self.offset:
+            self.offset = sample
+        else:
+            self.offset += (sample - self.offset) * 0.01
+
+        index = self.head
+        self.times[index] = self.timeline
+        base = index * 3
+        self.pos[base:base + 3] = array('d', position)
+        self.vel[base:base + 3] = array('d', velocity)
+        self.rot[base:base + 3] = array('d', rotation)
+        self.animation[index] = animation
+        self.head = (index + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+        return True
+
+    def _index(self, age: int) -> int:
+        """موضع اللقطة رقم age من الأحدث (0 = الأحدث)"""
+        return (self.head - 1 - age) % self.size
+
+    def _tangent(self, index: int, neighbor: int, dt: float) -> Tuple[float, float, float]:
+        """مماس هيرمت: السرعة المرسلة، أو الفرق بين اللقطتين إن كانت صفراً"""
+        base = index * 3
+        velocity = self.vel[base], self.vel[base + 1], self.vel[base + 2]
+        if velocity != (0.0, 0.0, 0.0) or dt == 0:
+            return velocity
+        other = neighbor * 3
+        return tuple((self.pos[other + axis] - self.pos[base + axis]) / dt for axis in range(3))
+
+    def sample(self, render_time: float, max_extrapolation: float = MAX_EXTRAPOLATION):
+        """حساب الحالة عند زمن عرض (بساعة المرسل): (الموقع، الدوران، الحركة) أو None"""
+        if not self.count:
+            return None
+
+        newest = self._index(0)
+        if render_time >= self.times[newest] or self.count == 1:
+            # تنبؤ محدود بالسرعة بعد أحدث لقطة
+            dt = min(max(render_time - self.times[newest], 0.0), max_extrapolation)
+            base = newest * 3
+            if self.count > 1:
+                previous = self._index(1)
+                velocity = self._tangent(newest, previous, self.times[previous] - self.times[newest])
+            else:
+                velocity = self.vel[base:base + 3]
+            position = tuple(self.pos[base + axis] + velocity[axis] * dt for axis in range(3))
+            rotation = (self.rot[base], self.rot[base + 1], self.rot[base + 2])
+            return position, rotation, self.animation[newest]
+
+        # البحث عن اللقطتين المحيطتين بزمن العرض
+        for age in range(1, self.count):
+            older = self._index(age)
+            if self.times[older] <= render_time:
+                newer = self._index(age - 1)
+                break
+        else:
+            oldest = self._index(self.count - 1)
+            base = oldest * 3
+            return (tuple(self.pos[base:base + 3]), tuple(self.rot[base:base + 3]),
+                    self.animation[oldest])
+
+        t0 = self.times[older]
+        t1 = self.times[newer]
+        dt = t1 - t0
+        s = (render_time - t0) / dt if dt > 0 else 1.0
+
+        # استيفاء هيرمت التكعيبي
+        s2 = s * s
+        s3 = s2 * s
+        h00 = 2 * s3 - 3 * s2 + 1
+        h10 = s3 - 2 * s2 + s
+        h01 = -2 * s3 + 3 * s2
+        h11 = s3 - s2
+        m0 = self._tangent(older, newer, dt)
+        m1 = self._tangent(newer, older, -dt)
+        b0 = older * 3
+        b1 = newer * 3
+        position = tuple(h00 * self.pos[b0 + axis] + h10 * dt * m0[axis] +
+                         h01 * self.pos[b1 + axis] + h11 * dt * m1[axis] for axis in range(3))
+
+        # الدوران: أقصر مسار للزاوية
+        rotation = tuple(self.rot[b0 + axis] + _wrap_angle(self.rot[b1 + axis] - self.rot[b0 + axis]) * s
+                         for axis in range(3))
+        animation = self.animation[newer if s >= 0.5 else older]
+        return position, rotation, animation
+
+class InterpolationBuffer:
+    """مخزن تذبذب لكل لاعب بعيد: العرض متأخراً ~100ms مع استيفاء وتنبؤ محدود"""
+
+    def __init__(self, delay: float = INTERPOLATION_DELAY, max_extrapolation: float = MAX_EXTRAPOLATION,
+                 ring_size: int = RING_SIZE):
+        self.delay = delay
+        self.max_extrapolation = max_extrapolation
+        self.ring_size = ring_size
+        self.rings: Dict[int, SnapshotRing] = {}
+
+    def push(self, player_id: int, packet, received_at: Optional[float] = None) -> bool:
+        """إضافة حزمة موقع مستلمة"""
+        ring = self.rings.get(player_id)
+        if ring is None:
+            ring = self.rings[player_id] = SnapshotRing(self.ring_size)
+        return ring.push(packet.timestamp, time.monotonic() if received_at is None else received_at,
+                         packet.position, packet.velocity, packet.rotation, packet.animation)
+
+    def sample(self, player_id: int, now: Optional[float] = None):
+        """حالة اللاعب للعرض الآن: (الموقع، الدوران، الحركة) أو None"""
+        ring = self.rings.get(player_id)
+        if ring is None or ring.offset is None:
+            return None
+        if now is None:
+            now = time.monotonic()
+        return ring.sample(now - ring.offset - self.delay, self.max_extrapolation)
+
+    def forget(self, player_id: int):
+        """حذف لاعب منفصل"""
+        self.rings.pop(player_id, None)
+
+def synthetic_trace(seconds: float = 10.0, send_rate: int = 20, jitter: float = 0.03,
+                    loss: float = 0.05, seed: int = 7) -> List[dict]:
+    """مسار اصطناعي (سيارة تدور) مع تذبذب وفقدان، بنفس صيغة الملفات المسجلة"""
+    rng = random.Random(seed)
+    trace = []
+    stamp_base = 0xFFFFF000  # يختبر التفاف الطابع الزمني
+    for tick in range(int(seconds * send_rate)):
+        t = tick / send_rate
+        if rng.random() < loss:
+            continue
+        position, velocity, heading = _circle(t)
+        trace.append({
+            'arrival': 5.0 + t + 0.02 + rng.uniform(0, jitter),
+            'timestamp': (stamp_base + int(t * 1000)) & 0xFFFFFFFF,
+            'position': position,
+            'velocity': velocity,
+            'rotation': (0.0, 0.0, heading),
+        })
+    trace.sort(key=lambda record: record['arrival'])  # إعادة الترتيب ممكنة
+    return trace
+
+def _circle(t: float):
+    """الحالة الحقيقية: دوران بسرعة 20 م/ث على دائرة نصف قطرها 60 م"""
+    speed, radius = 20.0, 60.0
+    angle = speed * t / radius
+    position = (radius * math.cos(angle), radius * math.sin(angle), 10.0)
+    velocity = (-speed * math.sin(angle), speed * math.cos(angle), 0.0)
+    return position, velocity, _wrap_angle(math.degrees(angle) + 90.0)
+
+def replay_trace(trace: List[dict], render_rate: int = 60, use_velocity: bool = True,
+                 delay: float = INTERPOLATION_DELAY) -> dict:
+    """تشغيل مسار مسجل بدون لعبة: الخطأ عن المسار الحقيقي وأكبر قفزة بين إطارين"""
+    buffer = InterpolationBuffer(delay=delay)
+    packets = iter(trace)
+    pending = next(packets, None)
+    start = trace[0]['arrival']
+    end = trace[-1]['arrival']
+    frame = 1.0 / render_rate
+
+    class _Packet:
+        __slots__ = ('timestamp', 'position', 'velocity', 'rotation', 'animation')
+
+    errors = []
+    jumps = []
+    previous = None
+    now = start
+    while now <= end:
+        while pending is not None and pending['arrival'] <= now:
+            packet = _Packet()
+            packet.timestamp = pending['timestamp']
+            packet.position = tuple(pending['position'])
+            packet.velocity = tuple(pending['velocity']) if use_velocity else (0.0, 0.0, 0.0)
+            packet.rotation = tuple(pending['rotation'])
+            packet.animation = 0
+            buffer.push(1, packet, pending['arrival'])
+            pending = next(packets, None)
+
+        state = buffer.sample(1, now)
+        if state is not None:
+            position = state[0]
+            # الزمن الحقيقي المعروض (الإرسال بدأ عند 5.02)
+            shown = now - 5.02 - delay
+            if shown > 0.5:
+                truth = _circle(shown)[0]
+                errors.append(math.dist(position, truth))
+            if previous is not None:
+                jumps.append(math.dist(position, previous))
+            previous = position
+        now += frame
+
+    errors.sort()
+    return {
+        'frames': len(jumps) + 1,
+        'mean_error': sum(errors) / len(errors),
+        'p99_error': errors[int(len(errors) * 0.99) - 1],
+        'max_jump': max(jumps),
+        'expected_step': 20.0 / render_rate,
+    }
+
+def _legacy_replay(trace: List[dict], render_rate: int = 60) -> dict:
+    """السلوك القديم: كتابة آخر موقع مستلم مباشرة (قفزات بمعدل الإرسال)"""
+    jumps = []
+    previous = None
+    for record in trace:
+        position = tuple(record['position'])
+        if previous is not None:
+            jumps.append(math.dist(position, previous))
+        previous = position
+    return {'max_jump': max(jumps)}
+
+# اختبار النظام
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # مسار مسجل: JSON lines بحقول arrival, timestamp, position, velocity, rotation
+        with open(sys.argv[1]) as f:
+            traces = {sys.argv[1]: [json.loads(line) for line in f if line.strip()]}
+    else:
+        traces = {f"{rate} Hz, 30 ms jitter, 5% loss": synthetic_trace(send_rate=rate)
+                  for rate in (20, 10)}
+
+    for name, trace in traces.items():
+        legacy = _legacy_replay(trace)
+        print(f"{name}:")
+        for use_velocity in (True, False):
+            result = replay_trace(trace, use_velocity=use_velocity)
+            label = "Hermite (velocity)" if use_velocity else "Hermite (finite difference)"
+            print(f"  {label:<28} mean error {result['mean_error']:.2f} m, p99 {result['p99_error']:.2f} m, "
+                  f"max step {result['max_jump']:.2f} m/frame (ideal {result['expected_step']:.2f})")
+            if len(sys.argv) == 1:
+                assert result['max_jump'] < 3 * result['expected_step'], result
+        print(f"  {'direct write (old)':<28} max step {legacy['max_jump']:.2f} m/update")
@@ -0,0 +1,514 @@
+import ctypes
+import mmap
+import os
+import random
+import struct
+import sys
+import tempfile
+from ctypes import wintypes
+from typing import Dict, List, Optional, Tuple
+
+# ثوابت Windows (بدون الاعتماد على pywin32)
+PROCESS_ALL_ACCESS = 0x001F0FFF
+TH32CS_SNAPMODULE = 0x00000008
+INVALID_HANDLE_VALUE = ctypes.c_void_p(-1).value
+MEM_COMMIT = 0x00001000
+MEM_RESERVE = 0x00002000
+MEM_RELEASE = 0x00008000
+PAGE_READWRITE = 0x04
+PAGE_NOACCESS = 0x01
+PAGE_GUARD = 0x100
+IOV_MAX = 1024
+
+class MemoryAccessError(Exception):
+    """فشل قراءة أو كتابة الذاكرة"""
+
+# تعريف الهياكل
+class MEMORY_BASIC_INFORMATION(ctypes.Structure):
+    _fields_ = [
+        ("BaseAddress", wintypes.LPVOID),
+        ("AllocationBase", wintypes.LPVOID),
+        ("AllocationProtect", wintypes.DWORD),
+        ("RegionSize", ctypes.c_size_t),
+        ("State", wintypes.DWORD),
+        ("Protect", wintypes.DWORD),
+        ("Type", wintypes.DWORD)
+    ]
+
+class MODULEENTRY32(ctypes.Structure):
+    _fields_ = [
+        ("dwSize", wintypes.DWORD),
+        ("th32ModuleID", wintypes.DWORD),
+        ("th32ProcessID", wintypes.DWORD),
+        ("GlblcntUsage", wintypes.DWORD),
+        ("ProccntUsage", wintypes.DWORD),
+        ("modBaseAddr", wintypes.LPVOID),
+        ("modBaseSize", wintypes.DWORD),
+        ("hModule", wintypes.HMODULE),
+        ("szModule", ctypes.c_char * 256),
+        ("szExePath", ctypes.c_char * 260)
+    ]
+
+class MemoryBackend:
+    """واجهة الوصول لذاكرة اللعبة: عملية Windows، ملف تفريغ، أو /proc على Linux"""
+
+    name = "base"
+    # هل تستفيد الواجهة من دمج كتابات النبضة (استدعاءات أقل)؟ ملف التفريغ نسخ في الذاكرة فقط
+    batch_writes = False
+
+    def read(self, address: int, size: int) -> bytes:
+        raise NotImplementedError
+
+    def write(self, address: int, data: bytes):
+        raise NotImplementedError
+
+    def read_into(self, address: int, buffer) -> int:
+        """قراءة داخل مخزن موجود"""
+        data = self.read(address, len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def write_many(self, writes: List[Tuple[int, bytes]]) -> int:
+        """كتابة عدة مجالات وإرجاع عدد استدعاءات النظام المستخدمة"""
+        for address, data in writes:
+            self.write(address, data)
+        return len(writes)
+
+    def modules(self) -> Dict[str, dict]:
+        """الوحدات المحملة: الاسم -> {base, size, path}"""
+        return {}
+
+    def regions(self) -> List[Tuple[int, int, str]]:
+        """المناطق المقروءة (committed): (البداية، الحجم، الصلاحيات)"""
+        return [(module['base'], module['size'], 'r--') for module in self.modules().values()]
+
+    def close(self):
+        pass
+
+class WindowsProcessBackend(MemoryBackend):
+    """الوصول عبر ReadProcessMemory / WriteProcessMemory"""
+
+    name = "windows"
+    batch_writes = True  # المجالات المتلاصقة: WriteProcessMemory واحد بدل عدة
+
+    def __init__(self, process_id: int):
+        self.process_id = process_id
+        self.kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        self.handle = self.kernel32.OpenProcess(PROCESS_ALL_ACCESS, False, process_id)
+        if not self.handle:
+            raise MemoryAccessError(f"Failed to open process {process_id}")
+
+    def read(self, address: int, size: int) -> bytes:
+        buffer = ctypes.create_string_buffer(size)
+        bytes_read = ctypes.c_size_t()
+
+        result = self.kernel32.ReadProcessMemory(
+            self.handle,
+            ctypes.c_void_p(address),
+            buffer,
+            size,
+            ctypes.byref(bytes_read)
+        )
+
+        if result and bytes_read.value == size:
+            return buffer.raw
+        raise MemoryAccessError(f"Failed to read memory at 0x{address:08X}")
+
+    def read_into(self, address: int, buffer) -> int:
+        size = len(buffer)
+        bytes_read = ctypes.c_size_t()
+        result = self.kernel32.ReadProcessMemory(
+            self.handle,
+            ctypes.c_void_p(address),
+            (ctypes.c_char * size).from_buffer(buffer),
+            size,
+            ctypes.byref(bytes_read)
+        )
+        if result and bytes_read.value == size:
+            return size
+        raise MemoryAccessError(f"Failed to read memory at 0x{address:08X}")
+
+    def write(self, address: int, data: bytes):
+        buffer = ctypes.create_string_buffer(data, len(data))
+        bytes_written = ctypes.c_size_t()
+
+        result = self.kernel32.WriteProcessMemory(
+            self.handle,
+            ctypes.c_void_p(address),
+            buffer,
+            len(data),
+            ctypes.byref(bytes_written)
+        )
+
+        if not (result and bytes_written.value == len(data)):
+            raise MemoryAccessError(f"Failed to write memory at 0x{address:08X}")
+
+    def modules(self) -> Dict[str, dict]:
+        modules = {}
+        snapshot = self.kernel32.CreateToolhelp32Snapshot(TH32CS_SNAPMODULE, self.process_id)
+        if snapshot == INVALID_HANDLE_VALUE:
+            return modules
+
+        module_entry = MODULEENTRY32()
+        module_entry.dwSize = ctypes.sizeof(MODULEENTRY32)
+
+        if self.kernel32.Module32First(snapshot, ctypes.byref(module_entry)):
+            while True:
+                module_name = module_entry.szModule.decode('ascii', errors='ignore')
+                modules[module_name] = {
+                    'base': module_entry.modBaseAddr,
+                    'size': module_entry.modBaseSize,
+                    'path': module_entry.szExePath.decode('ascii', errors='ignore')
+                }
+                if not self.kernel32.Module32Next(snapshot, ctypes.byref(module_entry)):
+                    break
+
+        self.kernel32.CloseHandle(snapshot)
+        return modules
+
+    def regions(self) -> List[Tuple[int, int, str]]:
+        """المناطق المقروءة عبر VirtualQueryEx (بدون المحجوزة والمحمية والحارسة)"""
+        regions = []
+        info = MEMORY_BASIC_INFORMATION()
+        address = 0
+        while address < 0x7FFFFFFF:
+            if not self.kernel32.VirtualQueryEx(self.handle, ctypes.c_void_p(address),
+                                                ctypes.byref(info), ctypes.sizeof(info)):
+                break
+            base = info.BaseAddress or 0
+            if (info.State == MEM_COMMIT and info.Protect and
+                    not info.Protect & (PAGE_NOACCESS | PAGE_GUARD)):
+                executable = 'x' if info.Protect & 0xF0 else '-'
+                writable = 'w' if info.Protect & 0xCC else '-'
+                regions.append((base, info.RegionSize, 'r' + writable + executable))
+            address = base + info.RegionSize
+        return regions
+
+    def close(self):
+        if self.handle:
+            self.kernel32.CloseHandle(self.handle)
+            self.handle = None
+
+class DumpFileBackend(MemoryBackend):
+    """صورة ذاكرة في ملف (mmap) تبدأ عند base_address - للاختبار والقياس بدون اللعبة"""
+
+    name = "dump"
+
+    def __init__(self, path: str, base_address: int = 0x00400000, module_name: str = "gta-vc.exe",
+                 writable: bool = False):
+        self.path = path
+        self.base_address = base_address
+        self.module_name = module_name
+        self.file = open(path, 'r+b' if writable else 'rb')
+        # بدون writable: الكتابات تبقى في الذاكرة ولا تغير الملف
+        access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_COPY
+        self.map = mmap.mmap(self.file.fileno(), 0, access=access)
+        self.size = len(self.map)
+        self.view = memoryview(self.map)
+
+    def _offset(self, address: int, size: int) -> int:
+        offset = address - self.base_address
+        if offset < 0 or offset + size > self.size:
+            raise MemoryAccessError(f"Failed to read memory at 0x{address:08X}")
+        return offset
+
+    def read(self, address: int, size: int) -> bytes:
+        offset = self._offset(address, size)
+        return self.map[offset:offset + size]
+
+    def read_into(self, address: int, buffer) -> int:
+        size = len(buffer)
+        offset = self._offset(address, size)
+        buffer[:size] = self.view[offset:offset + size]
+        return size
+
+    def view_at(self, address: int, size: int) -> memoryview:
+        """شريحة بدون نسخ من الصورة"""
+        offset = self._offset(address, size)
+        return self.view[offset:offset + size]
+
+    def write(self, address: int, data: bytes):
+        offset = address - self.base_address
+        if offset < 0 or offset + len(data) > self.size:
+            raise MemoryAccessError(f"Failed to write memory at 0x{address:08X}")
+        self.map[offset:offset + len(data)] = data
+
+    def modules(self) -> Dict[str, dict]:
+        return {self.module_name: {'base': self.base_address, 'size': self.size, 'path': self.path}}
+
+    def regions(self) -> List[Tuple[int, int, str]]:
+        return [(self.base_address, self.size, 'rwx')]
+
+    def close(self):
+        if self.map is not None:
+            self.view.release()
+            self.map.close()
+            self.file.close()
+            self.map = None
+
+class _IOVEC(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+_process_vm_readv = None
+_process_vm_writev = None
+if sys.platform.startswith('linux'):
+    try:
+        _libc = ctypes.CDLL(None, use_errno=True)
+        for _name in ('process_vm_readv', 'process_vm_writev'):
+            _function = getattr(_libc, _name)
+            _function.argtypes = [ctypes.c_int, ctypes.POINTER(_IOVEC), ctypes.c_ulong,
+                                  ctypes.POINTER(_IOVEC), ctypes.c_ulong, ctypes.c_ulong]
+            _function.restype = ctypes.c_ssize_t
+        _process_vm_readv = _libc.process_vm_readv
+        _process_vm_writev = _libc.process_vm_writev
+    except (OSError, AttributeError):
+        _process_vm_readv = _process_vm_writev = None
+
+class LinuxProcessBackend(MemoryBackend):
+    """عملية على Linux (مثلاً اللعبة تحت Wine): process_vm_readv مع /proc/<pid>/mem كبديل"""
+
+    name = "linux"
+    batch_writes = _process_vm_writev is not None
+
+    def __init__(self, process_id: int, use_vm_readv: bool = True):
+        self.process_id = process_id
+        self.use_vm_readv = use_vm_readv and _process_vm_readv is not None
+        try:
+            self.mem_fd = os.open(f"/proc/{process_id}/mem", os.O_RDWR)
+        except OSError:
+            try:
+                self.mem_fd = os.open(f"/proc/{process_id}/mem", os.O_RDONLY)
+            except OSError as e:
+                if not self.use_vm_readv:
+                    raise MemoryAccessError(f"Failed to open process {process_id}: {e}")
+                self.mem_fd = None
+
+    def read(self, address: int, size: int) -> bytes:
+        if self.use_vm_readv:
+            buffer = ctypes.create_string_buffer(size)
+            if self._vm_transfer(_process_vm_readv, address, ctypes.addressof(buffer), size):
+                return buffer.raw
+        if self.mem_fd is not None:
+            try:
+                data = os.pread(self.mem_fd, size, address)
+                if len(data) == size:
+                    return data
+            except OSError:
+                pass
+        raise MemoryAccessError(f"Failed to read memory at 0x{address:08X}")
+
+    def read_into(self, address: int, buffer) -> int:
+        size = len(buffer)
+        if self.use_vm_readv and isinstance(buffer, bytearray):
+            local = (ctypes.c_char * size).from_buffer(buffer)
+            if self._vm_transfer(_process_vm_readv, address, ctypes.addressof(local), size):
+                return size
+        return super().read_into(address, buffer)
+
+    def write(self, address: int, data: bytes):
+        # /proc/pid/mem يكتب حتى في الصفحات المحمية (مثل ما يفعل WriteProcessMemory)
+        if self.mem_fd is not None:
+            try:
+                if os.pwrite(self.mem_fd, data, address) == len(data):
+                    return
+            except OSError:
+                pass
+        if _process_vm_writev is not None:
+            buffer = ctypes.create_string_buffer(data, len(data))
+            if self._vm_transfer(_process_vm_writev, address, ctypes.addressof(buffer), len(data)):
+                return
+        raise MemoryAccessError(f"Failed to write memory at 0x{address:08X}")
+
+    def write_many(self, writes: List[Tuple[int, bytes]]) -> int:
+        """كل المجالات في استدعاء process_vm_writev واحد (لكل IOV_MAX مجال)"""
+        if _process_vm_writev is None or not writes:
+            return super().write_many(writes)
+
+        syscalls = 0
+        for start in range(0, len(writes), IOV_MAX):
+            group = writes[start:start + IOV_MAX]
+            payload = b''.join(data for _, data in group)
+            buffer = ctypes.create_string_buffer(payload, len(payload))
+            local = _IOVEC(ctypes.addressof(buffer), len(payload))
+            # مصفوفة iovec البعيدة تُبنى بـ struct بدل حقول ctypes (أسرع بكثير)
+            fields = []
+            for address, data in group:
+                fields += (address, len(data))
+            remote = (_IOVEC * len(group)).from_buffer(
+                bytearray(struct.pack(f'{len(group) * 2}N', *fields)))
+
+            written = _process_vm_writev(self.process_id, ctypes.byref(local), 1, remote, len(group), 0)
+            syscalls += 1
+            if written == len(payload):
+                continue
+
+            # توقف عند أول مجال فشل (مثلاً صفحة للقراءة فقط): الباقي عبر /proc/pid/mem
+            done = max(written, 0)
+            for address, data in group:
+                if done >= len(data):
+                    done -= len(data)
+                    continue
+                self.write(address + done, data[done:])
+                done = 0
+                syscalls += 1
+        return syscalls
+
+    def _vm_transfer(self, function, address: int, local_address: int, size: int) -> bool:
+        local = _IOVEC(local_address, size)
+        remote = _IOVEC(address, size)
+        return function(self.process_id, ctypes.byref(local), 1, ctypes.byref(remote), 1, 0) == size
+
+    def regions(self) -> List[Tuple[int, int, str]]:
+        """المناطق المقروءة من /proc/<pid>/maps"""
+        regions = []
+        try:
+            with open(f"/proc/{self.process_id}/maps") as f:
+                for line in f:
+                    parts = line.split(None, 5)
+                    if len(parts) < 2 or parts[1][0] != 'r' or parts[5:6] == ['[vvar]\n']:
+                        continue
+                    start, end = (int(value, 16) for value in parts[0].split('-'))
+                    regions.append((start, end - start, parts[1][:3]))
+        except OSError:
+            pass
+        return regions
+
+    def modules(self) -> Dict[str, dict]:
+        """الوحدات من /proc/<pid>/maps"""
+        modules = {}
+        try:
+            with open(f"/proc/{self.process_id}/maps") as f:
+                for line in f:
+                    parts = line.split(None, 5)
+                    if len(parts) < 6 or not parts[5].strip().startswith('/'):
+                        continue
+                    path = parts[5].strip()
+                    start, end = (int(value, 16) for value in parts[0].split('-'))
+                    name = os.path.basename(path)
+                    module = modules.get(name)
+                    if module is None:
+                        modules[name] = {'base': start, 'size': end - start, 'path': path}
+                    else:
+                        module_end = max(module['base'] + module['size'], end)
+                        module['base'] = min(module['base'], start)
+                        module['size'] = module_end - module['base']
+        except OSError:
+            pass
+        return modules
+
+    def close(self):
+        if self.mem_fd is not None:
+            os.close(self.mem_fd)
+            self.mem_fd = None
+
+def find_process_id(process_name: str) -> Optional[int]:
+    """البحث عن رقم العملية بالاسم (psutil إن وجد، وإلا /proc)"""
+    try:
+        import psutil
+        for proc in psutil.process_iter(['pid', 'name']):
+            if (proc.info['name'] or '').lower() == process_name.lower():
+                return proc.info['pid']
+        return None
+    except ImportError:
+        pass
+
+    if os.path.isdir('/proc'):
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/cmdline", 'rb') as f:
+                    command = f.read().split(b'\0')[0].decode(errors='ignore')
+            except OSError:
+                continue
+            # تحت Wine يظهر المسار بأسلوب Windows
+            if command.replace('\\', '/').rsplit('/', 1)[-1].lower() == process_name.lower():
+                return int(entry)
+    return None
+
+def open_process_backend(process_id: int) -> MemoryBackend:
+    """الواجهة المناسبة للعملية حسب نظام التشغيل"""
+    if sys.platform == "win32":
+        return WindowsProcessBackend(process_id)
+    return LinuxProcessBackend(process_id)
+
+# صورة gta-vc اصطناعية للاختبار في CI
+SYNTHETIC_BASE = 0x00400000
+SYNTHETIC_SIZE = 0x01000000
+SYNTHETIC_PLAYER_PED = SYNTHETIC_BASE + 0x00C00000
+SYNTHETIC_VEHICLE = SYNTHETIC_BASE + 0x00C10000
+
+def build_synthetic_image(path: Optional[str] = None, used_slots: int = 120, seed: int = 1) -> str:
+    """بناء صورة ذاكرة اصطناعية بنفس أوفسيت GTAVCMemoryManager وإرجاع مسارها"""
+    rng = random.Random(seed)
+    image = bytearray(SYNTHETIC_SIZE)
+    image[0:2] = b'MZ'
+    # ترويسة PE مختصرة: TimeDateStamp و SizeOfImage
+    struct.pack_into('<I', image, 0x3C, 0x80)
+    image[0x80:0x84] = b'PE\0\0'
+    struct.pack_into('<I', image, 0x88, 0x3C9A2B00)
+    struct.pack_into('<I', image, 0x80 + 24 + 56, SYNTHETIC_SIZE)
+
+    def put(address: int, fmt: str, *values):
+        struct.pack_into(fmt, image, address - SYNTHETIC_BASE, *values)
+
+    # مصفوفة الكائنات: أول used_slots مشغولة بترتيب عشوائي
+    entity_list = SYNTHETIC_BASE + 0x00B74490
+    slots = list(range(400))
+    rng.shuffle(slots)
+    for slot in slots[:used_slots]:
+        put(entity_list + slot * 0x198, '<i', 1)
+
+    # اللاعب المحلي ومركبته
+    put(SYNTHETIC_BASE + 0x00B7CD98, '<I', SYNTHETIC_PLAYER_PED)
+    put(SYNTHETIC_PLAYER_PED, '<i', 1)
+    put(SYNTHETIC_PLAYER_PED + 0x14, '<fff', 512.5, -1024.25, 12.0)
+    put(SYNTHETIC_PLAYER_PED + 0x20, '<fff', 0.0, 0.0, 90.0)
+    put(SYNTHETIC_PLAYER_PED + 0x58C, '<I', SYNTHETIC_VEHICLE)
+    put(SYNTHETIC_VEHICLE + 0x14, '<fff', 514.0, -1022.0, 12.5)
+
+    # تعليمات تصل للمتغيرات العامة (لحل الأوفست بالتوقيعات)
+    from OffsetCache import plant_signatures
+    plant_signatures(image, SYNTHETIC_BASE, {
+        'player_ped_ptr': 0x00B7CD98, 'entity_list': 0x00B74490, 'camera_ptr': 0x00B6F028,
+        'world_ptr': 0x00B79594, 'game_state': 0x00B7CB54,
+    })
+
+    # توقيعات معروفة لاختبار المسح
+    put(SYNTHETIC_BASE + 0x1000, '<5B', 0x90, 0x90, 0x90, 0x90, 0xE8)
+    put(SYNTHETIC_BASE + 0x2345, '<6B', 0x8B, 0x0D, 0x98, 0xCD, 0xB7, 0x00)
+
+    if path is None:
+        handle, path = tempfile.mkstemp(prefix="gta-vc-", suffix=".img")
+        os.close(handle)
+    with open(path, 'wb') as f:
+        f.write(image)
+    return path
+
+# اختبار النظام
+if __name__ == "__main__":
+    path = build_synthetic_image()
+    backend = DumpFileBackend(path)
+    pointer = struct.unpack('<I', backend.read(SYNTHETIC_BASE + 0x00B7CD98, 4))[0]
+    position = struct.unpack('<fff', backend.read(pointer + 0x14, 12))
+    assert position == (512.5, -1024.25, 12.0), position
+    backend.write(pointer + 0x14, struct.pack('<fff', 1.0, 2.0, 3.0))
+    assert struct.unpack('<fff', backend.read(pointer + 0x14, 12)) == (1.0, 2.0, 3.0)
+    backend.close()
+    # ACCESS_COPY: الملف لم يتغير
+    assert DumpFileBackend(path).read(pointer + 0x14, 4) == struct.pack('<f', 512.5)
+    print(f"✓ Dump backend OK ({path})")
+
+    if sys.platform.startswith('linux'):
+        # قراءة وكتابة ذاكرة هذه العملية نفسها
+        target = ctypes.create_string_buffer(b'vice-city-memory', 16)
+        for use_vm_readv in (True, False):
+            linux = LinuxProcessBackend(os.getpid(), use_vm_readv=use_vm_readv)
+            assert linux.read(ctypes.addressof(target), 16) == b'vice-city-memory'
+            linux.write(ctypes.addressof(target), b'VICE')
+            assert target.raw[:4] == b'VICE'
+            target.raw = b'vice-city-memory'
+            linux.close()
+        print(f"✓ Linux backend OK (process_vm_readv available: {_process_vm_readv is not None})")
+
+    os.unlink(path)
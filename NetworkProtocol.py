@@ -0,0 +1,324 @@
+import struct
+import random
+import time
+from collections import namedtuple
+from enum import IntEnum
+from typing import Dict, Iterator, Optional, Tuple
+
+from PacketCodec import PACKET_SIZE
+
+# نسخة تنسيق الشبكة - تزداد عند أي تغيير غير متوافق
+PROTOCOL_VERSION = 1
+
+# الرأس: النسخة (1) + نوع الحزمة (1) + طول البيانات (2)
+HEADER_STRUCT = struct.Struct('<BBH')
+HEADER_SIZE = HEADER_STRUCT.size
+MAX_PAYLOAD_SIZE = 0xFFFF
+
+# أنواع الحزم
+class PacketType(IntEnum):
+    CONNECT = 0x01
+    DISCONNECT = 0x02
+    POSITION = 0x03
+    VEHICLE = 0x04
+    SHOOT = 0x05
+    CHAT = 0x06
+    SYNC = 0x07
+    PING = 0x08
+    POSITION_DELTA = 0x09
+    SNAPSHOT_ACK = 0x0A
+
+class PacketSchema:
+    """مخطط حزمة: حقول ثابتة + حقل اختياري متغير الطول في النهاية (نص أو بايتات)"""
+
+    def __init__(self, packet_type: int, name: str, fields: Tuple[Tuple[str, str], ...],
+                 tail: Optional[str] = None, binary_tail: bool = False):
+        self.packet_type = int(packet_type)
+        self.name = name
+        self.fields = fields
+        self.tail = tail
+        self.binary_tail = binary_tail
+
+        # تجميع الحقول في هيكل واحد مترجم مسبقاً
+        self.struct = struct.Struct('<' + ''.join(fmt for _, fmt in fields))
+        self.size = self.struct.size
+
+        # مواقع كل حقل داخل القيم المفكوكة
+        self._slices = []
+        index = 0
+        for field_name, fmt in fields:
+            width = len(fmt)
+            self._slices.append((field_name, index, width))
+            index += width
+
+        names = [field_name for field_name, _ in fields]
+        if tail:
+            names.append(tail)
+        self.message_class = namedtuple(name, names)
+        self.message_class.packet_type = self.packet_type
+
+    def encode(self, message) -> bytes:
+        """ترميز رسالة (أي كائن يحمل أسماء الحقول كخصائص)"""
+        values = []
+        for field_name, _, width in self._slices:
+            value = getattr(message, field_name)
+            if width == 1:
+                values.append(value)
+            else:
+                values.extend(value)
+        payload = self.struct.pack(*values)
+
+        if self.tail:
+            tail = getattr(message, self.tail, None)
+            if self.binary_tail:
+                payload += bytes(tail or b'')
+            else:
+                payload += (tail or '').encode('utf-8')
+
+        return payload
+
+    def decode(self, payload) -> Optional[tuple]:
+        """فك بيانات الحزمة إلى رسالة"""
+        if len(payload) < self.size:
+            return None
+
+        unpacked = self.struct.unpack_from(payload)
+        values = []
+        for _, index, width in self._slices:
+            if width == 1:
+                values.append(unpacked[index])
+            else:
+                values.append(unpacked[index:index + width])
+
+        if self.tail:
+            tail = bytes(payload[self.size:])
+            values.append(tail if self.binary_tail else tail.decode('utf-8', errors='replace'))
+
+        return self.message_class(*values)
+
+    def make(self, **fields) -> tuple:
+        """إنشاء رسالة من قيم مسماة"""
+        return self.message_class(**fields)
+
+# سجل المخططات: نوع الحزمة -> المخطط
+SCHEMAS: Dict[int, PacketSchema] = {}
+
+def register_schema(schema: PacketSchema) -> PacketSchema:
+    """تسجيل مخطط حزمة"""
+    if schema.packet_type in SCHEMAS:
+        raise ValueError(f"Packet type 0x{schema.packet_type:02X} already registered")
+    SCHEMAS[schema.packet_type] = schema
+    return schema
+
+register_schema(PacketSchema(PacketType.CONNECT, 'ConnectMessage', (
+    ('player_id', 'I'),
+    ('timestamp', 'I'),
+    ('position', 'fff'),
+    ('rotation', 'fff'),
+)))
+
+register_schema(PacketSchema(PacketType.DISCONNECT, 'DisconnectMessage', (
+    ('player_id', 'I'),
+    ('timestamp', 'I'),
+)))
+
+register_schema(PacketSchema(PacketType.POSITION, 'PositionMessage', (
+    ('player_id', 'I'),
+    ('timestamp', 'I'),
+    ('position', 'fff'),
+    ('rotation', 'fff'),
+    ('velocity', 'fff'),
+    ('animation', 'H'),
+    ('health', 'B'),
+    ('armor', 'B'),
+    ('weapon', 'B'),
+)))
+
+register_schema(PacketSchema(PacketType.VEHICLE, 'VehicleMessage', (
+    ('player_id', 'I'),
+    ('timestamp', 'I'),
+    ('vehicle_model', 'H'),
+    ('position', 'fff'),
+    ('rotation', 'fff'),
+    ('velocity', 'fff'),
+)))
+
+register_schema(PacketSchema(PacketType.SHOOT, 'ShootMessage', (
+    ('player_id', 'I'),
+    ('timestamp', 'I'),
+    ('weapon', 'B'),
+    ('position', 'fff'),
+    ('direction', 'fff'),
+)))
+
+register_schema(PacketSchema(PacketType.CHAT, 'ChatMessage', (
+    ('player_id', 'I'),
+    ('timestamp', 'I'),
+), tail='text'))
+
+register_schema(PacketSchema(PacketType.SYNC, 'SyncMessage', (
+    ('player_id', 'I'),
+    ('timestamp', 'I'),
+    ('health', 'B'),
+    ('armor', 'B'),
+    ('weapon', 'B'),
+)))
+
+register_schema(PacketSchema(PacketType.PING, 'PingMessage', (
+    ('player_id', 'I'),
+    ('timestamp', 'I'),
+)))
+
+# لقطة موقع مضغوطة (انظر SnapshotDelta): الحقول المتغيرة فقط مقارنة بلقطة مؤكدة
+register_schema(PacketSchema(PacketType.POSITION_DELTA, 'PositionDeltaMessage', (
+    ('player_id', 'I'),
+    ('timestamp', 'I'),
+    ('sequence', 'H'),
+    ('baseline', 'B'),
+    ('mask', 'H'),
+), tail='data', binary_tail=True))
+
+# تأكيد استلام لقطة: subject_id هو صاحب اللقطات
+register_schema(PacketSchema(PacketType.SNAPSHOT_ACK, 'SnapshotAckMessage', (
+    ('player_id', 'I'),
+    ('subject_id', 'I'),
+    ('sequence', 'H'),
+)))
+
+def timestamp_ms() -> int:
+    """الطابع الزمني بالميلي ثانية (مقتطع إلى 32 بت)"""
+    return int(time.time() * 1000) & 0xFFFFFFFF
+
+def get_schema(packet_type: int) -> Optional[PacketSchema]:
+    """الحصول على مخطط نوع حزمة"""
+    return SCHEMAS.get(int(packet_type))
+
+def make_message(packet_type: int, **fields) -> tuple:
+    """إنشاء رسالة من نوع معين"""
+    return SCHEMAS[int(packet_type)].make(**fields)
+
+def encode_message(message, packet_type: Optional[int] = None) -> bytes:
+    """ترميز رسالة مع الرأس"""
+    if packet_type is None:
+        packet_type = message.packet_type
+    schema = SCHEMAS[int(packet_type)]
+    payload = schema.encode(message)
+
+    if len(payload) > MAX_PAYLOAD_SIZE:
+        raise ValueError(f"Payload too large: {len(payload)} bytes")
+
+    return HEADER_STRUCT.pack(PROTOCOL_VERSION, schema.packet_type, len(payload)) + payload
+
+def decode_message(data, offset: int = 0) -> Tuple[Optional[int], Optional[tuple], int]:
+    """فك رسالة واحدة: (النوع، الرسالة، الإزاحة التالية)"""
+    if len(data) - offset < HEADER_SIZE:
+        return None, None, len(data)
+
+    version, packet_type, length = HEADER_STRUCT.unpack_from(data, offset)
+    start = offset + HEADER_SIZE
+    end = start + length
+
+    if version != PROTOCOL_VERSION or end > len(data):
+        # حزمة غير صالحة أو من نسخة أخرى - تجاهل باقي البيانات
+        return None, None, len(data)
+
+    schema = SCHEMAS.get(packet_type)
+    if schema is None:
+        return packet_type, None, end
+
+    return packet_type, schema.decode(memoryview(data)[start:end]), end
+
+def iter_messages(data) -> Iterator[Tuple[int, tuple]]:
+    """المرور على كل الرسائل المتتالية في حزمة واحدة"""
+    offset = 0
+    while offset < len(data):
+        packet_type, message, offset = decode_message(data, offset)
+        if message is not None:
+            yield packet_type, message
+
+def wire_size(packet_type: int, tail_length: int = 0) -> int:
+    """حجم الحزمة على الشبكة مع الرأس"""
+    return HEADER_SIZE + SCHEMAS[int(packet_type)].size + tail_length
+
+def _random_message(schema: PacketSchema, rng: random.Random) -> tuple:
+    """إنشاء رسالة عشوائية (لاختبار الترميز)"""
+    limits = {'B': 0xFF, 'H': 0xFFFF, 'I': 0xFFFFFFFF}
+    fields = {}
+    for field_name, fmt in schema.fields:
+        values = []
+        for code in fmt:
+            if code == 'f':
+                # قيم قابلة للتمثيل بدقة float32
+                values.append(struct.unpack('<f', struct.pack('<f', rng.uniform(-5000, 5000)))[0])
+            else:
+                values.append(rng.randint(0, limits[code]))
+        fields[field_name] = values[0] if len(fmt) == 1 else tuple(values)
+    if schema.tail and schema.binary_tail:
+        fields[schema.tail] = bytes(rng.randint(0, 255) for _ in range(rng.randint(0, 64)))
+    elif schema.tail:
+        fields[schema.tail] = ''.join(chr(rng.choice((rng.randint(32, 126), rng.randint(0x600, 0x6FF))))
+                                      for _ in range(rng.randint(0, 200)))
+    return schema.make(**fields)
+
+def check_round_trip(iterations: int = 2000, seed: int = 1) -> int:
+    """اختبار الترميز وفكه لكل المخططات بقيم عشوائية"""
+    rng = random.Random(seed)
+    checked = 0
+    for _ in range(iterations):
+        schema = rng.choice(list(SCHEMAS.values()))
+        message = _random_message(schema, rng)
+
+        data = encode_message(message, schema.packet_type)
+        packet_type, decoded, end = decode_message(data)
+        assert packet_type == schema.packet_type
+        assert decoded == message, (message, decoded)
+        assert end == len(data)
+
+        # عدة رسائل متتالية في حزمة واحدة
+        joined = data + data
+        assert [m for _, m in iter_messages(joined)] == [message, message]
+
+        # حزمة مقطوعة لا تفك
+        assert decode_message(data[:-1])[1] is None
+        checked += 1
+    return checked
+
+def benchmark_bandwidth(players: int = 16, sync_rate: int = 20) -> dict:
+    """مقارنة البايتات في الثانية بين التنسيق القديم والجديد"""
+    per_second = players * sync_rate
+    results = {'players': players, 'sync_rate': sync_rate, 'types': {}}
+
+    for packet_type in (PacketType.POSITION, PacketType.PING, PacketType.SYNC, PacketType.DISCONNECT):
+        new_size = wire_size(packet_type)
+        results['types'][packet_type.name] = {
+            'legacy_bytes': PACKET_SIZE,
+            'new_bytes': new_size,
+            'legacy_bytes_per_sec': PACKET_SIZE * per_second,
+            'new_bytes_per_sec': new_size * per_second,
+        }
+
+    # سرعة الترميز والفك
+    message = make_message(PacketType.POSITION, player_id=1, timestamp=0,
+                           position=(1.0, 2.0, 3.0), rotation=(0.0, 0.0, 0.0),
+                           velocity=(0.0, 0.0, 0.0), animation=0, health=100,
+                           armor=0, weapon=0)
+    count = 20000
+    start_time = time.perf_counter()
+    for _ in range(count):
+        decode_message(encode_message(message, PacketType.POSITION))
+    results['round_trips_per_sec'] = count / (time.perf_counter() - start_time)
+    return results
+
+# اختبار النظام
+if __name__ == "__main__":
+    print(f"Protocol v{PROTOCOL_VERSION}, header {HEADER_SIZE} bytes")
+
+    checked = check_round_trip()
+    print(f"✅ Round trip OK ({checked} random messages)")
+
+    results = benchmark_bandwidth()
+    print(f"Bandwidth @ {results['players']} players x {results['sync_rate']} Hz:")
+    for name, info in results['types'].items():
+        print(f"  {name:<10} {info['legacy_bytes']:>3} -> {info['new_bytes']:>3} bytes "
+              f"({info['legacy_bytes_per_sec']:,} -> {info['new_bytes_per_sec']:,} B/s)")
+    print(f"Encode+decode: {results['round_trips_per_sec']:,.0f} messages/sec")
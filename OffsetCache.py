@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import struct
+import time
+from typing import Dict, Optional, Tuple
+
+# توقيعات الكود التي تصل للمتغيرات العامة: (توقيع IDA، موضع العنوان داخل التعليمة)
+# العنوان المطلق - قاعدة الوحدة = الأوفست في MEMORY_OFFSETS
+OFFSET_SIGNATURES = {
+    'player_ped_ptr': ("8B 0D ?? ?? ?? ?? 85 C9 74 ?? 8B 01", 2),   # mov ecx,[p]; test ecx,ecx
+    'entity_list': ("B9 ?? ?? ?? ?? E8 ?? ?? ?? ?? 84 C0 74", 1),   # mov ecx,list; call; test al,al
+    'camera_ptr': ("A1 ?? ?? ?? ?? 83 F8 FF 75 ?? E8", 1),          # mov eax,[p]; cmp eax,-1
+    'world_ptr': ("8B 15 ?? ?? ?? ?? 8B 42 ?? 85 C0", 2),           # mov edx,[p]; mov eax,[edx+n]
+    'game_state': ("83 3D ?? ?? ?? ?? 09 75", 2),                    # cmp dword [p],9
+}
+
+# أوفست مشتقة من أوفست محلولة
+DERIVED_OFFSETS = {
+    'peds_array': ('entity_list', 0x0),
+    'vehicles_array': ('entity_list', 0x4),
+    'objects_array': ('entity_list', 0x10),
+}
+
+DEFAULT_CACHE_FILE = "offset_cache.json"
+
+def signature_table_digest() -> str:
+    """بصمة جدول التوقيعات: تغييره يبطل كل الإدخالات المخزنة"""
+    table = json.dumps([OFFSET_SIGNATURES, DERIVED_OFFSETS], sort_keys=True)
+    return hashlib.sha256(table.encode()).hexdigest()[:16]
+
+def pe_header_key(header: bytes) -> Optional[str]:
+    """مفتاح من ترويسة PE في الذاكرة: TimeDateStamp + SizeOfImage"""
+    if len(header) < 0x40 or header[:2] != b'MZ':
+        return None
+    pe_offset = struct.unpack_from('<I', header, 0x3C)[0]
+    if pe_offset + 0x54 > len(header) or header[pe_offset:pe_offset + 4] != b'PE\0\0':
+        return None
+    timestamp = struct.unpack_from('<I', header, pe_offset + 8)[0]
+    size_of_image = struct.unpack_from('<I', header, pe_offset + 24 + 56)[0]
+    return f"pe:{timestamp:08x}:{size_of_image:x}"
+
+def plant_signatures(image: bytearray, base_address: int, offsets: Dict[str, int], start: int = 0x3000):
+    """كتابة تعليمات تطابق OFFSET_SIGNATURES في صورة اصطناعية"""
+    position = start
+    for name, (signature, operand) in OFFSET_SIGNATURES.items():
+        if name not in offsets:
+            continue
+        code = bytes(int(token, 16) if '?' not in token else 0x10 for token in signature.split())
+        image[position:position + len(code)] = code
+        struct.pack_into('<I', image, position + operand, base_address + offsets[name])
+        position += 0x40
+
+class OffsetCache:
+    """أوفست محلولة على القرص، مفتاحها SHA-256 لملف اللعبة (أو ترويسة PE)"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_FILE):
+        self.path = path
+        self.data = {'entries': {}, 'files': {}}
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data.get('entries'), dict) and isinstance(data.get('files'), dict):
+                self.data = data
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        # كتابة ذرية: ملف مؤقت ثم استبدال
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(temp_path, self.path)
+
+    def executable_key(self, path: Optional[str], header: bytes = b'') -> Optional[str]:
+        """SHA-256 للملف (يُعاد حسابه فقط عند تغير الحجم أو وقت التعديل)"""
+        if path and os.path.isfile(path):
+            stat = os.stat(path)
+            known = self.data['files'].get(path)
+            if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+                return known['key']
+
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(block)
+            key = f"sha256:{digest.hexdigest()}"
+            self.data['files'][path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'key': key}
+            return key
+        return pe_header_key(header)
+
+    def get(self, key: Optional[str]) -> Optional[Dict[str, int]]:
+        entry = self.data['entries'].get(key) if key else None
+        if entry is None or entry.get('signatures') != signature_table_digest():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {name: int(value, 16) for name, value in entry['offsets'].items()}
+
+    def put(self, key: Optional[str], offsets: Dict[str, int], missing=()):
+        if not key:
+            return
+        self.data['entries'][key] = {
+            'signatures': signature_table_digest(),
+            'offsets': {name: f"0x{value:08X}" for name, value in offsets.items()},
+            'missing': sorted(missing),
+            'resolved_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        self.save()
+
+def resolve_offsets(memory, base_address: int) -> Tuple[Dict[str, int], list]:
+    """مسح كامل بالتوقيعات: (الأوفست المحلولة، أسماء غير الموجودة)"""
+    signatures = {name: signature for name, (signature, _) in OFFSET_SIGNATURES.items()}
+    found = memory.scan_for_patterns(list(signatures.values()))
+
+    offsets = {}
+    missing = []
+    for name, (signature, operand) in OFFSET_SIGNATURES.items():
+        addresses = found.get(signature, [])
+        values = {memory.read_int(address + operand) - base_address for address in addresses}
+        if len(values) != 1:
+            # غير موجود أو غامض: تبقى القيمة الافتراضية
+            missing.append(name)
+            continue
+        offsets[name] = values.pop()
+
+    for name, (source, delta) in DERIVED_OFFSETS.items():
+        if source in offsets:
+            offsets[name] = offsets[source] + delta
+    return offsets, missing
+
+# اختبار النظام
+if __name__ == "__main__":
+    import tempfile
+    directory = tempfile.mkdtemp()
+    cache = OffsetCache(os.path.join(directory, DEFAULT_CACHE_FILE))
+
+    executable = os.path.join(directory, "gta-vc.exe")
+    with open(executable, 'wb') as f:
+        f.write(b'MZ' + bytes(1024))
+    key = cache.executable_key(executable)
+    assert cache.get(key) is None
+    cache.put(key, {'player_ped_ptr': 0xB7CD98})
+
+    # نسخة جديدة من الكائن تقرأ من القرص بدون إعادة حساب البصمة
+    cache = OffsetCache(cache.path)
+    assert cache.executable_key(executable) == key
+    assert cache.get(key) == {'player_ped_ptr': 0xB7CD98}
+
+    # تغيير الملف يبطل الإدخال
+    time.sleep(0.01)
+    with open(executable, 'ab') as f:
+        f.write(b'patch')
+    assert cache.executable_key(executable) != key
+    assert cache.get(cache.executable_key(executable)) is None
+
+    header = bytearray(0x200)
+    header[:2] = b'MZ'
+    struct.pack_into('<I', header, 0x3C, 0x80)
+    header[0x80:0x84] = b'PE\0\0'
+    struct.pack_into('<I', header, 0x88, 0x3C9A2B00)
+    struct.pack_into('<I', header, 0x80 + 24 + 56, 0x00A6D000)
+    assert cache.executable_key(None, bytes(header)) == "pe:3c9a2b00:a6d000"
+    print(f"✓ Offset cache OK (hits {cache.hits}, misses {cache.misses})")
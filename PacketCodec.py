@@ -0,0 +1,330 @@
+import struct
+import sys
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Iterable, Optional, Tuple
+
+# محاولة استيراد numpy (اختياري)
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# تنسيق الحزمة على الشبكة (نفس تنسيق NetworkPacket.to_bytes)
+PACKET_FORMAT = '<B I fff fff fff H B B B I'
+
+# هيكل مترجم مسبقاً - لا يعاد تحليل التنسيق مع كل حزمة
+PACKET_STRUCT = struct.Struct(PACKET_FORMAT)
+PACKET_SIZE = PACKET_STRUCT.size
+
+if NUMPY_AVAILABLE:
+    # نوع بيانات مطابق للتنسيق (بدون حشو)
+    PACKET_DTYPE = np.dtype([
+        ('packet_type', 'u1'),
+        ('player_id', '<u4'),
+        ('position', '<f4', (3,)),
+        ('rotation', '<f4', (3,)),
+        ('velocity', '<f4', (3,)),
+        ('animation', '<u2'),
+        ('health', 'u1'),
+        ('armor', 'u1'),
+        ('weapon', 'u1'),
+        ('timestamp', '<u4'),
+    ])
+else:
+    PACKET_DTYPE = None
+
+# مواقع الأعمدة داخل الحزمة: (الاسم، نوع array، الإزاحة، الحجم)
+_COLUMN_LAYOUT = (
+    ('packet_type', 'B', 0, 1),
+    ('player_id', 'I', 1, 4),
+    ('position', 'f', 5, 12),
+    ('rotation', 'f', 17, 12),
+    ('velocity', 'f', 29, 12),
+    ('animation', 'H', 41, 2),
+    ('health', 'B', 43, 1),
+    ('armor', 'B', 44, 1),
+    ('weapon', 'B', 45, 1),
+    ('timestamp', 'I', 46, 4),
+)
+
+# التنسيق على الشبكة little-endian
+_NEEDS_BYTESWAP = sys.byteorder != 'little'
+
+
+def packet_fields(packet) -> tuple:
+    """تحويل كائن حزمة إلى قيم مسطحة بترتيب التنسيق"""
+    position = packet.position
+    rotation = packet.rotation
+    velocity = packet.velocity
+    return (
+        packet.packet_type,
+        packet.player_id,
+        position[0], position[1], position[2],
+        rotation[0], rotation[1], rotation[2],
+        velocity[0], velocity[1], velocity[2],
+        packet.animation,
+        packet.health,
+        packet.armor,
+        packet.weapon,
+        packet.timestamp
+    )
+
+
+def encode_packet(packet) -> bytes:
+    """ترميز حزمة واحدة"""
+    return PACKET_STRUCT.pack(*packet_fields(packet))
+
+
+def decode_fields(data, offset: int = 0) -> Optional[tuple]:
+    """فك حزمة واحدة إلى قيم مسطحة بدون نسخ"""
+    if len(data) - offset < PACKET_SIZE:
+        return None
+    return PACKET_STRUCT.unpack_from(data, offset)
+
+
+class PacketBatchEncoder:
+    """ترميز عدة حزم في مخزن واحد باستخدام pack_into"""
+
+    def __init__(self, capacity: int = 64):
+        self.buffer = bytearray(capacity * PACKET_SIZE)
+        self.count = 0
+
+    def _reserve(self) -> int:
+        """حجز مكان للحزمة التالية مع توسيع المخزن عند الحاجة"""
+        offset = self.count * PACKET_SIZE
+        if offset + PACKET_SIZE > len(self.buffer):
+            self.buffer.extend(bytes(len(self.buffer) or PACKET_SIZE))
+        self.count += 1
+        return offset
+
+    def add(self, packet_type: int, player_id: int,
+            position: Tuple[float, float, float],
+            rotation: Tuple[float, float, float],
+            velocity: Tuple[float, float, float],
+            animation: int = 0, health: int = 100, armor: int = 0,
+            weapon: int = 0, timestamp: int = 0):
+        """إضافة حزمة من قيم مباشرة"""
+        PACKET_STRUCT.pack_into(
+            self.buffer, self._reserve(),
+            packet_type, player_id,
+            position[0], position[1], position[2],
+            rotation[0], rotation[1], rotation[2],
+            velocity[0], velocity[1], velocity[2],
+            animation, health, armor, weapon, timestamp
+        )
+
+    def add_packet(self, packet):
+        """إضافة كائن NetworkPacket"""
+        PACKET_STRUCT.pack_into(self.buffer, self._reserve(), *packet_fields(packet))
+
+    def getbuffer(self) -> memoryview:
+        """الحصول على البيانات المرمزة بدون نسخ"""
+        return memoryview(self.buffer)[:self.count * PACKET_SIZE]
+
+    def getvalue(self) -> bytes:
+        """الحصول على نسخة من البيانات المرمزة"""
+        return bytes(self.getbuffer())
+
+    def reset(self):
+        """إعادة الاستخدام بدون إعادة تخصيص المخزن"""
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+
+class PacketBatch:
+    """دفعة حزم مفكوكة بشكل عمودي (أعمدة array أو NumPy)"""
+
+    def __init__(self, count: int, columns: dict, records=None):
+        self.count = count
+        self.records = records
+        self.packet_type = columns['packet_type']
+        self.player_id = columns['player_id']
+        self.position = columns['position']
+        self.rotation = columns['rotation']
+        self.velocity = columns['velocity']
+        self.animation = columns['animation']
+        self.health = columns['health']
+        self.armor = columns['armor']
+        self.weapon = columns['weapon']
+        self.timestamp = columns['timestamp']
+
+    def __len__(self):
+        return self.count
+
+    def _vector(self, column, index: int) -> Tuple[float, float, float]:
+        """قراءة متجه ثلاثي من عمود"""
+        if self.records is not None:
+            x, y, z = column[index]
+            return (float(x), float(y), float(z))
+        base = index * 3
+        return (column[base], column[base + 1], column[base + 2])
+
+    def position_of(self, index: int) -> Tuple[float, float, float]:
+        return self._vector(self.position, index)
+
+    def rotation_of(self, index: int) -> Tuple[float, float, float]:
+        return self._vector(self.rotation, index)
+
+    def velocity_of(self, index: int) -> Tuple[float, float, float]:
+        return self._vector(self.velocity, index)
+
+    def row(self, index: int) -> tuple:
+        """الحصول على حزمة واحدة كقيم مسطحة"""
+        return (
+            int(self.packet_type[index]),
+            int(self.player_id[index]),
+            *self.position_of(index),
+            *self.rotation_of(index),
+            *self.velocity_of(index),
+            int(self.animation[index]),
+            int(self.health[index]),
+            int(self.armor[index]),
+            int(self.weapon[index]),
+            int(self.timestamp[index])
+        )
+
+
+def _decode_batch_numpy(view: memoryview, count: int) -> PacketBatch:
+    """فك الدفعة باستخدام NumPy (بدون نسخ)"""
+    records = np.frombuffer(view, dtype=PACKET_DTYPE, count=count)
+    columns = {name: records[name] for name in PACKET_DTYPE.names}
+    return PacketBatch(count, columns, records=records)
+
+
+def _gather_column(view: memoryview, count: int, offset: int, size: int) -> bytearray:
+    """تجميع بايتات حقل واحد من كل الحزم عبر شرائح متباعدة (بدون حلقة لكل حزمة)"""
+    column = bytearray(count * size)
+    for k in range(size):
+        column[k::size] = view[offset + k::PACKET_SIZE]
+    return column
+
+
+def _decode_batch_array(view: memoryview, count: int) -> PacketBatch:
+    """فك الدفعة باستخدام أعمدة array"""
+    columns = {}
+    for name, typecode, offset, size in _COLUMN_LAYOUT:
+        column = array(typecode)
+        column.frombytes(_gather_column(view, count, offset, size))
+        if _NEEDS_BYTESWAP and column.itemsize > 1:
+            column.byteswap()
+        columns[name] = column
+    return PacketBatch(count, columns)
+
+
+def iter_packets(data):
+    """المرور على الحزم المتتالية كقيم مسطحة باستخدام iter_unpack"""
+    view = memoryview(data).cast('B')
+    count = len(view) // PACKET_SIZE
+    return PACKET_STRUCT.iter_unpack(view[:count * PACKET_SIZE])
+
+
+def decode_batch(data, use_numpy: bool = True) -> PacketBatch:
+    """فك مخزن يحتوي على حزم متتالية إلى دفعة عمودية"""
+    view = memoryview(data).cast('B')
+    count = len(view) // PACKET_SIZE
+    # تجاهل أي بايتات زائدة في نهاية المخزن
+    view = view[:count * PACKET_SIZE]
+
+    if use_numpy and NUMPY_AVAILABLE:
+        return _decode_batch_numpy(view, count)
+    return _decode_batch_array(view, count)
+
+
+def encode_batch(packets: Iterable) -> bytes:
+    """ترميز مجموعة حزم في مخزن واحد"""
+    encoder = PacketBatchEncoder()
+    for packet in packets:
+        encoder.add_packet(packet)
+    return encoder.getvalue()
+
+
+@dataclass
+class _LegacyPacket:
+    """نموذج لكائن NetworkPacket القديم (لاختبار الأداء فقط)"""
+    packet_type: int
+    player_id: int
+    position: tuple
+    rotation: tuple
+    velocity: tuple
+    animation: int
+    health: int
+    armor: int
+    weapon: int
+    timestamp: int
+
+
+def benchmark_codec(count: int = 20000) -> dict:
+    """مقارنة سرعة الترميز القديم مع الترميز المترجم مسبقاً"""
+    sample = (
+        0x03, 1234,
+        100.0, 200.0, 10.0,
+        0.0, 0.0, 90.0,
+        1.0, 0.5, 0.0,
+        3, 100, 50, 2, 123456
+    )
+    results = {'packets': count, 'numpy': NUMPY_AVAILABLE}
+
+    # الطريقة القديمة: تحليل التنسيق مع كل حزمة + calcsize + كائن لكل حزمة
+    start_time = time.perf_counter()
+    encoded = []
+    for _ in range(count):
+        encoded.append(struct.pack(PACKET_FORMAT, *sample))
+    for data in encoded:
+        size = struct.calcsize(PACKET_FORMAT)
+        unpacked = struct.unpack(PACKET_FORMAT, data[:size])
+        _LegacyPacket(
+            unpacked[0], unpacked[1],
+            (unpacked[2], unpacked[3], unpacked[4]),
+            (unpacked[5], unpacked[6], unpacked[7]),
+            (unpacked[8], unpacked[9], unpacked[10]),
+            unpacked[11], unpacked[12], unpacked[13], unpacked[14], unpacked[15]
+        )
+    legacy_time = time.perf_counter() - start_time
+
+    # الطريقة الجديدة: pack_into في مخزن واحد + فك عمودي
+    start_time = time.perf_counter()
+    encoder = PacketBatchEncoder(capacity=count)
+    pack_into = PACKET_STRUCT.pack_into
+    buffer = encoder.buffer
+    for i in range(count):
+        pack_into(buffer, i * PACKET_SIZE, *sample)
+    encoder.count = count
+    batch = decode_batch(encoder.getbuffer())
+    batched_time = time.perf_counter() - start_time
+
+    assert len(batch) == count
+    assert batch.row(count - 1) == PACKET_STRUCT.unpack(PACKET_STRUCT.pack(*sample))
+
+    results['legacy_packets_per_sec'] = count / legacy_time
+    results['batched_packets_per_sec'] = count / batched_time
+    results['speedup'] = legacy_time / batched_time
+    return results
+
+
+# اختبار النظام
+if __name__ == "__main__":
+    print(f"Packet size: {PACKET_SIZE} bytes (NumPy: {NUMPY_AVAILABLE})")
+
+    for use_numpy in (False, True):
+        if use_numpy and not NUMPY_AVAILABLE:
+            continue
+        encoder = PacketBatchEncoder(capacity=2)
+        encoder.add(0x03, 1, (1.0, 2.0, 3.0), (0.0, 0.0, 90.0), (0.5, 0.0, 0.0), timestamp=42)
+        encoder.add(0x03, 2, (4.0, 5.0, 6.0), (0.0, 0.0, 45.0), (0.0, 0.0, 0.0), timestamp=43)
+        encoder.add(0x08, 3, (0, 0, 0), (0, 0, 0), (0, 0, 0), timestamp=44)
+        batch = decode_batch(encoder.getbuffer(), use_numpy=use_numpy)
+        assert len(batch) == 3
+        assert batch.position_of(1) == (4.0, 5.0, 6.0)
+        assert int(batch.player_id[2]) == 3
+        assert batch.row(0) == decode_fields(encoder.getbuffer())
+        print(f"✅ Round trip OK ({'numpy' if use_numpy else 'array'})")
+
+    results = benchmark_codec()
+    print(f"Legacy:  {results['legacy_packets_per_sec']:,.0f} packets/sec")
+    print(f"Batched: {results['batched_packets_per_sec']:,.0f} packets/sec")
+    print(f"Speedup: {results['speedup']:.1f}x")
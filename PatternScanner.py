@@ -0,0 +1,259 @@
+import os
+import random
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+# المناطق الأكبر من هذا تُقسم على عدة عمليات
+PARALLEL_THRESHOLD = 8 * 1024 * 1024
+
+class Signature:
+    """توقيع مترجم: نمط بايتات + قناع بأسلوب IDA (x = مطابق، ? = أي بايت)"""
+    __slots__ = ('name', 'pattern', 'mask', 'regex', 'anchor', 'anchor_offset', 'checks')
+
+    def __init__(self, pattern: bytes, mask: str, name: Optional[str] = None):
+        if len(mask) != len(pattern):
+            raise ValueError(f"Mask length {len(mask)} does not match pattern length {len(pattern)}")
+        if 'x' not in mask:
+            raise ValueError("Signature has no fixed bytes")
+        self.name = name or pattern.hex()
+        self.pattern = bytes(pattern)
+        self.mask = mask
+        self.regex = b''.join(re.escape(bytes([byte])) if m == 'x' else b'.'
+                              for byte, m in zip(pattern, mask))
+
+        # أطول سلسلة ثابتة: تُبحث بـ bytes.find (بحث سريع في C) ثم يُتحقق من الباقي
+        best_start, best_length, start = 0, 0, None
+        for i, m in enumerate(mask + '?'):
+            if m == 'x' and start is None:
+                start = i
+            elif m != 'x' and start is not None:
+                if i - start > best_length:
+                    best_start, best_length = start, i - start
+                start = None
+        self.anchor = self.pattern[best_start:best_start + best_length]
+        self.anchor_offset = best_start
+        self.checks = [(i, byte) for i, (byte, m) in enumerate(zip(pattern, mask))
+                       if m == 'x' and not best_start <= i < best_start + best_length]
+
+    def __len__(self) -> int:
+        return len(self.pattern)
+
+    def matches_at(self, data, position: int) -> bool:
+        if position < 0 or position + len(self.pattern) > len(data):
+            return False
+        return all(data[position + i] == byte for i, byte in self.checks) and \
+            data[position + self.anchor_offset:position + self.anchor_offset + len(self.anchor)] == self.anchor
+
+    def find_all(self, data, limit: Optional[int] = None) -> List[int]:
+        """كل مواضع التوقيع (متداخلة أيضاً) التي تبدأ قبل limit"""
+        end = len(data) - len(self.pattern)
+        if limit is not None:
+            end = min(end, limit - 1)
+        anchor, offset, checks = self.anchor, self.anchor_offset, self.checks
+        found = []
+        position = data.find(anchor, offset)
+        while position != -1:
+            start = position - offset
+            if start > end:
+                break
+            if all(data[start + i] == byte for i, byte in checks):
+                found.append(start)
+            position = data.find(anchor, position + 1)
+        return found
+
+def parse_ida_signature(signature: str) -> Tuple[bytes, str]:
+    """تحويل "8B 0D ?? ?? ?? ?? 85" إلى (نمط، قناع)"""
+    pattern = bytearray()
+    mask = []
+    for token in signature.split():
+        if token.strip('?') == '':
+            pattern.append(0)
+            mask.append('?')
+        else:
+            pattern.append(int(token, 16))
+            mask.append('x')
+    return bytes(pattern), ''.join(mask)
+
+def compile_signatures(signatures) -> List[Signature]:
+    """قبول Signature أو (نمط، قناع) أو نص IDA"""
+    compiled = []
+    for signature in signatures:
+        if isinstance(signature, Signature):
+            compiled.append(signature)
+        elif isinstance(signature, str):
+            compiled.append(Signature(*parse_ida_signature(signature), name=signature))
+        else:
+            compiled.append(Signature(*signature))
+    return compiled
+
+class MultiScanner:
+    """مسح عدة توقيعات في مرور واحد عبر تعبير re مجمع"""
+
+    def __init__(self, signatures):
+        self.signatures = compile_signatures(signatures)
+        # البحث الأمامي (?=...) يسمح بالتطابقات المتداخلة
+        alternatives = b'|'.join(b'(' + signature.regex + b')' for signature in self.signatures)
+        self.regex = re.compile(b'(?=' + alternatives + b')', re.DOTALL)
+
+    def scan(self, data, limit: Optional[int] = None) -> Dict[str, List[int]]:
+        """المواضع لكل توقيع (المواضع قبل limit فقط)"""
+        results = {signature.name: [] for signature in self.signatures}
+        signatures = self.signatures
+        end = len(data) if limit is None else limit
+        for match in self.regex.finditer(data, 0, len(data)):
+            position = match.start()
+            if position >= end:
+                break
+            first = match.lastindex - 1
+            results[signatures[first].name].append(position)
+            # البدائل تتوقف عند أول تطابق: التوقيعات التالية تُفحص مباشرة
+            for signature in signatures[first + 1:]:
+                if signature.matches_at(data, position):
+                    results[signature.name].append(position)
+        return results
+
+def _scan_chunk(arguments):
+    """عامل: مسح جزء من البيانات (الجزء يتضمن تداخلاً بطول أطول توقيع)"""
+    signatures, data, own_length, method = arguments
+    if method == 'regex' and len(signatures) > 1:
+        return MultiScanner(signatures).scan(data, own_length)
+    return {signature.name: signature.find_all(data, own_length) for signature in signatures}
+
+def scan(data, signatures, base_address: int = 0, workers: Optional[int] = None,
+         parallel_threshold: int = PARALLEL_THRESHOLD, method: str = 'anchor') -> Dict[str, List[int]]:
+    """مسح منطقة مقروءة مرة واحدة وإرجاع العناوين لكل توقيع
+
+    anchor: أطول سلسلة ثابتة لكل توقيع بـ bytes.find ثم تحقق (الأسرع في CPython).
+    regex: مرور واحد بتعبير مجمع لكل التوقيعات.
+    المناطق الكبيرة تُقسم بتداخل على مجمع عمليات.
+    """
+    signatures = compile_signatures(signatures)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers > 1 and len(data) > parallel_threshold:
+        overlap = max(len(signature) for signature in signatures) - 1
+        chunk_size = -(-len(data) // workers)
+        view = memoryview(data)
+        starts = range(0, len(data), chunk_size)
+        jobs = [(signatures, bytes(view[start:start + chunk_size + overlap]),
+                 min(chunk_size, len(data) - start), method) for start in starts]
+        results = {signature.name: [] for signature in signatures}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for start, partial in zip(starts, pool.map(_scan_chunk, jobs)):
+                for name, positions in partial.items():
+                    results[name].extend(start + position for position in positions)
+    else:
+        results = _scan_chunk((signatures, data, len(data), method))
+
+    return {name: [base_address + position for position in positions]
+            for name, positions in results.items()}
+
+def find_pattern(data, pattern: bytes, mask: str, base_address: int = 0, **options) -> List[int]:
+    """عناوين توقيع واحد (بديل المسح البسيط في scan_for_pattern)"""
+    signature = Signature(pattern, mask)
+    return scan(data, [signature], base_address, **options)[signature.name]
+
+def _naive_scan(data, pattern: bytes, mask: str) -> List[int]:
+    """المسح القديم (مع إصلاح القراءة بعد نهاية المخزن) - للمقارنة فقط"""
+    found = []
+    for pos in range(len(data) - len(pattern) + 1):
+        match = True
+        for i, (p, m) in enumerate(zip(pattern, mask)):
+            if m == 'x' and data[pos + i] != p:
+                match = False
+                break
+        if match:
+            found.append(pos)
+    return found
+
+def synthetic_code_image(size: int = 16 * 1024 * 1024, seed: int = 5) -> bytearray:
+    """صورة بحجم size ببايتات شبيهة بكود x86 (بايتات شائعة أكثر تكراراً)"""
+    rng = random.Random(seed)
+    common = bytes([0x00, 0x8B, 0x89, 0xFF, 0xE8, 0x83, 0x0F, 0x85, 0xC3, 0x90, 0x55, 0x50])
+    block = bytearray(rng.randbytes(64 * 1024))
+    for i in range(0, len(block), 3):
+        block[i] = common[block[i] % len(common)]
+    image = bytearray()
+    while len(image) < size:
+        image += block
+        block = block[7:] + block[:7]  # كتل غير متطابقة تماماً
+    return image[:size]
+
+BENCHMARK_SIGNATURES = [
+    "8B 0D ?? ?? ?? ?? 85 C9 74 ?? 8B 01",
+    "55 8B EC 83 E4 F8 81 EC ?? ?? ?? ??",
+    "A1 ?? ?? ?? ?? 83 F8 FF 75 ?? E8",
+    "C7 05 ?? ?? ?? ?? 00 00 80 3F",
+    "D9 05 ?? ?? ?? ?? D8 0D ?? ?? ?? ?? D9 5C 24",
+    "0F B6 05 ?? ?? ?? ?? 84 C0 75",
+]
+
+def benchmark_scanner(size: int = 16 * 1024 * 1024, naive_sample: int = 256 * 1024) -> dict:
+    """مقارنة المسح البسيط مع المحرك على صورة اصطناعية"""
+    image = synthetic_code_image(size)
+    signatures = compile_signatures(BENCHMARK_SIGNATURES)
+    # زرع كل توقيع في مواضع معروفة
+    planted = {}
+    rng = random.Random(9)
+    for signature in signatures:
+        planted[signature.name] = sorted(rng.sample(range(0, size - 64, 64), 5))
+        for position in planted[signature.name]:
+            filler = rng.randbytes(len(signature))
+            image[position:position + len(signature)] = bytes(
+                byte if m == 'x' else other for byte, m, other in zip(signature.pattern, signature.mask, filler))
+    data = bytes(image)
+    results = {'size_mb': size / (1024 * 1024)}
+
+    # المسح القديم: على عينة ثم تقدير الكامل
+    first = signatures[0]
+    start_time = time.perf_counter()
+    _naive_scan(data[:naive_sample], first.pattern, first.mask)
+    results['naive_one_s'] = (time.perf_counter() - start_time) * size / naive_sample
+
+    start_time = time.perf_counter()
+    found = scan(data, [first], workers=1)
+    results['anchor_one_s'] = time.perf_counter() - start_time
+    assert set(planted[first.name]) <= set(found[first.name])
+
+    start_time = time.perf_counter()
+    found = scan(data, signatures, workers=1)
+    results['anchor_all_s'] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    combined = scan(data, signatures, workers=1, method='regex')
+    results['regex_pass_s'] = time.perf_counter() - start_time
+    assert combined == found
+
+    workers = max(2, os.cpu_count() or 1)
+    start_time = time.perf_counter()
+    parallel = scan(data, signatures, workers=workers, parallel_threshold=0)
+    results['parallel_s'] = time.perf_counter() - start_time
+    results['workers'] = workers
+    results['cpus'] = os.cpu_count()
+
+    assert parallel == found
+    for name, positions in planted.items():
+        assert set(positions) <= set(found[name]), name
+    results['signatures'] = len(signatures)
+    return results
+
+# اختبار النظام
+if __name__ == "__main__":
+    data = b'\x90\x90\x90\x90\xE8\x00\x90\x90\x90\x90\xE8'
+    assert find_pattern(data, b'\x90\x90\x90\x90\xE8', 'xxxxx', 0x400000) == [0x400000, 0x400006]
+    # نمط في النهاية تماماً لا يقرأ بعد المخزن
+    assert find_pattern(data, b'\x90\xE8\x00', 'x?x') == [3]
+    assert find_pattern(data, b'\xE8\x00\x00', 'x??') == [4]
+    assert parse_ida_signature("8B ?? 0D ?") == (b'\x8B\x00\x0D\x00', 'x?x?')
+    assert scan(data, ["90 90", "90 ?? 90"]) == {"90 90": [0, 1, 2, 6, 7, 8], "90 ?? 90": [0, 1, 6, 7]}
+
+    results = benchmark_scanner()
+    print(f"{results['size_mb']:.0f} MB image, {results['signatures']} signatures:")
+    print(f"  naive loop (1 signature, estimated): {results['naive_one_s']:8.2f} s")
+    print(f"  anchor + verify (1 signature):       {results['anchor_one_s']:8.3f} s")
+    print(f"  anchor + verify (all signatures):    {results['anchor_all_s']:8.3f} s")
+    print(f"  combined regex (single pass):        {results['regex_pass_s']:8.3f} s")
+    print(f"  anchor, {results['workers']} processes ({results['cpus']} CPUs):    {results['parallel_s']:8.3f} s")
@@ -0,0 +1,259 @@
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+class PlayerRecord(NamedTuple):
+    """نسخة ثابتة من صف لاعب (للقراءة من خيوط الواجهة والشبكة)"""
+    player_id: int
+    row: int
+    address: Optional[tuple]
+    entity_addr: int
+    slot: int
+    position: Tuple[float, float, float]
+    rotation: Tuple[float, float, float]
+    velocity: Tuple[float, float, float]
+    last_update: float
+
+_ZERO = (0.0, 0.0, 0.0)
+_new_record = tuple.__new__
+
+class PlayerTable:
+    """جدول اللاعبين البعيدين: صف ثابت لكل لاعب يحمل PlayerRecord ثابتاً
+
+    التحديث يبني سجلاً جديداً ويضعه في نفس الصف باستبدال مرجع واحد (ذري تحت GIL)،
+    فالقراء يرون دائماً صفاً كاملاً بدون قفل ولا إعادة محاولة، واللقطة تجمع المراجع فقط
+    (أسرع بكثير من بناء السجلات من أعمدة array عند كل قراءة).
+    كاتب واحد (خيط الشبكة) يحدث الصفوف، والإضافة والحذف تحت قفل الكتابة.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.capacity = 0
+        self.records: List[Optional[PlayerRecord]] = []
+        self.index: Dict[int, int] = {}  # player_id -> صف
+        self.free: List[int] = []
+        self.version = 0  # يزيد مع كل إضافة أو حذف
+        self._write_lock = threading.Lock()
+        self._grow(capacity)
+
+    def _grow(self, capacity: int):
+        """توسيع الجدول (الصفوف الموجودة لا تتحرك)"""
+        self.records.extend([None] * (capacity - self.capacity))
+        # الصفوف الأصغر تُستخدم أولاً
+        self.free.extend(range(capacity - 1, self.capacity - 1, -1))
+        self.free.sort(reverse=True)
+        self.capacity = capacity
+
+    def add(self, player_id: int, address: Optional[tuple], position=(0.0, 0.0, 0.0),
+            rotation=(0.0, 0.0, 0.0), entity_addr: int = 0, slot: int = -1) -> int:
+        """إضافة لاعب (أو تحديث بياناته إن كان موجوداً) وإرجاع رقم صفه الثابت"""
+        with self._write_lock:
+            row = self.index.get(player_id)
+            if row is None:
+                if not self.free:
+                    self._grow(self.capacity * 2)
+                row = self.free.pop()
+
+            self.records[row] = PlayerRecord(player_id, row, address, entity_addr, slot,
+                                             tuple(position), tuple(rotation), _ZERO, time.time())
+            self.index[player_id] = row
+            self.version += 1
+            return row
+
+    def remove(self, player_id: int) -> Optional[PlayerRecord]:
+        """حذف لاعب وإرجاع آخر نسخة من صفه"""
+        with self._write_lock:
+            row = self.index.pop(player_id, None)
+            if row is None:
+                return None
+            record = self.records[row]
+            self.records[row] = None
+            self.free.append(row)
+            self.version += 1
+            return record
+
+    def update(self, player_id: int, position, rotation, velocity=None,
+               timestamp: Optional[float] = None) -> bool:
+        """تحديث موقع لاعب في صفه (سجل جديد يستبدل القديم دفعة واحدة)"""
+        row = self.index.get(player_id)
+        if row is None:
+            return False
+
+        records = self.records
+        record = records[row]
+        if record is None:
+            return False
+        # tuple() لا تنسخ tuple موجودة؛ إن فشل البناء يبقى السجل القديم كاملاً
+        records[row] = _new_record(PlayerRecord, (
+            player_id, row, record[2], record[3], record[4], tuple(position), tuple(rotation),
+            record[7] if velocity is None else tuple(velocity),
+            time.time() if timestamp is None else timestamp
+        ))
+        return True
+
+    def get(self, player_id: int) -> Optional[PlayerRecord]:
+        """قراءة صف لاعب بدون قفل (None إن لم يوجد)"""
+        row = self.index.get(player_id)
+        return None if row is None else self.records[row]
+
+    def snapshot(self) -> List[PlayerRecord]:
+        """نسخة متسقة لكل صف بدون قفل (كل سجل ثابت، فيكفي جمع المراجع)"""
+        records = self.records
+        snapshot = [records[row] for row in list(self.index.values())]
+        if None in snapshot:
+            # لاعب حُذف أثناء الجمع
+            snapshot = [record for record in snapshot if record is not None]
+        return snapshot
+
+    def address_of(self, player_id: int) -> Optional[tuple]:
+        record = self.get(player_id)
+        return None if record is None else record.address
+
+    def entity_of(self, player_id: int) -> int:
+        record = self.get(player_id)
+        return 0 if record is None else record.entity_addr
+
+    def recipients(self) -> Dict[tuple, int]:
+        """{العنوان: رقم اللاعب} لكل لاعب له عنوان"""
+        return {record.address: record.player_id for record in self.snapshot()
+                if record.address is not None}
+
+    def player_ids(self) -> List[int]:
+        return list(self.index)
+
+    def __contains__(self, player_id: int) -> bool:
+        return player_id in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+def _best_time(function, repeat: int = 5) -> float:
+    """أفضل زمن من عدة تشغيلات (الجهاز المشترك يضيف ضجيجاً كبيراً)"""
+    best = float('inf')
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start_time)
+    return best
+
+def benchmark_table(players: int = 1000, rounds: int = 20, update_rate: int = 20,
+                    render_rate: int = 60) -> dict:
+    """مقارنة القاموس القديم (dict of dicts) مع الجدول: الذاكرة وكلفة التحديث واللقطة
+
+    cpu_ms_per_sec: كل لاعب يُحدث update_rate مرة في الثانية، والرسم يقرأ الكل render_rate مرة.
+    """
+    results = {}
+    updates = [((float(i), float(i) * 2, 10.0), (0.0, 0.0, float(i % 360))) for i in range(players)]
+
+    # القاموس القديم
+    tracemalloc.start()
+    legacy = {}
+    for player_id in range(players):
+        legacy[player_id] = {
+            'slot': -1, 'entity_addr': 0, 'address': ('10.0.0.1', 10000 + player_id),
+            'last_update': time.time(),
+            'position': (float(player_id), 0.0, 0.0), 'rotation': (0.0, 0.0, 0.0)
+        }
+    legacy_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    def legacy_updates():
+        for _ in range(rounds):
+            for player_id in range(players):
+                position, rotation = updates[player_id]
+                # المسار القديم: الصفوف تأتي من فك الحزمة كـ tuple جديدة
+                info = legacy[player_id]
+                info['last_update'] = time.time()
+                info['position'] = tuple(position)
+                info['rotation'] = tuple(rotation)
+    legacy_update = _best_time(legacy_updates) / (rounds * players)
+
+    def legacy_listings():
+        for _ in range(rounds):
+            listing = [{'id': player_id, 'is_local': False, 'position': info.get('position', (0, 0, 0)),
+                        'last_update': info.get('last_update', 0)} for player_id, info in legacy.items()]
+        assert len(listing) == players
+    legacy_listing = _best_time(legacy_listings) / rounds
+
+    # الجدول
+    tracemalloc.start()
+    table = PlayerTable(capacity=64)
+    for player_id in range(players):
+        table.add(player_id, ('10.0.0.1', 10000 + player_id), (float(player_id), 0.0, 0.0))
+    table_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    def table_updates():
+        update = table.update
+        for _ in range(rounds):
+            for player_id in range(players):
+                position, rotation = updates[player_id]
+                update(player_id, position, rotation)
+    table_update = _best_time(table_updates) / (rounds * players)
+
+    def table_snapshots():
+        for _ in range(rounds):
+            records = table.snapshot()
+        assert len(records) == players and records[5].position == (5.0, 10.0, 10.0)
+    table_snapshot = _best_time(table_snapshots) / rounds
+
+    for name, memory, update, snapshot in (('legacy', legacy_memory, legacy_update, legacy_listing),
+                                           ('table', table_memory, table_update, table_snapshot)):
+        results[name] = {'memory': memory, 'update_us': update * 1e6, 'snapshot_ms': snapshot * 1000,
+                         'cpu_ms_per_sec': (players * update_rate * update + render_rate * snapshot) * 1000}
+    return results
+
+def _check_concurrent_reads(seconds: float = 1.0) -> int:
+    """قارئ في خيط آخر لا يرى صفاً نصف محدث"""
+    table = PlayerTable()
+    table.add(1, None, (0.0, 0.0, 0.0))
+    state = {'running': True, 'torn': 0, 'reads': 0}
+
+    def reader():
+        while state['running']:
+            record = table.get(1)
+            x, y, z = record.position
+            # الكاتب يكتب دائماً (n, n, n)
+            if not (x == y == z):
+                state['torn'] += 1
+            state['reads'] += 1
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    end = time.perf_counter() + seconds
+    value = 0.0
+    while time.perf_counter() < end:
+        value += 1.0
+        table.update(1, (value, value, value), (0.0, 0.0, 0.0))
+    state['running'] = False
+    thread.join()
+    assert state['torn'] == 0, state
+    return state['reads']
+
+# اختبار النظام
+if __name__ == "__main__":
+    sys.setswitchinterval(1e-6)  # تبديل الخيوط بكثرة لكشف القراءة الممزقة
+    reads = _check_concurrent_reads()
+    sys.setswitchinterval(0.005)
+    print(f"Concurrent reads without torn rows: {reads:,}")
+
+    # كاتب فشل في منتصف التحديث: الصف القديم يبقى كاملاً ولا يسقط من اللقطة
+    table = PlayerTable()
+    table.add(1, None, (1.0, 2.0, 3.0), entity_addr=0x1000)
+    table.add(2, None, (7.0, 8.0, 9.0))
+    try:
+        table.update(1, (4.0, 5.0, 6.0), None)
+    except TypeError:
+        pass
+    assert table.get(1).position == (1.0, 2.0, 3.0)
+    assert [(record.player_id, record.entity_addr) for record in table.snapshot()] == [(1, 0x1000), (2, 0)]
+    table.remove(1)
+    assert [record.player_id for record in table.snapshot()] == [2] and not table.update(1, (0, 0, 0), (0, 0, 0))
+    print("✓ Failed writer leaves the row intact, snapshot keeps every player")
+
+    results = benchmark_table()
+    for name, info in results.items():
+        print(f"{name:<7} memory {info['memory'] / 1024:7.1f} KB   "
+              f"update {info['update_us']:.2f} us   snapshot/list {info['snapshot_ms']:.3f} ms   "
+              f"{info['cpu_ms_per_sec']:.1f} ms CPU/s at 20 Hz updates + 60 Hz render (1000 players)")
@@ -0,0 +1,286 @@
+import struct
+import time
+from typing import Callable, Dict, NamedTuple, Optional, Tuple, Union
+
+from EntityView import (
+    TYPE_OFFSET, POSITION_OFFSET, ENABLED_OFFSET, ROTATION_OFFSET, PLAYER_ID_OFFSET,
+    AI_OFFSET, VEHICLE_OFFSET, ANIMATION_OFFSET
+)
+
+class PointerNode(NamedTuple):
+    """مؤشر في السلسلة: الجذر يُقرأ من base + أوفست عام، والابن من parent + offset"""
+    parent: Optional[str]
+    offset: Union[int, str]   # اسم في MEMORY_OFFSETS للجذر
+    volatile: bool = False    # يُعاد قراءته كل نبضة حتى لو لم يتغير الأب (مثل المركبة)
+
+# المؤشرات المعروفة - إضافة مسار جديد = سطر واحد هنا
+POINTER_NODES: Dict[str, PointerNode] = {
+    'player': PointerNode(None, 'player_ped_ptr'),
+    'player.vehicle': PointerNode('player', VEHICLE_OFFSET, volatile=True),
+    'camera': PointerNode(None, 'camera_ptr'),
+    'world': PointerNode(None, 'world_ptr'),
+}
+
+# حقول الكائن: الاسم -> (الإزاحة، صيغة struct)
+ENTITY_FIELDS: Dict[str, Tuple[int, str]] = {
+    'type': (TYPE_OFFSET, '<i'),
+    'position': (POSITION_OFFSET, '<fff'),
+    'enabled': (ENABLED_OFFSET, '<i'),
+    'rotation': (ROTATION_OFFSET, '<fff'),
+    'player_id': (PLAYER_ID_OFFSET, '<i'),
+    'ai': (AI_OFFSET, '<i'),
+    'vehicle_ptr': (VEHICLE_OFFSET, '<I'),
+    'animation': (ANIMATION_OFFSET, '<i'),
+}
+
+_POINTER = struct.Struct('<I')
+
+class PointerResolver:
+    """حل مسارات مثل "player.vehicle.position" مع تخزين المؤشرات الوسيطة
+
+    كل مؤشر يُحل مرة واحدة في النبضة. الجذر (مؤشر عام) هو الحارس: قراءة 4 بايت
+    لكل نبضة، وإن لم يتغير تبقى المؤشرات الأبناء غير المتقلبة مخزنة بدون قراءة.
+    بدون begin_tick() كل استدعاء read/resolve يعتبر نبضة مستقلة (السلوك القديم).
+    """
+
+    def __init__(self, read: Callable[[int, int], Optional[bytes]], base_address: int,
+                 offsets: Dict[str, int], nodes: Dict[str, PointerNode] = None,
+                 fields: Dict[str, Tuple[int, str]] = None):
+        self.read = read  # read(address, size) -> bytes أو None عند الفشل
+        self.base_address = base_address
+        self.offsets = offsets
+        self.nodes = POINTER_NODES if nodes is None else nodes
+        self.fields = ENTITY_FIELDS if fields is None else fields
+        self.tick = 0
+        self.tick_driven = False
+        # الاسم -> [المؤشر، نبضة التحقق، مؤشر الأب عند الحل، نبضة آخر تغيير]
+        self.cache: Dict[str, list] = {}
+        self._paths: Dict[str, tuple] = {}
+
+        # إحصائيات
+        self.sentinel_reads = 0
+        self.dereferences = 0
+        self.changes = 0
+
+    def begin_tick(self):
+        """نبضة جديدة: كل الجذور تُتحقق مرة أخرى عند أول استخدام"""
+        self.tick_driven = True
+        self.tick += 1
+
+    def invalidate(self):
+        """نسيان كل المؤشرات (بعد إعادة الارتباط أو تغيير الأوفست)"""
+        self.cache.clear()
+
+    def _read_pointer(self, address: int) -> int:
+        data = self.read(address, 4)
+        if not data or len(data) < 4:
+            return 0
+        return _POINTER.unpack_from(data)[0]
+
+    def _resolve(self, name: str) -> int:
+        entry = self.cache.get(name)
+        tick = self.tick
+        if entry is not None and entry[1] == tick:
+            return entry[0]
+
+        parent_name, offset, volatile = self.nodes[name]
+        parent = None
+        if parent_name is None:
+            if isinstance(offset, str):
+                offset = self.offsets[offset]
+            pointer = self._read_pointer(self.base_address + offset)
+            self.sentinel_reads += 1
+        else:
+            # الأب تحقق في هذه النبضة غالباً: بدون استدعاء متداخل
+            parent_entry = self.cache.get(parent_name)
+            if parent_entry is not None and parent_entry[1] == tick:
+                parent = parent_entry[0]
+            else:
+                parent = self._resolve(parent_name)
+            if not parent:
+                pointer = 0
+            elif entry is not None and not volatile and entry[2] == parent:
+                pointer = entry[0]
+            else:
+                pointer = self._read_pointer(parent + offset)
+                self.dereferences += 1
+
+        if entry is None:
+            # الحل الأول ليس تغييراً
+            self.cache[name] = [pointer, tick, parent, None]
+        else:
+            if entry[0] != pointer:
+                entry[0] = pointer
+                entry[3] = tick
+                self.changes += 1
+            entry[1] = tick
+            entry[2] = parent
+        return pointer
+
+    def resolve(self, name: str) -> int:
+        """قيمة مؤشر (0 إن كانت السلسلة فارغة)"""
+        if not self.tick_driven:
+            self.tick += 1
+        return self._resolve(name)
+
+    def last_known(self, name: str) -> Tuple[int, bool]:
+        """آخر قيمة للمؤشر بدون قراءة: (المؤشر، هل تحقق في هذه النبضة) - للقراءة التخمينية"""
+        entry = self.cache.get(name)
+        if entry is None:
+            return 0, False
+        return entry[0], self.tick_driven and entry[1] == self.tick
+
+    def confirm(self, name: str, pointer: int):
+        """المؤشر تحقق خارجياً (قراءة تخمينية) في هذه النبضة"""
+        entry = self.cache.get(name)
+        if entry is not None and entry[0] == pointer and self.tick_driven:
+            entry[1] = self.tick
+
+    def changed(self, name: str) -> bool:
+        """هل تغير المؤشر في هذه النبضة (مثل دخول مركبة أو الخروج منها)"""
+        self.resolve(name)
+        return self.cache[name][3] == self.tick
+
+    def _split(self, path: str) -> tuple:
+        """(المؤشر، الإزاحة، الحجم، unpack_from، قيمة مفردة) - يُحسب مرة لكل مسار"""
+        parsed = self._paths.get(path)
+        if parsed is None:
+            if path in self.nodes:
+                parsed = (path, 0, 0, None, False)
+            else:
+                node, _, field = path.rpartition('.')
+                if not node or node not in self.nodes:
+                    raise KeyError(f"Unknown pointer path: {path}")
+                offset, fmt = self.fields[field]
+                layout = struct.Struct(fmt)
+                parsed = (node, offset, layout.size, layout.unpack_from, len(fmt.lstrip('<>=!@')) == 1)
+            self._paths[path] = parsed
+        return parsed
+
+    def address(self, path: str) -> int:
+        """عنوان الحقل في نهاية المسار (0 إن كان أحد المؤشرات فارغاً)"""
+        node, offset = self._split(path)[:2]
+        pointer = self.resolve(node)
+        return pointer + offset if pointer else 0
+
+    def read_path(self, path: str):
+        """قيمة الحقل (متجه كـ tuple، أو عدد)؛ None إن لم يُحل المسار"""
+        node, offset, size, unpack, scalar = self._paths.get(path) or self._split(path)
+        # المسار السريع: المؤشر تحقق في هذه النبضة (بدون استدعاء resolve)
+        entry = self.cache.get(node)
+        if entry is not None and entry[1] == self.tick and self.tick_driven:
+            pointer = entry[0]
+        else:
+            pointer = self.resolve(node)
+        if unpack is None:
+            return pointer
+        if not pointer:
+            return None
+        data = self.read(pointer + offset, size)
+        if not data or len(data) < size:
+            return None
+        return unpack(data)[0] if scalar else unpack(data)
+
+def benchmark_paths(backend, base_address: int, offsets: Dict[str, int], ticks: int = 5000,
+                    repeats: int = 5) -> dict:
+    """قراءات النبضة: الوصول القديم لكل حقل مقابل المسارات مع المؤشرات المخزنة (أفضل تكرار)"""
+    from EntityView import _CountingBackend
+    results = {}
+    unpack_int = struct.Struct('<i').unpack
+    unpack_vector = struct.Struct('<fff').unpack
+    player_ptr_addr = base_address + offsets['player_ped_ptr']
+
+    for _ in range(repeats):
+        # القديم: get_player_position + rotation + vehicle + get_vehicle_position(get_player_vehicle())
+        counting = _CountingBackend(backend)
+        start_time = time.perf_counter()
+        for _ in range(ticks):
+            player_ptr = unpack_int(counting.read(player_ptr_addr, 4))[0]
+            position = unpack_vector(counting.read(player_ptr + POSITION_OFFSET, 12))
+            player_ptr = unpack_int(counting.read(player_ptr_addr, 4))[0]
+            rotation = unpack_vector(counting.read(player_ptr + ROTATION_OFFSET, 12))
+            player_ptr = unpack_int(counting.read(player_ptr_addr, 4))[0]
+            vehicle = unpack_int(counting.read(player_ptr + VEHICLE_OFFSET, 4))[0]
+            player_ptr = unpack_int(counting.read(player_ptr_addr, 4))[0]
+            vehicle = unpack_int(counting.read(player_ptr + VEHICLE_OFFSET, 4))[0]
+            vehicle_position = unpack_vector(counting.read(vehicle + POSITION_OFFSET, 12))
+        elapsed = time.perf_counter() - start_time
+        old_state = (position, rotation, vehicle, vehicle_position)
+        tick_us = elapsed * 1e6 / ticks
+        if 'per_field' not in results or tick_us < results['per_field']['tick_us']:
+            results['per_field'] = {'reads_per_tick': counting.reads / ticks, 'tick_us': tick_us}
+
+        counting = _CountingBackend(backend)
+        resolver = PointerResolver(counting.read, base_address, offsets)
+        start_time = time.perf_counter()
+        for _ in range(ticks):
+            resolver.begin_tick()
+            position = resolver.read_path('player.position')
+            rotation = resolver.read_path('player.rotation')
+            vehicle = resolver.resolve('player.vehicle')
+            vehicle_position = resolver.read_path('player.vehicle.position')
+        elapsed = time.perf_counter() - start_time
+        assert (position, rotation, vehicle, vehicle_position) == old_state
+        tick_us = elapsed * 1e6 / ticks
+        if 'paths' not in results or tick_us < results['paths']['tick_us']:
+            results['paths'] = {'reads_per_tick': counting.reads / ticks, 'tick_us': tick_us}
+    return results
+
+# اختبار النظام
+if __name__ == "__main__":
+    import os
+    import sys
+    from MemoryBackends import DumpFileBackend, build_synthetic_image, SYNTHETIC_BASE, SYNTHETIC_PLAYER_PED, \
+        SYNTHETIC_VEHICLE
+    from EntityView import _CountingBackend
+
+    path = build_synthetic_image()
+    dump = DumpFileBackend(path, SYNTHETIC_BASE)  # الكتابة في نسخة خاصة، الملف لا يتغير
+    offsets = {'player_ped_ptr': 0x00B7CD98, 'camera_ptr': 0x00B6F028, 'world_ptr': 0x00B79594}
+    counting = _CountingBackend(dump)
+    resolver = PointerResolver(counting.read, SYNTHETIC_BASE, offsets)
+
+    resolver.begin_tick()
+    assert resolver.resolve('player') == SYNTHETIC_PLAYER_PED
+    assert resolver.read_path('player.position') == (512.5, -1024.25, 12.0)
+    assert resolver.resolve('player.vehicle') == SYNTHETIC_VEHICLE
+    assert resolver.address('player.vehicle.position') == SYNTHETIC_VEHICLE + POSITION_OFFSET
+    assert counting.reads == 3  # حارس + حقل + مؤشر المركبة
+
+    # الخروج من المركبة: المؤشر المتقلب يُعاد قراءته ويُكشف التغيير
+    dump.write(SYNTHETIC_PLAYER_PED + VEHICLE_OFFSET, _POINTER.pack(0))
+    resolver.begin_tick()
+    assert resolver.changed('player.vehicle') and not resolver.changed('player')
+    assert resolver.read_path('player.vehicle.position') is None
+
+    # تغيير الحارس (اللاعب أعيد إنشاؤه في مكان آخر)
+    dump.write(SYNTHETIC_BASE + offsets['player_ped_ptr'], _POINTER.pack(SYNTHETIC_VEHICLE))
+    resolver.begin_tick()
+    assert resolver.resolve('player') == SYNTHETIC_VEHICLE and resolver.changed('player')
+    dump.close()
+
+    backends = {'dump file (mmap)': (DumpFileBackend(path, SYNTHETIC_BASE), SYNTHETIC_BASE)}
+    if sys.platform.startswith('linux'):
+        # لاعب ومركبة في ذاكرة هذه العملية تحت 4GB (MAP_32BIT) كما في اللعبة
+        import ctypes
+        import mmap
+        from MemoryBackends import LinuxProcessBackend
+        try:
+            region = mmap.mmap(-1, 0x2000, flags=mmap.MAP_PRIVATE | mmap.MAP_ANONYMOUS | 0x40)
+            address = ctypes.addressof((ctypes.c_char * 0x2000).from_buffer(region))
+        except (OSError, ValueError):
+            address = 1 << 32
+        if address < 1 << 31:
+            _POINTER.pack_into(region, 0, address + 0x100)
+            _POINTER.pack_into(region, 0x100 + VEHICLE_OFFSET, address + 0x1000)
+            struct.pack_into('<fff', region, 0x1000 + POSITION_OFFSET, 1.0, 2.0, 3.0)
+            backends['process_vm_readv'] = (LinuxProcessBackend(os.getpid()),
+                                            address - offsets['player_ped_ptr'])
+
+    for name, (backend, base_address) in backends.items():
+        results = benchmark_paths(backend, base_address, offsets)
+        before, after = results['per_field'], results['paths']
+        print(f"{name}: reads/tick {before['reads_per_tick']:.0f} -> {after['reads_per_tick']:.0f}, "
+              f"tick {before['tick_us']:.2f} -> {after['tick_us']:.2f} us")
+        backend.close()
+    os.unlink(path)
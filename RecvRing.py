@@ -0,0 +1,319 @@
+import ctypes
+import gc
+import socket
+import struct
+import sys
+import time
+from typing import Callable, List, Optional
+
+# recvmmsg متوفر فقط على Linux (عبر libc)
+RECVMMSG_AVAILABLE = False
+if sys.platform.startswith('linux'):
+    try:
+        _libc = ctypes.CDLL(None, use_errno=True)
+        _recvmmsg = _libc.recvmmsg
+        RECVMMSG_AVAILABLE = True
+    except (OSError, AttributeError):
+        RECVMMSG_AVAILABLE = False
+
+MSG_DONTWAIT = 0x40
+MSG_TRUNC = 0x20
+EAGAIN_ERRORS = (11, 35)  # EAGAIN على Linux و macOS
+EMSGSIZE_ERRORS = (90, 40, 10040)  # حزمة أكبر من الخانة: Linux و macOS و Windows (WSAEMSGSIZE)
+SOCKADDR_SIZE = 128
+
+class IOVEC(ctypes.Structure):
+    _fields_ = [
+        ("iov_base", ctypes.c_void_p),
+        ("iov_len", ctypes.c_size_t)
+    ]
+
+class MSGHDR(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(IOVEC)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int)
+    ]
+
+class MMSGHDR(ctypes.Structure):
+    _fields_ = [
+        ("msg_hdr", MSGHDR),
+        ("msg_len", ctypes.c_uint)
+    ]
+
+if RECVMMSG_AVAILABLE:
+    _recvmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(MMSGHDR), ctypes.c_uint,
+                          ctypes.c_int, ctypes.c_void_p]
+    _recvmmsg.restype = ctypes.c_int
+
+class ReceiveRing:
+    """حلقة مخازن مخصصة مسبقاً للاستقبال بدون نسخ (memoryview لكل حزمة)"""
+
+    def __init__(self, slots: int = 64, slot_size: int = 2048, use_recvmmsg: bool = True):
+        self.slots = slots
+        self.slot_size = slot_size
+        self.buffer = bytearray(slots * slot_size)
+        self.view = memoryview(self.buffer)
+        self.lengths = [0] * slots
+        self.addrs: List[Optional[tuple]] = [None] * slots
+        self.count = 0
+
+        # إحصائيات
+        self.syscalls = 0
+        self.packets = 0
+        self.dropped = 0  # حزم أكبر من الخانة (مقطوعة) تُسقط
+
+        # شرائح ثابتة لكل خانة (تعاد استخدامها)
+        self._slot_views = [self.view[i * slot_size:(i + 1) * slot_size] for i in range(slots)]
+
+        self.use_recvmmsg = use_recvmmsg and RECVMMSG_AVAILABLE
+        if self.use_recvmmsg:
+            self._setup_recvmmsg()
+
+    def _setup_recvmmsg(self):
+        """تجهيز هياكل recvmmsg مرة واحدة"""
+        slots = self.slots
+        self._c_buffer = (ctypes.c_char * len(self.buffer)).from_buffer(self.buffer)
+        self._names = (ctypes.c_char * (SOCKADDR_SIZE * slots))()
+        self._names_view = memoryview(self._names).cast('B')
+        self._iovecs = (IOVEC * slots)()
+        self._msgs = (MMSGHDR * slots)()
+
+        base = ctypes.addressof(self._c_buffer)
+        names_base = ctypes.addressof(self._names)
+        for i in range(slots):
+            self._iovecs[i].iov_base = base + i * self.slot_size
+            self._iovecs[i].iov_len = self.slot_size
+            header = self._msgs[i].msg_hdr
+            header.msg_name = names_base + i * SOCKADDR_SIZE
+            header.msg_iov = ctypes.pointer(self._iovecs[i])
+            header.msg_iovlen = 1
+
+        # الوصول لحقول mmsghdr عبر memoryview بدل خصائص ctypes (أسرع بكثير)
+        self._msgs_view = memoryview(self._msgs).cast('B')
+        self._msg_size = ctypes.sizeof(MMSGHDR)
+        self._namelen_offset = MMSGHDR.msg_hdr.offset + MSGHDR.msg_namelen.offset
+        self._len_offset = MMSGHDR.msg_len.offset
+        self._flags_offset = MMSGHDR.msg_hdr.offset + MSGHDR.msg_flags.offset
+        self._uint = struct.Struct('I')
+        self._last_count = slots
+
+        # ذاكرة مؤقتة للعناوين: بايتات sockaddr -> (ip, port)
+        self._addr_cache = {}
+
+    def _parse_addr(self, index: int) -> tuple:
+        """تحويل sockaddr_in إلى (ip, port) مع ذاكرة مؤقتة"""
+        offset = index * SOCKADDR_SIZE
+        raw = bytes(self._names_view[offset + 2:offset + 8])
+        addr = self._addr_cache.get(raw)
+        if addr is None:
+            addr = (socket.inet_ntoa(raw[2:6]), int.from_bytes(raw[0:2], 'big'))
+            if len(self._addr_cache) > 4096:
+                self._addr_cache.clear()
+            self._addr_cache[raw] = addr
+        return addr
+
+    def receive(self, sock: socket.socket) -> int:
+        """استقبال دفعة من الحزم في الحلقة، وإرجاع عددها"""
+        if self.use_recvmmsg and sock.family == socket.AF_INET:
+            return self._receive_recvmmsg(sock)
+        return self._receive_into(sock)
+
+    def _receive_recvmmsg(self, sock: socket.socket) -> int:
+        """استقبال عدة حزم باستدعاء نظام واحد"""
+        view = self._msgs_view
+        size = self._msg_size
+        uint = self._uint
+
+        # recvmmsg يكتب طول العنوان الفعلي - إعادة الضبط للخانات المستخدمة فقط
+        offset = self._namelen_offset
+        for i in range(self._last_count):
+            uint.pack_into(view, offset + i * size, SOCKADDR_SIZE)
+
+        self.syscalls += 1
+        count = _recvmmsg(sock.fileno(), self._msgs, self.slots, MSG_DONTWAIT, None)
+        if count < 0:
+            error = ctypes.get_errno()
+            if error in EAGAIN_ERRORS:
+                self.count = 0
+                self._last_count = 0
+                return 0
+            raise OSError(error, f"recvmmsg failed: errno {error}")
+
+        offset = self._len_offset
+        flags_offset = self._flags_offset
+        kept = 0
+        for i in range(count):
+            if uint.unpack_from(view, flags_offset + i * size)[0] & MSG_TRUNC:
+                # حزمة أكبر من الخانة: تُسقط بدل تمريرها ناقصة
+                self.dropped += 1
+                continue
+            length = uint.unpack_from(view, offset + i * size)[0]
+            if kept != i:
+                # نادر: إزاحة الحزم التالية لسد مكان الحزمة المسقطة
+                self._slot_views[kept][:length] = self._slot_views[i][:length]
+            self.lengths[kept] = length
+            self.addrs[kept] = self._parse_addr(i)
+            kept += 1
+
+        self.count = kept
+        self._last_count = count
+        self.packets += kept
+        return kept
+
+    def _receive_into(self, sock: socket.socket) -> int:
+        """استقبال حتى امتلاء الحلقة باستخدام recvfrom_into (كل المنصات)"""
+        count = 0
+        recvfrom_into = sock.recvfrom_into
+        slot_views = self._slot_views
+        while count < self.slots:
+            self.syscalls += 1
+            try:
+                nbytes, addr = recvfrom_into(slot_views[count])
+            except (BlockingIOError, InterruptedError):
+                break
+            except ConnectionResetError:
+                # Windows: ICMP port unreachable من إرسال سابق
+                continue
+            except OSError as e:
+                if e.errno in EMSGSIZE_ERRORS or getattr(e, 'winerror', None) in EMSGSIZE_ERRORS:
+                    # Windows: حزمة أكبر من الخانة (الباقي أُسقط من المقبس)
+                    self.dropped += 1
+                    continue
+                if not count:
+                    raise
+                break  # الحزم المستقبلة في هذه الدفعة تبقى، والخطأ يظهر في الاستقبال التالي
+            self.lengths[count] = nbytes
+            self.addrs[count] = addr
+            count += 1
+
+        self.count = count
+        self.packets += count
+        return count
+
+    def packet(self, index: int) -> memoryview:
+        """الحصول على بيانات حزمة بدون نسخ (صالحة حتى الاستقبال التالي)"""
+        return self._slot_views[index][:self.lengths[index]]
+
+    def drain(self, sock: socket.socket, handler: Callable[[memoryview, tuple], None],
+              max_rounds: int = 4) -> int:
+        """استقبال ومعالجة كل الحزم الجاهزة"""
+        total = 0
+        for _ in range(max_rounds):
+            count = self.receive(sock)
+            for i in range(count):
+                handler(self.packet(i), self.addrs[i])
+            total += count
+            if count < self.slots:
+                break
+        return total
+
+    def packets_per_syscall(self) -> float:
+        return self.packets / max(1, self.syscalls)
+
+def _flood(sender, target, count: int, payload: bytes):
+    """إرسال عدد كبير من الحزم"""
+    for _ in range(count):
+        try:
+            sender.sendto(payload, target)
+        except BlockingIOError:
+            time.sleep(0.0001)
+
+def benchmark_receive(packets: int = 50000, batch: int = 2000) -> dict:
+    """اختبار إغراق عبر loopback: recvfrom مقابل الحلقة (recvfrom_into / recvmmsg)"""
+    results = {}
+    payload = b'\x01\x03' + b'x' * 51
+    modes = ['recvfrom', 'recvfrom_into']
+    if RECVMMSG_AVAILABLE:
+        modes.append('recvmmsg')
+
+    for mode in modes:
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024 * 1024)
+        receiver.bind(('127.0.0.1', 0))
+        receiver.setblocking(False)
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        target = receiver.getsockname()
+
+        ring = ReceiveRing(use_recvmmsg=(mode == 'recvmmsg'))
+        kept = [None] * batch
+        received = 0
+        syscalls = 0
+        elapsed = 0.0
+        blocks = 0
+
+        # الإرسال على دفعات صغيرة حتى لا يمتلئ مخزن الاستقبال
+        for _ in range(packets // batch):
+            _flood(sender, target, batch, payload)
+            got = 0
+            gc.disable()
+            blocks_before = sys.getallocatedblocks()
+            start_time = time.perf_counter()
+            if mode == 'recvfrom':
+                while got < batch:
+                    syscalls += 1
+                    try:
+                        data, addr = receiver.recvfrom(2048)
+                    except BlockingIOError:
+                        break
+                    kept[got] = (data, addr)
+                    got += 1
+            else:
+                while got < batch:
+                    count = ring.receive(receiver)
+                    if not count:
+                        break
+                    for i in range(count):
+                        if got + i < batch:
+                            kept[got + i] = ring.packet(i)
+                    got += count
+            elapsed += time.perf_counter() - start_time
+            blocks += sys.getallocatedblocks() - blocks_before
+            gc.enable()
+            kept = [None] * batch
+            received += got
+
+        if mode != 'recvfrom':
+            syscalls = ring.syscalls
+
+        results[mode] = {
+            'received': received,
+            'packets_per_sec': received / elapsed if elapsed else 0.0,
+            'packets_per_syscall': received / max(1, syscalls),
+            'allocations_per_packet': blocks / max(1, received),
+        }
+        sender.close()
+        receiver.close()
+
+    return results
+
+# اختبار النظام
+if __name__ == "__main__":
+    print(f"recvmmsg available: {RECVMMSG_AVAILABLE}")
+
+    # حزمة أكبر من الخانة تُسقط وتُحسب، والحزم حولها تبقى كاملة
+    for use_recvmmsg in (False, True):
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind(('127.0.0.1', 0))
+        receiver.setblocking(False)
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        for payload in (b'first', b'x' * 600, b'last'):
+            sender.sendto(payload, receiver.getsockname())
+        time.sleep(0.05)
+        ring = ReceiveRing(slots=8, slot_size=512, use_recvmmsg=use_recvmmsg)
+        got = [bytes(ring.packet(i)) for i in range(ring.receive(receiver))]
+        if ring.use_recvmmsg or sys.platform == 'win32':
+            assert got == [b'first', b'last'] and ring.dropped == 1, (got, ring.dropped)
+        sender.close()
+        receiver.close()
+    print("✓ Oversized datagrams dropped")
+    results = benchmark_receive()
+    for mode, info in results.items():
+        print(f"{mode:<14} {info['packets_per_sec']:>12,.0f} packets/sec  "
+              f"{info['packets_per_syscall']:5.1f} packets/syscall  "
+              f"{info['allocations_per_packet']:4.1f} live allocations/packet  "
+              f"({info['received']} received)")
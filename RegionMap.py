@@ -0,0 +1,301 @@
+import bisect
+import ctypes
+import os
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Tuple
+
+from MemoryBackends import MemoryBackend, MemoryAccessError
+
+PAGE_SIZE = 0x1000
+
+class MemoryRegion(NamedTuple):
+    start: int
+    size: int
+    protect: str  # مثل "r-x" أو "rw-"
+
+    @property
+    def end(self) -> int:
+        return self.start + self.size
+
+class RegionMap:
+    """خريطة المناطق المقروءة (committed) في العملية - تُبنى عند الارتباط وتُحدث عند ظهور ذاكرة جديدة"""
+
+    def __init__(self, regions):
+        self.refresh(regions)
+
+    def refresh(self, regions):
+        """إعادة بناء الخريطة في المكان (من يحمل مرجعاً لها يرى المناطق الجديدة)"""
+        self.regions: List[MemoryRegion] = sorted(
+            (MemoryRegion(*region) for region in regions if region[1] > 0), key=lambda r: r.start)
+        self.starts = [region.start for region in self.regions]
+
+    def find(self, address: int) -> Optional[MemoryRegion]:
+        """المنطقة التي تحتوي العنوان"""
+        index = bisect.bisect_right(self.starts, address) - 1
+        if index >= 0 and address < self.regions[index].end:
+            return self.regions[index]
+        return None
+
+    def readable_end(self, address: int) -> int:
+        """نهاية المجال المقروء المتصل الذي يبدأ من العنوان (المناطق المتلاصقة تُدمج)"""
+        index = bisect.bisect_right(self.starts, address) - 1
+        if index < 0 or address >= self.regions[index].end:
+            return address
+        end = self.regions[index].end
+        for region in self.regions[index + 1:]:
+            if region.start != end:
+                break
+            end = region.end
+        return end
+
+    def contains(self, address: int, size: int) -> bool:
+        return self.readable_end(address) >= address + size
+
+    def readable_runs(self, start: int, size: int) -> List[Tuple[int, int]]:
+        """أجزاء المجال [start, start+size) المقروءة، بدون الثغرات"""
+        runs = []
+        end = start + size
+        index = max(0, bisect.bisect_right(self.starts, start) - 1)
+        for region in self.regions[index:]:
+            if region.start >= end:
+                break
+            run_start = max(start, region.start)
+            run_end = min(end, region.end)
+            if run_start >= run_end:
+                continue
+            if runs and runs[-1][0] + runs[-1][1] == run_start:
+                runs[-1] = (runs[-1][0], run_end - runs[-1][0])
+            else:
+                runs.append((run_start, run_end - run_start))
+        return runs
+
+    def __len__(self) -> int:
+        return len(self.regions)
+
+class PageCache(MemoryBackend):
+    """ذاكرة مؤقتة بالصفحات (LRU) فوق أي واجهة ذاكرة، مع قراءة مسبقة
+
+    القراءات الصغيرة المتجاورة خلال النبضة تُخدم من نفس الصفحات بدون استدعاء نظام.
+    الكتابة تمر للواجهة وتحدث الصفحات المخزنة. invalidate() في بداية كل نبضة.
+    """
+
+    name = "page-cache"
+
+    def __init__(self, backend: MemoryBackend, region_map: Optional[RegionMap] = None,
+                 capacity: int = 256, read_ahead: int = 1, page_size: int = PAGE_SIZE,
+                 bypass_size: int = 64 * 1024):
+        self.backend = backend
+        self.region_map = region_map
+        self.capacity = capacity
+        self.read_ahead = read_ahead
+        self.page_size = page_size
+        self.page_mask = ~(page_size - 1)
+        self.bypass_size = bypass_size  # القراءات الكبيرة (مسح) لا تمر بالذاكرة المؤقتة
+        self.pages: 'OrderedDict[int, bytearray]' = OrderedDict()
+        self.lock = threading.Lock()
+        self._map_stale = False  # قراءة نجحت خارج الخريطة: تُحدث في النبضة التالية
+
+        # إحصائيات
+        self.hits = 0
+        self.misses = 0
+        self.backend_reads = 0
+        self.invalidations = 0
+
+    def invalidate(self):
+        """إفراغ كل الصفحات (بداية نبضة جديدة)"""
+        with self.lock:
+            self.pages.clear()
+            self.invalidations += 1
+            if self._map_stale:
+                self._map_stale = False
+                try:
+                    self.region_map.refresh(self.backend.regions())
+                except Exception as e:
+                    print(f"Failed to refresh region map: {e}")
+
+    def _fetch(self, first_page: int, last_page: int):
+        """قراءة الصفحات الناقصة [first_page, last_page] + القراءة المسبقة في استدعاء واحد"""
+        page_size = self.page_size
+        end = last_page + page_size * (1 + self.read_ahead)
+        outside_map = False
+        if self.region_map is not None:
+            readable_end = self.region_map.readable_end(first_page)
+            if readable_end < last_page + page_size:
+                # خارج الخريطة: ربما ذاكرة حُجزت بعد الارتباط (كومة أو مجمع كيانات جديد)،
+                # فالواجهة تقرر؛ بدون قراءة مسبقة
+                outside_map = True
+                end = last_page + page_size
+            else:
+                end = min(end, readable_end)
+
+        try:
+            data = self.backend.read(first_page, end - first_page)
+        except MemoryAccessError:
+            if end == last_page + page_size:
+                raise
+            # بدون خريطة: القراءة المسبقة قد تتجاوز المنطقة
+            end = last_page + page_size
+            data = self.backend.read(first_page, end - first_page)
+        self.backend_reads += 1
+        if outside_map:
+            self._map_stale = True
+
+        pages = self.pages
+        for offset in range(0, end - first_page, page_size):
+            page = first_page + offset
+            pages[page] = bytearray(data[offset:offset + page_size])
+            pages.move_to_end(page)
+        while len(pages) > self.capacity:
+            pages.popitem(last=False)
+
+    def read(self, address: int, size: int) -> bytes:
+        if size > self.bypass_size:
+            return self.backend.read(address, size)
+
+        page_size = self.page_size
+        first_page = address & self.page_mask
+        last_page = (address + size - 1) & self.page_mask
+        with self.lock:
+            pages = self.pages
+            page = pages.get(first_page)
+            if page is not None and first_page == last_page:
+                # الحالة الشائعة: حقل داخل صفحة مخزنة
+                self.hits += 1
+                pages.move_to_end(first_page)
+                offset = address - first_page
+                return bytes(page[offset:offset + size])
+
+            missing = [p for p in range(first_page, last_page + 1, page_size) if p not in pages]
+            if missing:
+                self.misses += 1
+                self._fetch(missing[0], missing[-1])
+            else:
+                self.hits += 1
+
+            chunks = []
+            for p in range(first_page, last_page + 1, page_size):
+                pages.move_to_end(p)
+                chunks.append(pages[p])
+            data = chunks[0] if len(chunks) == 1 else b''.join(chunks)
+            offset = address - first_page
+            return bytes(data[offset:offset + size])
+
+    def write(self, address: int, data: bytes):
+        self.backend.write(address, data)
+        self._patch(address, data)
+
+    def _patch(self, address: int, data: bytes):
+        """تحديث الصفحات المخزنة التي تغطي الكتابة"""
+        page_size = self.page_size
+        end = address + len(data)
+        with self.lock:
+            for page_address in range(address & self.page_mask, end, page_size):
+                page = self.pages.get(page_address)
+                if page is None:
+                    continue
+                start = max(address, page_address)
+                stop = min(end, page_address + page_size)
+                page[start - page_address:stop - page_address] = data[start - address:stop - address]
+
+    @property
+    def batch_writes(self) -> bool:
+        return self.backend.batch_writes
+
+    def write_many(self, writes) -> int:
+        syscalls = self.backend.write_many(writes)
+        for address, data in writes:
+            self._patch(address, data)
+        return syscalls
+
+    def modules(self):
+        return self.backend.modules()
+
+    def regions(self):
+        return self.backend.regions()
+
+    def close(self):
+        self.backend.close()
+
+def benchmark_page_cache(backend, player_ptr_addr: int, ticks: int = 5000) -> dict:
+    """المسار القديم (6 قراءات صغيرة لكل نبضة) مع وبدون الذاكرة المؤقتة"""
+    results = {}
+    unpack_int = struct.Struct('i').unpack
+    unpack_vector = struct.Struct('fff').unpack
+
+    for name, reader in (('direct', backend), ('page_cache', PageCache(backend, read_ahead=0))):
+        start_time = time.perf_counter()
+        for _ in range(ticks):
+            if isinstance(reader, PageCache):
+                reader.invalidate()
+            player_ptr = unpack_int(reader.read(player_ptr_addr, 4))[0]
+            position = unpack_vector(reader.read(player_ptr + 0x14, 12))
+            player_ptr = unpack_int(reader.read(player_ptr_addr, 4))[0]
+            rotation = unpack_vector(reader.read(player_ptr + 0x20, 12))
+            player_ptr = unpack_int(reader.read(player_ptr_addr, 4))[0]
+            vehicle = unpack_int(reader.read(player_ptr + 0x58C, 4))[0]
+        elapsed = time.perf_counter() - start_time
+        syscalls = reader.backend_reads if isinstance(reader, PageCache) else 6 * ticks
+        results[name] = {'ticks_per_sec': ticks / elapsed, 'syscalls_per_tick': syscalls / ticks,
+                         'state': (position, rotation, vehicle)}
+
+    assert results['direct']['state'] == results['page_cache']['state']
+    return results
+
+# اختبار النظام
+if __name__ == "__main__":
+    from MemoryBackends import LinuxProcessBackend, DumpFileBackend, build_synthetic_image, SYNTHETIC_BASE
+
+    region_map = RegionMap([(0x1000, 0x2000, 'r--'), (0x3000, 0x1000, 'rw-'), (0x8000, 0x1000, 'r-x')])
+    assert region_map.readable_runs(0x0, 0x10000) == [(0x1000, 0x3000), (0x8000, 0x1000)]
+    assert region_map.contains(0x2FF0, 0x20) and not region_map.contains(0x3FF0, 0x20)
+    assert region_map.find(0x8010).protect == 'r-x' and region_map.find(0x5000) is None
+
+    path = build_synthetic_image()
+    dump = DumpFileBackend(path, SYNTHETIC_BASE)
+    cache = PageCache(dump, RegionMap(dump.regions()))
+    address = SYNTHETIC_BASE + 0x00C00000
+    assert cache.read(address + 0x14, 12) == dump.read(address + 0x14, 12)
+    cache.write(address + 0x14, struct.pack('fff', 1.0, 2.0, 3.0))
+    assert cache.read(address + 0xFFA, 12) == dump.read(address + 0xFFA, 12)  # عبر حد صفحتين
+    assert struct.unpack('fff', cache.read(address + 0x14, 12)) == (1.0, 2.0, 3.0)
+    assert cache.backend_reads == 1  # الصفحة التالية جاءت بالقراءة المسبقة
+
+    # ذاكرة حُجزت بعد بناء الخريطة: القراءة تنجح والخريطة تُحدث في النبضة التالية
+    stale_map = RegionMap([(SYNTHETIC_BASE, 0x1000, 'r--')])
+    cache = PageCache(dump, stale_map)
+    assert cache.read(address + 0x14, 12) == dump.read(address + 0x14, 12)
+    cache.invalidate()
+    assert stale_map.contains(address, 0x1000)
+    try:
+        cache.read(SYNTHETIC_BASE - 0x1000, 4)
+        raise AssertionError("read outside every region succeeded")
+    except MemoryAccessError:
+        pass
+    print("✓ Page cache reads memory committed after attach")
+    dump.close()
+    os.unlink(path)
+
+    if sys.platform.startswith('linux'):
+        linux = LinuxProcessBackend(os.getpid())
+        region_map = RegionMap(linux.regions())
+        print(f"Regions of this process: {len(region_map)} readable, "
+              f"{sum(r.size for r in region_map.regions) / (1024 * 1024):.0f} MB")
+
+        # لاعب في ذاكرة هذه العملية تحت 4GB (MAP_32BIT) كما في اللعبة
+        import mmap
+        try:
+            region = mmap.mmap(-1, 0x2000, flags=mmap.MAP_PRIVATE | mmap.MAP_ANONYMOUS | 0x40)
+            address = ctypes.addressof((ctypes.c_char * 0x2000).from_buffer(region))
+        except (OSError, ValueError):
+            address = 1 << 32
+        if address < 1 << 31:
+            struct.pack_into('i', region, 0, address + 0x100)
+            struct.pack_into('fff', region, 0x100 + 0x14, 512.5, -1024.25, 12.0)
+            for name, info in benchmark_page_cache(linux, address).items():
+                print(f"{name:<10} {info['ticks_per_sec']:,.0f} ticks/s, "
+                      f"{info['syscalls_per_tick']:.1f} syscalls/tick")
+        linux.close()
@@ -0,0 +1,447 @@
+import contextlib
+import ctypes
+import mmap
+import os
+import struct
+import sys
+import time
+from typing import List, Optional
+
+# ملف ذاكرة مشتركة بحلقتين (طلبات: Python -> النواة، ردود: النواة -> Python)
+# نفس ترميز الأوامر المؤطرة في ControlChannel، بدون مقبس ولا نسخ في النواة
+RING_MAGIC = 0x42524C56  # 'VLRB'
+RING_VERSION = 1
+RING_CAPACITY = 1 << 16
+
+# الرأس: [السحر][الإصدار][السعة][pid العميل][pid الخادم]
+SEGMENT_HEADER = struct.Struct('<IIIII')
+SEGMENT_HEADER_SIZE = 64
+CLIENT_PID_OFFSET = 12
+SERVER_PID_OFFSET = 16
+# العميل أغلق؛ الخادم يفرغ الحلقتين ثم يعيد الحقل إلى 0 (العميل التالي لا يسبق التفريغ)
+CLIENT_CLOSING = 0xFFFFFFFF
+# رأس الحلقة: head عند +0 وtail عند +64 (خط ذاكرة لكل طرف)
+RING_HEADER_SIZE = 128
+TAIL_OFFSET = 64
+
+# الصيغة الأصلية (بدون '<'): نسخة واحدة بحجم الحقل، لا كتابة بايت ببايت
+# فلا يرى الطرف الآخر قيمة نصف مكتوبة (الملف x86 little-endian في الطرفين)
+_INDEX = struct.Struct('Q')
+_PID = struct.Struct('I')
+
+def ring_name(port: int) -> str:
+    """اسم الذاكرة المشتركة لخادم التحكم على هذا المنفذ"""
+    return f"vice_line_control_{port}"
+
+def segment_size(capacity: int = RING_CAPACITY) -> int:
+    return SEGMENT_HEADER_SIZE + 2 * (RING_HEADER_SIZE + capacity)
+
+def _open_segment(name: str, size: int, create: bool) -> Optional[mmap.mmap]:
+    """ربط ملف الذاكرة المشتركة (None إن لم يكن موجوداً)"""
+    if sys.platform == 'win32':
+        # CreateFileMapping بالاسم: النواة تنشئه، والعميل يفتح نفس الاسم
+        return mmap.mmap(-1, size, tagname=name)
+
+    path = os.path.join('/dev/shm', name)
+    try:
+        fd = os.open(path, os.O_RDWR | (os.O_CREAT if create else 0), 0o600)
+    except FileNotFoundError:
+        return None
+    try:
+        if create:
+            os.ftruncate(fd, size)
+        elif os.fstat(fd).st_size < size:
+            return None
+        return mmap.mmap(fd, size)
+    finally:
+        os.close(fd)
+
+@contextlib.contextmanager
+def _attach_lock(name: str):
+    """قفل بين العملاء باسم الحلقة (mutex مسمى على Windows، flock على POSIX)"""
+    if sys.platform == 'win32':
+        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        kernel32.CreateMutexW.restype = ctypes.c_void_p
+        kernel32.WaitForSingleObject.argtypes = (ctypes.c_void_p, ctypes.c_uint32)
+        kernel32.ReleaseMutex.argtypes = (ctypes.c_void_p,)
+        kernel32.CloseHandle.argtypes = (ctypes.c_void_p,)
+        handle = kernel32.CreateMutexW(None, False, f"{name}_attach")
+        if not handle:
+            raise OSError(ctypes.get_last_error(), "CreateMutexW failed")
+        try:
+            # WAIT_OBJECT_0 أو WAIT_ABANDONED (عميل مات وهو يحمله): القفل لنا في الحالتين
+            if kernel32.WaitForSingleObject(handle, 5000) not in (0, 0x80):
+                raise TimeoutError("Shared-memory attach lock timed out")
+            try:
+                yield
+            finally:
+                kernel32.ReleaseMutex(handle)
+        finally:
+            kernel32.CloseHandle(handle)
+        return
+
+    import fcntl
+    fd = os.open(os.path.join('/dev/shm', f"{name}.attach"), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)  # يحرر القفل
+
+def _claim_client(view, name: str, timeout: float = 1.0) -> bool:
+    """حجز الحلقة: pid العميل من 0 إلى pid هذه العملية (مقارنة ثم تبديل)
+
+    Python لا يملك CAS على الذاكرة المشتركة، والنواة لا تكتب الحقل إلا من CLIENT_CLOSING
+    إلى 0، لذلك المقارنة والكتابة تحت قفل بين العملاء تكافئ CAS: عميل واحد فقط يرتبط.
+    """
+    deadline = time.monotonic() + timeout
+    with _attach_lock(name):
+        client_pid = _PID.unpack_from(view, CLIENT_PID_OFFSET)[0]
+        # العميل السابق يغلق: الخادم يفرغ الحلقتين ثم يعيد الحقل إلى 0
+        while client_pid == CLIENT_CLOSING and time.monotonic() < deadline:
+            time.sleep(0.001)
+            client_pid = _PID.unpack_from(view, CLIENT_PID_OFFSET)[0]
+        if client_pid != 0:
+            return False
+        _PID.pack_into(view, CLIENT_PID_OFFSET, os.getpid())
+        return True
+
+# على معالج واحد الدوران يمنع الطرف الآخر من العمل: التنازل والنوم مباشرة،
+# والانتظار في النواة (TCP) أسرع من الاستطلاع، لذلك الاختيار التلقائي يبقى على TCP
+SHARED_MEMORY_PREFERRED = (os.cpu_count() or 1) > 1
+_SPIN_LIMIT = 200 if SHARED_MEMORY_PREFERRED else 0
+_YIELD_LIMIT = _SPIN_LIMIT + (2000 if _SPIN_LIMIT else 20)
+
+def _backoff(spins: int):
+    """انتظار الطرف الآخر: دوران قصير، ثم التنازل عن المعالج، ثم نوم قصير"""
+    if spins < _SPIN_LIMIT:
+        return
+    if spins < _YIELD_LIMIT:
+        time.sleep(0)
+    else:
+        time.sleep(0.00005)
+
+class SpscRing:
+    """حلقة بايتات بمنتج واحد ومستهلك واحد بدون أقفال
+
+    head يكتبه المنتج فقط وtail يكتبه المستهلك فقط، وكلاهما عداد 64 بت لا يلتف.
+    المؤشر يُنشر بعد نسخ البيانات (ترتيب الكتابة في x86 يكفي).
+    """
+
+    def __init__(self, buffer: memoryview, offset: int, capacity: int):
+        if capacity & (capacity - 1):
+            raise ValueError("Ring capacity must be a power of two")
+        self.buffer = buffer
+        self.head_offset = offset
+        self.tail_offset = offset + TAIL_OFFSET
+        self.data_offset = offset + RING_HEADER_SIZE
+        self.capacity = capacity
+        self.mask = capacity - 1
+
+    def _indices(self):
+        return (_INDEX.unpack_from(self.buffer, self.head_offset)[0],
+                _INDEX.unpack_from(self.buffer, self.tail_offset)[0])
+
+    def readable(self) -> int:
+        head, tail = self._indices()
+        return head - tail
+
+    def write(self, data) -> int:
+        """كتابة ما يتسع من البيانات: عدد البايتات المكتوبة"""
+        head, tail = self._indices()
+        count = min(self.capacity - (head - tail), len(data))
+        if count <= 0:
+            return 0
+        start = head & self.mask
+        first = min(count, self.capacity - start)
+        base = self.data_offset
+        self.buffer[base + start:base + start + first] = data[:first]
+        if count > first:
+            self.buffer[base:base + count - first] = data[first:count]
+        _INDEX.pack_into(self.buffer, self.head_offset, head + count)
+        return count
+
+    def read(self, size: int) -> bytes:
+        """قراءة حتى size بايت من المتاح"""
+        head, tail = self._indices()
+        count = min(head - tail, size)
+        if count <= 0:
+            return b''
+        start = tail & self.mask
+        first = min(count, self.capacity - start)
+        base = self.data_offset
+        data = bytes(self.buffer[base + start:base + start + first])
+        if count > first:
+            data += bytes(self.buffer[base:base + count - first])
+        _INDEX.pack_into(self.buffer, self.tail_offset, tail + count)
+        return data
+
+    def reset(self):
+        _INDEX.pack_into(self.buffer, self.head_offset, 0)
+        _INDEX.pack_into(self.buffer, self.tail_offset, 0)
+
+class RingSocket:
+    """طرف اتصال فوق حلقتي الذاكرة المشتركة بواجهة المقبس التي تستخدمها PipelinedChannel
+
+    عميل واحد في كل مرة (pid العميل في الرأس). الخادم ينشئ الملف بـ create()،
+    والعميل يرتبط بـ attach() التي تعيد None إن لم يكن الخادم يدعم الذاكرة المشتركة.
+    """
+
+    def __init__(self, segment: mmap.mmap, name: str, is_server: bool):
+        self.segment = segment
+        self.name = name
+        self.is_server = is_server
+        self.view = memoryview(segment)
+        capacity = SEGMENT_HEADER.unpack_from(self.view)[2]
+        requests = SpscRing(self.view, SEGMENT_HEADER_SIZE, capacity)
+        responses = SpscRing(self.view, SEGMENT_HEADER_SIZE + RING_HEADER_SIZE + capacity, capacity)
+        self.incoming, self.outgoing = (requests, responses) if is_server else (responses, requests)
+        self.closed = False
+
+    @classmethod
+    def create(cls, name: str, capacity: int = RING_CAPACITY) -> 'RingSocket':
+        """إنشاء الملف (طرف الخادم)"""
+        segment = _open_segment(name, segment_size(capacity), create=True)
+        SEGMENT_HEADER.pack_into(segment, 0, RING_MAGIC, RING_VERSION, capacity, 0, os.getpid())
+        ring = cls(segment, name, is_server=True)
+        ring.incoming.reset()
+        ring.outgoing.reset()
+        return ring
+
+    @classmethod
+    def attach(cls, name: str) -> Optional['RingSocket']:
+        """الارتباط بملف خادم قائم (طرف العميل)؛ None إن لم يوجد أو كان مشغولاً"""
+        segment = None
+        try:
+            segment = _open_segment(name, SEGMENT_HEADER_SIZE, create=False)
+            if segment is None:
+                return None
+            magic, version, capacity, client_pid, server_pid = SEGMENT_HEADER.unpack_from(segment)
+            segment.close()
+            if magic != RING_MAGIC or version != RING_VERSION or not server_pid:
+                return None
+            segment = _open_segment(name, segment_size(capacity), create=False)
+            if segment is None:
+                return None
+            if not _claim_client(segment, name):
+                # عميل آخر مرتبط
+                segment.close()
+                return None
+        except (OSError, ValueError):
+            if segment is not None:
+                segment.close()
+            return None
+        return cls(segment, name, is_server=False)
+
+    def _peer_alive(self) -> bool:
+        if self.is_server:
+            return self.client_attached()
+        return _PID.unpack_from(self.view, SERVER_PID_OFFSET)[0] != 0
+
+    def client_attached(self) -> bool:
+        return _PID.unpack_from(self.view, CLIENT_PID_OFFSET)[0] not in (0, CLIENT_CLOSING)
+
+    def client_closing(self) -> bool:
+        return _PID.unpack_from(self.view, CLIENT_PID_OFFSET)[0] == CLIENT_CLOSING
+
+    def sendall(self, data):
+        view = memoryview(data)
+        spins = 0
+        while view:
+            if self.closed or not self._peer_alive():
+                raise ConnectionError("Shared-memory peer closed")
+            written = self.outgoing.write(view)
+            if written:
+                view = view[written:]
+                spins = 0
+            else:
+                # الحلقة ممتلئة: الطرف الآخر لم يقرأ بعد
+                spins += 1
+                _backoff(spins)
+
+    def wait_readable(self, timeout: Optional[float] = None) -> bool:
+        """انتظار بيانات أو إغلاق الطرف الآخر (True إن كان recv لن ينتظر)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        spins = 0
+        while not self.incoming.readable():
+            if self.closed or not self._peer_alive():
+                return True
+            if deadline is not None and spins & 63 == 0 and time.monotonic() >= deadline:
+                return False
+            spins += 1
+            _backoff(spins)
+        return True
+
+    def recv(self, size: int) -> bytes:
+        """مثل socket.recv: ينتظر بايتاً واحداً على الأقل، وb'' عند الإغلاق"""
+        while True:
+            self.wait_readable()
+            data = self.incoming.read(size)
+            if data or self.closed or not self._peer_alive():
+                return data
+
+    def settimeout(self, timeout):
+        pass  # الانتظار عبر wait_readable
+
+    def setsockopt(self, *args):
+        pass
+
+    def shutdown(self, how=None):
+        self.closed = True
+
+    def reset(self):
+        """الخادم: تجهيز الحلقتين للعميل التالي (بعد أن يغلق العميل الحالي)"""
+        self.incoming.reset()
+        self.outgoing.reset()
+        _PID.pack_into(self.view, CLIENT_PID_OFFSET, 0)
+
+    def close(self):
+        if self.segment is None:
+            return
+        self.closed = True
+        if self.is_server:
+            _PID.pack_into(self.view, SERVER_PID_OFFSET, 0)
+        else:
+            _PID.pack_into(self.view, CLIENT_PID_OFFSET, CLIENT_CLOSING)
+        self.incoming = self.outgoing = None
+        self.view.release()
+        self.segment.close()
+        self.segment = None
+        if self.is_server and sys.platform != 'win32':
+            for path in (self.name, f"{self.name}.attach"):
+                try:
+                    os.unlink(os.path.join('/dev/shm', path))
+                except OSError:
+                    pass
+
+class LatencyHistogram:
+    """مدرج زمن الاستجابة بفئات لوغاريتمية (ميكروثانية)"""
+
+    BOUNDS_US = (5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+    def __init__(self):
+        self.samples: List[float] = []
+
+    def record(self, seconds: float):
+        self.samples.append(seconds * 1e6)
+
+    def percentile(self, percent: float) -> float:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+    def buckets(self) -> List[tuple]:
+        """(الحد الأعلى، العدد) لكل فئة؛ الأخيرة بدون حد"""
+        counts = [0] * (len(self.BOUNDS_US) + 1)
+        for sample in self.samples:
+            index = 0
+            while index < len(self.BOUNDS_US) and sample > self.BOUNDS_US[index]:
+                index += 1
+            counts[index] += 1
+        return list(zip(self.BOUNDS_US + (None,), counts))
+
+    def summary(self) -> dict:
+        return {
+            'count': len(self.samples),
+            'p50_us': self.percentile(50),
+            'p90_us': self.percentile(90),
+            'p99_us': self.percentile(99),
+            'max_us': max(self.samples) if self.samples else 0.0,
+        }
+
+    def render(self, width: int = 40) -> str:
+        total = max(1, len(self.samples))
+        lines = []
+        lower = 0
+        for bound, count in self.buckets():
+            label = f"{lower:>5}-{bound:<5}us" if bound else f"{lower:>5}+     us"
+            lines.append(f"  {label} {'#' * round(width * count / total):<{width}} {count}")
+            lower = bound
+        return '\n'.join(lines)
+
+def _run_stand_in(path: str, base: int, ready, stop):
+    """عملية الطرف الآخر: خادم التحكم البديل على TCP والذاكرة المشتركة"""
+    from ControlChannel import StandInControlServer
+    from MemoryBackends import DumpFileBackend
+
+    backend = DumpFileBackend(path, base)
+    server = StandInControlServer(backend)
+    server.serve_ring(ring_name(server.port))
+    ready.put(server.port)
+    stop.wait()
+    server.close()
+    backend.close()
+
+def benchmark_transports(port: int, address: int, commands: int = 3000) -> dict:
+    """زمن الرحلة لكل أمر (قراءة 12 بايت، عمق 1) لكل وسيلة نقل"""
+    controller_module = __import__('deepseek_python_20251209_8e4673')
+    results = {}
+    for label, options in (('tcp (legacy)', {'pipelined': False}),
+                           ('tcp (pipelined)', {'transport': 'tcp'}),
+                           ('shared memory', {'transport': 'shm'})):
+        controller = controller_module.CPPController(port=port, **options)
+        if not controller.connect():
+            continue
+        histogram = LatencyHistogram()
+        for _ in range(commands):
+            start_time = time.perf_counter()
+            data = controller.read_memory(address, 12)
+            histogram.record(time.perf_counter() - start_time)
+        assert data is not None and len(data) == 12
+        results[label] = histogram
+        controller.disconnect()
+    return results
+
+# اختبار النظام
+if __name__ == "__main__":
+    import multiprocessing
+    from MemoryBackends import build_synthetic_image, SYNTHETIC_BASE, SYNTHETIC_PLAYER_PED
+
+    # الحلقة: التفاف عند نهاية المخزن وامتلاء
+    buffer = memoryview(bytearray(RING_HEADER_SIZE + 16))
+    ring = SpscRing(buffer, 0, 16)
+    assert ring.write(b'0123456789') == 10 and ring.read(8) == b'01234567'
+    assert ring.write(b'abcdefghijklmnop') == 14 and ring.readable() == 16
+    assert ring.read(100) == b'89abcdefghijklmn' and ring.write(b'') == 0
+
+    if sys.platform != 'win32' and not os.path.isdir('/dev/shm'):
+        print("⚠ /dev/shm not available, skipping transport benchmark")
+        sys.exit(0)
+
+    path = build_synthetic_image()
+    ready = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    peer = multiprocessing.Process(target=_run_stand_in, args=(path, SYNTHETIC_BASE, ready, stop), daemon=True)
+    peer.start()
+    port = ready.get(timeout=30)
+
+    try:
+        # الاختيار التلقائي: الذاكرة المشتركة عند توفرها (وعلى أكثر من معالج)
+        controller_module = __import__('deepseek_python_20251209_8e4673')
+        controller = controller_module.CPPController(port=port)
+        assert controller.connect()
+        assert (type(controller.socket).__name__ == 'RingSocket') == SHARED_MEMORY_PREFERRED
+        assert controller.get_local_player_position() == (512.5, -1024.25, 12.0)
+        controller.disconnect()
+        # بدون خادم ذاكرة مشتركة: TCP
+        assert RingSocket.attach(ring_name(port + 1)) is None
+        # عميل واحد فقط يحجز الحلقة، والتالي ينتظر تفريغها بعد الإغلاق
+        first = RingSocket.attach(ring_name(port))
+        assert first is not None and RingSocket.attach(ring_name(port)) is None
+        assert not _claim_client(first.view, first.name, timeout=0)
+        first.close()
+        second = RingSocket.attach(ring_name(port))
+        assert second is not None
+        second.close()
+        print("✓ Shared-memory attach is exclusive")
+
+        for label, histogram in benchmark_transports(port, SYNTHETIC_PLAYER_PED + 0x14).items():
+            info = histogram.summary()
+            print(f"{label}: p50 {info['p50_us']:.1f} us, p90 {info['p90_us']:.1f} us, "
+                  f"p99 {info['p99_us']:.1f} us, max {info['max_us']:.0f} us")
+            print(histogram.render())
+    finally:
+        stop.set()
+        peer.join(timeout=5)
+        os.unlink(path)
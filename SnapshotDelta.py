@@ -0,0 +1,481 @@
+import math
+import socket
+import struct
+from typing import Dict, List, Optional, Tuple
+
+from NetworkProtocol import (PacketType, encode_message, decode_message, make_message,
+                             wire_size)
+
+# حدود خريطة Vice City (X, Y, Z) بالأمتار
+MAP_BOUNDS = ((-3000.0, 3000.0), (-3000.0, 3000.0), (-200.0, 800.0))
+
+# دقة السرعة: 1/100 متر في الثانية (int16)
+VELOCITY_SCALE = 100.0
+
+# ترتيب الحقول في اللقطة المكممة
+FIELD_NAMES = (
+    'pos_x', 'pos_y', 'pos_z',
+    'rot_x', 'rot_y', 'rot_z',
+    'vel_x', 'vel_y', 'vel_z',
+    'animation', 'health', 'armor', 'weapon',
+)
+FIELD_COUNT = len(FIELD_NAMES)
+
+# تنسيق كل حقل عند الإرسال الكامل
+FULL_FORMATS = ('H', 'H', 'H', 'H', 'H', 'H', 'h', 'h', 'h', 'H', 'B', 'B', 'B')
+
+# مجموعات الحقول التي يمكن إرسال فرقها كبايت واحد (int8)
+GROUPS = ((0, 3), (3, 6), (6, 9))
+SMALL_FLAGS = (1 << 13, 1 << 14, 1 << 15)
+CHANGED_MASK = (1 << FIELD_COUNT) - 1
+KEYFRAME_MASK = CHANGED_MASK
+
+# الحقول الدائرية (الزوايا) تلتف عند 16 بت
+WRAPPING_FIELDS = (3, 4, 5)
+
+# baseline = 0 تعني لقطة كاملة (keyframe)
+KEYFRAME = 0
+MAX_BASELINE_DISTANCE = 48
+DECODER_HISTORY = 64
+
+# هياكل مترجمة لكل قناع (تبنى عند أول استخدام)
+_struct_cache: Dict[int, struct.Struct] = {}
+
+def _mask_struct(mask: int) -> struct.Struct:
+    """الحصول على هيكل البيانات لقناع معين"""
+    cached = _struct_cache.get(mask)
+    if cached is None:
+        fmt = ['<']
+        for index in range(FIELD_COUNT):
+            if not mask & (1 << index):
+                continue
+            code = FULL_FORMATS[index]
+            for group, flag in zip(GROUPS, SMALL_FLAGS):
+                if group[0] <= index < group[1] and mask & flag:
+                    code = 'b'
+            fmt.append(code)
+        cached = _struct_cache[mask] = struct.Struct(''.join(fmt))
+    return cached
+
+def _quantize(value: float, low: float, high: float) -> int:
+    """تكميم قيمة ضمن مجال إلى 16 بت"""
+    if value <= low:
+        return 0
+    if value >= high:
+        return 0xFFFF
+    return int((value - low) * 0xFFFF / (high - low) + 0.5)
+
+def _dequantize(value: int, low: float, high: float) -> float:
+    return low + value * (high - low) / 0xFFFF
+
+def quantize_angle(degrees: float) -> int:
+    """تكميم زاوية (بالدرجات) إلى 16 بت"""
+    return int(round((degrees % 360.0) * 65536.0 / 360.0)) & 0xFFFF
+
+def dequantize_angle(value: int) -> float:
+    degrees = value * 360.0 / 65536.0
+    return degrees - 360.0 if degrees >= 180.0 else degrees
+
+def _quantize_velocity(value: float) -> int:
+    return max(-32768, min(32767, int(round(value * VELOCITY_SCALE))))
+
+def quantize_snapshot(position, rotation, velocity, animation=0, health=100,
+                      armor=0, weapon=0) -> tuple:
+    """تحويل حالة اللاعب إلى لقطة مكممة"""
+    return (
+        _quantize(position[0], *MAP_BOUNDS[0]),
+        _quantize(position[1], *MAP_BOUNDS[1]),
+        _quantize(position[2], *MAP_BOUNDS[2]),
+        quantize_angle(rotation[0]),
+        quantize_angle(rotation[1]),
+        quantize_angle(rotation[2]),
+        _quantize_velocity(velocity[0]),
+        _quantize_velocity(velocity[1]),
+        _quantize_velocity(velocity[2]),
+        int(animation) & 0xFFFF,
+        max(0, min(255, int(health))),
+        max(0, min(255, int(armor))),
+        int(weapon) & 0xFF,
+    )
+
+def dequantize_snapshot(snapshot: tuple) -> dict:
+    """تحويل لقطة مكممة إلى حالة لاعب"""
+    return {
+        'position': (
+            _dequantize(snapshot[0], *MAP_BOUNDS[0]),
+            _dequantize(snapshot[1], *MAP_BOUNDS[1]),
+            _dequantize(snapshot[2], *MAP_BOUNDS[2]),
+        ),
+        'rotation': (
+            dequantize_angle(snapshot[3]),
+            dequantize_angle(snapshot[4]),
+            dequantize_angle(snapshot[5]),
+        ),
+        'velocity': (
+            snapshot[6] / VELOCITY_SCALE,
+            snapshot[7] / VELOCITY_SCALE,
+            snapshot[8] / VELOCITY_SCALE,
+        ),
+        'animation': snapshot[9],
+        'health': snapshot[10],
+        'armor': snapshot[11],
+        'weapon': snapshot[12],
+    }
+
+def _field_delta(index: int, new: int, old: int) -> int:
+    """الفرق بين قيمتين (مع الالتفاف للزوايا)"""
+    delta = new - old
+    if index in WRAPPING_FIELDS:
+        delta = ((delta + 0x8000) & 0xFFFF) - 0x8000
+    return delta
+
+def encode_delta(snapshot: tuple, baseline: Optional[tuple]) -> Tuple[int, bytes]:
+    """ترميز لقطة مقارنة بلقطة أساس: (القناع، البيانات)"""
+    if baseline is None:
+        return KEYFRAME_MASK, _mask_struct(KEYFRAME_MASK).pack(*snapshot)
+
+    mask = 0
+    deltas = [0] * FIELD_COUNT
+    for index in range(FIELD_COUNT):
+        if snapshot[index] != baseline[index]:
+            mask |= 1 << index
+            deltas[index] = _field_delta(index, snapshot[index], baseline[index])
+
+    # فروق صغيرة في مجموعة كاملة ترسل كبايت واحد لكل حقل
+    for (start, end), flag in zip(GROUPS, SMALL_FLAGS):
+        changed = [i for i in range(start, end) if mask & (1 << i)]
+        if changed and all(-128 <= deltas[i] <= 127 for i in changed):
+            mask |= flag
+
+    values = []
+    for index in range(FIELD_COUNT):
+        if not mask & (1 << index):
+            continue
+        small = any(start <= index < end and mask & flag
+                    for (start, end), flag in zip(GROUPS, SMALL_FLAGS))
+        values.append(deltas[index] if small else snapshot[index])
+
+    return mask, _mask_struct(mask).pack(*values)
+
+def decode_delta(mask: int, data, baseline: Optional[tuple]) -> Optional[tuple]:
+    """فك لقطة باستخدام لقطة الأساس"""
+    layout = _mask_struct(mask)
+    if len(data) < layout.size:
+        return None
+    values = iter(layout.unpack_from(data))
+
+    snapshot = list(baseline) if baseline is not None else [0] * FIELD_COUNT
+    for index in range(FIELD_COUNT):
+        if not mask & (1 << index):
+            continue
+        value = next(values)
+        small = any(start <= index < end and mask & flag
+                    for (start, end), flag in zip(GROUPS, SMALL_FLAGS))
+        if small:
+            value = snapshot[index] + value
+            if index in WRAPPING_FIELDS:
+                value &= 0xFFFF
+        snapshot[index] = value
+
+    return tuple(snapshot)
+
+def _sequence_distance(newer: int, older: int) -> int:
+    return (newer - older) & 0xFFFF
+
+class SnapshotEncoder:
+    """مرمز لقطات لتيار واحد (لاعب -> مستقبل)"""
+
+    def __init__(self, keyframe_interval: int = 40):
+        self.keyframe_interval = keyframe_interval
+        self.sequence = 0
+        self.history: Dict[int, tuple] = {}
+        self.acked_sequence: Optional[int] = None
+        self.sends_since_keyframe = 0
+
+    def acknowledge(self, sequence: int):
+        """تسجيل تأكيد استلام لقطة من المستقبل"""
+        if sequence not in self.history:
+            return
+        if self.acked_sequence is not None and \
+                _sequence_distance(sequence, self.acked_sequence) > 0x7FFF:
+            return  # تأكيد قديم
+        self.acked_sequence = sequence
+
+        # حذف اللقطات الأقدم من المؤكدة
+        for old in [s for s in self.history
+                    if _sequence_distance(sequence, s) <= 0x7FFF and s != sequence]:
+            del self.history[old]
+
+    def _baseline(self) -> Optional[tuple]:
+        """لقطة الأساس المؤكدة إن كانت صالحة"""
+        if self.acked_sequence is None:
+            return None
+        distance = _sequence_distance(self.sequence + 1, self.acked_sequence)
+        if distance > MAX_BASELINE_DISTANCE:
+            return None
+        return self.history.get(self.acked_sequence)
+
+    def encode(self, snapshot: tuple, delta_cache: Optional[dict] = None) -> Optional[Tuple[int, int, int, bytes]]:
+        """ترميز لقطة: (التسلسل، مسافة الأساس، القناع، البيانات) أو None إن لم يتغير شيء"""
+        baseline = self._baseline()
+
+        # المستقبل يملك هذه الحالة بالفعل
+        if baseline is not None and baseline == snapshot:
+            return None
+
+        if baseline is None or self.sends_since_keyframe >= self.keyframe_interval:
+            baseline = None
+            self.sends_since_keyframe = 0
+        else:
+            self.sends_since_keyframe += 1
+
+        self.sequence = (self.sequence + 1) & 0xFFFF
+        self.history[self.sequence] = snapshot
+
+        # الحد من حجم السجل إذا توقفت التأكيدات
+        if len(self.history) > MAX_BASELINE_DISTANCE * 2:
+            for old in sorted(self.history, key=lambda s: _sequence_distance(self.sequence, s),
+                              reverse=True)[:len(self.history) - MAX_BASELINE_DISTANCE]:
+                del self.history[old]
+
+        # المستقبلون الذين يشتركون في نفس الأساس يحصلون على نفس الفرق
+        if delta_cache is None:
+            mask, data = encode_delta(snapshot, baseline)
+        else:
+            delta = delta_cache.get(baseline)
+            if delta is None:
+                delta = delta_cache[baseline] = encode_delta(snapshot, baseline)
+            mask, data = delta
+        distance = KEYFRAME if baseline is None else \
+            _sequence_distance(self.sequence, self.acked_sequence)
+        return self.sequence, distance, mask, data
+
+class SnapshotDecoder:
+    """مفكك لقطات لتيار واحد عند المستقبل"""
+
+    def __init__(self):
+        self.history: Dict[int, tuple] = {}
+        self.latest_sequence: Optional[int] = None
+        self.decoded_since_ack = 0
+
+    def decode(self, sequence: int, baseline_distance: int, mask: int, data) -> Optional[tuple]:
+        """فك لقطة، أو None إن كانت قديمة أو أساسها مفقود"""
+        if self.latest_sequence is not None and \
+                _sequence_distance(sequence, self.latest_sequence) > 0x7FFF:
+            return None  # وصلت بعد لقطة أحدث
+
+        baseline = None
+        if baseline_distance != KEYFRAME:
+            baseline = self.history.get((sequence - baseline_distance) & 0xFFFF)
+            if baseline is None:
+                return None
+
+        snapshot = decode_delta(mask, data, baseline)
+        if snapshot is None:
+            return None
+
+        self.history[sequence] = snapshot
+        self.latest_sequence = sequence
+        self.decoded_since_ack += 1
+
+        if len(self.history) > DECODER_HISTORY:
+            for old in [s for s in self.history
+                        if _sequence_distance(sequence, s) >= DECODER_HISTORY]:
+                del self.history[old]
+
+        return snapshot
+
+class SnapshotStreams:
+    """إدارة تيارات اللقطات: مرمز لكل (لاعب، مستقبل) ومفكك لكل (لاعب، مرسل)"""
+
+    def __init__(self, keyframe_interval: int = 40, ack_interval: int = 4):
+        self.keyframe_interval = keyframe_interval
+        self.ack_interval = ack_interval
+        self.encoders: Dict[tuple, SnapshotEncoder] = {}
+        self.decoders: Dict[tuple, SnapshotDecoder] = {}
+
+    def encode(self, subject_id: int, receiver, packet) -> Optional[bytes]:
+        """ترميز حالة لاعب لمستقبل معين (None = لا حاجة للإرسال)"""
+        snapshot = quantize_snapshot(packet.position, packet.rotation, packet.velocity,
+                                     packet.animation, packet.health, packet.armor,
+                                     packet.weapon)
+        return self._encode_for(subject_id, receiver, snapshot, packet.timestamp)
+
+    def encode_many(self, subject_id: int, receivers, packet) -> List[Tuple[bytes, tuple]]:
+        """ترميز حالة لاعب لعدة مستقبلين: تكميم مرة واحدة وفرق واحد لكل أساس مشترك"""
+        snapshot = quantize_snapshot(packet.position, packet.rotation, packet.velocity,
+                                     packet.animation, packet.health, packet.armor,
+                                     packet.weapon)
+        delta_cache = {}
+        outgoing = []
+        for receiver in receivers:
+            data = self._encode_for(subject_id, receiver, snapshot, packet.timestamp, delta_cache)
+            if data:
+                outgoing.append((data, receiver))
+        return outgoing
+
+    def _encode_for(self, subject_id: int, receiver, snapshot: tuple, timestamp: int,
+                    delta_cache: Optional[dict] = None) -> Optional[bytes]:
+        """ترميز لقطة مكممة عبر مرمز المستقبل"""
+        key = (subject_id, receiver)
+        encoder = self.encoders.get(key)
+        if encoder is None:
+            encoder = self.encoders[key] = SnapshotEncoder(self.keyframe_interval)
+
+        encoded = encoder.encode(snapshot, delta_cache)
+        if encoded is None:
+            return None
+
+        sequence, baseline, mask, data = encoded
+        return encode_message(make_message(
+            PacketType.POSITION_DELTA,
+            player_id=subject_id,
+            timestamp=timestamp,
+            sequence=sequence,
+            baseline=baseline,
+            mask=mask,
+            data=data
+        ))
+
+    def decode(self, message, sender) -> Tuple[Optional[tuple], Optional[int]]:
+        """فك رسالة POSITION_DELTA إلى PositionMessage، مع رقم تسلسل للتأكيد إن حان وقته"""
+        key = (message.player_id, sender)
+        decoder = self.decoders.get(key)
+        if decoder is None:
+            decoder = self.decoders[key] = SnapshotDecoder()
+
+        snapshot = decoder.decode(message.sequence, message.baseline, message.mask, message.data)
+        if snapshot is None:
+            return None, None
+
+        ack = None
+        if message.baseline == KEYFRAME or decoder.decoded_since_ack >= self.ack_interval:
+            decoder.decoded_since_ack = 0
+            ack = message.sequence
+
+        state = dequantize_snapshot(snapshot)
+        return make_message(PacketType.POSITION, player_id=message.player_id,
+                            timestamp=message.timestamp, **state), ack
+
+    def make_ack(self, local_player_id: int, subject_id: int, sequence: int) -> bytes:
+        """ترميز رسالة تأكيد"""
+        return encode_message(make_message(
+            PacketType.SNAPSHOT_ACK,
+            player_id=local_player_id,
+            subject_id=subject_id,
+            sequence=sequence
+        ))
+
+    def acknowledge(self, subject_id: int, receiver, sequence: int):
+        """تطبيق تأكيد وارد من مستقبل"""
+        encoder = self.encoders.get((subject_id, receiver))
+        if encoder:
+            encoder.acknowledge(sequence)
+
+    def forget(self, player_id: int = None, peer=None):
+        """حذف التيارات الخاصة بلاعب أو عنوان بعد الانفصال"""
+        for table in (self.encoders, self.decoders):
+            for key in [k for k in table if k[0] == player_id or k[1] == peer]:
+                del table[key]
+
+def _synthetic_state(kind: str, player: int, tick: int, rate: int) -> tuple:
+    """حالة لاعب اصطناعية: واقف، يمشي، أو يقود"""
+    t = tick / rate
+    origin_x = -1500.0 + (player % 8) * 300.0
+    origin_y = -1500.0 + (player // 8) * 300.0
+
+    if kind == 'idle':
+        return (origin_x, origin_y, 10.0), (0.0, 0.0, 45.0), (0.0, 0.0, 0.0), 0
+
+    if kind == 'walking':
+        speed, radius = 1.5, 40.0
+    else:
+        speed, radius = 25.0, 400.0
+
+    angle = speed * t / radius
+    position = (origin_x + radius * math.cos(angle), origin_y + radius * math.sin(angle), 10.0)
+    velocity = (-speed * math.sin(angle), speed * math.cos(angle), 0.0)
+    heading = math.degrees(angle) + 90.0
+    return position, (0.0, 0.0, heading), velocity, 1 if kind == 'walking' else 0
+
+def benchmark_loopback(players: int = 32, seconds: float = 10.0, rate: int = 20) -> dict:
+    """قياس البايتات لكل لاعب في الثانية عبر loopback (لقطات كاملة مقابل المضغوطة)"""
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(('127.0.0.1', 0))
+    sender.bind(('127.0.0.1', 0))
+    receiver.settimeout(1.0)
+    sender.setblocking(False)
+    receiver_addr = receiver.getsockname()
+    sender_addr = sender.getsockname()
+
+    kinds = ('idle', 'walking', 'driving')
+    streams_out = SnapshotStreams()
+    streams_in = SnapshotStreams()
+    ticks = int(seconds * rate)
+    delta_bytes = 0
+    ack_bytes = 0
+    datagrams = 0
+    max_error = 0.0
+
+    try:
+        for tick in range(ticks):
+            for player in range(players):
+                position, rotation, velocity, animation = \
+                    _synthetic_state(kinds[player % 3], player, tick, rate)
+                packet = make_message(PacketType.POSITION, player_id=player + 1,
+                                      timestamp=tick * 1000 // rate, position=position,
+                                      rotation=rotation, velocity=velocity,
+                                      animation=animation, health=100, armor=0, weapon=0)
+
+                data = streams_out.encode(player + 1, receiver_addr, packet)
+                if data is None:
+                    continue
+                sender.sendto(data, receiver_addr)
+                delta_bytes += len(data)
+                datagrams += 1
+
+                received, _ = receiver.recvfrom(2048)
+                _, message, _ = decode_message(received)
+                state, ack = streams_in.decode(message, sender_addr)
+                if state is not None:
+                    max_error = max(max_error, *(abs(a - b) for a, b in zip(state.position, position)))
+                if ack is not None:
+                    ack_data = streams_in.make_ack(0, message.player_id, ack)
+                    receiver.sendto(ack_data, sender_addr)
+                    ack_bytes += len(ack_data)
+
+            # معالجة التأكيدات المتراكمة مرة كل نبضة
+            while True:
+                try:
+                    received, _ = sender.recvfrom(2048)
+                except BlockingIOError:
+                    break
+                _, ack_message, _ = decode_message(received)
+                streams_out.acknowledge(ack_message.subject_id, receiver_addr, ack_message.sequence)
+    finally:
+        sender.close()
+        receiver.close()
+
+    full_bytes = wire_size(PacketType.POSITION) * players * ticks
+    divisor = players * seconds
+    return {
+        'players': players,
+        'full_bytes_per_player_sec': full_bytes / divisor,
+        'delta_bytes_per_player_sec': delta_bytes / divisor,
+        'ack_bytes_per_player_sec': ack_bytes / divisor,
+        'reduction': full_bytes / max(1, delta_bytes),
+        'datagrams_per_player_sec': datagrams / divisor,
+        'max_position_error': max_error,
+    }
+
+# اختبار النظام
+if __name__ == "__main__":
+    for players in (16, 32):
+        results = benchmark_loopback(players=players)
+        print(f"{players} players (idle/walking/driving mix):")
+        print(f"  Full POSITION: {results['full_bytes_per_player_sec']:,.0f} B/player/s")
+        print(f"  Delta:         {results['delta_bytes_per_player_sec']:,.0f} B/player/s "
+              f"(+{results['ack_bytes_per_player_sec']:,.0f} B/s acks upstream from receiver)")
+        print(f"  Reduction:     {results['reduction']:.1f}x, "
+              f"max position error {results['max_position_error']:.3f} m")
@@ -0,0 +1,356 @@
+import math
+import random
+from collections import deque
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+from JitterBuffer import InterpolationBuffer, MAX_EXTRAPOLATION, _wrap_angle
+
+# أقل تغيير يستحق الإرسال لكل حقل (الحقول غير المذكورة تُقارن بالمساواة)
+DEFAULT_EPSILONS = {
+    'position': 0.02,   # وحدة لعبة
+    'rotation': 0.5,    # درجة
+    'velocity': 0.5,    # وحدة/ثانية (المستقبل يتنبأ بالموقع، فتذبذب السرعة الصغير لا يهم)
+}
+# حقول الزوايا: الفرق يُحسب مع الالتفاف حول 360
+ANGLE_FIELDS = {'rotation'}
+
+def _field_changed(old, new, epsilon: Optional[float], angle: bool) -> bool:
+    if epsilon is None:
+        return old != new
+    if isinstance(new, (tuple, list)):
+        pairs = zip(old, new)
+    else:
+        pairs = ((old, new),)
+    for a, b in pairs:
+        delta = abs(b - a)
+        if angle:
+            delta = abs((delta + 180.0) % 360.0 - 180.0)
+        if delta > epsilon:
+            return True
+    return False
+
+class MotionEstimator:
+    """سرعة خطية وسرعة دوران (yaw) ناعمة من مواقع مؤرخة في حلقة صغيرة
+
+    الميل بانحدار خطي (أقل مربعات) على آخر size قراءات خلال window ثانية:
+    يخفف تذبذب القراءات وتوقيت النبضات. قفزة أسرع من max_speed (انتقال فوري) تفرغ الحلقة،
+    وسرعة أقل من min_speed (ضجيج float أثناء الوقوف) تُعتبر صفراً.
+    """
+
+    def __init__(self, size: int = 5, window: float = 0.3, max_speed: float = 150.0,
+                 min_speed: float = 0.1):
+        self.window = window
+        self.max_speed = max_speed
+        self.min_speed = min_speed
+        self.samples = deque(maxlen=size)  # (الزمن، x، y، z، yaw بدون التفاف)
+        self.velocity = (0.0, 0.0, 0.0)
+        self.yaw_rate = 0.0
+        self.resets = 0
+
+    def update(self, now: float, position, yaw: float = 0.0) -> Tuple[Tuple[float, float, float], float]:
+        """إضافة قراءة وإرجاع (السرعة، سرعة الدوران بالدرجات/ثانية)"""
+        samples = self.samples
+        if samples:
+            last = samples[-1]
+            dt = now - last[0]
+            if dt <= 0:
+                return self.velocity, self.yaw_rate
+            if math.dist(position, last[1:4]) / dt > self.max_speed:
+                samples.clear()
+                self.resets += 1
+            else:
+                # الزاوية متصلة عبر 360 لحساب الميل
+                yaw = last[4] + _wrap_angle(yaw - last[4])
+        while samples and now - samples[0][0] > self.window:
+            samples.popleft()
+        samples.append((now, position[0], position[1], position[2], yaw))
+
+        if len(samples) < 2:
+            self.velocity, self.yaw_rate = (0.0, 0.0, 0.0), 0.0
+            return self.velocity, self.yaw_rate
+
+        count = len(samples)
+        mean_t = sum(sample[0] for sample in samples) / count
+        variance = sum((sample[0] - mean_t) ** 2 for sample in samples)
+        slopes = []
+        for column in range(1, 5):
+            mean = sum(sample[column] for sample in samples) / count
+            slopes.append(sum((sample[0] - mean_t) * (sample[column] - mean) for sample in samples) / variance)
+        self.velocity = (slopes[0], slopes[1], slopes[2])
+        if math.hypot(*self.velocity) < self.min_speed:
+            self.velocity = (0.0, 0.0, 0.0)
+        self.yaw_rate = slopes[3]
+        return self.velocity, self.yaw_rate
+
+class StateSampler:
+    """مرحلة بين قراءة اللاعب المحلي والإرسال: تتخطى الحالات المكررة وتكيّف معدل القراءة
+
+    - الإرسال فقط إذا تجاوز حقل ما حده عن آخر حالة مرسلة، أو مر keepalive منذ آخر إرسال.
+      الموقع يُقارن بتنبؤ المستقبل (آخر موقع مرسل + السرعة × الزمن) إن كان motion مفعلاً،
+      ولا يتجاوز الصمت أثناء الحركة max_prediction (حد تنبؤ مخزن التذبذب).
+    - السرعة في الحالة تُملأ من MotionEstimator.
+    - معدل القراءة: tick_rate أثناء الحركة السريعة أو الدوران الحاد، moving_rate أثناء الحركة،
+      idle_rate بعد idle_after ثانية بدون تغيير (قائمة، وقوف).
+    النبضة الخارجية تعمل بـ tick_rate وتسأل due() قبل قراءة الذاكرة.
+    """
+
+    def __init__(self, tick_rate: float = 40.0, moving_rate: float = 20.0, idle_rate: float = 5.0,
+                 keepalive: float = 1.0, fast_speed: float = 10.0, idle_after: float = 0.5,
+                 epsilons: Dict[str, float] = None, motion: bool = True,
+                 fast_yaw_rate: float = 90.0, max_prediction: float = MAX_EXTRAPOLATION):
+        self.tick_rate = tick_rate
+        self.moving_rate = moving_rate
+        self.idle_rate = idle_rate
+        self.keepalive = keepalive
+        self.fast_speed = fast_speed  # وحدة/ثانية: أعلى من الركض
+        self.fast_yaw_rate = fast_yaw_rate  # درجة/ثانية
+        self.idle_after = idle_after
+        self.motion = MotionEstimator() if motion else None
+        self.max_prediction = max_prediction
+        self.epsilons = DEFAULT_EPSILONS if epsilons is None else epsilons
+        # هامش نصف نبضة: تذبذب المؤقت لا يؤخر القراءة نبضة كاملة
+        self.tolerance = 0.5 / tick_rate
+
+        self.last_sent: Optional[dict] = None
+        self.last_sent_time = 0.0
+        self.last_position = None
+        self.last_sample_time = None
+        self.last_change_time = None
+        self.yaw_rate = 0.0
+        self.next_sample = 0.0
+        self.mode = 'moving'
+        self.speed = 0.0
+
+        # إحصائيات
+        self.samples = 0
+        self.sends = 0
+        self.suppressed = 0
+        self.keepalives = 0
+
+    def due(self, now: float) -> bool:
+        """هل حان وقت قراءة الحالة في هذه النبضة"""
+        return now >= self.next_sample - self.tolerance
+
+    def predicted_position(self, now: float):
+        """موقع اللاعب كما يتنبأ به المستقبل من آخر حالة مرسلة"""
+        last = self.last_sent
+        velocity = last.get('velocity') if self.motion else None
+        if not velocity:
+            return last['position']
+        dt = min(now - self.last_sent_time, self.max_prediction)
+        return tuple(p + v * dt for p, v in zip(last['position'], velocity))
+
+    def changed(self, state: dict, now: Optional[float] = None) -> bool:
+        """هل تختلف الحالة عن آخر حالة مرسلة (أو عن التنبؤ بها) بأكثر من الحدود"""
+        last = self.last_sent
+        if last is None:
+            return True
+        epsilons = self.epsilons
+        for key, value in state.items():
+            if key not in last:
+                return True
+            old = last[key]
+            if key == 'position' and now is not None:
+                old = self.predicted_position(now)
+            if _field_changed(old, value, epsilons.get(key), key in ANGLE_FIELDS):
+                return True
+        return False
+
+    def offer(self, state: dict, now: float) -> bool:
+        """تسجيل قراءة (تُملأ سرعتها): True إن يجب إرسالها"""
+        self.samples += 1
+
+        position = state.get('position')
+        if position is not None and self.motion is not None:
+            rotation = state.get('rotation') or (0.0, 0.0, 0.0)
+            velocity, self.yaw_rate = self.motion.update(now, position, rotation[2])
+            state['velocity'] = velocity
+            self.speed = math.hypot(*velocity)
+        elif position is not None and self.last_position is not None and now > self.last_sample_time:
+            self.speed = math.dist(position, self.last_position) / (now - self.last_sample_time)
+        self.last_position = position
+        self.last_sample_time = now
+
+        changed = self.changed(state, now)
+        if not changed and self.motion is not None and self.speed > 0.0 and \
+                now - self.last_sent_time >= self.max_prediction:
+            # المستقبل توقف عن التنبؤ: حالة جديدة قبل أن يتجمد اللاعب عنده
+            changed = True
+        if changed:
+            self.last_change_time = now
+        keepalive = not changed and now - self.last_sent_time >= self.keepalive
+
+        # المعدل التالي حسب الحركة
+        if self.speed >= self.fast_speed or abs(self.yaw_rate) >= self.fast_yaw_rate:
+            self.mode, rate = 'fast', self.tick_rate
+        elif self.last_change_time is not None and now - self.last_change_time < self.idle_after:
+            self.mode, rate = 'moving', self.moving_rate
+        else:
+            self.mode, rate = 'idle', self.idle_rate
+
+        send = changed or keepalive
+        if send:
+            self.last_sent = dict(state)
+            self.last_sent_time = now
+            self.sends += 1
+            self.keepalives += keepalive
+        else:
+            self.suppressed += 1
+
+        # القراءة التالية لا تتأخر عن موعد keepalive
+        self.next_sample = min(now + 1.0 / rate, self.last_sent_time + self.keepalive)
+        return send
+
+    def summary(self) -> dict:
+        return {
+            'samples': self.samples,
+            'sends': self.sends,
+            'suppressed': self.suppressed,
+            'keepalives': self.keepalives,
+            'mode': self.mode,
+        }
+
+def synthetic_trace(rate: float = 40.0, seed: int = 3) -> List[Tuple[float, str, dict]]:
+    """جلسة لعب اصطناعية: (الزمن، المرحلة، الحالة) بمعدل rate
+
+    قائمة، مشي، قيادة، انعطاف بالسيارة، وقوف (مع ضجيج أقل من الحدود في القراءات).
+    """
+    rng = random.Random(seed)
+    # (المرحلة، المدة، السرعة، الانعطاف بالدرجات/ثانية، الحركة)
+    phases = [('menu', 20.0, 0.0, 0.0, 0), ('walking', 20.0, 1.6, 0.0, 1), ('driving', 20.0, 28.0, 0.0, 0),
+              ('cornering', 10.0, 20.0, 45.0, 0), ('standing', 20.0, 0.0, 0.0, 0)]
+    trace = []
+    x, y, heading = 100.0, -250.0, 0.0
+    t = 0.0
+    for phase, duration, speed, turn, animation in phases:
+        end = t + duration
+        while t < end - 1e-9:
+            if speed:
+                heading = (heading + (turn + rng.uniform(-20.0, 20.0)) / rate) % 360.0
+                x += math.cos(math.radians(heading)) * speed / rate
+                y += math.sin(math.radians(heading)) * speed / rate
+            noise = rng.uniform(-1e-4, 1e-4)  # قيم float تتذبذب في آخر الخانات
+            trace.append((t, phase, {
+                'position': (x + noise, y - noise, 10.0),
+                'rotation': (0.0, 0.0, heading + noise),
+                'velocity': (0, 0, 0),
+                'animation': animation,
+                'health': 100,
+                'armor': 0,
+                'weapon': 0,
+                'vehicle_model': 400 if phase in ('driving', 'cornering') else 0,
+            }))
+            t += 1.0 / rate
+    return trace
+
+def replay_trace(trace, sampler: Optional[StateSampler], baseline_rate: float = 20.0) -> dict:
+    """تشغيل الأثر عبر المُعاين (أو الإرسال الثابت كل 1/baseline_rate إن كان None)"""
+    next_send = 0.0
+    sent = []
+    sends_by_phase: Dict[str, int] = {}
+    received = None
+    last_send = 0.0
+    max_gap = 0.0
+    max_error = 0.0
+
+    for now, phase, state in trace:
+        state = dict(state)  # المُعاين يملأ السرعة
+        if sampler is None:
+            send = now >= next_send - 1e-9
+            if send:
+                next_send += 1.0 / baseline_rate
+        else:
+            send = sampler.due(now) and sampler.offer(state, now)
+
+        if send:
+            sends_by_phase[phase] = sends_by_phase.get(phase, 0) + 1
+            max_gap = max(max_gap, now - last_send)
+            last_send = now
+            received = state
+            sent.append((now, state))
+
+        # خطأ المستقبل في الوقوف والقائمة: ما يعرفه عن الموقع مقابل الحقيقي
+        if received is not None and phase in ('menu', 'standing'):
+            max_error = max(max_error, math.dist(received['position'], state['position']))
+
+    return {
+        'sends': len(sent),
+        'sends_by_phase': sends_by_phase,
+        'sent': sent,
+        'keepalives': sampler.keepalives if sampler else 0,
+        'max_gap': max_gap,
+        'idle_error': max_error,
+    }
+
+def render_error(trace, sent, latency_ticks: int = 1, rate: float = 40.0) -> Dict[str, Tuple[float, float]]:
+    """خطأ الموقع المعروض عند المستقبل (مخزن التذبذب) مقابل الحقيقي: (المتوسط، الأقصى) لكل مرحلة"""
+    buffer = InterpolationBuffer()
+    delay_ticks = latency_ticks + round(buffer.delay * rate)
+    arrivals = {}
+    for sent_at, state in sent:
+        arrivals.setdefault(round(sent_at * rate) + latency_ticks, []).append((sent_at, state))
+
+    errors: Dict[str, List[float]] = {}
+    for tick, (now, phase, state) in enumerate(trace):
+        for sent_at, packet_state in arrivals.get(tick, ()):
+            buffer.push(1, SimpleNamespace(timestamp=int(round(sent_at * 1000)), **packet_state), now)
+        rendered = buffer.sample(1, now)
+        if rendered is None or tick < delay_ticks:
+            continue
+        # المعروض الآن يقابل حالة المرسل قبل (التأخير + زمن الوصول)
+        truth = trace[tick - delay_ticks][2]['position']
+        errors.setdefault(phase, []).append(math.dist(rendered[0], truth))
+    return {phase: (sum(values) / len(values), max(values)) for phase, values in errors.items()}
+
+# اختبار النظام
+if __name__ == "__main__":
+    sampler = StateSampler()
+    state = {'position': (1.0, 2.0, 3.0), 'rotation': (0.0, 0.0, 359.9), 'animation': 0}
+    assert sampler.offer(state, 0.0)  # أول حالة تُرسل دائماً
+    assert not sampler.changed({**state, 'position': (1.01, 2.0, 3.0)})
+    assert not sampler.changed({**state, 'rotation': (0.0, 0.0, 0.2)})  # عبر 360
+    assert sampler.changed({**state, 'animation': 1})
+    assert not sampler.offer(state, 0.5) and sampler.offer(state, 1.0)  # keepalive
+
+    # المقدر على مسارات معروفة: خط مستقيم، دائرة، توقف، انتقال فوري
+    estimator = MotionEstimator()
+    for tick in range(10):
+        velocity, yaw_rate = estimator.update(tick / 40, (3.0 * tick / 40, -4.0 * tick / 40, 10.0), 350.0 + tick)
+    assert math.dist(velocity, (3.0, -4.0, 0.0)) < 1e-6 and abs(yaw_rate - 40.0) < 1e-6  # عبر 360
+    worst = 0.0
+    for tick in range(200):
+        t = tick / 40
+        angle = 20.0 * t / 60.0  # 20 وحدة/ث على دائرة نصف قطرها 60
+        velocity, _ = estimator.update(0.25 + t, (60 * math.cos(angle), 60 * math.sin(angle), 0.0))
+        if tick >= 5:
+            worst = max(worst, math.dist(velocity, (-20 * math.sin(angle), 20 * math.cos(angle), 0.0)))
+    assert estimator.resets == 1 and worst < 0.5  # القفزة إلى الدائرة أفرغت الحلقة
+    for tick in range(12):
+        velocity, _ = estimator.update(20 + tick / 40, (1.0, 1.0, 1.0))
+    assert velocity == (0.0, 0.0, 0.0)
+    print(f"✓ Motion estimator: circle velocity error <= {worst:.3f} units/s")
+
+    trace = synthetic_trace()
+    configs = [('fixed 20 Hz', None), ('sampler', StateSampler(motion=False)),
+               ('sampler + motion', StateSampler())]
+    print(f"{'':<17}{'packets':>8}" + ''.join(f"{phase:>20}" for phase in
+                                              ('menu', 'walking', 'driving', 'cornering', 'standing')))
+    results = {}
+    for name, sampler in configs:
+        result = results[name] = replay_trace(trace, sampler)
+        errors = result['errors'] = render_error(trace, result['sent'])
+        print(f"{name:<17}{result['sends']:8d}" + ''.join(
+            f"{result['sends_by_phase'].get(phase, 0):5d} {errors[phase][0]:6.3f}/{errors[phase][1]:5.2f}"
+            for phase in ('menu', 'walking', 'driving', 'cornering', 'standing')))
+    print("  (per phase: packets, mean/max rendered position error)")
+
+    fixed, motion = results['fixed 20 Hz'], results['sampler + motion']
+    sampler = configs[-1][1]
+    assert motion['max_gap'] <= sampler.keepalive + 1.0 / sampler.tick_rate + 1e-9
+    assert motion['sends_by_phase']['menu'] <= 22  # keep-alive فقط
+    assert motion['idle_error'] <= DEFAULT_EPSILONS['position']
+    assert motion['sends'] < fixed['sends'] * 0.5
+    for phase in ('walking', 'driving', 'cornering'):
+        # متوسط خطأ العرض ضمن حد الموقع رغم الحزم الأقل
+        assert motion['errors'][phase][0] <= DEFAULT_EPSILONS['position'], phase
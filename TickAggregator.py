@@ -0,0 +1,186 @@
+import math
+import socket
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from NetworkProtocol import PacketType, make_message, iter_messages
+from SnapshotDelta import SnapshotStreams
+from FanOut import FanOutSender
+
+# أقل من MTU الإنترنت الشائع (1500) بعد رؤوس IP/UDP وهامش للأنفاق
+MAX_DATAGRAM_SIZE = 1200
+
+def pack_datagrams(messages: Iterable[bytes], limit: int = MAX_DATAGRAM_SIZE) -> List[bytes]:
+    """تجميع رسائل مرمزة في أقل عدد من الحزم دون تجاوز الحد"""
+    datagrams = []
+    current = []
+    size = 0
+    for message in messages:
+        if current and size + len(message) > limit:
+            datagrams.append(b''.join(current))
+            current = []
+            size = 0
+        current.append(message)
+        size += len(message)
+    if current:
+        datagrams.append(b''.join(current))
+    return datagrams
+
+class TickAggregator:
+    """تجميع آخر حالة لكل لاعب خلال النبضة وإرسال حزمة واحدة لكل عميل"""
+
+    def __init__(self, max_datagram: int = MAX_DATAGRAM_SIZE):
+        self.max_datagram = max_datagram
+        self.latest: Dict[int, tuple] = {}  # player_id -> (packet, source_addr)
+        self.dirty: Set[int] = set()  # اللاعبون الذين وصل تحديثهم في هذه النبضة
+
+        # إحصائيات
+        self.updates = 0
+        self.overwritten = 0
+        self.datagrams = 0
+
+    def update(self, player_id: int, packet, source: Optional[tuple] = None):
+        """تسجيل حالة لاعب (التحديث الأحدث يستبدل الأقدم في نفس النبضة)"""
+        if player_id in self.dirty:
+            self.overwritten += 1
+        self.latest[player_id] = (packet, source)
+        self.dirty.add(player_id)
+        self.updates += 1
+
+    def forget(self, player_id: int):
+        """حذف حالة لاعب منفصل"""
+        self.latest.pop(player_id, None)
+        self.dirty.discard(player_id)
+
+    def build(self, recipients: Dict[tuple, int], streams: SnapshotStreams,
+              interest=None) -> List[Tuple[bytes, tuple]]:
+        """بناء حزم النبضة: recipients = {العنوان: رقم اللاعب}"""
+        dirty, self.dirty = self.dirty, set()
+        if not recipients:
+            return []
+
+        # بدون إدارة اهتمام: اللاعبون المحدثون فقط لكل المستقبلين
+        # مع إدارة الاهتمام: آخر حالة معروفة لكل لاعب، والمستقبلون حسب المسافة
+        subjects = self.latest if interest else {player_id: self.latest[player_id]
+                                                 for player_id in dirty if player_id in self.latest}
+
+        per_recipient: Dict[tuple, List[bytes]] = {addr: [] for addr in recipients}
+        for subject_id, (packet, source) in subjects.items():
+            is_dirty = subject_id in dirty
+            receivers = [addr for addr, player_id in recipients.items()
+                         if addr != source and player_id != subject_id and
+                         (interest is None or interest.should_send(player_id, subject_id, is_dirty))]
+            if not receivers:
+                continue
+            for data, addr in streams.encode_many(subject_id, receivers, packet):
+                per_recipient[addr].append(data)
+
+        outgoing = []
+        for addr, messages in per_recipient.items():
+            for datagram in pack_datagrams(messages, self.max_datagram):
+                outgoing.append((datagram, addr))
+
+        self.datagrams += len(outgoing)
+        return outgoing
+
+def _position_packet(player: int, tick: int, rate: int):
+    """حزمة موقع اصطناعية للاختبار"""
+    angle = (tick + player * 7) / rate
+    return make_message(PacketType.POSITION, player_id=player + 1,
+                        timestamp=tick * 1000 // rate,
+                        position=(100.0 * math.cos(angle) + player, 100.0 * math.sin(angle), 10.0),
+                        rotation=(0.0, 0.0, math.degrees(angle)),
+                        velocity=(1.0, 1.0, 0.0),
+                        animation=1, health=100, armor=0, weapon=0)
+
+def benchmark_aggregation(client_counts=(4, 8, 16, 32, 64), ticks: int = 100,
+                          rate: int = 20, updates_per_tick: int = 1) -> dict:
+    """مقارنة إعادة البث لكل حزمة مع التجميع لكل نبضة (حزم وزمن نظام في الثانية عند السيرفر)"""
+    results = {}
+    seconds = ticks / rate
+
+    for count in client_counts:
+        clients = []
+        for _ in range(count):
+            client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            client.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+            client.bind(('127.0.0.1', 0))
+            client.setblocking(False)
+            clients.append(client)
+        recipients = {client.getsockname(): player + 1 for player, client in enumerate(clients)}
+        sources = list(recipients)
+
+        row = {}
+        for mode in ('per_packet', 'aggregated'):
+            host = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            host.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4 * 1024 * 1024)
+            host.bind(('127.0.0.1', 0))
+            streams = SnapshotStreams()
+            sender = FanOutSender(host)
+            aggregator = TickAggregator()
+            received = 0
+            messages = 0
+            max_size = 0
+
+            for tick in range(ticks):
+                for _ in range(updates_per_tick):
+                    for player, source in enumerate(sources):
+                        packet = _position_packet(player, tick, rate)
+                        if mode == 'per_packet':
+                            receivers = [addr for addr in sources if addr != source]
+                            sender.queue_batch(streams.encode_many(packet.player_id, receivers, packet))
+                            sender.flush()
+                        else:
+                            aggregator.update(packet.player_id, packet, source)
+
+                if mode == 'aggregated':
+                    sender.queue_batch(aggregator.build(recipients, streams))
+                    sender.flush()
+
+                # المستقبلون يؤكدون آخر لقطة ويقرؤون ما وصلهم
+                for encoder in streams.encoders.values():
+                    encoder.acknowledge(encoder.sequence)
+                for client in clients:
+                    try:
+                        while True:
+                            data = client.recv(2048)
+                            received += 1
+                            max_size = max(max_size, len(data))
+                            messages += sum(1 for _ in iter_messages(data))
+                    except BlockingIOError:
+                        pass
+
+            row[mode] = {
+                'datagrams_per_sec': sender.datagrams / seconds,
+                'syscalls_per_sec': sender.syscalls / seconds,
+                'received': received,
+                'messages': messages,
+                'max_datagram': max_size,
+                'overwritten': aggregator.overwritten,
+            }
+            host.close()
+
+        for client in clients:
+            client.close()
+        results[count] = row
+
+    return results
+
+# اختبار النظام
+if __name__ == "__main__":
+    assert [len(d) for d in pack_datagrams([b'x' * 500] * 5, 1200)] == [1000, 1000, 500]
+
+    print(f"{'clients':>7}  {'per-packet dgram/s':>18}  {'aggregated dgram/s':>18}  "
+          f"{'ratio':>6}  {'syscalls/s':>16}  {'max bytes':>9}")
+    for count, row in benchmark_aggregation().items():
+        before = row['per_packet']
+        after = row['aggregated']
+        print(f"{count:>7}  {before['datagrams_per_sec']:>18,.0f}  {after['datagrams_per_sec']:>18,.0f}  "
+              f"{before['datagrams_per_sec'] / max(1, after['datagrams_per_sec']):>5.1f}x  "
+              f"{before['syscalls_per_sec']:>7,.0f}/{after['syscalls_per_sec']:<7,.0f}  "
+              f"{after['max_datagram']:>9}")
+        assert before['messages'] == after['messages'], (before['messages'], after['messages'])
+
+    # تحديثان لكل لاعب في النبضة: الأحدث يستبدل الأقدم
+    row = benchmark_aggregation(client_counts=(8,), ticks=20, updates_per_tick=2)[8]
+    print(f"2 updates/tick, 8 clients: {row['aggregated']['overwritten']} overwritten, "
+          f"{row['aggregated']['messages']} vs {row['per_packet']['messages']} messages delivered")
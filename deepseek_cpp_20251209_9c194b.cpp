@@ -6,12 +6,15 @@
 #include <ws2tcpip.h>
 #include <stdio.h>
 #include <stdlib.h>
+#include <string.h>
+#include <math.h>
 #include <vector>
 #include <string>
 #include <thread>
 #include <atomic>
 #include <mutex>
 #include <map>
+#include <memory>
 #include <fstream>
 #include <json/json.h>
 
@@ -24,6 +27,21 @@
 
 #define CONTROL_PORT 52525  // منفذ التحكم المحلي
 #define MAX_PACKET_SIZE 4096
+#define PIPELINE_FLAG 0x80000000  // أمر مؤطر برقم طلب: [الأمر|العلم][رقم الطلب][الحجم] + البيانات
+
+// ذاكرة مشتركة بحلقتي SPSC (طلبات، ردود) بنفس الأوامر المؤطرة - نفس تخطيط SharedRing.py
+#define RING_MAGIC 0x42524C56  // 'VLRB'
+#define RING_VERSION 1
+#define RING_CAPACITY (1 << 16)
+#define RING_SEGMENT_HEADER 64
+#define RING_HEADER 128  // head عند +0 وtail عند +64
+#define RING_CLIENT_CLOSING 0xFFFFFFFF
+
+// البث: CMD_SUBSCRIBE [النوع][الأعلام][المعدل Hz:f][حد تغير الموقع:f][مهلة الإبقاء ms] -> [رقم الاشتراك]
+// ثم إطارات CMD_STATE_PUSH بالرأس المؤطر ورقم الطلب = رقم الاشتراك
+#define STREAM_LOCAL_PLAYER 1
+#define SUBSCRIBE_ON_CHANGE 0x1
+#define ROTATION_EPSILON 0.5f
 
 // أنواع أوامر التحكم
 enum ControlCommand {
@@ -36,7 +54,11 @@ enum ControlCommand {
     CMD_REMOVE_PLAYER = 7,
     CMD_UPDATE_PLAYER = 8,
     CMD_READ_MEMORY = 9,
-    CMD_WRITE_MEMORY = 10
+    CMD_WRITE_MEMORY = 10,
+    CMD_BATCH = 11,  // عدة أوامر في إطار واحد ورد واحد بحالة لكل أمر
+    CMD_SUBSCRIBE = 12,
+    CMD_UNSUBSCRIBE = 13,
+    CMD_STATE_PUSH = 14  // من الخادم فقط
 };
 
 // هيكل أوفسيت الذاكرة
@@ -55,6 +77,33 @@ struct ControlResponse {
     BYTE data[MAX_PACKET_SIZE - 12];
 };
 
+// رأس ملف الذاكرة المشتركة
+struct RingSegmentHeader {
+    DWORD magic;
+    DWORD version;
+    DWORD capacity;
+    volatile DWORD clientPid;  // RING_CLIENT_CLOSING: العميل أغلق والخادم يفرغ الحلقتين
+    volatile DWORD serverPid;
+};
+
+// رأس رد الأمر المؤطر (أول 12 بايت كالرأس القديم + رقم الطلب)
+struct PipelinedResponseHeader {
+    DWORD command;
+    DWORD status;
+    DWORD dataSize;
+    DWORD requestId;
+};
+
+// إطار حالة اللاعب المحلي (40 بايت)
+struct LocalPlayerFrame {
+    DWORD sequence;
+    DWORD tickMs;
+    float position[3];
+    float rotation[3];
+    DWORD vehicle;
+    int animation;
+};
+
 // ============================================
 // فئة مدير الذاكرة المتكامل
 // ============================================
@@ -154,6 +203,23 @@ public:
         return bytesWritten;
     }
     
+    // حالة اللاعب المحلي بقراءتين: المؤشر ثم كائن اللاعب حتى 0x5A4
+    bool ReadLocalPlayerState(LocalPlayerFrame* frame) {
+        DWORD pointer = 0;
+        if (ReadMemory(GetOffsetAddress("player_ped_ptr"), 4, (BYTE*)&pointer) != 4 || !pointer) {
+            return false;
+        }
+        BYTE ped[0x5A4];
+        if (ReadMemory(pointer, sizeof(ped), ped) != sizeof(ped)) {
+            return false;
+        }
+        memcpy(frame->position, ped + 0x14, 12);
+        memcpy(frame->rotation, ped + 0x20, 12);
+        frame->vehicle = *(DWORD*)(ped + 0x58C);
+        frame->animation = *(int*)(ped + 0x5A0);
+        return true;
+    }
+    
     DWORD GetOffsetAddress(const std::string& offsetName) {
         auto it = memoryOffsets.find(offsetName);
         if (it != memoryOffsets.end()) {
@@ -271,17 +337,53 @@ public:
 // فئة خادم التحكم المحلي
 // ============================================
 
+// عميل تحكم: الردود وإطارات البث تُرسل من عدة خيوط عبر sendMutex
+struct ControlClient {
+    SOCKET socket;  // INVALID_SOCKET: عميل الذاكرة المشتركة
+    std::mutex sendMutex;
+    bool open;
+    
+    ControlClient(SOCKET s) : socket(s), open(true) {}
+};
+
+struct Subscription {
+    std::shared_ptr<ControlClient> client;
+    DWORD flags;
+    DWORD intervalMs;
+    float epsilon;
+    DWORD keepaliveMs;
+    DWORD nextDue;
+    DWORD lastSent;
+    DWORD sequence;
+    bool hasLast;
+    LocalPlayerFrame last;
+};
+
 class ControlServer {
 private:
     SOCKET controlSocket;
     std::thread serverThread;
     std::atomic<bool> running;
     
+    // النقل عبر الذاكرة المشتركة (اختياري)
+    HANDLE ringMapping;
+    BYTE* ringView;
+    std::thread ringThread;
+    std::shared_ptr<ControlClient> ringClient;
+    
+    // اشتراكات البث وخيط الدفع
+    std::mutex subscriptionMutex;
+    std::map<DWORD, Subscription> subscriptions;
+    DWORD nextSubscriptionId;
+    std::thread pushThread;
+    
     IntegratedMemoryManager* memoryManager;
     
 public:
     ControlServer(IntegratedMemoryManager* memMgr) 
-        : controlSocket(INVALID_SOCKET), running(false), memoryManager(memMgr) {}
+        : controlSocket(INVALID_SOCKET), running(false), ringMapping(NULL), ringView(nullptr),
+          nextSubscriptionId(1),
+          memoryManager(memMgr) {}
     
     ~ControlServer() {
         Stop();
@@ -315,6 +417,10 @@ public:
         
         running = true;
         serverThread = std::thread(&ControlServer::ServerLoop, this);
+        pushThread = std::thread(&ControlServer::PushLoop, this);
+        
+        // بدون الذاكرة المشتركة يبقى TCP وحده
+        StartSharedRing();
         
         return true;
     }
@@ -331,6 +437,12 @@ public:
             serverThread.join();
         }
         
+        if (pushThread.joinable()) {
+            pushThread.join();
+        }
+        
+        StopSharedRing();
+        
         WSACleanup();
     }
     
@@ -344,6 +456,10 @@ public:
                 continue;
             }
             
+            // بدون Nagle: الردود الصغيرة لا تنتظر
+            BOOL noDelay = TRUE;
+            setsockopt(clientSocket, IPPROTO_TCP, TCP_NODELAY, (char*)&noDelay, sizeof(noDelay));
+            
             // معالجة الاتصال في خيط منفصل
             std::thread clientThread(&ControlServer::HandleClient, this, clientSocket);
             clientThread.detach();
@@ -353,15 +469,392 @@ public:
     void HandleClient(SOCKET clientSocket) {
         char buffer[MAX_PACKET_SIZE];
         int bytesReceived;
+        std::vector<char> pending;  // أوامر مؤطرة غير مكتملة
+        std::vector<char> replies;
+        std::shared_ptr<ControlClient> client = std::make_shared<ControlClient>(clientSocket);
         
         while ((bytesReceived = recv(clientSocket, buffer, MAX_PACKET_SIZE, 0)) > 0) {
-            ControlResponse response = ProcessCommand(buffer, bytesReceived);
-            send(clientSocket, (char*)&response, 12 + response.dataSize, 0);
+            if (pending.empty() && (bytesReceived < 4 || !(*(DWORD*)buffer & PIPELINE_FLAG))) {
+                // الصيغة القديمة: أمر واحد لكل recv
+                ControlResponse response = ProcessCommand(buffer, bytesReceived);
+                SendToClient(client.get(), (char*)&response, 12 + response.dataSize);
+                continue;
+            }
+            
+            // الصيغة المؤطرة: قد تحمل القراءة عدة أوامر أو جزءاً من أمر
+            pending.insert(pending.end(), buffer, buffer + bytesReceived);
+            bool valid = ProcessFrames(pending, replies, client);
+            
+            // كل ردود القراءة في إرسال واحد
+            if (!SendToClient(client.get(), replies.data(), replies.size()) || !valid) {
+                break;
+            }
         }
         
+        CloseClient(client);
         closesocket(clientSocket);
     }
     
+    // إرسال إلى عميل (مقبس أو الحلقة 1)؛ false إن أُغلق
+    bool SendToClient(ControlClient* client, const char* data, size_t size) {
+        std::lock_guard<std::mutex> lock(client->sendMutex);
+        if (!client->open) {
+            return false;
+        }
+        if (client->socket == INVALID_SOCKET) {
+            return RingWrite(data, size);
+        }
+        size_t sent = 0;
+        while (sent < size) {
+            int result = send(client->socket, data + sent, (int)(size - sent), 0);
+            if (result <= 0) {
+                return false;
+            }
+            sent += result;
+        }
+        return true;
+    }
+    
+    // إلغاء اشتراكات العميل ومنع أي إرسال إليه بعد الآن
+    void CloseClient(const std::shared_ptr<ControlClient>& client) {
+        {
+            std::lock_guard<std::mutex> lock(subscriptionMutex);
+            for (auto it = subscriptions.begin(); it != subscriptions.end();) {
+                if (it->second.client == client) {
+                    it = subscriptions.erase(it);
+                } else {
+                    ++it;
+                }
+            }
+        }
+        std::lock_guard<std::mutex> lock(client->sendMutex);
+        client->open = false;
+    }
+    
+    ControlResponse Subscribe(const std::shared_ptr<ControlClient>& client, const char* payload, DWORD size) {
+        ControlResponse response = {0};
+        response.command = CMD_SUBSCRIBE;
+        if (size < 20) {
+            return response;
+        }
+        DWORD stream = *(DWORD*)payload;
+        float rate = *(float*)(payload + 8);
+        if (stream != STREAM_LOCAL_PLAYER || !(rate > 0.0f && rate <= 1000.0f)) {
+            return response;
+        }
+        
+        Subscription subscription = {};
+        subscription.client = client;
+        subscription.flags = *(DWORD*)(payload + 4);
+        subscription.intervalMs = (DWORD)(1000.0f / rate);
+        subscription.epsilon = *(float*)(payload + 12);
+        subscription.keepaliveMs = *(DWORD*)(payload + 16);
+        subscription.nextDue = GetTickCount();
+        
+        std::lock_guard<std::mutex> lock(subscriptionMutex);
+        DWORD id = nextSubscriptionId++;
+        subscriptions[id] = subscription;
+        *(DWORD*)response.data = id;
+        response.dataSize = 4;
+        response.status = 0x00000001;
+        return response;
+    }
+    
+    ControlResponse Unsubscribe(const std::shared_ptr<ControlClient>& client, const char* payload, DWORD size) {
+        ControlResponse response = {0};
+        response.command = CMD_UNSUBSCRIBE;
+        if (size < 4) {
+            return response;
+        }
+        std::lock_guard<std::mutex> lock(subscriptionMutex);
+        auto it = subscriptions.find(*(DWORD*)payload);
+        if (it != subscriptions.end() && it->second.client == client) {
+            subscriptions.erase(it);
+            response.status = 0x00000001;
+        }
+        return response;
+    }
+    
+    static bool StateChanged(const Subscription& subscription, const LocalPlayerFrame& frame) {
+        if (!subscription.hasLast) {
+            return true;
+        }
+        const LocalPlayerFrame& last = subscription.last;
+        for (int i = 0; i < 3; i++) {
+            if (fabsf(frame.position[i] - last.position[i]) > subscription.epsilon ||
+                fabsf(frame.rotation[i] - last.rotation[i]) > ROTATION_EPSILON) {
+                return true;
+            }
+        }
+        return frame.vehicle != last.vehicle || frame.animation != last.animation;
+    }
+    
+    // خيط الدفع: قراءة واحدة للحالة لكل مرور، ثم إطار لكل اشتراك حان وقته
+    void PushLoop() {
+        while (running) {
+            DWORD now = GetTickCount();
+            DWORD wait = 50;
+            std::vector<std::pair<std::shared_ptr<ControlClient>, std::vector<char>>> pushes;
+            {
+                std::lock_guard<std::mutex> lock(subscriptionMutex);
+                LocalPlayerFrame frame = {0};
+                bool haveState = false;
+                bool stateRead = false;
+                for (auto& entry : subscriptions) {
+                    Subscription& subscription = entry.second;
+                    if ((int)(subscription.nextDue - now) > 0) {
+                        DWORD remaining = subscription.nextDue - now;
+                        wait = remaining < wait ? remaining : wait;
+                        continue;
+                    }
+                    subscription.nextDue = now + subscription.intervalMs;
+                    wait = subscription.intervalMs < wait ? subscription.intervalMs : wait;
+                    
+                    if (!stateRead) {
+                        haveState = memoryManager->ReadLocalPlayerState(&frame);
+                        stateRead = true;
+                    }
+                    if (!haveState) {
+                        continue;
+                    }
+                    if ((subscription.flags & SUBSCRIBE_ON_CHANGE) && !StateChanged(subscription, frame) &&
+                        now - subscription.lastSent < subscription.keepaliveMs) {
+                        continue;
+                    }
+                    
+                    frame.sequence = subscription.sequence++;
+                    frame.tickMs = now;
+                    subscription.last = frame;
+                    subscription.hasLast = true;
+                    subscription.lastSent = now;
+                    
+                    PipelinedResponseHeader header = { CMD_STATE_PUSH, 0x00000001, sizeof(frame), entry.first };
+                    std::vector<char> packet((char*)&header, (char*)&header + sizeof(header));
+                    packet.insert(packet.end(), (char*)&frame, (char*)&frame + sizeof(frame));
+                    pushes.push_back(std::make_pair(entry.second.client, packet));
+                }
+            }
+            
+            // الإرسال خارج القفل: الحلقة الممتلئة لا تعطل الاشتراك من عملاء آخرين
+            for (auto& push : pushes) {
+                SendToClient(push.first.get(), push.second.data(), push.second.size());
+            }
+            Sleep(wait ? wait : 1);
+        }
+    }
+    
+    // تنفيذ الأوامر المؤطرة الكاملة في pending وإلحاق ردودها بـ replies
+    bool ProcessFrames(std::vector<char>& pending, std::vector<char>& replies,
+                       const std::shared_ptr<ControlClient>& client) {
+        char buffer[MAX_PACKET_SIZE];
+        replies.clear();
+        size_t offset = 0;
+        bool valid = true;
+        while (pending.size() - offset >= 12) {
+            DWORD command = *(DWORD*)&pending[offset];
+            DWORD requestId = *(DWORD*)&pending[offset + 4];
+            DWORD payloadSize = *(DWORD*)&pending[offset + 8];
+            if (payloadSize > MAX_PACKET_SIZE - 4) {
+                valid = false;
+                break;
+            }
+            if (pending.size() - offset - 12 < payloadSize) {
+                break;
+            }
+            
+            // إعادة بناء الأمر بالصيغة القديمة لـ ProcessCommand
+            *(DWORD*)buffer = command & ~PIPELINE_FLAG;
+            memcpy(buffer + 4, pending.data() + offset + 12, payloadSize);
+            offset += 12 + payloadSize;
+            
+            // الاشتراك مرتبط بالعميل الذي تُدفع إليه الإطارات
+            ControlResponse response;
+            if ((command & ~PIPELINE_FLAG) == CMD_SUBSCRIBE) {
+                response = Subscribe(client, buffer + 4, payloadSize);
+            } else if ((command & ~PIPELINE_FLAG) == CMD_UNSUBSCRIBE) {
+                response = Unsubscribe(client, buffer + 4, payloadSize);
+            } else {
+                response = ProcessCommand(buffer, 4 + payloadSize);
+            }
+            PipelinedResponseHeader header = { command, response.status, response.dataSize, requestId };
+            replies.insert(replies.end(), (char*)&header, (char*)&header + sizeof(header));
+            replies.insert(replies.end(), (char*)response.data, (char*)response.data + response.dataSize);
+        }
+        pending.erase(pending.begin(), pending.begin() + offset);
+        return valid;
+    }
+    
+    bool StartSharedRing() {
+        char name[64];
+        sprintf(name, "vice_line_control_%d", CONTROL_PORT);
+        DWORD size = RING_SEGMENT_HEADER + 2 * (RING_HEADER + RING_CAPACITY);
+        
+        ringMapping = CreateFileMappingA(INVALID_HANDLE_VALUE, NULL, PAGE_READWRITE, 0, size, name);
+        if (!ringMapping) {
+            return false;
+        }
+        ringView = (BYTE*)MapViewOfFile(ringMapping, FILE_MAP_ALL_ACCESS, 0, 0, size);
+        if (!ringView) {
+            CloseHandle(ringMapping);
+            ringMapping = NULL;
+            return false;
+        }
+        
+        memset(ringView, 0, size);
+        RingSegmentHeader* header = (RingSegmentHeader*)ringView;
+        header->magic = RING_MAGIC;
+        header->version = RING_VERSION;
+        header->capacity = RING_CAPACITY;
+        MemoryBarrier();
+        header->serverPid = GetCurrentProcessId();  // العميل يرتبط فقط بعد هذا
+        
+        ringThread = std::thread(&ControlServer::RingLoop, this);
+        return true;
+    }
+    
+    void StopSharedRing() {
+        if (ringThread.joinable()) {
+            ringThread.join();
+        }
+        if (ringView) {
+            ((RingSegmentHeader*)ringView)->serverPid = 0;
+            UnmapViewOfFile(ringView);
+            ringView = nullptr;
+        }
+        if (ringMapping) {
+            CloseHandle(ringMapping);
+            ringMapping = NULL;
+        }
+    }
+    
+    // الحلقة 0: طلبات (Python ينتج)، الحلقة 1: ردود (الخادم ينتج)
+    // head يكتبه المنتج فقط وtail المستهلك فقط، عدادات 64 بت لا تلتف
+    volatile ULONGLONG* RingHead(int ring) {
+        return (volatile ULONGLONG*)(ringView + RING_SEGMENT_HEADER + ring * (RING_HEADER + RING_CAPACITY));
+    }
+    
+    volatile ULONGLONG* RingTail(int ring) {
+        return (volatile ULONGLONG*)((BYTE*)RingHead(ring) + 64);
+    }
+    
+    // في DLL بـ 32 بت قراءة وكتابة ULONGLONG العادية تتم على نصفين فقد يرى الطرف الآخر
+    // عداداً ممزقاً: كلاهما عبر Interlocked (القراءة CAS لا يغير القيمة)
+    ULONGLONG RingLoad(volatile ULONGLONG* counter) {
+        return (ULONGLONG)InterlockedCompareExchange64((volatile LONGLONG*)counter, 0, 0);
+    }
+    
+    void RingStore(volatile ULONGLONG* counter, ULONGLONG value) {
+        InterlockedExchange64((volatile LONGLONG*)counter, (LONGLONG)value);
+    }
+    
+    BYTE* RingData(int ring) {
+        return (BYTE*)RingHead(ring) + RING_HEADER;
+    }
+    
+    void RingBackoff(int spins) {
+        if (spins < 200) {
+            YieldProcessor();
+        } else if (spins < 2200) {
+            SwitchToThread();
+        } else {
+            Sleep(1);
+        }
+    }
+    
+    size_t RingRead(char* buffer, size_t size) {
+        ULONGLONG head = RingLoad(RingHead(0));
+        ULONGLONG tail = RingLoad(RingTail(0));
+        MemoryBarrier();  // البيانات تُقرأ بعد head
+        size_t count = head - tail < size ? (size_t)(head - tail) : size;
+        if (count == 0) {
+            return 0;
+        }
+        
+        size_t start = (size_t)(tail & (RING_CAPACITY - 1));
+        size_t first = count < RING_CAPACITY - start ? count : RING_CAPACITY - start;
+        memcpy(buffer, RingData(0) + start, first);
+        memcpy(buffer + first, RingData(0), count - first);
+        MemoryBarrier();
+        RingStore(RingTail(0), tail + count);
+        return count;
+    }
+    
+    bool RingWrite(const char* data, size_t size) {
+        RingSegmentHeader* header = (RingSegmentHeader*)ringView;
+        size_t written = 0;
+        int spins = 0;
+        while (written < size) {
+            DWORD client = header->clientPid;
+            if (!running || client == 0 || client == RING_CLIENT_CLOSING) {
+                return false;
+            }
+            
+            ULONGLONG head = RingLoad(RingHead(1));
+            ULONGLONG tail = RingLoad(RingTail(1));
+            size_t space = (size_t)(RING_CAPACITY - (head - tail));
+            size_t count = size - written < space ? size - written : space;
+            if (count == 0) {
+                // الحلقة ممتلئة: العميل لم يقرأ بعد
+                RingBackoff(++spins);
+                continue;
+            }
+            
+            size_t start = (size_t)(head & (RING_CAPACITY - 1));
+            size_t first = count < RING_CAPACITY - start ? count : RING_CAPACITY - start;
+            memcpy(RingData(1) + start, data + written, first);
+            memcpy(RingData(1), data + written + first, count - first);
+            MemoryBarrier();  // البيانات قبل نشر head
+            RingStore(RingHead(1), head + count);
+            written += count;
+            spins = 0;
+        }
+        return true;
+    }
+    
+    void RingLoop() {
+        RingSegmentHeader* header = (RingSegmentHeader*)ringView;
+        char buffer[MAX_PACKET_SIZE];
+        std::vector<char> pending;
+        std::vector<char> replies;
+        int spins = 0;
+        
+        while (running) {
+            DWORD client = header->clientPid;
+            if (client == RING_CLIENT_CLOSING) {
+                // العميل أغلق: لا دفع بعد الآن، والحلقتان للعميل التالي
+                if (ringClient) {
+                    CloseClient(ringClient);
+                    ringClient.reset();
+                }
+                RingStore(RingHead(0), 0);
+                RingStore(RingTail(0), 0);
+                RingStore(RingHead(1), 0);
+                RingStore(RingTail(1), 0);
+                pending.clear();
+                MemoryBarrier();
+                InterlockedCompareExchange((volatile LONG*)&header->clientPid, 0, (LONG)RING_CLIENT_CLOSING);
+                continue;
+            }
+            
+            size_t count = client ? RingRead(buffer, sizeof(buffer)) : 0;
+            if (count == 0) {
+                RingBackoff(++spins);
+                continue;
+            }
+            spins = 0;
+            if (!ringClient) {
+                ringClient = std::make_shared<ControlClient>(INVALID_SOCKET);
+            }
+            
+            pending.insert(pending.end(), buffer, buffer + count);
+            if (!ProcessFrames(pending, replies, ringClient) ||
+                !SendToClient(ringClient.get(), replies.data(), replies.size())) {
+                // إطار غير صالح أو العميل أغلق: أوامره المعلقة تنتهي بمهلة
+                pending.clear();
+            }
+        }
+    }
+    
     ControlResponse ProcessCommand(char* buffer, int size) {
         ControlResponse response = {0};
         
@@ -472,6 +965,57 @@ public:
                 break;
             }
             
+            case CMD_BATCH: {
+                // [العدد] ثم لكل أمر: [الأمر:2][الحجم:2][البيانات]
+                // الرد: [عدد المنفذ] ثم لكل أمر: [الحالة:4][الحجم:2][البيانات]
+                if (size < 8) {
+                    break;
+                }
+                DWORD count = *(DWORD*)(buffer + 4);
+                int offset = 8;
+                DWORD resultOffset = 4;
+                DWORD completed = 0;
+                char itemBuffer[MAX_PACKET_SIZE];
+                
+                for (DWORD i = 0; i < count; i++) {
+                    if (offset + 4 > size) {
+                        break;
+                    }
+                    WORD itemCommand = *(WORD*)(buffer + offset);
+                    WORD itemSize = *(WORD*)(buffer + offset + 2);
+                    offset += 4;
+                    if (offset + itemSize > size || itemCommand == CMD_BATCH) {
+                        break;
+                    }
+                    
+                    *(DWORD*)itemBuffer = itemCommand;
+                    memcpy(itemBuffer + 4, buffer + offset, itemSize);
+                    offset += itemSize;
+                    
+                    ControlResponse itemResponse = ProcessCommand(itemBuffer, 4 + itemSize);
+                    DWORD itemStatus = itemResponse.status;
+                    DWORD itemDataSize = itemResponse.dataSize;
+                    if (resultOffset + 6 + itemDataSize > sizeof(response.data)) {
+                        if (resultOffset + 6 > sizeof(response.data)) {
+                            break;
+                        }
+                        // الرد لا يتسع: الأمر نُفذ لكن بدون بيانات
+                        itemStatus = 0x00000000;
+                        itemDataSize = 0;
+                    }
+                    *(DWORD*)(response.data + resultOffset) = itemStatus;
+                    *(WORD*)(response.data + resultOffset + 4) = (WORD)itemDataSize;
+                    memcpy(response.data + resultOffset + 6, itemResponse.data, itemDataSize);
+                    resultOffset += 6 + itemDataSize;
+                    completed++;
+                }
+                
+                *(DWORD*)response.data = completed;
+                response.dataSize = resultOffset;
+                response.status = completed == count ? 0x00000001 : 0x00000000;
+                break;
+            }
+            
             default:
                 response.status = 0xFFFFFFFF; // أمر غير معروف
                 break;
@@ -1,42 +1,26 @@
 import ctypes
-import win32api
-import win32process
-import win32con
-import psutil
 import time
 import struct
 from ctypes import wintypes
 import sys
 import os
+import threading
+from contextlib import contextmanager
 
-# تعريفات Windows API
-kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+from MemoryBackends import (
+    MemoryBackend, DumpFileBackend, find_process_id, open_process_backend,
+    MEM_COMMIT, MEM_RESERVE, MEM_RELEASE, PAGE_READWRITE
+)
+from EntityView import EntityView
+from EntitySlots import FreeSlotMap, scan_free_slots
+from PatternScanner import Signature, compile_signatures, scan
+from OffsetCache import OffsetCache, resolve_offsets
+from RegionMap import RegionMap, PageCache
+from WriteBatch import WriteBatch, WriteMetrics, flush_batch
+from PointerPaths import PointerResolver
 
-# تعريف الهياكل
-class MEMORY_BASIC_INFORMATION(ctypes.Structure):
-    _fields_ = [
-        ("BaseAddress", wintypes.LPVOID),
-        ("AllocationBase", wintypes.LPVOID),
-        ("AllocationProtect", wintypes.DWORD),
-        ("RegionSize", ctypes.c_size_t),
-        ("State", wintypes.DWORD),
-        ("Protect", wintypes.DWORD),
-        ("Type", wintypes.DWORD)
-    ]
-
-class MODULEENTRY32(ctypes.Structure):
-    _fields_ = [
-        ("dwSize", wintypes.DWORD),
-        ("th32ModuleID", wintypes.DWORD),
-        ("th32ProcessID", wintypes.DWORD),
-        ("GlblcntUsage", wintypes.DWORD),
-        ("ProccntUsage", wintypes.DWORD),
-        ("modBaseAddr", wintypes.LPVOID),
-        ("modBaseSize", wintypes.DWORD),
-        ("hModule", wintypes.HMODULE),
-        ("szModule", ctypes.c_char * 256),
-        ("szExePath", ctypes.c_char * 260)
-    ]
+# تعريفات Windows API (غير متوفرة على Linux: الوصول يتم عبر MemoryBackends)
+kernel32 = ctypes.WinDLL('kernel32', use_last_error=True) if sys.platform == "win32" else None
 
 class GTAVCMemoryManager:
     """مدير ذاكرة متقدم لـ GTA Vice City"""
@@ -65,44 +49,62 @@ class GTAVCMemoryManager:
         3: 'DUMMY'
     }
     
-    def __init__(self, process_name="gta-vc.exe"):
+    def __init__(self, process_name="gta-vc.exe", backend: MemoryBackend = None,
+                 offset_cache: OffsetCache = None):
         self.process_name = process_name
+        # نسخة لكل كائن: الأوفست المكتشفة لعملية لا تتسرب إلى غيرها
+        self.MEMORY_OFFSETS = dict(self.MEMORY_OFFSETS)
         self.process_id = None
         self.process_handle = None
         self.base_address = None
         self.modules = {}
         self.is_attached = False
+        # واجهة الذاكرة: عملية Windows أو Linux، أو ملف تفريغ للاختبار
+        self.backend = backend
+        # سجل اللاعب المحلي (يُعاد استخدامه في كل قراءة)
+        self._player_view = EntityView()
+        # خريطة الفتحات الفارغة (تُبنى بمسح واحد عند الحاجة)
+        self.free_slots = None
+        # أوفست محلولة بالتوقيعات ومخزنة حسب نسخة الملف التنفيذي
+        self.offset_cache = offset_cache
+        # خريطة المناطق المقروءة وذاكرة الصفحات المؤقتة (اختيارية)
+        self.region_map = None
+        self.read_cache = None
+        # دفعة الكتابات الحالية لكل خيط (داخل write_batch فقط) ومقاييسها
+        self._batch_state = threading.local()
+        self.write_metrics = WriteMetrics()
+        # None: حسب الواجهة (ملف التفريغ يكتب مباشرة)، True/False لفرض الدمج أو تعطيله
+        self.batch_writes = None
+        # مسارات المؤشرات (player.vehicle.position ...) مع مؤشرات وسيطة مخزنة لكل نبضة
+        self.pointers = None
         
     def attach_to_process(self):
-        """الارتباط بعملية اللعبة"""
+        """الارتباط بعملية اللعبة (أو بالواجهة المعطاة مسبقاً)"""
         try:
-            # البحث عن ID العملية
-            for proc in psutil.process_iter(['pid', 'name']):
-                if proc.info['name'].lower() == self.process_name.lower():
-                    self.process_id = proc.info['pid']
-                    break
-            
-            if not self.process_id:
-                raise Exception(f"Process {self.process_name} not found")
-            
-            # فتح مقبض للعملية
-            self.process_handle = kernel32.OpenProcess(
-                win32con.PROCESS_ALL_ACCESS,
-                False,
-                self.process_id
-            )
+            if self.backend is None:
+                # البحث عن ID العملية
+                self.process_id = find_process_id(self.process_name)
+                
+                if not self.process_id:
+                    raise Exception(f"Process {self.process_name} not found")
+                
+                # فتح مقبض للعملية
+                self.backend = open_process_backend(self.process_id)
             
-            if not self.process_handle:
-                raise Exception(f"Failed to open process {self.process_id}")
+            self.process_handle = getattr(self.backend, 'handle', None)
             
             # الحصول على وحدات العملية
             self._get_process_modules()
             
-            # تحديث أوفسيت الذاكرة بناءً على الإصدار
-            self._detect_game_version()
+            # المناطق المقروءة (مرة واحدة عند الارتباط)
+            self.region_map = RegionMap(self.backend.regions())
+            
+            # تحديث أوفسيت الذاكرة بناءً على الإصدار (من الذاكرة المؤقتة إن وجدت)
+            self._load_offsets()
+            self.pointers = PointerResolver(self.read_memory, self.base_address, self.MEMORY_OFFSETS)
             
             self.is_attached = True
-            print(f"✓ Attached to process {self.process_id} at 0x{self.base_address:08X}")
+            print(f"✓ Attached to process {self.process_id or self.backend.name} at 0x{self.base_address:08X}")
             return True
             
         except Exception as e:
@@ -111,32 +113,51 @@ class GTAVCMemoryManager:
     
     def _get_process_modules(self):
         """الحصول على وحدات العملية المحملة"""
-        snapshot = kernel32.CreateToolhelp32Snapshot(win32con.TH32CS_SNAPMODULE, self.process_id)
-        
-        if snapshot == win32con.INVALID_HANDLE_VALUE:
+        for module_name, module_info in self.backend.modules().items():
+            self.modules[module_name] = module_info
+            
+            # تحديد قاعدة gta-vc.exe
+            if module_name.lower() == self.process_name.lower():
+                self.base_address = module_info['base']
+                self.MEMORY_OFFSETS['base_address'] = self.base_address
+    
+    def _main_module(self) -> dict:
+        """معلومات وحدة اللعبة (أسماء الوحدات في Windows لا تفرق بين الحالات)"""
+        name = self.process_name.lower()
+        for module_name, module_info in self.modules.items():
+            if module_name.lower() == name:
+                return module_info
+        return {}
+    
+    def _load_offsets(self):
+        """الأوفست من الذاكرة المؤقتة، وإلا كشف النسخة ومسح كامل بالتوقيعات ثم الحفظ"""
+        if not self.base_address:
             return
+        if self.offset_cache is None:
+            self.offset_cache = OffsetCache()
         
-        module_entry = MODULEENTRY32()
-        module_entry.dwSize = ctypes.sizeof(MODULEENTRY32)
-        
-        if kernel32.Module32First(snapshot, ctypes.byref(module_entry)):
-            while True:
-                module_name = module_entry.szModule.decode('ascii', errors='ignore')
-                self.modules[module_name] = {
-                    'base': module_entry.modBaseAddr,
-                    'size': module_entry.modBaseSize,
-                    'path': module_entry.szExePath.decode('ascii', errors='ignore')
-                }
-                
-                # تحديد قاعدة gta-vc.exe
-                if module_name.lower() == 'gta-vc.exe':
-                    self.base_address = module_entry.modBaseAddr
-                    self.MEMORY_OFFSETS['base_address'] = self.base_address
-                
-                if not kernel32.Module32Next(snapshot, ctypes.byref(module_entry)):
-                    break
+        module_info = self._main_module()
+        try:
+            header = self.read_memory(self.base_address, 0x400)
+        except Exception:
+            header = b''
+        key = self.offset_cache.executable_key(module_info.get('path'), header)
+        
+        offsets = self.offset_cache.get(key)
+        if offsets is not None:
+            self.MEMORY_OFFSETS.update(offsets)
+            print(f"✓ Offsets loaded from cache ({len(offsets)} entries)")
+            return
         
-        kernel32.CloseHandle(snapshot)
+        self._detect_game_version()
+        offsets, missing = resolve_offsets(self, self.base_address)
+        self.MEMORY_OFFSETS.update(offsets)
+        if missing:
+            print(f"⚠ Signatures not found, using defaults: {', '.join(missing)}")
+        # كل الأوفست الفعالة (كشف النسخة + التوقيعات) ليطابق الارتباط الدافئ البارد
+        effective = {name: value for name, value in self.MEMORY_OFFSETS.items() if name != 'base_address'}
+        self.offset_cache.put(key, effective, missing)
+        print(f"✓ Resolved {len(offsets)} offsets by signature scan")
     
     def _detect_game_version(self):
         """كشف نسخة اللعبة وتحديث الأوفست"""
@@ -173,39 +194,62 @@ class GTAVCMemoryManager:
     
     def read_memory(self, address, size):
         """قراءة من الذاكرة"""
-        buffer = ctypes.create_string_buffer(size)
-        bytes_read = ctypes.c_size_t()
-        
-        result = kernel32.ReadProcessMemory(
-            self.process_handle,
-            ctypes.c_void_p(address),
-            buffer,
-            size,
-            ctypes.byref(bytes_read)
-        )
-        
-        if result and bytes_read.value == size:
-            return buffer.raw
-        else:
-            raise Exception(f"Failed to read memory at 0x{address:08X}")
+        return (self.read_cache or self.backend).read(address, size)
     
     def write_memory(self, address, data):
-        """الكتابة في الذاكرة"""
-        buffer = ctypes.create_string_buffer(data)
-        bytes_written = ctypes.c_size_t()
+        """الكتابة في الذاكرة (تؤجل حتى نهاية write_batch إن كانت دفعة مفتوحة)"""
+        batch = getattr(self._batch_state, 'batch', None)
+        if batch is not None:
+            batch.add(address, data)
+            return True
+        (self.read_cache or self.backend).write(address, data)
+        return True
+    
+    @contextmanager
+    def write_batch(self):
+        """تجميع كتابات النبضة ثم إرسالها مدمجة (process_vm_writev واحد على Linux)
+        
+        القراءات داخل الدفعة لا ترى الكتابات المؤجلة. على واجهة لا تستفيد من الدمج
+        (ملف التفريغ) تمر الكتابات مباشرة ما لم يُفرض batch_writes
+        """
+        enabled = self.batch_writes
+        if enabled is None:
+            enabled = getattr(self.backend, 'batch_writes', False)
+        if not enabled:
+            yield None
+            return
         
-        result = kernel32.WriteProcessMemory(
-            self.process_handle,
-            ctypes.c_void_p(address),
-            buffer,
-            len(data),
-            ctypes.byref(bytes_written)
-        )
+        state = self._batch_state
+        if getattr(state, 'batch', None) is not None:
+            # دفعة متداخلة: تنضم للدفعة الخارجية
+            yield state.batch
+            return
         
-        if result and bytes_written.value == len(data):
-            return True
-        else:
-            raise Exception(f"Failed to write memory at 0x{address:08X}")
+        state.batch = WriteBatch()
+        start_time = time.perf_counter()
+        try:
+            yield state.batch
+        finally:
+            batch, state.batch = state.batch, None
+            writes = len(batch)
+            if writes and self.backend is not None:
+                ranges, syscalls = flush_batch(self.read_cache or self.backend, batch)
+                self.write_metrics.record(writes, ranges, syscalls, time.perf_counter() - start_time)
+    
+    def enable_read_cache(self, capacity=256, read_ahead=1):
+        """تفعيل ذاكرة الصفحات المؤقتة: القراءات المتجاورة في نفس النبضة بدون استدعاء نظام
+        
+        يجب استدعاء begin_tick() في بداية كل نبضة لقراءة القيم الجديدة
+        """
+        self.read_cache = PageCache(self.backend, self.region_map, capacity, read_ahead)
+        return self.read_cache
+    
+    def begin_tick(self):
+        """بداية نبضة: إبطال الصفحات المخزنة والتحقق من المؤشرات عند أول استخدام"""
+        if self.read_cache is not None:
+            self.read_cache.invalidate()
+        if self.pointers is not None:
+            self.pointers.begin_tick()
     
     def read_int(self, address):
         """قراءة عدد صحيح 4 بايت"""
@@ -237,39 +281,38 @@ class GTAVCMemoryManager:
         data = struct.pack('fff', x, y, z)
         return self.write_memory(address, data)
     
-    def get_player_position(self):
-        """الحصول على موقع اللاعب"""
-        player_ptr_addr = self.base_address + self.MEMORY_OFFSETS['player_ped_ptr']
-        player_ptr = self.read_int(player_ptr_addr)
+    def read_entity(self, entity_addr, view=None):
+        """قراءة سجل الكائن كاملاً في استدعاء واحد"""
+        if view is None:
+            view = EntityView()
+        return view.load(self.read_cache or self.backend, entity_addr)
+    
+    def get_local_player_view(self):
+        """سجل اللاعب المحلي: قراءتان (المؤشر ثم الكائن) بدل قراءة لكل حقل
+        
+        السجل المرجع يُعاد استخدامه في الاستدعاء التالي
+        """
+        player_ptr = self.pointers.resolve('player')
         
         if player_ptr:
-            # موقع اللاعب في الكائن
-            pos_offset = 0x14  # إزاحة الموقع في هيكل الكائن
-            return self.read_vector3(player_ptr + pos_offset)
-        return (0.0, 0.0, 0.0)
+            return self.read_entity(player_ptr, self._player_view)
+        return None
+    
+    def read_path(self, path):
+        """قيمة مسار مؤشرات مثل "player.vehicle.position" (None إن كان أحد المؤشرات فارغاً)"""
+        return self.pointers.read_path(path)
+    
+    def get_player_position(self):
+        """الحصول على موقع اللاعب"""
+        return self.pointers.read_path('player.position') or (0.0, 0.0, 0.0)
     
     def get_player_rotation(self):
         """الحصول على دوران اللاعب"""
-        player_ptr_addr = self.base_address + self.MEMORY_OFFSETS['player_ped_ptr']
-        player_ptr = self.read_int(player_ptr_addr)
-        
-        if player_ptr:
-            # دوران اللاعب
-            rot_offset = 0x20  # إزاحة الدوران
-            return self.read_vector3(player_ptr + rot_offset)
-        return (0.0, 0.0, 0.0)
+        return self.pointers.read_path('player.rotation') or (0.0, 0.0, 0.0)
     
     def get_player_vehicle(self):
         """الحصول على مركبة اللاعب"""
-        player_ptr_addr = self.base_address + self.MEMORY_OFFSETS['player_ped_ptr']
-        player_ptr = self.read_int(player_ptr_addr)
-        
-        if player_ptr:
-            # مؤشر المركبة
-            vehicle_offset = 0x58C
-            vehicle_ptr = self.read_int(player_ptr + vehicle_offset)
-            return vehicle_ptr
-        return 0
+        return self.pointers.resolve('player.vehicle')
     
     def get_vehicle_position(self, vehicle_ptr):
         """الحصول على موقع المركبة"""
@@ -278,20 +321,52 @@ class GTAVCMemoryManager:
             return self.read_vector3(vehicle_ptr + pos_offset)
         return (0.0, 0.0, 0.0)
     
+    def _entity_slot(self, entity_addr):
+        """رقم الفتحة لعنوان كائن في المصفوفة (أو -1)"""
+        entity_list_addr = self.base_address + self.MEMORY_OFFSETS['entity_list']
+        entity_size = self.MEMORY_OFFSETS['entity_size']
+        offset = entity_addr - entity_list_addr
+        if offset < 0 or offset % entity_size:
+            return -1
+        slot = offset // entity_size
+        return slot if slot < self.MEMORY_OFFSETS['max_entities'] else -1
+    
+    def scan_entity_slots(self):
+        """قراءة مصفوفة الكائنات كاملة مرة واحدة وإعادة بناء خريطة الفتحات الفارغة"""
+        entity_list_addr = self.base_address + self.MEMORY_OFFSETS['entity_list']
+        max_entities = self.MEMORY_OFFSETS['max_entities']
+        entity_size = self.MEMORY_OFFSETS['entity_size']
+        
+        data = self.read_memory(entity_list_addr, max_entities * entity_size)
+        if self.free_slots is None or self.free_slots.max_entities != max_entities:
+            self.free_slots = FreeSlotMap(max_entities)
+        self.free_slots.load(scan_free_slots(data, entity_size, max_entities))
+        return self.free_slots
+    
     def find_free_entity_slot(self):
         """العثور على فتحة كائن فارغة"""
         entity_list_addr = self.base_address + self.MEMORY_OFFSETS['entity_list']
-        max_entities = self.MEMORY_OFFSETS['max_entities']
         entity_size = self.MEMORY_OFFSETS['entity_size']
         
-        for i in range(max_entities):
+        if self.free_slots is None or not self.free_slots.bits:
+            self.scan_entity_slots()
+        
+        # كل محاولة فاشلة تشطب فتحة، والحد يمنع الدوران إن تغيرت المصفوفة باستمرار
+        for _ in range(self.MEMORY_OFFSETS['max_entities'] + 1):
+            i = self.free_slots.first()
+            if i == -1:
+                return -1, 0
             entity_addr = entity_list_addr + (i * entity_size)
             
-            # التحقق إذا كانت الفتحة فارغة
-            entity_type = self.read_int(entity_addr)
+            # التحقق إذا كانت الفتحة ما زالت فارغة (اللعبة قد تكون استخدمتها)
+            # من الواجهة مباشرة: صفحة الذاكرة المؤقتة قد تكون أقدم من المسح
+            entity_type = struct.unpack('i', self.backend.read(entity_addr, 4))[0]
             if entity_type == 0:  # فارغ
                 return i, entity_addr
-        
+            
+            self.free_slots.mark_used(i)
+            if not self.free_slots.bits:
+                self.scan_entity_slots()
         return -1, 0
     
     def create_remote_player(self, player_id, position=(0, 0, 0)):
@@ -304,6 +379,7 @@ class GTAVCMemoryManager:
         # إنشاء كائن مشاة (NPC)
         entity_type = 1  # نوع المشاة
         self.write_int(entity_addr, entity_type)
+        self.free_slots.mark_used(slot)
         
         # تعيين موقع الكائن
         pos_offset = 0x14
@@ -348,6 +424,8 @@ class GTAVCMemoryManager:
             
             # إعادة تعيين النوع
             self.write_int(entity_addr, 0)
+            if self.free_slots is not None:
+                self.free_slots.mark_free(self._entity_slot(entity_addr))
             
             print(f"✓ Destroyed entity at 0x{entity_addr:08X}")
     
@@ -355,34 +433,22 @@ class GTAVCMemoryManager:
         """مسح الذاكرة للعثور على نمط معين"""
         # pattern example: b"\x90\x90\x90\x90\xE8"
         # mask example: "xxxx?"
+        signature = Signature(pattern, mask)
+        return self.scan_for_patterns([signature])[signature.name]
+    
+    def scan_for_patterns(self, signatures, workers=None):
+        """مسح عدة توقيعات (نص IDA أو (نمط، قناع)) بقراءة واحدة لكل وحدة"""
+        signatures = compile_signatures(signatures)
+        found_addresses = {signature.name: [] for signature in signatures}
         
-        # هذه وظيفة متقدمة تحتوي على كود مسح حقيقي
-        # سيتم تبسيطها هنا لأغراض التوضيح
-        
-        modules = self._get_executable_sections()
-        found_addresses = []
-        
-        for module_name, module_info in modules.items():
+        for module_name, module_info in self._get_executable_sections().items():
             try:
                 data = self.read_memory(module_info['base'], module_info['size'])
-                
-                # البحث عن النمط
-                pos = 0
-                while pos < len(data):
-                    match = True
-                    for i, (p, m) in enumerate(zip(pattern, mask)):
-                        if m == 'x' and data[pos + i] != p:
-                            match = False
-                            break
-                    
-                    if match:
-                        found_addr = module_info['base'] + pos
-                        found_addresses.append(found_addr)
-                    
-                    pos += 1
-                    
-            except:
+            except Exception:
                 continue
+            
+            for name, addresses in scan(data, signatures, module_info['base'], workers).items():
+                found_addresses[name].extend(addresses)
         
         return found_addresses
     
@@ -391,15 +457,25 @@ class GTAVCMemoryManager:
         sections = {}
         
         for module_name, module_info in self.modules.items():
-            sections[module_name] = {
-                'base': module_info['base'],
-                'size': module_info['size']
-            }
+            if self.region_map is None:
+                sections[module_name] = {
+                    'base': module_info['base'],
+                    'size': module_info['size']
+                }
+                continue
+            
+            # تخطي الصفحات غير المحجوزة أو المحمية داخل الوحدة
+            for base, size in self.region_map.readable_runs(module_info['base'], module_info['size']):
+                name = module_name if base == module_info['base'] else f"{module_name}+0x{base - module_info['base']:X}"
+                sections[name] = {'base': base, 'size': size}
         
         return sections
     
     def inject_dll(self, dll_path):
         """حقن DLL في عملية اللعبة"""
+        if kernel32 is None or not self.process_handle:
+            raise Exception("DLL injection requires an attached Windows process")
+        
         # تحويل المسار إلى بايتات
         dll_path_bytes = dll_path.encode('utf-8') + b'\x00'
         
@@ -408,8 +484,8 @@ class GTAVCMemoryManager:
             self.process_handle,
             None,
             len(dll_path_bytes),
-            win32con.MEM_COMMIT | win32con.MEM_RESERVE,
-            win32con.PAGE_READWRITE
+            MEM_COMMIT | MEM_RESERVE,
+            PAGE_READWRITE
         )
         
         if not alloc_addr:
@@ -440,7 +516,7 @@ class GTAVCMemoryManager:
                 self.process_handle,
                 alloc_addr,
                 0,
-                win32con.MEM_RELEASE
+                MEM_RELEASE
             )
             raise Exception("Failed to create remote thread")
         
@@ -453,7 +529,7 @@ class GTAVCMemoryManager:
             self.process_handle,
             alloc_addr,
             0,
-            win32con.MEM_RELEASE
+            MEM_RELEASE
         )
         
         print(f"✓ Injected DLL: {dll_path}")
@@ -461,15 +537,138 @@ class GTAVCMemoryManager:
     
     def detach(self):
         """فك الارتباط بالعملية"""
-        if self.process_handle:
-            kernel32.CloseHandle(self.process_handle)
-            self.process_handle = None
+        if self.backend is not None:
+            self.backend.close()
+            self.backend = None
+        self.process_handle = None
+        self.read_cache = None
+        self.region_map = None
+        self.pointers = None
         
         self.is_attached = False
         print("✓ Detached from process")
 
 # اختبار النظام
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--synthetic":
+        # بدون اللعبة: نفس الدوال على صورة gta-vc اصطناعية (أو ملف تفريغ معطى)
+        from MemoryBackends import build_synthetic_image, SYNTHETIC_BASE
+        path = sys.argv[2] if len(sys.argv) > 2 else build_synthetic_image()
+        import shutil
+        import tempfile
+        cache_directory = tempfile.mkdtemp()
+        cache_path = os.path.join(cache_directory, "offset_cache.json")
+        
+        # نسخة Steam بدون توقيع player_ped_ptr: قيمة كشف النسخة تُخزن أيضاً، وentity_list من التوقيع
+        with open(path, 'rb') as f:
+            image = bytearray(f.read())
+        image[0x3000:0x3040] = bytes(0x40)  # أول توقيع في plant_signatures
+        struct.pack_into('<I', image, 0x3040 + 1, SYNTHETIC_BASE + 0x00C1C6A0)
+        steam_path = os.path.join(cache_directory, "gta-vc-steam.img")
+        with open(steam_path, 'wb') as f:
+            f.write(image)
+        
+        class SteamBuild(GTAVCMemoryManager):
+            def _detect_game_version(self):
+                self.MEMORY_OFFSETS.update({'player_ped_ptr': 0x00C1D0F8, 'entity_list': 0x00C1C690})
+        
+        steam_cache_path = os.path.join(cache_directory, "steam_offset_cache.json")
+        for manager_class in (SteamBuild, GTAVCMemoryManager):
+            # الدافئ لا يكشف النسخة: القيم كلها من الذاكرة المؤقتة
+            steam = manager_class(backend=DumpFileBackend(steam_path, SYNTHETIC_BASE),
+                                  offset_cache=OffsetCache(steam_cache_path))
+            assert steam.attach_to_process()
+            assert steam.MEMORY_OFFSETS['player_ped_ptr'] == 0x00C1D0F8
+            assert steam.MEMORY_OFFSETS['entity_list'] == 0x00C1C6A0
+            assert steam.MEMORY_OFFSETS['vehicles_array'] == 0x00C1C6A4
+            steam.detach()
+        assert steam.offset_cache.hits == 1
+        assert GTAVCMemoryManager.MEMORY_OFFSETS['player_ped_ptr'] == 0x00B7CD98
+        print("✓ Warm attach matches cold attach (version-detected and signature offsets)")
+        
+        # الارتباط البارد (مسح كامل) ثم الدافئ (من الذاكرة المؤقتة)
+        attach_times = []
+        for attempt in range(2):
+            mem = GTAVCMemoryManager(backend=DumpFileBackend(path, SYNTHETIC_BASE),
+                                     offset_cache=OffsetCache(cache_path))
+            start_time = time.perf_counter()
+            assert mem.attach_to_process()
+            attach_times.append(time.perf_counter() - start_time)
+            if attempt == 0:
+                mem.detach()
+        assert mem.offset_cache.hits == 1
+        assert mem.MEMORY_OFFSETS['player_ped_ptr'] == 0x00B7CD98
+        assert mem.MEMORY_OFFSETS['vehicles_array'] == 0x00B74494
+        print(f"Attach: cold {attach_times[0] * 1000:.1f} ms, warm {attach_times[1] * 1000:.1f} ms")
+        
+        # Windows قد يعيد اسم الوحدة بحالة أحرف أخرى: نفس الملف يعطي نفس مفتاح الذاكرة المؤقتة
+        upper = GTAVCMemoryManager(backend=DumpFileBackend(path, SYNTHETIC_BASE, module_name="GTA-VC.EXE"),
+                                   offset_cache=OffsetCache(cache_path))
+        assert upper.attach_to_process() and upper.offset_cache.hits == 1
+        assert upper._main_module()['path'] == path
+        upper.detach()
+        
+        pos = mem.get_player_position()
+        print(f"Player Position: X={pos[0]:.2f}, Y={pos[1]:.2f}, Z={pos[2]:.2f}")
+        print(f"Player Vehicle: 0x{mem.get_player_vehicle():08X} at {mem.get_vehicle_position(mem.get_player_vehicle())}")
+        view = mem.get_local_player_view()
+        assert (view.position, view.rotation, view.vehicle) == (
+            pos, mem.get_player_rotation(), mem.get_player_vehicle())
+        
+        assert mem.read_path('player.vehicle.position') == mem.get_vehicle_position(mem.get_player_vehicle())
+        
+        # القراءات الصغيرة في نفس النبضة من ذاكرة الصفحات، والمؤشر يُقرأ مرة واحدة
+        cache = mem.enable_read_cache()
+        mem.begin_tick()
+        sentinel_reads = mem.pointers.sentinel_reads
+        mem.get_player_position(); mem.get_player_rotation(); mem.get_player_vehicle()
+        assert mem.pointers.sentinel_reads == sentinel_reads + 1
+        print(f"Page cache: {cache.backend_reads} backend reads for 4 field reads")
+        
+        slot, entity_addr = mem.create_remote_player(player_id=1001, position=(100.0, 200.0, 10.0))
+        mem.update_remote_player(entity_addr, (105.0, 205.0, 10.0), (0.0, 0.0, 90.0))
+        assert mem.read_vector3(entity_addr + 0x14) == (105.0, 205.0, 10.0)
+        assert mem.find_free_entity_slot()[0] != slot
+        
+        # ملف التفريغ لا يستفيد من الدمج: الكتابة مباشرة
+        with mem.write_batch() as batch:
+            assert batch is None
+        
+        # كتابات النبضة مجمعة (مفروضة): تظهر بعد نهاية الدفعة فقط
+        mem.batch_writes = True
+        with mem.write_batch():
+            mem.update_remote_player(entity_addr, (110.0, 210.0, 10.0), (0.0, 0.0, 180.0), animation=3)
+            assert mem.read_vector3(entity_addr + 0x14) == (105.0, 205.0, 10.0)
+        mem.begin_tick()
+        assert mem.read_vector3(entity_addr + 0x14) == (110.0, 210.0, 10.0)
+        assert mem.read_int(entity_addr + 0x5A0) == 3
+        metrics = mem.write_metrics.summary()
+        print(f"Write batch: {metrics['writes_per_tick']:.0f} writes -> "
+              f"{metrics['ranges_per_tick']:.0f} ranges, {metrics['avg_tick_ms']:.3f} ms")
+        mem.destroy_entity(entity_addr)
+        assert mem.find_free_entity_slot()[0] == slot
+        
+        # اللعبة شغلت الفتحة بعد المسح: التحقق يتخطاها
+        mem.write_int(entity_addr, 1)
+        assert mem.find_free_entity_slot()[0] not in (-1, slot)
+        
+        # اللعبة حررت الفتحة بعد تخزين صفحتها: المسح والتحقق يريان نفس الذاكرة
+        assert mem.read_int(entity_addr) == 1
+        mem.backend.write(entity_addr, struct.pack('<i', 0))
+        mem.scan_entity_slots()
+        assert mem.find_free_entity_slot()[0] == slot
+        
+        found = mem.scan_for_pattern(b"\x90\x90\x90\x90\xE8", "xxxxx")
+        print(f"Pattern found at: {[hex(addr) for addr in found]}")
+        assert SYNTHETIC_BASE + 0x1000 in found
+        found = mem.scan_for_patterns(["8B 0D ?? ?? ?? ?? 85", "8B 0D 98 CD B7 00"])
+        assert found["8B 0D 98 CD B7 00"] == [SYNTHETIC_BASE + 0x2345]
+        mem.detach()
+        shutil.rmtree(cache_directory)
+        if len(sys.argv) == 2:
+            os.unlink(path)
+        sys.exit(0)
+    
     # اختبار نظام إدارة الذاكرة
     mem = GTAVCMemoryManager()
     
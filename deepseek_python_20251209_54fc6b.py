@@ -8,7 +8,9 @@ from enum import IntEnum
 from dataclasses import dataclass
 from typing import Dict, List, Tuple, Optional
 import socket
-import struct
+
+from PacketCodec import encode_packet, decode_fields
+from StateSampler import StateSampler
 
 # تعريفات Windows
 USER32 = ctypes.WinDLL('user32', use_last_error=True)
@@ -41,30 +43,16 @@ class NetworkPacket:
     
     def to_bytes(self):
         """تحويل الحزمة إلى بايتات"""
-        return struct.pack(
-            '<B I fff fff fff H B B B I',
-            self.packet_type,
-            self.player_id,
-            self.position[0], self.position[1], self.position[2],
-            self.rotation[0], self.rotation[1], self.rotation[2],
-            self.velocity[0], self.velocity[1], self.velocity[2],
-            self.animation,
-            self.health,
-            self.armor,
-            self.weapon,
-            self.timestamp
-        )
+        return encode_packet(self)
     
     @classmethod
     def from_bytes(cls, data: bytes):
         """إنشاء حزمة من البايتات"""
-        fmt = '<B I fff fff fff H B B B I'
-        size = struct.calcsize(fmt)
-        
-        if len(data) < size:
+        unpacked = decode_fields(data)
+        if unpacked is None:
             return None
         
-        unpacked = struct.unpack(fmt, data[:size])
+        # vehicle_model غير موجود في تنسيق الشبكة الحالي
         return cls(
             packet_type=unpacked[0],
             player_id=unpacked[1],
@@ -75,8 +63,8 @@ class NetworkPacket:
             health=unpacked[12],
             armor=unpacked[13],
             weapon=unpacked[14],
-            vehicle_model=unpacked[15],
-            timestamp=unpacked[16]
+            vehicle_model=0,
+            timestamp=unpacked[15]
         )
 
 class GTAMultiplayerSystem:
@@ -100,6 +88,8 @@ class GTAMultiplayerSystem:
         
         # إعدادات
         self.sync_rate = 20  # 20Hz
+        # تخطي الحالات المكررة، ومعدل قراءة متكيف (حتى ضعف sync_rate أثناء القيادة)
+        self.sampler = StateSampler(tick_rate=2 * self.sync_rate, moving_rate=self.sync_rate)
         self.broadcast_rate = 5  # 5Hz
         self.port = 5192
         self.broadcast_port = 9999
@@ -264,14 +254,20 @@ extern "C" __declspec(dllexport) void InitializeMultiplayer() {
         """حلقة مزامنة بيانات اللاعب"""
         print("🔄 Starting sync loop...")
         
-        sync_interval = 1.0 / self.sync_rate
+        sync_interval = 1.0 / self.sampler.tick_rate
         
         while self.running:
             try:
+                now = time.monotonic()
+                if not self.sampler.due(now):
+                    time.sleep(sync_interval)
+                    continue
+                
                 # الحصول على بيانات اللاعب المحلي
                 player_data = self._get_local_player_data()
                 
-                if player_data:
+                # الإرسال فقط إذا تغيرت الحالة (أو للإبقاء على الاتصال)
+                if player_data and self.sampler.offer(player_data, now):
                     # إنشاء حزمة
                     packet = NetworkPacket(
                         packet_type=PacketType.POSITION.value,
@@ -339,24 +335,24 @@ extern "C" __declspec(dllexport) void InitializeMultiplayer() {
             if not self.memory_manager or not self.memory_manager.is_attached:
                 return None
             
-            # قراءة موقع اللاعب
-            position = self.memory_manager.get_player_position()
-            
-            # قراءة دوران اللاعب
-            rotation = self.memory_manager.get_player_rotation()
+            # سجل اللاعب كاملاً في قراءة واحدة (بدل قراءة لكل حقل)
+            view = self.memory_manager.get_local_player_view()
+            if view is None:
+                return None
+            position = view.position
+            rotation = view.rotation
             
-            # قراءة المركبة (إذا كان في واحدة)
-            vehicle_ptr = self.memory_manager.get_player_vehicle()
+            # المركبة (إذا كان في واحدة)
             vehicle_model = 0
-            if vehicle_ptr:
+            if view.vehicle:
                 # يمكن قراءة نموذج المركبة من الذاكرة
                 vehicle_model = 400  # افتراضي
             
             return {
                 'position': position,
                 'rotation': rotation,
-                'velocity': (0, 0, 0),  # سيتم حسابه من الحركة
-                'animation': 0,  # سيتم قراءته من الذاكرة
+                'velocity': (0, 0, 0),  # يملؤها StateSampler من المواقع المؤرخة
+                'animation': view.animation,
                 'health': 100,  # سيتم قراءته من الذاكرة
                 'armor': 0,  # سيتم قراءته من الذاكرة
                 'weapon': 0,  # سيتم قراءته من الذاكرة
@@ -2,6 +2,7 @@ import os
 import sys
 import json
 import time
+import contextlib
 import threading
 from enum import Enum
 from dataclasses import dataclass
@@ -55,6 +56,12 @@ except ImportError:
             return False
         def get_local_player_position(self):
             return None
+        def subscribe_local_player(self, rate=20.0, on_change=True, epsilon=0.01, keepalive=1.0):
+            return None
+        def unsubscribe(self, stream):
+            return False
+        def batch(self):
+            return contextlib.nullcontext()
 
 try:
     from MemoryInjector import GTAVCMemoryManager
@@ -72,6 +79,10 @@ except ImportError:
             return (0.0, 0.0, 0.0)
         def get_player_rotation(self):
             return (0.0, 0.0, 0.0)
+        def get_player_vehicle(self):
+            return 0
+        def get_local_player_view(self):
+            return None
         def detach(self):
             pass
 
@@ -101,9 +112,13 @@ class UnifiedMultiplayerSystem:
         self.injector = AdvancedInjector() if ADVANCED_INJECTOR_AVAILABLE else None
         self.cpp_controller = None
         self.memory_manager = None
+        self.local_stream = None  # بث حالة اللاعب المحلي من النواة (بدل الاستطلاع)
         
         # حالة النظام
         self.players: Dict[int, PlayerInfo] = {}
+        # آخر تحديث لكل لاعب بعيد، يُطبق في نبضة المزامنة التالية (دفعة CMD_BATCH واحدة)
+        self._pending_updates: Dict[int, Tuple[Tuple[float, float, float], Tuple[float, float, float]]] = {}
+        self._updates_lock = threading.Lock()
         self.local_player_id = os.getpid()
         self.game_pid = None
         
@@ -219,6 +234,9 @@ class UnifiedMultiplayerSystem:
         if status:
             print(f"📊 C++ Core Status: {json.dumps(status, indent=2)}")
         
+        # النواة تدفع حالة اللاعب عند تغيرها (ضعف معدل المزامنة ليبقى الإطار حديثاً)
+        self.local_stream = self.cpp_controller.subscribe_local_player(rate=self.sync_rate * 2)
+        
         print("✅ C++ core initialized")
         return True
     
@@ -269,8 +287,9 @@ class UnifiedMultiplayerSystem:
                 # تحديث بيانات اللاعب المحلي
                 self._update_local_player()
                 
-                # مزامنة مع اللاعبين الآخرين
-                self._sync_with_remote_players()
+                # مزامنة مع اللاعبين الآخرين (أوامر C++ في إطار CMD_BATCH واحد)
+                with self._control_batch():
+                    self._sync_with_remote_players()
                 
                 # انتظار للمعدل المطلوب
                 time.sleep(sync_interval)
@@ -279,6 +298,12 @@ class UnifiedMultiplayerSystem:
                 print(f"Sync error: {e}")
                 time.sleep(1)
     
+    def _control_batch(self):
+        """دفعة أوامر التحكم للنبضة (بدون اتصال C++: لا شيء)"""
+        if self.cpp_controller and self.cpp_controller.connected:
+            return self.cpp_controller.batch()
+        return contextlib.nullcontext()
+    
     def _update_local_player(self):
         """تحديث بيانات اللاعب المحلي"""
         player_data = self._get_local_player_data()
@@ -298,25 +323,40 @@ class UnifiedMultiplayerSystem:
                 self.players[self.local_player_id].position = player_data['position']
                 self.players[self.local_player_id].last_update = time.time()
     
+    def _get_cpp_player_data(self) -> Optional[Dict]:
+        """بيانات اللاعب من النواة: آخر إطار مدفوع بدون انتظار، وإلا قراءة مباشرة"""
+        rotation = (0, 0, 0)
+        # إطار أقدم من مهلة الإبقاء يعني أن النواة توقفت عن البث: استطلاع
+        state = self.local_stream.fresh() if self.local_stream else None
+        if state is not None:
+            position, rotation = state.position, state.rotation
+        else:
+            position = self.cpp_controller.get_local_player_position()
+        if not position:
+            return None
+        return {
+            'position': position,
+            'rotation': rotation,
+            'velocity': (0, 0, 0),
+            'health': 100,
+            'armor': 0
+        }
+    
     def _get_local_player_data(self) -> Optional[Dict]:
         """الحصول على بيانات اللاعب المحلي"""
         try:
             if self.mode == SystemMode.CPP_ONLY and self.cpp_controller:
                 # استخدام C++ للحصول على البيانات
-                position = self.cpp_controller.get_local_player_position()
-                if position:
-                    return {
-                        'position': position,
-                        'rotation': (0, 0, 0),
-                        'velocity': (0, 0, 0),
-                        'health': 100,
-                        'armor': 0
-                    }
+                return self._get_cpp_player_data()
             
             elif self.mode == SystemMode.STANDALONE and self.memory_manager:
                 # استخدام Python للحصول على البيانات
-                position = self.memory_manager.get_player_position()
-                rotation = self.memory_manager.get_player_rotation()
+                # سجل اللاعب كاملاً في قراءة واحدة
+                view = self.memory_manager.get_local_player_view()
+                if view is None:
+                    return None
+                position = view.position
+                rotation = view.rotation
                 
                 return {
                     'position': position,
@@ -329,20 +369,18 @@ class UnifiedMultiplayerSystem:
             elif self.mode == SystemMode.HYBRID:
                 # استخدام كلا النظامين
                 if self.cpp_controller:
-                    position = self.cpp_controller.get_local_player_position()
-                    if position:
-                        return {
-                            'position': position,
-                            'rotation': (0, 0, 0),
-                            'velocity': (0, 0, 0),
-                            'health': 100,
-                            'armor': 0
-                        }
+                    data = self._get_cpp_player_data()
+                    if data:
+                        return data
                 
                 # fallback إلى Python
                 if self.memory_manager:
-                    position = self.memory_manager.get_player_position()
-                    rotation = self.memory_manager.get_player_rotation()
+                    # سجل اللاعب كاملاً في قراءة واحدة
+                    view = self.memory_manager.get_local_player_view()
+                    if view is None:
+                        return None
+                    position = view.position
+                    rotation = view.rotation
                     
                     return {
                         'position': position,
@@ -358,9 +396,11 @@ class UnifiedMultiplayerSystem:
         return None
     
     def _sync_with_remote_players(self):
-        """المزامنة مع اللاعبين الآخرين"""
-        # هذه وظيفة ستتم مزامنتها مع الشبكة
-        pass
+        """المزامنة مع اللاعبين الآخرين: تطبيق تحديثات المواقع المنتظرة"""
+        with self._updates_lock:
+            updates, self._pending_updates = self._pending_updates, {}
+        for player_id, (position, rotation) in updates.items():
+            self._apply_player_update(player_id, position, rotation)
     
     def create_remote_player(self, player_id: int, name: str, 
                            position: Tuple[float, float, float]) -> bool:
@@ -427,7 +467,22 @@ class UnifiedMultiplayerSystem:
     def update_player_position(self, player_id: int, 
                              position: Tuple[float, float, float],
                              rotation: Tuple[float, float, float]) -> bool:
-        """تحديث موقع لاعب"""
+        """تحديث موقع لاعب (أثناء عمل حلقة المزامنة يُطبق في نبضتها التالية)"""
+        if player_id not in self.players:
+            return False
+        
+        if self.running and self.sync_thread and self.sync_thread.is_alive():
+            # التحديثات المتتالية لنفس اللاعب قبل النبضة: الأحدث فقط
+            with self._updates_lock:
+                self._pending_updates[player_id] = (position, rotation)
+            return True
+        
+        return self._apply_player_update(player_id, position, rotation)
+    
+    def _apply_player_update(self, player_id: int,
+                             position: Tuple[float, float, float],
+                             rotation: Tuple[float, float, float]) -> bool:
+        """تطبيق تحديث موقع لاعب على نواة C++ ومدير الذاكرة"""
         if player_id not in self.players:
             return False
         
@@ -492,6 +547,8 @@ class UnifiedMultiplayerSystem:
         # إيقاف نواة C++
         if self.cpp_controller:
             try:
+                if self.local_stream:
+                    self.cpp_controller.unsubscribe(self.local_stream)
                 self.cpp_controller.shutdown_core()
                 self.cpp_controller.disconnect()
             except:
@@ -517,21 +574,31 @@ class UnifiedMultiplayerSystem:
         }
         
         try:
-            # اختبار سرعة القراءة
-            start_time = time.time()
-            read_count = 10  # تقليل العدد للسرعة
-            
-            for i in range(read_count):
-                if self.memory_manager:
+            # اختبار سرعة القراءة: حقل بحقل (6 قراءات) مقابل سجل واحد (قراءتان)
+            if self.memory_manager:
+                read_count = 10  # تقليل العدد للسرعة
+                
+                start_time = time.perf_counter()
+                for i in range(read_count):
                     self.memory_manager.get_player_position()
-            
-            read_time = time.time() - start_time
-            if read_time > 0:
-                results['tests']['python_read_speed'] = {
-                    'ops': read_count,
-                    'time': read_time,
-                    'ops_per_sec': read_count / read_time
-                }
+                    self.memory_manager.get_player_rotation()
+                    self.memory_manager.get_player_vehicle()
+                field_time = time.perf_counter() - start_time
+                
+                start_time = time.perf_counter()
+                for i in range(read_count):
+                    view = self.memory_manager.get_local_player_view()
+                    if view is not None:
+                        view.position, view.rotation, view.vehicle
+                view_time = time.perf_counter() - start_time
+                
+                if field_time > 0 and view_time > 0:
+                    results['tests']['python_read_speed'] = {
+                        'ops': read_count,
+                        'per_field_ops_per_sec': read_count / field_time,
+                        'entity_view_ops_per_sec': read_count / view_time,
+                        'speedup': field_time / view_time
+                    }
             
             print(f"📈 Benchmark results: {json.dumps(results, indent=2)}")
             
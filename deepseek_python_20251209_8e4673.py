@@ -2,37 +2,73 @@ import socket
 import struct
 import json
 import time
-from enum import IntEnum
-from typing import Tuple, Optional, Dict, Any
+import threading
+import gzip
+import mmap
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
+from contextlib import contextmanager
+from typing import Tuple, Optional, Dict, Any, List
 
-# تعريفات الأوامر
-class ControlCommand(IntEnum):
-    CMD_INIT = 1
-    CMD_SHUTDOWN = 2
-    CMD_UPDATE_CONFIG = 3
-    CMD_SEND_CHAT = 4
-    CMD_GET_STATUS = 5
-    CMD_CREATE_PLAYER = 6
-    CMD_REMOVE_PLAYER = 7
-    CMD_UPDATE_PLAYER = 8
-    CMD_READ_MEMORY = 9
-    CMD_WRITE_MEMORY = 10
+from ControlChannel import (ControlCommand, PipelinedChannel, CommandBatch, StateStream,
+                            STREAM_LOCAL_PLAYER, SUBSCRIBE_ON_CHANGE)
+from PatternScanner import Signature, compile_signatures, scan
+from PointerPaths import PointerResolver
+from SharedRing import RingSocket, ring_name, SHARED_MEMORY_PREFERRED
+
+# أقصى بيانات في رد واحد من خادم التحكم (MAX_PACKET_SIZE - 12)
+MAX_READ_SIZE = 4096 - 12
+# قراءات في الطريق عند تفريغ منطقة كبيرة (الذاكرة المستخدمة ~ DUMP_WINDOW * MAX_READ_SIZE)
+DUMP_WINDOW = 32
 
 class CPPController:
     """متحكم في نواة C++ المحقونة"""
     
-    def __init__(self, port=52525):
+    def __init__(self, port=52525, pipelined=True, transport='auto'):
         self.port = port
+        # 'auto': الذاكرة المشتركة إن أنشأتها النواة (وعلى أكثر من معالج) وإلا TCP؛
+        # 'shm' أو 'tcp' لفرض إحداهما
+        self.transport = transport
         self.socket = None
         self.connected = False
+        # قناة بأرقام طلبات: عدة أوامر في الطريق، والردود بأي ترتيب
+        self.pipelined = pipelined
+        self.channel: Optional[PipelinedChannel] = None
+        # دفعة CMD_BATCH مفتوحة لكل خيط (الكتابة وتحديث اللاعبين تؤجل إليها)
+        self._batch_state = threading.local()
+        self.batch_frames = 0
+        self.batch_items = 0
         self.memory_cache = {}
+        self._response_header = bytearray(12)  # رأس الرد بالطريقة القديمة يُستقبل هنا
+        # مسارات المؤشرات: كل مؤشر وسيط رحلة TCP كاملة، لذلك يُخزن لكل نبضة
+        self.pointers = PointerResolver(self.read_memory, 0x00400000, {
+            'player_ped_ptr': 0x00B7CD98,  # أوفسيت افتراضي
+            'camera_ptr': 0x00B6F028,
+            'world_ptr': 0x00B79594,
+        })
         
     def connect(self) -> bool:
         """الاتصال بخادم التحكم في C++"""
+        use_ring = self.transport == 'shm' or (self.transport == 'auto' and SHARED_MEMORY_PREFERRED)
+        if self.pipelined and use_ring:
+            ring = RingSocket.attach(ring_name(self.port))
+            if ring is not None:
+                self.socket = ring
+                self.channel = PipelinedChannel(ring)
+                self.connected = True
+                print(f"✅ Connected to C++ core via shared memory ({ring.name})")
+                return True
+            if self.transport == 'shm':
+                print(f"❌ Shared-memory transport not available for port {self.port}")
+                return False
+        
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.socket.settimeout(5.0)
             self.socket.connect(('127.0.0.1', self.port))
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if self.pipelined:
+                self.channel = PipelinedChannel(self.socket)
             self.connected = True
             print(f"✅ Connected to C++ core on port {self.port}")
             return True
@@ -42,6 +78,9 @@ class CPPController:
     
     def disconnect(self):
         """قطع الاتصال"""
+        if self.channel:
+            self.channel.close()
+            self.channel = None
         if self.socket:
             self.socket.close()
             self.socket = None
@@ -52,6 +91,9 @@ class CPPController:
         if not self.connected and not self.connect():
             return False, b''
         
+        if self.channel is not None:
+            return self._result(self.submit(command, data))
+        
         try:
             # بناء الحزمة: 4 بايت للأمر + البيانات
             packet = struct.pack('<I', command.value) + data
@@ -60,8 +102,8 @@ class CPPController:
             self.socket.sendall(packet)
             
             # استقبال الرد
-            header = self._recv_exact(12)  # 12 بايت للرأس
-            if len(header) < 12:
+            header = self._response_header  # 12 بايت للرأس
+            if self._recv_into(memoryview(header)) < 12:
                 return False, b''
             
             # فك الرأس
@@ -79,16 +121,92 @@ class CPPController:
             self.connected = False
             return False, b''
     
-    def _recv_exact(self, size: int) -> bytes:
-        """استقبال عدد محدد من البايتات"""
-        data = b''
-        while len(data) < size:
-            chunk = self.socket.recv(size - len(data))
-            if not chunk:
-                break
-            data += chunk
+    def submit(self, command: ControlCommand, data: bytes = b'') -> Future:
+        """إرسال أمر بدون انتظار الرد: Future تُحل بـ (الحالة، البيانات)"""
+        if self.channel is None:
+            # بدون القناة: الأمر ينفذ الآن بالطريقة القديمة
+            future = Future()
+            success, response = self._send_command(command, data)
+            future.set_result((1 if success else 0, response))
+            return future
+        return self.channel.submit(command, data)
+    
+    def _result(self, future: Future, timeout: float = 5.0) -> Tuple[bool, bytes]:
+        """انتظار رد أمر أُرسل بـ submit"""
+        try:
+            status, response = future.result(timeout)
+            return (status == 1, response)
+        except FuturesTimeoutError:
+            # رد بطيء فقط: الطلب خرج من pending (PendingReply.result) والاتصال يبقى
+            print(f"Command timeout after {timeout}s")
+            return False, b''
+        except (ConnectionError, OSError) as e:
+            print(f"Command error: {e}")
+            self.disconnect()
+            return False, b''
+    
+    def _recv_exact(self, size: int) -> bytearray:
+        """استقبال عدد محدد من البايتات في مخزن واحد مخصص مسبقاً"""
+        data = bytearray(size)
+        received = self._recv_into(memoryview(data))
+        if received < size:
+            del data[received:]
         return data
     
+    def _recv_into(self, view: memoryview) -> int:
+        """ملء view من المقبس مباشرة: عدد البايتات المستلمة (أقل عند الإغلاق)"""
+        received = 0
+        while received < len(view):
+            count = self.socket.recv_into(view[received:])
+            if not count:
+                break
+            received += count
+        return received
+    
+    @contextmanager
+    def batch(self):
+        """تجميع أوامر النبضة في أطر CMD_BATCH تُرسل مرة واحدة عند الخروج
+
+        داخل الكتلة write_memory* وupdate_remote_player تؤجل وتعيد True؛
+        للقراءة: batch.read_memory(...) تعيد BatchResult يكتمل بعد الخروج.
+        """
+        current = getattr(self._batch_state, 'batch', None)
+        if current is not None:
+            # دفعة متداخلة: تنضم للخارجية
+            yield current
+            return
+        
+        batch = CommandBatch()
+        self._batch_state.batch = batch
+        try:
+            yield batch
+        finally:
+            self._batch_state.batch = None
+            if batch.items:
+                self.flush_batch(batch)
+    
+    def flush_batch(self, batch: CommandBatch) -> int:
+        """إرسال الدفعة: عدد الأوامر الناجحة"""
+        frames = batch.frames()
+        succeeded = 0
+        if not self.connected and not self.connect():
+            for _, results in frames:
+                CommandBatch.decode(b'', results)
+        elif self.channel is not None:
+            # كل الأطر في إرسال واحد، والردود تُنتظر بعده
+            futures = self.channel.submit_many([(ControlCommand.CMD_BATCH, payload) for payload, _ in frames])
+            for future, (_, results) in zip(futures, frames):
+                _, response = self._result(future)
+                succeeded += CommandBatch.decode(response, results)
+        else:
+            for payload, results in frames:
+                _, response = self._send_command(ControlCommand.CMD_BATCH, payload)
+                succeeded += CommandBatch.decode(response, results)
+        self.batch_frames += len(frames)
+        self.batch_items += len(batch)
+        batch.items = []
+        return succeeded
+    
     def initialize_core(self) -> bool:
         """تهيئة نواة C++"""
         success, response = self._send_command(ControlCommand.CMD_INIT)
@@ -123,6 +241,38 @@ class CPPController:
             return response
         return None
     
+    def read_memory_into(self, address: int, view: memoryview) -> int:
+        """قراءة len(view) بايت (حتى MAX_READ_SIZE) إلى مخزن موجود: عدد البايتات المقروءة، أو -1 عند انقطاع الاتصال
+
+        بالطريقة القديمة تُستقبل البيانات من المقبس إلى view مباشرة.
+        """
+        size = len(view)
+        if self.channel is not None or not size:
+            data = self.read_memory(address, size) if size else None
+            if not data:
+                return 0 if self.connected else -1
+            view[:len(data)] = data
+            return len(data)
+        
+        if not self.connected and not self.connect():
+            return -1
+        try:
+            self.socket.sendall(struct.pack('<III', ControlCommand.CMD_READ_MEMORY, address, size))
+            header = self._response_header
+            if self._recv_into(memoryview(header)) < 12:
+                raise ConnectionError("Control server closed the connection")
+            _, status, data_size = struct.unpack('<III', header)
+            if data_size > size:
+                self._recv_exact(data_size)
+                return 0
+            if self._recv_into(view[:data_size]) < data_size:
+                raise ConnectionError("Control server closed the connection")
+            return data_size if status == 1 else 0
+        except Exception as e:
+            print(f"Command error: {e}")
+            self.disconnect()
+            return -1
+    
     def read_memory_int(self, address: int) -> Optional[int]:
         """قراءة عدد صحيح من الذاكرة"""
         data = self.read_memory(address, 4)
@@ -146,6 +296,11 @@ class CPPController:
     
     def write_memory(self, address: int, data: bytes) -> bool:
         """كتابة في الذاكرة"""
+        batch = getattr(self._batch_state, 'batch', None)
+        if batch is not None:
+            batch.write_memory(address, data)
+            return True
+        
         # بناء البيانات: العنوان + حجم البيانات + البيانات
         header = struct.pack('<II', address, len(data))
         success, _ = self._send_command(ControlCommand.CMD_WRITE_MEMORY, header + data)
@@ -182,6 +337,11 @@ class CPPController:
                            position: Tuple[float, float, float],
                            rotation: Tuple[float, float, float]) -> bool:
         """تحديث لاعب عن بعد"""
+        batch = getattr(self._batch_state, 'batch', None)
+        if batch is not None:
+            batch.update_player(player_id, position, rotation)
+            return True
+        
         x, y, z = position
         rx, ry, rz = rotation
         
@@ -197,21 +357,124 @@ class CPPController:
         """الحصول على موقع لاعب"""
         return self.read_memory_vector3(entity_address + 0x14)
     
+    def begin_tick(self):
+        """بداية نبضة: المؤشرات تُتحقق مرة واحدة عند أول استخدام"""
+        self.pointers.begin_tick()
+    
+    def read_path(self, path: str):
+        """قيمة مسار مؤشرات مثل "player.vehicle.position" (None إن لم يُحل)"""
+        return self.pointers.read_path(path)
+    
     def get_local_player_position(self) -> Optional[Tuple[float, float, float]]:
         """الحصول على موقع اللاعب المحلي"""
-        # قراءة مؤشر اللاعب أولاً
-        player_ptr = self.read_memory_int(0x00400000 + 0xB7CD98)  # أوفسيت افتراضي
-        if player_ptr:
-            return self.get_player_position(player_ptr)
-        return None
+        player, fresh = self.pointers.last_known('player')
+        if self.channel is None or fresh or not player:
+            return self.pointers.read_path('player.position')
+        
+        # قراءة المؤشر والموقع عند آخر قيمة معروفة في نفس الرحلة
+        pointer_address = self.pointers.base_address + self.pointers.offsets['player_ped_ptr']
+        pointer_future, position_future = self.channel.submit_many([
+            (ControlCommand.CMD_READ_MEMORY, struct.pack('<II', pointer_address, 4)),
+            (ControlCommand.CMD_READ_MEMORY, struct.pack('<II', player + 0x14, 12)),
+        ])
+        success, pointer_data = self._result(pointer_future)
+        if success and len(pointer_data) >= 4 and struct.unpack('<I', pointer_data[:4])[0] == player:
+            self.pointers.confirm('player', player)
+            success, position = self._result(position_future)
+            if success and len(position) >= 12:
+                return struct.unpack('<fff', position[:12])
+        # المؤشر تغير: الطريق العادي
+        return self.pointers.read_path('player.position')
+    
+    def subscribe_local_player(self, rate: float = 20.0, on_change: bool = True,
+                               epsilon: float = 0.01, keepalive: float = 1.0) -> Optional[StateStream]:
+        """بث حالة اللاعب المحلي من النواة بدل الاستطلاع (None إن لم تدعمه النواة)
+
+        النواة ترسل إطاراً كل 1/rate ثانية، أو عند التغير فقط مع on_change
+        (وإطار إبقاء كل keepalive ثانية).
+        """
+        if not self.connected and not self.connect():
+            return None
+        if self.channel is None:
+            return None  # البث يحتاج القناة المؤطرة
+        try:
+            stream = self.channel.subscribe(STREAM_LOCAL_PLAYER, rate,
+                                            SUBSCRIBE_ON_CHANGE if on_change else 0, epsilon, keepalive)
+        except Exception as e:
+            print(f"Command error: {e}")
+            self.disconnect()
+            return None
+        if stream is None:
+            print("⚠ C++ core does not support state streams, polling instead")
+            return None
+        print(f"✅ Subscribed to local player state ({rate:g} Hz{', on change' if on_change else ''})")
+        return stream
+    
+    def unsubscribe(self, stream: StateStream) -> bool:
+        """إيقاف بث"""
+        if self.channel is None or stream.channel is not self.channel:
+            stream._close()
+            return False
+        try:
+            return self.channel.unsubscribe(stream)
+        except Exception as e:
+            print(f"Command error: {e}")
+            self.disconnect()
+            return False
+    
+    def _iter_region(self, start: int, size: int, window: int = DUMP_WINDOW):
+        """(الإزاحة، الحجم، البيانات أو None) لأجزاء المنطقة بالترتيب، مع window قراءات في الطريق"""
+        end = start + size
+        window = max(1, window)
+        in_flight = deque()
+        for address in range(start, end, MAX_READ_SIZE):
+            chunk_size = min(MAX_READ_SIZE, end - address)
+            in_flight.append((address - start, chunk_size, self.submit(
+                ControlCommand.CMD_READ_MEMORY, struct.pack('<II', address, chunk_size))))
+            while len(in_flight) >= window:
+                yield self._region_chunk(*in_flight.popleft())
+        while in_flight:
+            yield self._region_chunk(*in_flight.popleft())
+    
+    def _region_chunk(self, offset: int, chunk_size: int, future: Future):
+        success, data = self._result(future)
+        return offset, chunk_size, data if success and len(data) == chunk_size else None
+    
+    def read_region(self, start: int, size: int) -> List[Tuple[int, bytes]]:
+        """قراءة منطقة كبيرة على أجزاء: قائمة (عنوان، بيانات) للأجزاء المتصلة المقروءة"""
+        runs = []
+        run_start = None
+        chunks = []
+        for offset, _, data in self._iter_region(start, size):
+            if data is not None:
+                if run_start is None:
+                    run_start = start + offset
+                chunks.append(data)
+            elif run_start is not None:
+                # جزء غير مقروء يقطع المنطقة
+                runs.append((run_start, b''.join(chunks)))
+                run_start = None
+                chunks = []
+        if run_start is not None:
+            runs.append((run_start, b''.join(chunks)))
+        return runs
     
-    def scan_for_pattern(self, pattern: bytes, mask: str) -> list:
-        """مسح الذاكرة للعثور على نمط"""
-        # هذا كود متقدم للمسح - يمكن تطويره
-        found_addresses = []
+    def scan_for_pattern(self, pattern: bytes, mask: str,
+                         start: int = 0x00400000, size: int = 0x00300000) -> list:
+        """مسح الذاكرة للعثور على نمط (افتراضياً صورة gta-vc.exe)"""
+        signature = Signature(pattern, mask)
+        return self.scan_for_patterns([signature], start, size)[signature.name]
+    
+    def scan_for_patterns(self, signatures, start: int = 0x00400000,
+                          size: int = 0x00300000) -> Dict[str, list]:
+        """مسح عدة توقيعات بقراءة واحدة للمنطقة"""
+        signatures = compile_signatures(signatures)
+        found_addresses = {signature.name: [] for signature in signatures}
+        
+        for run_start, data in self.read_region(start, size):
+            for name, addresses in scan(data, signatures, run_start).items():
+                found_addresses[name].extend(addresses)
         
-        # قراءة أقسام الذاكرة
-        # هذه وظيفة متقدمة تحتاج إلى تحسين
         return found_addresses
     
     def hotpatch_function(self, address: int, new_code: bytes) -> bool:
@@ -245,15 +508,59 @@ class CPPController:
         # سيتم تنفيذها في النسخة القادمة
         return 0
     
-    def dump_memory_region(self, start: int, size: int, filename: str) -> bool:
-        """تفريغ منطقة من الذاكرة إلى ملف"""
+    def dump_memory_region(self, start: int, size: int, filename: str, compress: bool = False,
+                           window: int = DUMP_WINDOW) -> bool:
+        """تفريغ منطقة من الذاكرة إلى ملف على أجزاء بذاكرة ثابتة
+
+        بدون ضغط يُكتب كل جزء في mmap للملف مباشرة؛ مع compress يُكتب gzip متدفقاً.
+        الأجزاء غير المقروءة تُكتب أصفاراً حتى تطابق الإزاحات العناوين؛ انقطاع الاتصال يوقف التفريغ.
+        """
+        if size <= 0:
+            return False
+        missing = 0
+        zeros = memoryview(bytes(min(size, MAX_READ_SIZE)))
         try:
-            data = self.read_memory(start, size)
-            if data:
-                with open(filename, 'wb') as f:
-                    f.write(data)
-                print(f"✅ Dumped memory 0x{start:08X}-0x{start+size:08X} to {filename}")
-                return True
+            if compress:
+                # المستوى 1: الضغط لا يبطئ التفريغ عن سرعة المقبس
+                with gzip.open(filename, 'wb', compresslevel=1) as f:
+                    for _, chunk_size, data in self._iter_region(start, size, window):
+                        if not self.connected:
+                            raise ConnectionError("Control connection lost")
+                        if data is None:
+                            missing += chunk_size
+                            data = zeros[:chunk_size]
+                        f.write(data)
+            else:
+                with open(filename, 'w+b') as f:
+                    f.truncate(size)
+                    with mmap.mmap(f.fileno(), size) as mapped, memoryview(mapped) as view:
+                        if self.channel is None:
+                            # بالطريقة القديمة: الرد يُستقبل في الملف نفسه
+                            for offset in range(0, size, MAX_READ_SIZE):
+                                chunk = view[offset:offset + MAX_READ_SIZE]
+                                received = self.read_memory_into(start + offset, chunk)
+                                if received < 0:
+                                    chunk.release()
+                                    raise ConnectionError("Control connection lost")
+                                if received < len(chunk):
+                                    # رد جزئي أو فشل مع بيانات: الجزء كله أصفار
+                                    missing += len(chunk)
+                                    chunk[:] = zeros[:len(chunk)]
+                                chunk.release()
+                        else:
+                            for offset, chunk_size, data in self._iter_region(start, size, window):
+                                if not self.connected:
+                                    raise ConnectionError("Control connection lost")
+                                if data is None:
+                                    missing += chunk_size
+                                else:
+                                    view[offset:offset + chunk_size] = data
+            if missing == size:
+                print(f"❌ Memory region 0x{start:08X}-0x{start+size:08X} is not readable")
+                return False
+            note = f" ({missing:,} unreadable bytes zero-filled)" if missing else ""
+            print(f"✅ Dumped memory 0x{start:08X}-0x{start+size:08X} to {filename}{note}")
+            return True
         except Exception as e:
             print(f"Memory dump error: {e}")
         return False
@@ -3,6 +3,7 @@ import os
 import time
 import threading
 import json
+import contextlib
 from enum import Enum
 from dataclasses import dataclass
 from typing import Dict, List, Optional, Tuple
@@ -42,9 +43,13 @@ class UnifiedMultiplayerSystem:
         self.injector = AdvancedInjector()
         self.cpp_controller = None
         self.memory_manager = None
+        self.local_stream = None  # بث حالة اللاعب المحلي من النواة (بدل الاستطلاع)
         
         # حالة النظام
         self.players: Dict[int, PlayerInfo] = {}
+        # آخر تحديث لكل لاعب بعيد، يُطبق في نبضة المزامنة التالية (دفعة CMD_BATCH واحدة)
+        self._pending_updates: Dict[int, Tuple[Tuple[float, float, float], Tuple[float, float, float]]] = {}
+        self._updates_lock = threading.Lock()
         self.local_player_id = os.getpid()
         self.game_pid = None
         
@@ -144,6 +149,9 @@ class UnifiedMultiplayerSystem:
         if status:
             print(f"📊 C++ Core Status: {json.dumps(status, indent=2)}")
         
+        # النواة تدفع حالة اللاعب عند تغيرها (ضعف معدل المزامنة ليبقى الإطار حديثاً)
+        self.local_stream = self.cpp_controller.subscribe_local_player(rate=self.sync_rate * 2)
+        
         print("✅ C++ core initialized")
         return True
     
@@ -197,8 +205,9 @@ class UnifiedMultiplayerSystem:
                 # تحديث بيانات اللاعب المحلي
                 self._update_local_player()
                 
-                # مزامنة مع اللاعبين الآخرين
-                self._sync_with_remote_players()
+                # مزامنة مع اللاعبين الآخرين (أوامر C++ في إطار CMD_BATCH واحد)
+                with self._control_batch():
+                    self._sync_with_remote_players()
                 
                 # انتظار للمعدل المطلوب
                 time.sleep(sync_interval)
@@ -207,6 +216,12 @@ class UnifiedMultiplayerSystem:
                 print(f"Sync error: {e}")
                 time.sleep(1)
     
+    def _control_batch(self):
+        """دفعة أوامر التحكم للنبضة (بدون اتصال C++: لا شيء)"""
+        if self.cpp_controller and self.cpp_controller.connected:
+            return self.cpp_controller.batch()
+        return contextlib.nullcontext()
+    
     def _update_local_player(self):
         """تحديث بيانات اللاعب المحلي"""
         player_data = self._get_local_player_data()
@@ -231,25 +246,40 @@ class UnifiedMultiplayerSystem:
                 # يمكن إرسال البيانات عبر C++ للشبكة
                 pass
     
+    def _get_cpp_player_data(self) -> Optional[Dict]:
+        """بيانات اللاعب من النواة: آخر إطار مدفوع بدون انتظار، وإلا قراءة مباشرة"""
+        rotation = (0, 0, 0)
+        # إطار أقدم من مهلة الإبقاء يعني أن النواة توقفت عن البث: استطلاع
+        state = self.local_stream.fresh() if self.local_stream else None
+        if state is not None:
+            position, rotation = state.position, state.rotation
+        else:
+            position = self.cpp_controller.get_local_player_position()
+        if not position:
+            return None
+        return {
+            'position': position,
+            'rotation': rotation,
+            'velocity': (0, 0, 0),
+            'health': 100,
+            'armor': 0
+        }
+    
     def _get_local_player_data(self) -> Optional[Dict]:
         """الحصول على بيانات اللاعب المحلي"""
         try:
             if self.mode == SystemMode.CPP_ONLY and self.cpp_controller:
                 # استخدام C++ للحصول على البيانات
-                position = self.cpp_controller.get_local_player_position()
-                if position:
-                    return {
-                        'position': position,
-                        'rotation': (0, 0, 0),
-                        'velocity': (0, 0, 0),
-                        'health': 100,
-                        'armor': 0
-                    }
+                return self._get_cpp_player_data()
             
             elif self.mode == SystemMode.STANDALONE and self.memory_manager:
                 # استخدام Python للحصول على البيانات
-                position = self.memory_manager.get_player_position()
-                rotation = self.memory_manager.get_player_rotation()
+                # سجل اللاعب كاملاً في قراءة واحدة
+                view = self.memory_manager.get_local_player_view()
+                if view is None:
+                    return None
+                position = view.position
+                rotation = view.rotation
                 
                 return {
                     'position': position,
@@ -262,20 +292,18 @@ class UnifiedMultiplayerSystem:
             elif self.mode == SystemMode.HYBRID:
                 # استخدام كلا النظامين
                 if self.cpp_controller:
-                    position = self.cpp_controller.get_local_player_position()
-                    if position:
-                        return {
-                            'position': position,
-                            'rotation': (0, 0, 0),
-                            'velocity': (0, 0, 0),
-                            'health': 100,
-                            'armor': 0
-                        }
+                    data = self._get_cpp_player_data()
+                    if data:
+                        return data
                 
                 # fallback إلى Python
                 if self.memory_manager:
-                    position = self.memory_manager.get_player_position()
-                    rotation = self.memory_manager.get_player_rotation()
+                    # سجل اللاعب كاملاً في قراءة واحدة
+                    view = self.memory_manager.get_local_player_view()
+                    if view is None:
+                        return None
+                    position = view.position
+                    rotation = view.rotation
                     
                     return {
                         'position': position,
@@ -291,9 +319,11 @@ class UnifiedMultiplayerSystem:
         return None
     
     def _sync_with_remote_players(self):
-        """المزامنة مع اللاعبين الآخرين"""
-        # هذه وظيفة ستتم مزامنتها مع الشبكة
-        pass
+        """المزامنة مع اللاعبين الآخرين: تطبيق تحديثات المواقع المنتظرة"""
+        with self._updates_lock:
+            updates, self._pending_updates = self._pending_updates, {}
+        for player_id, (position, rotation) in updates.items():
+            self._apply_player_update(player_id, position, rotation)
     
     def _network_loop(self):
         """حلقة الشبكة (للمضيف فقط)"""
@@ -361,7 +391,22 @@ class UnifiedMultiplayerSystem:
     def update_player_position(self, player_id: int, 
                              position: Tuple[float, float, float],
                              rotation: Tuple[float, float, float]) -> bool:
-        """تحديث موقع لاعب"""
+        """تحديث موقع لاعب (أثناء عمل حلقة المزامنة يُطبق في نبضتها التالية)"""
+        if player_id not in self.players:
+            return False
+        
+        if self.running and self.sync_thread and self.sync_thread.is_alive():
+            # التحديثات المتتالية لنفس اللاعب قبل النبضة: الأحدث فقط
+            with self._updates_lock:
+                self._pending_updates[player_id] = (position, rotation)
+            return True
+        
+        return self._apply_player_update(player_id, position, rotation)
+    
+    def _apply_player_update(self, player_id: int,
+                             position: Tuple[float, float, float],
+                             rotation: Tuple[float, float, float]) -> bool:
+        """تطبيق تحديث موقع لاعب على نواة C++ ومدير الذاكرة"""
         if player_id not in self.players:
             return False
         
@@ -425,6 +470,8 @@ class UnifiedMultiplayerSystem:
         
         # إيقاف نواة C++
         if self.cpp_controller:
+            if self.local_stream:
+                self.cpp_controller.unsubscribe(self.local_stream)
             self.cpp_controller.shutdown_core()
             self.cpp_controller.disconnect()
         
@@ -450,20 +497,30 @@ class UnifiedMultiplayerSystem:
         }
         
         try:
-            # اختبار سرعة القراءة
-            start_time = time.time()
-            read_count = 100
-            
-            for i in range(read_count):
-                if self.memory_manager:
+            # اختبار سرعة القراءة: حقل بحقل (6 قراءات) مقابل سجل واحد (قراءتان)
+            if self.memory_manager:
+                read_count = 100
+                
+                start_time = time.perf_counter()
+                for i in range(read_count):
                     self.memory_manager.get_player_position()
-            
-            read_time = time.time() - start_time
-            results['tests']['python_read_speed'] = {
-                'ops': read_count,
-                'time': read_time,
-                'ops_per_sec': read_count / read_time
-            }
+                    self.memory_manager.get_player_rotation()
+                    self.memory_manager.get_player_vehicle()
+                field_time = time.perf_counter() - start_time
+                
+                start_time = time.perf_counter()
+                for i in range(read_count):
+                    view = self.memory_manager.get_local_player_view()
+                    if view is not None:
+                        view.position, view.rotation, view.vehicle
+                view_time = time.perf_counter() - start_time
+                
+                results['tests']['python_read_speed'] = {
+                    'ops': read_count,
+                    'per_field_ops_per_sec': read_count / field_time,
+                    'entity_view_ops_per_sec': read_count / view_time,
+                    'speedup': field_time / view_time
+                }
             
             # اختبار سرعة الكتابة
             if self.cpp_controller:
@@ -474,10 +531,20 @@ class UnifiedMultiplayerSystem:
                     self.cpp_controller.write_memory_int(0x00400000, i)
                 
                 write_time = time.time() - start_time
+                
+                # نفس الكتابات في دفعة CMD_BATCH
+                start_time = time.time()
+                with self.cpp_controller.batch():
+                    for i in range(write_count):
+                        self.cpp_controller.write_memory_int(0x00400000, i)
+                batch_time = time.time() - start_time
+                
                 results['tests']['cpp_write_speed'] = {
                     'ops': write_count,
                     'time': write_time,
-                    'ops_per_sec': write_count / write_time
+                    'ops_per_sec': write_count / write_time,
+                    'batched_time': batch_time,
+                    'batched_ops_per_sec': write_count / batch_time if batch_time > 0 else 0.0
                 }
             
             print(f"📈 Benchmark results: {json.dumps(results, indent=2)}")
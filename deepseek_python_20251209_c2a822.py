@@ -4,11 +4,20 @@ import os
 import time
 import threading
 import json
-from enum import IntEnum
+import contextlib
 from dataclasses import dataclass
 from typing import Dict, List, Tuple, Optional
 import socket
-import struct
+
+from NetworkProtocol import PacketType, encode_message, iter_messages, make_message, timestamp_ms
+from SnapshotDelta import SnapshotStreams
+from HostEventLoop import EventLoopEngine
+from FanOut import FanOutSender
+from TickAggregator import TickAggregator, pack_datagrams
+from InterestGrid import InterestManager
+from JitterBuffer import InterpolationBuffer
+from PlayerTable import PlayerTable
+from StateSampler import StateSampler
 
 # التحقق من نظام التشغيل
 if sys.platform != "win32":
@@ -34,17 +43,6 @@ except ImportError:
 USER32 = ctypes.WinDLL('user32', use_last_error=True)
 KERNEL32 = ctypes.WinDLL('kernel32', use_last_error=True)
 
-# أنواع الحزم
-class PacketType(IntEnum):
-    CONNECT = 0x01
-    DISCONNECT = 0x02
-    POSITION = 0x03
-    VEHICLE = 0x04
-    SHOOT = 0x05
-    CHAT = 0x06
-    SYNC = 0x07
-    PING = 0x08
-
 @dataclass
 class NetworkPacket:
     packet_type: int
@@ -60,44 +58,8 @@ class NetworkPacket:
     timestamp: int
     
     def to_bytes(self):
-        """تحويل الحزمة إلى بايتات"""
-        return struct.pack(
-            '<B I fff fff fff H B B B I',
-            self.packet_type,
-            self.player_id,
-            self.position[0], self.position[1], self.position[2],
-            self.rotation[0], self.rotation[1], self.rotation[2],
-            self.velocity[0], self.velocity[1], self.velocity[2],
-            self.animation,
-            self.health,
-            self.armor,
-            self.weapon,
-            self.timestamp
-        )
-    
-    @classmethod
-    def from_bytes(cls, data: bytes):
-        """إنشاء حزمة من البايتات"""
-        fmt = '<B I fff fff fff H B B B I'
-        size = struct.calcsize(fmt)
-        
-        if len(data) < size:
-            return None
-        
-        unpacked = struct.unpack(fmt, data[:size])
-        return cls(
-            packet_type=unpacked[0],
-            player_id=unpacked[1],
-            position=(unpacked[2], unpacked[3], unpacked[4]),
-            rotation=(unpacked[5], unpacked[6], unpacked[7]),
-            velocity=(unpacked[8], unpacked[9], unpacked[10]),
-            animation=unpacked[11],
-            health=unpacked[12],
-            armor=unpacked[13],
-            weapon=unpacked[14],
-            vehicle_model=unpacked[15],
-            timestamp=unpacked[16]
-        )
+        """تحويل الحزمة إلى بايتات (حسب مخطط نوعها)"""
+        return encode_message(self)
 
 # استيراد مدير الذاكرة من ملف منفصل
 try:
@@ -123,6 +85,18 @@ except ImportError:
         def get_player_vehicle(self):
             return 0
             
+        def get_local_player_view(self):
+            return None
+            
+        def enable_read_cache(self):
+            return None
+            
+        def begin_tick(self):
+            pass
+            
+        def write_batch(self):
+            return contextlib.nullcontext()
+            
         def create_remote_player(self, player_id, position):
             return 0, 0
             
@@ -145,7 +119,7 @@ class GTAMultiplayerSystem:
         self.is_host = False
         self.running = False
         self.local_player_id = os.getpid()
-        self.remote_players = {}
+        self.remote_players = PlayerTable()
         
         # أنظمة فرعية
         self.memory_manager = None
@@ -156,16 +130,53 @@ class GTAMultiplayerSystem:
         self.network_thread = None
         self.sync_thread = None
         self.broadcast_thread = None
+        self.render_thread = None
         
         # إعدادات
         self.sync_rate = 20  # 20Hz
+        self.render_rate = 60  # تحديث اللاعبين البعيدين في الذاكرة
         self.broadcast_rate = 5  # 5Hz
         self.port = 5192
         self.broadcast_port = 9999
+        self.use_event_loop = True  # False = الخيوط القديمة (recvfrom مع مهلة)
         
         # مقابس الشبكة
         self.server_socket = None
         self.client_socket = None
+        self.current_server = None
+        self.fan_out = None  # إرسال جماعي من السيرفر
+        
+        # جدول معالجة الحزم حسب النوع
+        self.packet_handlers = {
+            PacketType.CONNECT: self._handle_player_connect,
+            PacketType.DISCONNECT: self._handle_player_disconnect,
+            PacketType.POSITION: self._handle_player_position,
+            PacketType.VEHICLE: self._handle_player_vehicle,
+            PacketType.CHAT: self._handle_player_chat,
+            PacketType.POSITION_DELTA: self._handle_position_delta,
+            PacketType.SNAPSHOT_ACK: self._handle_snapshot_ack,
+        }
+        
+        # لقطات الموقع المضغوطة (مرمز لكل مستقبل)
+        self.snapshot_streams = SnapshotStreams()
+        
+        # تجميع المواقع: حزمة واحدة لكل عميل في كل نبضة
+        self.aggregator = TickAggregator()
+        self._pending_acks = []
+        
+        # إدارة الاهتمام حسب المسافة (None = إرسال الكل للجميع)
+        self.interest = InterestManager()
+        
+        # عرض اللاعبين البعيدين متأخراً ~100ms مع استيفاء بين اللقطات
+        self.interpolation = InterpolationBuffer()
+        
+        # تخطي إرسال الحالة المكررة وتكييف معدل القراءة (حتى ضعف sync_rate أثناء القيادة)
+        self.sampler = StateSampler(tick_rate=2 * self.sync_rate, moving_rate=self.sync_rate)
+        self._sync_ticks = 0
+        
+        # المجمع وفهرس الاهتمام ومرمزات اللقطات يُعدلها خيط الشبكة ويقرؤها خيط المزامنة
+        # (في وضع الخيوط القديم؛ مع حلقة الأحداث القفل بلا تنافس)
+        self.state_lock = threading.Lock()
         
     def initialize(self, as_host=True):
         """تهيئة النظام"""
@@ -179,6 +190,9 @@ class GTAMultiplayerSystem:
             
             if not self.memory_manager.attach_to_process():
                 print("⚠ Could not attach to GTA VC process, continuing in simulation mode")
+            else:
+                # القراءات في نفس نبضة المزامنة تُخدم من ذاكرة الصفحات
+                self.memory_manager.enable_read_cache()
             
             # 2. محاولة حقن DLL (اختياري)
             dll_path = self._get_dll_path()
@@ -228,6 +242,7 @@ class GTAMultiplayerSystem:
                 # ربط بالمنفذ
                 self.server_socket.bind(('0.0.0.0', self.port))
                 self.server_socket.settimeout(0.1)
+                self.fan_out = FanOutSender(self.server_socket)
                 
                 print(f"📡 Server listening on port {self.port}")
             else:
@@ -244,6 +259,10 @@ class GTAMultiplayerSystem:
     
     def _start_subsystems(self):
         """بدء الأنظمة الفرعية"""
+        if self.use_event_loop:
+            self._start_event_loop()
+            return
+        
         # خيط الشبكة
         self.network_thread = threading.Thread(
             target=self._network_loop,
@@ -260,6 +279,14 @@ class GTAMultiplayerSystem:
         )
         self.sync_thread.start()
         
+        # خيط تحديث اللاعبين البعيدين
+        self.render_thread = threading.Thread(
+            target=self._render_loop,
+            daemon=True,
+            name="RenderThread"
+        )
+        self.render_thread.start()
+        
         # خيط البث (للسيرفر فقط)
         if self.is_host:
             self.broadcast_thread = threading.Thread(
@@ -269,6 +296,21 @@ class GTAMultiplayerSystem:
             )
             self.broadcast_thread.start()
     
+    def _start_event_loop(self):
+        """بدء الشبكة والمزامنة والبث على حلقة أحداث واحدة"""
+        sock = self.server_socket if self.is_host else self.client_socket
+        
+        self.network_manager = EventLoopEngine(sock, self._process_incoming_packet,
+                                               on_drained=self._flush_outgoing)
+        self.network_manager.add_periodic(1.0 / self.sampler.tick_rate, self._sync_tick, "Sync")
+        self.network_manager.add_periodic(1.0 / self.render_rate, self._render_tick, "Render")
+        if self.is_host:
+            self.network_manager.add_periodic(1.0 / self.broadcast_rate, self._broadcast_tick, "Broadcast")
+        
+        self.network_manager.start()
+        self.network_thread = self.network_manager.thread
+        print("🌐 Network event loop started")
+    
     def _network_loop(self):
         """حلقة معالجة الشبكة"""
         print("🌐 Starting network loop...")
@@ -280,6 +322,7 @@ class GTAMultiplayerSystem:
                     try:
                         data, addr = self.server_socket.recvfrom(1024)
                         self._process_incoming_packet(data, addr)
+                        self._flush_outgoing()
                     except socket.timeout:
                         continue
                     except OSError as e:
@@ -307,31 +350,11 @@ class GTAMultiplayerSystem:
         """حلقة مزامنة بيانات اللاعب"""
         print("🔄 Starting sync loop...")
         
-        sync_interval = 1.0 / self.sync_rate
+        sync_interval = 1.0 / self.sampler.tick_rate
         
         while self.running:
             try:
-                # الحصول على بيانات اللاعب المحلي
-                player_data = self._get_local_player_data()
-                
-                if player_data:
-                    # إنشاء حزمة
-                    packet = NetworkPacket(
-                        packet_type=PacketType.POSITION.value,
-                        player_id=self.local_player_id,
-                        position=player_data['position'],
-                        rotation=player_data['rotation'],
-                        velocity=player_data['velocity'],
-                        animation=player_data['animation'],
-                        health=player_data['health'],
-                        armor=player_data['armor'],
-                        weapon=player_data['weapon'],
-                        vehicle_model=player_data['vehicle_model'],
-                        timestamp=int(time.time() * 1000)
-                    )
-                    
-                    # إرسال الحزمة
-                    self._send_packet(packet)
+                self._sync_tick()
                 
                 # انتظار للمعدل المطلوب
                 time.sleep(sync_interval)
@@ -341,6 +364,90 @@ class GTAMultiplayerSystem:
                     print(f"Sync error: {e}")
                     time.sleep(1)
     
+    def _sync_tick(self):
+        """نبضة مزامنة واحدة: قراءة اللاعب المحلي وإرساله إن تغير"""
+        now = time.monotonic()
+        self._sync_ticks += 1
+        
+        # القراءة بمعدل المُعاين (أعلى أثناء القيادة، أقل في القوائم والوقوف)
+        if self.sampler.due(now):
+            if self.memory_manager:
+                self.memory_manager.begin_tick()
+            
+            # الحصول على بيانات اللاعب المحلي
+            player_data = self._get_local_player_data()
+            
+            if player_data and self.sampler.offer(player_data, now):
+                # إنشاء حزمة
+                packet = NetworkPacket(
+                    packet_type=PacketType.POSITION.value,
+                    player_id=self.local_player_id,
+                    position=player_data['position'],
+                    rotation=player_data['rotation'],
+                    velocity=player_data['velocity'],
+                    animation=player_data['animation'],
+                    health=player_data['health'],
+                    armor=player_data['armor'],
+                    weapon=player_data['weapon'],
+                    vehicle_model=player_data['vehicle_model'],
+                    timestamp=timestamp_ms()
+                )
+                
+                # إرسال الحزمة كلقطة مضغوطة
+                with self.state_lock:
+                    self._send_position(packet)
+        
+        # السيرفر يرسل مواقع كل اللاعبين المجمعة بمعدل sync_rate
+        aggregate_every = max(1, round(self.sampler.tick_rate / self.sync_rate))
+        if self.is_host and self._sync_ticks % aggregate_every == 0:
+            with self.state_lock:
+                self._send_aggregates()
+        self._flush_outgoing()
+    
+    def _render_loop(self):
+        """حلقة تحديث اللاعبين البعيدين في الذاكرة"""
+        render_interval = 1.0 / self.render_rate
+        
+        while self.running:
+            try:
+                self._render_tick()
+                time.sleep(render_interval)
+                
+            except Exception as e:
+                if self.running:
+                    print(f"Render error: {e}")
+                    time.sleep(1)
+    
+    def _render_tick(self):
+        """كتابة الحالة المستوفاة لكل لاعب بعيد في ذاكرة اللعبة"""
+        if not self.memory_manager:
+            return
+        
+        # كل كتابات النبضة تُرسل دفعة واحدة مدمجة عند الخروج
+        try:
+            with self.memory_manager.write_batch():
+                now = time.monotonic()
+                for record in self.remote_players.snapshot():
+                    if record.entity_addr == 0:
+                        continue
+                    
+                    state = self.interpolation.sample(record.player_id, now)
+                    if state is None:
+                        continue
+                    
+                    position, rotation, animation = state
+                    try:
+                        self.memory_manager.update_remote_player(
+                            entity_addr=record.entity_addr,
+                            position=position,
+                            rotation=rotation,
+                            animation=animation
+                        )
+                    except Exception as e:
+                        print(f"Failed to update remote player: {e}")
+        except Exception as e:
+            print(f"Failed to flush render writes: {e}")
+    
     def _broadcast_loop(self):
         """حلقة بث وجود السيرفر"""
         if not self.is_host or not self.server_socket:
@@ -352,24 +459,7 @@ class GTAMultiplayerSystem:
         
         while self.running:
             try:
-                # إنشاء حزمة بث
-                packet = NetworkPacket(
-                    packet_type=PacketType.CONNECT.value,
-                    player_id=self.local_player_id,
-                    position=(0, 0, 0),
-                    rotation=(0, 0, 0),
-                    velocity=(0, 0, 0),
-                    animation=0,
-                    health=100,
-                    armor=0,
-                    weapon=0,
-                    vehicle_model=0,
-                    timestamp=int(time.time() * 1000)
-                )
-                
-                # البث على الشبكة المحلية
-                broadcast_addr = ('255.255.255.255', self.broadcast_port)
-                self.server_socket.sendto(packet.to_bytes(), broadcast_addr)
+                self._broadcast_tick()
                 
                 time.sleep(broadcast_interval)
                 
@@ -378,29 +468,51 @@ class GTAMultiplayerSystem:
                     print(f"Broadcast error: {e}")
                     time.sleep(1)
     
+    def _broadcast_tick(self):
+        """بث حزمة وجود السيرفر مرة واحدة"""
+        if not self.server_socket:
+            return
+        
+        # إنشاء حزمة بث
+        packet = NetworkPacket(
+            packet_type=PacketType.CONNECT.value,
+            player_id=self.local_player_id,
+            position=(0, 0, 0),
+            rotation=(0, 0, 0),
+            velocity=(0, 0, 0),
+            animation=0,
+            health=100,
+            armor=0,
+            weapon=0,
+            vehicle_model=0,
+            timestamp=timestamp_ms()
+        )
+        
+        # البث على الشبكة المحلية
+        broadcast_addr = ('255.255.255.255', self.broadcast_port)
+        self.server_socket.sendto(encode_message(packet), broadcast_addr)
+    
     def _get_local_player_data(self) -> Optional[Dict]:
         """الحصول على بيانات اللاعب المحلي"""
         try:
             if not self.memory_manager:
                 return None
             
-            # قراءة موقع اللاعب
-            position = self.memory_manager.get_player_position()
-            
-            # قراءة دوران اللاعب
-            rotation = self.memory_manager.get_player_rotation()
+            # سجل اللاعب كاملاً في قراءة واحدة (بدل قراءة لكل حقل)
+            view = self.memory_manager.get_local_player_view()
+            if view is None:
+                return None
             
-            # قراءة المركبة (إذا كان في واحدة)
-            vehicle_ptr = self.memory_manager.get_player_vehicle()
+            # المركبة (إذا كان في واحدة)
             vehicle_model = 0
-            if vehicle_ptr:
+            if view.vehicle:
                 vehicle_model = 400  # افتراضي
             
             return {
-                'position': position,
-                'rotation': rotation,
-                'velocity': (0, 0, 0),
-                'animation': 0,
+                'position': view.position,
+                'rotation': view.rotation,
+                'velocity': (0, 0, 0),  # يملؤها StateSampler من المواقع المؤرخة
+                'animation': view.animation,
                 'health': 100,
                 'armor': 0,
                 'weapon': 0,
@@ -414,37 +526,33 @@ class GTAMultiplayerSystem:
     def _process_incoming_packet(self, data: bytes, addr: tuple):
         """معالجة الحزمة الواردة"""
         try:
-            packet = NetworkPacket.from_bytes(data)
-            if not packet:
-                return
-            
-            # تجاهل الحزم الخاصة بي
-            if packet.player_id == self.local_player_id:
-                return
-            
-            # معالجة حسب نوع الحزمة
-            if packet.packet_type == PacketType.CONNECT.value:
-                print(f"👤 Player {packet.player_id} connected from {addr[0]}:{addr[1]}")
-                self._handle_player_connect(packet, addr)
-                
-            elif packet.packet_type == PacketType.DISCONNECT.value:
-                print(f"👤 Player {packet.player_id} disconnected")
-                self._handle_player_disconnect(packet)
-                
-            elif packet.packet_type == PacketType.POSITION.value:
-                self._handle_player_position(packet)
+            with self.state_lock:
+                self._pending_acks = []
                 
-            elif packet.packet_type == PacketType.VEHICLE.value:
-                self._handle_player_vehicle(packet)
+                # الحزمة قد تحتوي عدة رسائل (لقطات مجمعة من السيرفر)
+                for packet_type, packet in iter_messages(data):
+                    # تجاهل الحزم الخاصة بي
+                    if packet.player_id == self.local_player_id:
+                        continue
+                    
+                    # معالجة حسب نوع الحزمة
+                    handler = self.packet_handlers.get(packet_type)
+                    if handler:
+                        handler(packet, addr)
                 
-            elif packet.packet_type == PacketType.CHAT.value:
-                self._handle_player_chat(packet)
+                # تأكيدات كل اللقطات في حزمة واحدة للمرسل
+                if self._pending_acks:
+                    for datagram in pack_datagrams(self._pending_acks):
+                        self._send_raw(datagram, addr)
+                    self._pending_acks = []
             
         except Exception as e:
             print(f"Error processing packet: {e}")
     
-    def _handle_player_connect(self, packet: NetworkPacket, addr: tuple):
+    def _handle_player_connect(self, packet, addr: tuple):
         """معالجة اتصال لاعب جديد"""
+        print(f"👤 Player {packet.player_id} connected from {addr[0]}:{addr[1]}")
+        
         # إنلاعب عن بعد في الذاكرة
         if self.memory_manager and hasattr(self.memory_manager, 'is_attached') and self.memory_manager.is_attached:
             try:
@@ -454,14 +562,13 @@ class GTAMultiplayerSystem:
                 )
                 
                 if entity_addr:
-                    self.remote_players[packet.player_id] = {
-                        'slot': slot,
-                        'entity_addr': entity_addr,
-                        'address': addr,
-                        'last_update': time.time(),
-                        'position': packet.position,
-                        'rotation': packet.rotation
-                    }
+                    self.remote_players.add(
+                        packet.player_id, addr,
+                        position=packet.position,
+                        rotation=packet.rotation,
+                        entity_addr=entity_addr,
+                        slot=slot
+                    )
                     
                     print(f"✅ Created remote player {packet.player_id} at slot {slot}")
                 
@@ -469,88 +576,93 @@ class GTAMultiplayerSystem:
                 print(f"Failed to create remote player: {e}")
         else:
             # حفظ المعلومات بدون إنشاء في الذاكرة
-            self.remote_players[packet.player_id] = {
-                'slot': -1,
-                'entity_addr': 0,
-                'address': addr,
-                'last_update': time.time(),
-                'position': packet.position,
-                'rotation': packet.rotation
-            }
+            self.remote_players.add(
+                packet.player_id, addr,
+                position=packet.position,
+                rotation=packet.rotation
+            )
             print(f"📝 Registered remote player {packet.player_id} (memory not attached)")
         
         # إذا كنت سيرفر، قم بإعادة البث للآخرين
         if self.is_host:
             self._broadcast_packet(packet, exclude_addr=addr)
     
-    def _handle_player_disconnect(self, packet: NetworkPacket):
+    def _handle_player_disconnect(self, packet, addr: tuple = None):
         """معالجة انفصال لاعب"""
-        if packet.player_id in self.remote_players:
-            player_info = self.remote_players[packet.player_id]
-            
+        print(f"👤 Player {packet.player_id} disconnected")
+        
+        player_info = self.remote_players.remove(packet.player_id)
+        if player_info:
             # تدمير الكائن في الذاكرة إذا كان موجوداً
-            if self.memory_manager and player_info.get('entity_addr', 0) != 0:
+            if self.memory_manager and player_info.entity_addr != 0:
                 try:
-                    self.memory_manager.destroy_entity(player_info['entity_addr'])
+                    self.memory_manager.destroy_entity(player_info.entity_addr)
                 except Exception as e:
                     print(f"Warning: Failed to destroy entity: {e}")
             
-            del self.remote_players[packet.player_id]
+            self.snapshot_streams.forget(player_id=packet.player_id, peer=player_info.address)
+            self.aggregator.forget(packet.player_id)
+            self.interpolation.forget(packet.player_id)
+            if self.interest:
+                self.interest.remove(packet.player_id)
+            if self.fan_out:
+                self.fan_out.forget(player_info.address)
             print(f"✅ Removed remote player {packet.player_id}")
     
-    def _handle_player_position(self, packet: NetworkPacket):
+    def _handle_player_position(self, packet, addr: tuple = None):
         """معالجة تحديث موقع لاعب"""
-        if packet.player_id in self.remote_players:
-            player_info = self.remote_players[packet.player_id]
-            player_info['last_update'] = time.time()
-            player_info['position'] = packet.position
-            player_info['rotation'] = packet.rotation
-            
-            # تحديث الكائن في الذاكرة
-            if self.memory_manager and player_info.get('entity_addr', 0) != 0:
-                try:
-                    self.memory_manager.update_remote_player(
-                        entity_addr=player_info['entity_addr'],
-                        position=packet.position,
-                        rotation=packet.rotation,
-                        animation=packet.animation
-                    )
-                except Exception as e:
-                    print(f"Failed to update remote player: {e}")
+        if self.remote_players.update(packet.player_id, packet.position, packet.rotation, packet.velocity):
+            # الكائن في الذاكرة يُحدث من مخزن الاستيفاء في _render_tick
+            self.interpolation.push(packet.player_id, packet)
             
-            # إذا كنت سيرفر، قم بإعادة البث للآخرين
+            # إذا كنت سيرفر، يُعاد البث مع النبضة التالية
             if self.is_host:
-                self._broadcast_packet(packet)
+                if self.interest:
+                    self.interest.update(packet.player_id, packet.position)
+                self.aggregator.update(packet.player_id, packet, addr)
+    
+    def _handle_position_delta(self, packet, addr: tuple = None):
+        """معالجة لقطة موقع مضغوطة"""
+        state, ack_sequence = self.snapshot_streams.decode(packet, addr)
+        
+        # تأكيد الاستلام ليستخدمه المرسل كأساس للفروق القادمة
+        if ack_sequence is not None:
+            self._pending_acks.append(
+                self.snapshot_streams.make_ack(self.local_player_id, packet.player_id, ack_sequence)
+            )
+        
+        if state:
+            self._handle_player_position(state, addr)
+    
+    def _handle_snapshot_ack(self, packet, addr: tuple = None):
+        """معالجة تأكيد استلام لقطة"""
+        self.snapshot_streams.acknowledge(packet.subject_id, addr, packet.sequence)
     
-    def _handle_player_vehicle(self, packet: NetworkPacket):
+    def _handle_player_vehicle(self, packet, addr: tuple = None):
         """معالجة تحديث مركبة لاعب"""
         # سيتم تنفيذ هذا لاحقاً
         print(f"Vehicle update from player {packet.player_id}")
     
-    def _handle_player_chat(self, packet: NetworkPacket):
+    def _handle_player_chat(self, packet, addr: tuple = None):
         """معالجة رسالة دردشة"""
-        # فك تشفير الرسالة
-        print(f"💬 Player {packet.player_id}: [Chat message]")
+        print(f"💬 Player {packet.player_id}: {packet.text}")
+        
+        # إذا كنت سيرفر، قم بإعادة البث للآخرين
+        if self.is_host:
+            self._broadcast_packet(packet, exclude_addr=addr)
     
-    def _send_packet(self, packet: NetworkPacket):
+    def _send_packet(self, packet):
         """إرسال حزمة"""
         try:
             if self.is_host and self.server_socket:
-                # السيرفر يبث للجميع
-                for player_id, info in self.remote_players.items():
-                    if 'address' in info:
-                        try:
-                            self.server_socket.sendto(
-                                packet.to_bytes(),
-                                info['address']
-                            )
-                        except Exception as e:
-                            print(f"Failed to send to player {player_id}: {e}")
+                # السيرفر يبث للجميع (ترميز مرة واحدة)
+                addrs = list(self.remote_players.recipients())
+                self.fan_out.send_many(encode_message(packet), addrs)
             elif not self.is_host and self.client_socket and self.current_server:
                 # العميل يرسل للسيرفر
                 try:
                     self.client_socket.sendto(
-                        packet.to_bytes(),
+                        encode_message(packet),
                         self.current_server
                     )
                 except Exception as e:
@@ -559,20 +671,53 @@ class GTAMultiplayerSystem:
         except Exception as e:
             print(f"Error sending packet: {e}")
     
-    def _broadcast_packet(self, packet: NetworkPacket, exclude_addr=None):
+    def _send_raw(self, data: bytes, addr: tuple):
+        """إرسال بيانات مرمزة إلى عنوان"""
+        sock = self.server_socket if self.is_host else self.client_socket
+        if sock and addr:
+            try:
+                sock.sendto(data, addr)
+            except Exception as e:
+                print(f"Failed to send to {addr}: {e}")
+    
+    def _send_position(self, packet):
+        """إرسال موقع اللاعب المحلي كلقطات مضغوطة"""
+        if self.is_host:
+            if self.interest:
+                self.interest.update(packet.player_id, packet.position)
+            self.aggregator.update(packet.player_id, packet)
+        elif self.current_server:
+            data = self.snapshot_streams.encode(packet.player_id, self.current_server, packet)
+            if data:
+                self._send_raw(data, self.current_server)
+    
+    def _send_aggregates(self):
+        """إرسال آخر حالة لكل اللاعبين: حزمة واحدة (أو أكثر حسب MTU) لكل عميل"""
+        if not self.is_host or not self.server_socket:
+            return
+        
+        recipients = self.remote_players.recipients()
+        
+        if self.interest:
+            self.interest.refresh(recipients.values())
+        self.fan_out.queue_batch(
+            self.aggregator.build(recipients, self.snapshot_streams, self.interest)
+        )
+    
+    def _broadcast_packet(self, packet, exclude_addr=None):
         """بث حزمة لجميع العملاء"""
         if not self.is_host or not self.server_socket:
             return
         
-        for player_id, info in self.remote_players.items():
-            if 'address' in info and info['address'] != exclude_addr:
-                try:
-                    self.server_socket.sendto(
-                        packet.to_bytes(),
-                        info['address']
-                    )
-                except Exception as e:
-                    print(f"Failed to broadcast to player {player_id}: {e}")
+        data = encode_message(packet)
+        self.fan_out.queue_many(data, [
+            addr for addr in self.remote_players.recipients() if addr != exclude_addr
+        ])
+    
+    def _flush_outgoing(self):
+        """إرسال كل الحزم المعلقة في مرحلة الإرسال الجماعي"""
+        if self.fan_out:
+            self.fan_out.flush()
     
     def connect_to_server(self, server_ip: str, server_port: int = None):
         """الاتصال بسيرفر"""
@@ -584,8 +729,9 @@ class GTAMultiplayerSystem:
             server_port = self.port
         
         try:
-            # حفظ معلومات السيرفر
-            self.current_server = (server_ip, server_port)
+            # حفظ معلومات السيرفر بالصيغة التي يعيدها recvfrom (IP رقمي)، فالتأكيدات تطابق مفتاح اللقطات
+            self.current_server = socket.getaddrinfo(server_ip, server_port, socket.AF_INET,
+                                                     socket.SOCK_DGRAM)[0][4]
             
             # إنشاء حزمة اتصال
             packet = NetworkPacket(
@@ -599,14 +745,14 @@ class GTAMultiplayerSystem:
                 armor=0,
                 weapon=0,
                 vehicle_model=0,
-                timestamp=int(time.time() * 1000)
+                timestamp=timestamp_ms()
             )
             
             # إرسال طلب الاتصال
             if self.client_socket:
                 self.client_socket.sendto(
-                    packet.to_bytes(),
-                    (server_ip, server_port)
+                    encode_message(packet),
+                    self.current_server
                 )
             
             print(f"🔗 Connecting to server {server_ip}:{server_port}...")
@@ -618,8 +764,13 @@ class GTAMultiplayerSystem:
     
     def send_chat_message(self, message: str):
         """إرسال رسالة دردشة"""
-        # سيتم تنفيذ هذا لاحقاً
-        print(f"Sending chat: {message}")
+        packet = make_message(
+            PacketType.CHAT,
+            player_id=self.local_player_id,
+            timestamp=timestamp_ms(),
+            text=message
+        )
+        self._send_packet(packet)
     
     def get_player_list(self) -> List[Dict]:
         """الحصول على قائمة اللاعبين"""
@@ -633,12 +784,12 @@ class GTAMultiplayerSystem:
         })
         
         # اللاعبين عن بعد
-        for player_id, info in self.remote_players.items():
+        for record in self.remote_players.snapshot():
             players.append({
-                'id': player_id,
+                'id': record.player_id,
                 'is_local': False,
-                'position': info.get('position', (0, 0, 0)),
-                'last_update': info.get('last_update', 0)
+                'position': record.position,
+                'last_update': record.last_update
             })
         
         return players
@@ -649,6 +800,11 @@ class GTAMultiplayerSystem:
         
         self.running = False
         
+        # إيقاف حلقة الأحداث (المزامنة والبث تتوقف معها)
+        if self.network_manager:
+            self.network_manager.stop()
+            self.network_manager = None
+        
         # إرسال حزمة انفصال
         if len(self.remote_players) > 0:
             try:
@@ -663,7 +819,7 @@ class GTAMultiplayerSystem:
                     armor=0,
                     weapon=0,
                     vehicle_model=0,
-                    timestamp=int(time.time() * 1000)
+                    timestamp=timestamp_ms()
                 )
                 
                 self._send_packet(disconnect_packet)
@@ -672,11 +828,10 @@ class GTAMultiplayerSystem:
         
         # تنظيف الذاكرة
         if self.memory_manager:
-            for player_id in list(self.remote_players.keys()):
+            for record in self.remote_players.snapshot():
                 try:
-                    info = self.remote_players[player_id]
-                    if info.get('entity_addr', 0) != 0:
-                        self.memory_manager.destroy_entity(info['entity_addr'])
+                    if record.entity_addr != 0:
+                        self.memory_manager.destroy_entity(record.entity_addr)
                 except:
                     pass
             
@@ -699,6 +854,8 @@ class GTAMultiplayerSystem:
             threads_to_wait.append(self.sync_thread)
         if self.broadcast_thread and self.broadcast_thread.is_alive():
             threads_to_wait.append(self.broadcast_thread)
+        if self.render_thread and self.render_thread.is_alive():
+            threads_to_wait.append(self.render_thread)
         
         for thread in threads_to_wait:
             thread.join(timeout=2)